@@ -4,8 +4,10 @@ __docformat__ = 'restructuredtext'
 
 import cookielib
 from copy import deepcopy
+import json
 from StringIO import StringIO
 import sys
+import time
 import urllib
 import urllib2
 import urlparse
@@ -117,14 +119,22 @@ class Dispatcher (object):
         """Return a deep copy of the base document."""
         return deepcopy(self.__base_doc)
 
-    def import_document (self, document, import_message):
+    def import_document (self, document, import_message, poll_interval=1,
+                         timeout=3600):
         """Import `document` into EATS. Return the URL of the
-        resulting page.
+        resulting page, once the import has been carried out.
+
+        Raise an exception if the import fails, or if it has not
+        completed within `timeout` seconds (for example, because no
+        worker is running on the server).
 
         Arguments:
 
         - `document`: EATSML document
         - `import_message`: string description of import
+        - `poll_interval`: seconds to wait between checks on the
+          progress of the import
+        - `timeout`: seconds to wait for the import to complete
 
         """
         string = etree.tostring(document, encoding='utf-8', pretty_print=True)
@@ -134,7 +144,34 @@ class Dispatcher (object):
                   'csrfmiddlewaretoken': self.__csrf_token}
         url = urlparse.urljoin(self.base_url, self.__urls['import'])
         handle = urllib2.urlopen(url, params)
-        return handle.geturl()
+        import_url = handle.geturl()
+        # The import is queued on the server, and carried out by a
+        # separate worker.
+        deadline = time.time() + timeout
+        while True:
+            progress = self.get_import_progress(import_url)
+            if progress['status'] == 'completed':
+                return import_url
+            if progress['status'] == 'failed':
+                raise Exception('EATS import failed: %s' % progress['error'])
+            if time.time() >= deadline:
+                raise Exception(
+                    'EATS import did not complete within %d seconds '
+                    '(status: %s): %s' % (timeout, progress['status'],
+                                          import_url))
+            time.sleep(poll_interval)
+
+    def get_import_progress (self, base_url):
+        """Return a dictionary of the progress of the import at
+        `base_url`.
+
+        Arguments:
+
+        - `base_url`: string URL of the import
+
+        """
+        url = urlparse.urljoin(base_url, 'progress/')
+        return json.load(urllib2.urlopen(url))
 
     def get_annotated_import (self, base_url):
         """Return a `CollectionElementClass` instance of the annotated
@@ -1,6 +1,6 @@
-from django.conf import settings
 from django.shortcuts import render_to_response
 
+from eats.lib.topic_map_context import get_current_context, get_eats_topic_map, TopicMapContext
 from eats.models import EATSTopicMap
 
 
@@ -14,8 +14,16 @@ def add_topic_map (fn):
     
     """
     def wrapper (request, *args, **kwargs):
+        if get_current_context() is None:
+            # Share the topic map with everything used by the view,
+            # even when TopicMapMiddleware is not installed.
+            with TopicMapContext():
+                return call_view(request, *args, **kwargs)
+        return call_view(request, *args, **kwargs)
+
+    def call_view (request, *args, **kwargs):
         try:
-            tm = EATSTopicMap.objects.get(iri=settings.EATS_TOPIC_MAP)
+            tm = get_eats_topic_map()
         except AttributeError:
             # The EATS_TOPIC_MAP setting is not set.
             context_data = {'error_heading': 'EATS configuration error',
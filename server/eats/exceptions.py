@@ -19,6 +19,14 @@ class EATSImportException (EATSException):
     pass
 
 
+class EATSImportLeaseException (EATSImportException):
+
+    """Exception raised when an import job finds that its import has
+    been claimed by another worker."""
+
+    pass
+
+
 class EATSMergedIdentifierException (EATSException):
 
     """Exception raised when an entity identifier that no longer exists
@@ -1,7 +1,9 @@
 from django import forms
+from django.utils.functional import lazy
 
 from eats.models import Calendar, DatePeriod, DateType, EATSUser, EntityRelationshipType, EntityType, Language, NamePartType, NameType, Script
 from eats.forms.edit import create_choice_list
+from eats.lib.authority_usage import AuthorityUsageIndex
 
 
 class AdminForm (forms.Form):
@@ -66,29 +68,74 @@ class AuthorityForm (AdminForm):
     scripts = forms.MultipleChoiceField(choices=[], required=False)
     editors = forms.MultipleChoiceField(choices=[], required=False)
 
+    # Form fields for the authority's components, with the component
+    # type and model of each.
+    COMPONENT_FIELDS = (
+        ('calendars', 'calendar', Calendar),
+        ('date_periods', 'date_period', DatePeriod),
+        ('date_types', 'date_type', DateType),
+        ('entity_relationship_types', 'entity_relationship_type',
+         EntityRelationshipType),
+        ('entity_types', 'entity_type', EntityType),
+        ('languages', 'language', Language),
+        ('name_types', 'name_type', NameType),
+        ('name_part_types', 'name_part_type', NamePartType),
+        ('scripts', 'script', Script))
+
     def __init__ (self, topic_map, model, data=None, instance=None, **kwargs):
         super(AuthorityForm, self).__init__(topic_map, model, data=data,
                                             instance=instance, **kwargs)
-        self.fields['calendars'].choices = create_choice_list(
-            topic_map, Calendar.objects.all())[1:]
-        self.fields['date_periods'].choices = create_choice_list(
-            topic_map, DatePeriod.objects.all())[1:]
-        self.fields['date_types'].choices = create_choice_list(
-            topic_map, DateType.objects.all())[1:]
-        self.fields['entity_relationship_types'].choices = create_choice_list(
-            topic_map, EntityRelationshipType.objects.all())[1:]
-        self.fields['entity_types'].choices = create_choice_list(
-            topic_map, EntityType.objects.all())[1:]
-        self.fields['languages'].choices = create_choice_list(
-            topic_map, Language.objects.all())[1:]
-        self.fields['name_types'].choices = create_choice_list(
-            topic_map, NameType.objects.all())[1:]
-        self.fields['name_part_types'].choices = create_choice_list(
-            topic_map, NamePartType.objects.all())[1:]
-        self.fields['scripts'].choices = create_choice_list(
-            topic_map, Script.objects.all())[1:]
+        self._usage = None
+        for field_name, component_type, model in self.COMPONENT_FIELDS:
+            self.fields[field_name].choices = self._create_component_choices(
+                model.objects.all(), component_type)
         self.fields['editors'].choices = [(editor.user.pk, editor.user.username) for editor in EATSUser.objects.all()]
 
+    def _create_component_choices (self, queryset, component_type):
+        """Returns a list of 2-tuples created from the items in
+        `queryset`, with the number of uses of each item by the
+        authority's property assertions added to its label.
+
+        The labels are lazy, so that the uses are counted only if
+        the form is rendered.
+
+        :param queryset: source of data for choices
+        :type queryset: `QuerySet`
+        :param component_type: type of the items
+        :type component_type: `str`
+        :rtype: list
+
+        """
+        get_label = lazy(self._get_component_label, unicode)
+        choices = []
+        for item in queryset:
+            name = item.get_admin_name()
+            choices.append((name, unicode(item.get_id()),
+                            get_label(component_type, item.pk, name)))
+        choices.sort()
+        return [(value, label) for name, value, label in choices]
+
+    def _get_component_label (self, component_type, pk, name):
+        """Returns the label of the component with primary key `pk`,
+        with its number of uses by the authority's property
+        assertions.
+
+        The uses of every component are counted on the first call.
+
+        :rtype: unicode string
+
+        """
+        if self._usage is None:
+            if self.instance is None:
+                self._usage = {}
+            else:
+                self._usage = AuthorityUsageIndex(
+                    self.instance).get_all_usage()
+        uses = self._usage.get(component_type, {}).get(pk)
+        if uses is None:
+            return name
+        return u'%s (in use: %d)' % (name, uses)
+
     def _objectify_data (self, base_data):
         # It would be nice to handle this process of converting
         # submitted form data into model objects where appropriate in
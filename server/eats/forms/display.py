@@ -1,15 +1,48 @@
 from django import forms
 
+from eats.lib.date_bounds import get_date_bounds
 from eats.views.edit import create_choice_list
 
 
+DATE_HELP_TEXT = 'A year, year and month, or year, month and day, such as 1650 or 1650-03-25.'
+
+
 class EntitySearchForm (forms.Form):
 
     name = forms.CharField(label='Name')
     entity_type = forms.ChoiceField(required=False)
+    date_from = forms.CharField(label='Existed from', required=False,
+                                help_text=DATE_HELP_TEXT)
+    date_to = forms.CharField(label='Existed until', required=False,
+                              help_text=DATE_HELP_TEXT)
 
     def __init__ (self, topic_map, *args, **kwargs):
         entity_types = kwargs.pop('entity_types', [])
         super(EntitySearchForm, self).__init__(*args, **kwargs)
         self.fields['entity_type'].choices = create_choice_list(
             topic_map, entity_types)
+
+    def clean (self):
+        cleaned_data = super(EntitySearchForm, self).clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and \
+                get_date_bounds(date_from)[0] > get_date_bounds(date_to)[1]:
+            raise forms.ValidationError(
+                'The date the entity existed from must not be after the date it existed until.')
+        return cleaned_data
+
+    def clean_date_from (self):
+        return self._clean_date('date_from')
+
+    def clean_date_to (self):
+        return self._clean_date('date_to')
+
+    def _clean_date (self, field_name):
+        date = self.cleaned_data[field_name].strip()
+        if date:
+            try:
+                get_date_bounds(date)
+            except ValueError:
+                raise forms.ValidationError('Enter a valid date.')
+        return date
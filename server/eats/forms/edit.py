@@ -6,7 +6,7 @@ import selectable.forms as selectable
 from eats.constants import FORWARD_RELATIONSHIP_MARKER, \
     REVERSE_RELATIONSHIP_MARKER, UNNAMED_ENTITY_NAME
 from eats.lookups import EntityLookup
-from eats.models import Calendar, DatePeriod, DateType, EntityRelationshipType, EntityType, Language, NamePart, NamePartType, NameType, Script
+from eats.models import Calendar, DatePeriod, DateType, EntityRelationshipType, EntityType, Language, NameCache, NamePart, NamePartType, NameType, Script
 
 
 class PropertyAssertionFormSet (BaseFormSet):
@@ -560,14 +560,10 @@ class SubjectIdentifierForm (PropertyAssertionForm):
         duplicate_entities = self.entity.get_duplicate_subject_identifiers(
             subject_identifier, self.authority)
         if duplicate_entities:
-            names = []
-            for duplicate_entity in duplicate_entities:
-                name = duplicate_entity.get_preferred_name(None, None, None)
-                try:
-                    name_form = name.name.assembled_form
-                except AttributeError:
-                    name_form = UNNAMED_ENTITY_NAME
-                names.append(name_form)
+            name_forms = NameCache.objects.get_preferred_forms(
+                duplicate_entities, None, None, None)
+            names = [name_forms.get(duplicate_entity.pk, UNNAMED_ENTITY_NAME)
+                     for duplicate_entity in duplicate_entities]
             raise forms.ValidationError(
                 'This URL is also used by this authority to identify %s; either the URL is incorrect or these entities should be merged.' % (', '.join(names)))
         return subject_identifier
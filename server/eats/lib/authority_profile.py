@@ -0,0 +1,233 @@
+"""Process-local cache of the infrastructure components (calendars,
+languages, scripts, etc) available to each authority.
+
+Validating a property assertion checks that each of its components is
+available to its authority. Rather than querying for each kind of
+component on every validation, an `AuthorityProfile` holding the
+primary keys of all of an authority's components is loaded in a
+single query and kept for the life of the process.
+
+Each time an authority's components are set, a version number stored
+in the database (`AuthorityComponentVersion`) is incremented. A cached
+profile is used only while its version matches the stored one; the
+version is checked once per `TopicMapContext` (that is, once per
+request), or on every validation outside of one.
+
+A profile loaded inside a transaction that has changed the
+authority's components may reflect changes that are later rolled
+back, so it is kept only on the active `TopicMapContext` rather than
+being shared with the rest of the process. Any other profile holds
+only committed data, wherever it is loaded, and is shared.
+
+The number of validations and profile loads are recorded on the
+active `TopicMapContext`, and in total for the process on the cache.
+
+"""
+
+import threading
+
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+
+from tmapi.models import Role, TopicMap
+
+from eats.lib.topic_map_context import get_current_context
+
+
+_local = threading.local()
+
+# Properties of the EATS topic map giving the type of association
+# between an authority and each type of component.
+COMPONENT_ASSOCIATION_TYPES = {
+    'calendar': 'authority_has_calendar_association_type',
+    'date_period': 'authority_has_date_period_association_type',
+    'date_type': 'authority_has_date_type_association_type',
+    'entity_relationship_type':
+        'authority_has_entity_relationship_type_association_type',
+    'entity_type': 'authority_has_entity_type_association_type',
+    'language': 'authority_has_language_association_type',
+    'name_part_type': 'authority_has_name_part_type_association_type',
+    'name_type': 'authority_has_name_type_association_type',
+    'script': 'authority_has_script_association_type',
+    }
+
+
+def _get_changed_authorities ():
+    """Returns the primary keys of the authorities whose components
+    have been changed in the current transaction of this thread.
+
+    The transaction is taken to have ended once this is called
+    outside of an atomic block.
+
+    :rtype: `set` of integers
+
+    """
+    if not hasattr(_local, 'changed_authorities') or \
+            not connection.in_atomic_block:
+        _local.changed_authorities = set()
+    return _local.changed_authorities
+
+
+def load_component_keys (authority):
+    """Returns the primary keys of the components available to
+    `authority`, keyed by component type, fetched in a single query.
+
+    :param authority: the authority
+    :type authority: `Authority`
+    :rtype: `dict` of `set`s
+
+    """
+    topic_map = authority.eats_topic_map
+    component_types = {}
+    component_keys = {}
+    for component_type, name in COMPONENT_ASSOCIATION_TYPES.items():
+        component_types[getattr(topic_map, name).pk] = component_type
+        component_keys[component_type] = set()
+    roles = Role.objects.filter(
+        type=topic_map.infrastructure_role_type,
+        association__type__in=component_types.keys(),
+        association__roles__type=topic_map.authority_role_type,
+        association__roles__player=authority).values_list(
+        'association__type', 'player')
+    for association_type, player in roles:
+        component_keys[component_types[association_type]].add(player)
+    return component_keys
+
+
+class AuthorityProfile (object):
+
+    """The components available to an authority, at a particular
+    version."""
+
+    def __init__ (self, version, component_keys):
+        self.version = version
+        self.component_keys = component_keys
+
+    def has_component (self, component_type, component):
+        """Returns True if `component` is available to the authority.
+
+        :param component_type: type of the component
+        :type component_type: `str`
+        :param component: infrastructure element
+        :type component: `Topic`
+        :rtype: `bool`
+
+        """
+        return component.pk in self.component_keys[component_type]
+
+
+class AuthorityProfileCache (object):
+
+    def __init__ (self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self.reset_statistics()
+
+    def clear (self):
+        """Removes all profiles from the cache."""
+        with self._lock:
+            self._profiles = {}
+
+    def get (self, authority):
+        """Returns the profile of `authority`, loading it if it is not
+        cached or is out of date.
+
+        :param authority: the authority
+        :type authority: `Authority`
+        :rtype: `AuthorityProfile`
+
+        """
+        from eats.models import AuthorityComponentVersion
+        context = get_current_context()
+        profile = None
+        if context is not None:
+            profile = context.authority_profiles.get(authority.pk)
+        if profile is None:
+            with self._lock:
+                profile = self._profiles.get(authority.pk)
+        if profile is not None and context is not None and \
+                authority.pk in context.checked_authority_profiles:
+            return profile
+        version = AuthorityComponentVersion.objects.get_version(authority)
+        self.version_checks += 1
+        if profile is None or profile.version != version:
+            profile = AuthorityProfile(version, load_component_keys(authority))
+            self.loads += 1
+            if context is not None:
+                context.authority_profile_loads += 1
+            if authority.pk in _get_changed_authorities():
+                # The transaction may yet be rolled back.
+                if context is not None:
+                    context.authority_profiles[authority.pk] = profile
+            else:
+                with self._lock:
+                    self._profiles[authority.pk] = profile
+        if context is not None:
+            context.checked_authority_profiles.add(authority.pk)
+        return profile
+
+    def get_statistics (self):
+        """Returns the validation, version check and load counts of
+        the cache.
+
+        :rtype: `dict`
+
+        """
+        return {'loads': self.loads, 'validations': self.validations,
+                'version_checks': self.version_checks}
+
+    def has_component (self, authority, component_type, component):
+        """Returns True if `component` is available to `authority`.
+
+        :param authority: the authority
+        :type authority: `Authority`
+        :param component_type: type of the component
+        :type component_type: `str`
+        :param component: infrastructure element
+        :type component: `Topic`
+        :rtype: `bool`
+
+        """
+        self.validations += 1
+        context = get_current_context()
+        if context is not None:
+            context.component_validations += 1
+        return self.get(authority).has_component(component_type, component)
+
+    def reset_statistics (self):
+        """Resets the validation, version check and load counts to
+        zero."""
+        self.loads = 0
+        self.validations = 0
+        self.version_checks = 0
+
+
+authority_profile_cache = AuthorityProfileCache()
+
+
+def invalidate_authority_profile (authority):
+    """Records that the components available to `authority` have
+    changed, so that every process reloads its profile.
+
+    :param authority: the authority
+    :type authority: `Authority`
+
+    """
+    from eats.models import AuthorityComponentVersion
+    AuthorityComponentVersion.objects.increment(authority)
+    if connection.in_atomic_block:
+        _get_changed_authorities().add(authority.pk)
+    context = get_current_context()
+    if context is not None:
+        context.checked_authority_profiles.discard(authority.pk)
+
+
+def _clear_authority_profile_cache (sender, instance, **kwargs):
+    if kwargs.get('created', True):
+        authority_profile_cache.clear()
+
+for sender in (TopicMap, 'eats.EATSTopicMap'):
+    post_save.connect(_clear_authority_profile_cache, sender=sender,
+                      dispatch_uid='eats_authority_profile_save')
+    post_delete.connect(_clear_authority_profile_cache, sender=sender,
+                        dispatch_uid='eats_authority_profile_delete')
@@ -0,0 +1,204 @@
+"""Counts of the use of infrastructure components (calendars,
+languages, scripts, etc) by the property assertions of an authority.
+
+Each kind of component is counted with a single grouped query,
+optionally restricted to particular components, rather than a count
+for each component. These counts are used to check that components
+being removed from an authority are not in use, and are shown
+alongside the components in the authority's administration form.
+
+"""
+
+from django.db import connection
+from django.db.models import Count
+
+from tmapi.models import Role
+
+from eats.models import Calendar, Date, DatePeriod, DateType, EntityRelationshipPropertyAssertion, EntityTypePropertyAssertion, NamePropertyAssertion
+
+
+# Component types, in the order used by the administration form.
+COMPONENT_TYPES = ('calendar', 'date_period', 'date_type',
+                   'entity_relationship_type', 'entity_type', 'language',
+                   'name_type', 'name_part_type', 'script')
+
+
+class AuthorityUsageIndex (object):
+
+    def __init__ (self, authority):
+        self.authority = authority
+        self.topic_map = authority.eats_topic_map
+
+    def get_all_usage (self):
+        """Returns the number of uses of every component used by the
+        authority's property assertions, keyed by component type and
+        then by the primary key of the component.
+
+        :rtype: `dict` of `dict`s
+
+        """
+        return dict([(component_type, self.get_usage(component_type)) for
+                     component_type in COMPONENT_TYPES])
+
+    def get_usage (self, component_type, components=None):
+        """Returns the number of uses of each component of
+        `component_type` by the authority's property assertions, keyed
+        by the primary key of the component.
+
+        Components that are not used are omitted. Uses are counted as
+        property assertions, except for calendars, date periods and
+        date types, whose uses are counted as dates.
+
+        :param component_type: type of the components
+        :type component_type: `str`
+        :param components: components to count, or None for all
+        :type components: iterable of `Topic`s
+        :rtype: `dict`
+
+        """
+        if components is not None:
+            components = [component.pk for component in components]
+            if not components:
+                return {}
+        rows = getattr(self, '_count_' + component_type)(components)
+        return dict([(component, count) for component, count in rows if
+                     component is not None])
+
+    def _count (self, queryset, path, components):
+        """Returns the number of distinct objects in `queryset`
+        grouped by the component at `path`.
+
+        :rtype: `list` of (primary key, count) `tuple`s
+
+        """
+        if components is not None:
+            queryset = queryset.filter(**{path + '__in': components})
+        return list(queryset.values_list(path).annotate(
+                count=Count('pk', distinct=True)).order_by())
+
+    def _count_calendar (self, components):
+        return self._count_date_scope(Calendar, components)
+
+    def _count_date_period (self, components):
+        # Dates are linked to their date period by one association and
+        # to their property assertion by another, so the counting
+        # starts from the date period.
+        tm = self.topic_map
+        dates = self._get_dates().values('pk')
+        date_periods = DatePeriod.objects.filter(
+            roles__type=tm.date_period_role_type,
+            roles__association__type=tm.date_period_association_type,
+            roles__association__roles__type=tm.date_role_type,
+            roles__association__roles__player__in=dates)
+        if components is not None:
+            date_periods = date_periods.filter(pk__in=components)
+        return list(date_periods.values_list('pk').annotate(
+                count=Count('roles__association__roles__player',
+                            distinct=True)).order_by())
+
+    def _count_date_scope (self, model, components):
+        """Returns the number of dates having a date part in the scope
+        of each component of `model`."""
+        if components is None:
+            # The date parts are also in the scope of topics that are
+            # not of `model`.
+            components = model.objects.values('pk')
+        return self._count(self._get_dates(), 'names__scope', components)
+
+    def _count_date_type (self, components):
+        return self._count_date_scope(DateType, components)
+
+    def _count_entity_relationship_type (self, components):
+        assertions = EntityRelationshipPropertyAssertion.objects.filter(
+            scope=self.authority).filter(
+            roles__type=self.topic_map.entity_relationship_type_role_type)
+        return self._count(assertions, 'roles__player', components)
+
+    def _count_entity_type (self, components):
+        assertions = EntityTypePropertyAssertion.objects.filter(
+            scope=self.authority).filter(
+            roles__type=self.topic_map.property_role_type)
+        return self._count(assertions, 'roles__player', components)
+
+    def _count_language (self, components):
+        return self._count_name_element(self.topic_map.language_role_type,
+                                        components)
+
+    def _count_name_element (self, role_type, components):
+        """Returns the number of name property assertions whose name,
+        or any of whose name parts, plays a role in an association
+        with a component playing a role of `role_type`.
+
+        The assertions reached through names and through name parts
+        are combined with a UNION, so that each assertion is counted
+        once for each component.
+
+        """
+        tm = self.topic_map
+        name_path = 'roles__player__roles__association__roles__player'
+        part_path = name_path + '__roles__association__roles__player'
+        # The conditions of each query are given in a single filter,
+        # so that the grouped column is taken from the same joins.
+        name_filter = {
+            'roles__type': tm.property_role_type,
+            'roles__player__roles__type': tm.name_role_type,
+            'roles__player__roles__association__roles__type': role_type}
+        part_filter = {
+            'roles__type': tm.property_role_type,
+            'roles__player__roles__type': tm.name_role_type,
+            'roles__player__roles__association__roles__type':
+                tm.name_part_role_type,
+            'roles__player__roles__association__roles__player__roles__association__roles__type': role_type}
+        if components is not None:
+            name_filter[name_path + '__in'] = components
+            part_filter[part_path + '__in'] = components
+        names = self._get_name_assertions().filter(**name_filter)
+        parts = self._get_name_assertions().filter(**part_filter)
+        name_sql, name_params = names.values_list(
+            name_path, 'pk').order_by().query.sql_with_params()
+        part_sql, part_params = parts.values_list(
+            part_path, 'pk').order_by().query.sql_with_params()
+        # The result columns of the UNION take their names from the
+        # first query.
+        component = connection.ops.quote_name(
+            Role._meta.get_field('player').column)
+        sql = 'SELECT %s, COUNT(*) FROM (%s UNION %s) uses GROUP BY %s' % (
+            component, name_sql, part_sql, component)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, name_params + part_params)
+            return cursor.fetchall()
+
+    def _count_name_part_type (self, components):
+        tm = self.topic_map
+        assertions = self._get_name_assertions().filter(
+            roles__type=tm.property_role_type,
+            roles__player__roles__type=tm.name_role_type,
+            roles__player__roles__association__roles__type=
+            tm.name_part_role_type)
+        return self._count(
+            assertions,
+            'roles__player__roles__association__roles__player__names__type',
+            components)
+
+    def _count_name_type (self, components):
+        assertions = self._get_name_assertions().filter(
+            roles__type=self.topic_map.property_role_type)
+        return self._count(assertions, 'roles__player__names__type',
+                           components)
+
+    def _count_script (self, components):
+        return self._count_name_element(self.topic_map.script_role_type,
+                                        components)
+
+    def _get_dates (self):
+        """Returns the dates of the authority's property assertions.
+
+        :rtype: `QuerySet` of `Date`s
+
+        """
+        return Date.objects.filter(
+            roles__type=self.topic_map.date_role_type,
+            roles__association__scope=self.authority)
+
+    def _get_name_assertions (self):
+        return NamePropertyAssertion.objects.filter(scope=self.authority)
@@ -0,0 +1,241 @@
+"""Verification and repair of the name cache, name index and entity
+relationship cache against the topic map.
+
+The names and entity relationship property assertions are processed
+in batches, in primary key order. For each batch, the cache entries
+that should exist are built from the topic map and compared with
+those that do exist for the same range of primary keys; entries for
+objects that are not in the topic map are orphans. Only the entries
+that differ are repaired, and only one batch is held in memory at a
+time.
+
+"""
+
+from django.db import transaction
+
+from eats.lib.reindex import build_name_rows, build_relationship_rows, get_batches, map_batches
+from eats.lib.search_backends import get_search_backend
+from eats.models import EntityRelationshipCache, EntityRelationshipPropertyAssertion, EntitySummary, Name, NameCache, NameIndex, StatisticsSnapshot
+from eats.models.statistics_snapshot import NAME_LANGUAGES_SCRIPTS
+
+
+NAME_CACHE_FIELDS = ('entity_id', 'assertion_id', 'authority_id', 'form',
+                     'is_preferred', 'language_id', 'script_id')
+NAME_INDEX_FIELDS = ('entity_id', 'name_part_id', 'form', 'key')
+RELATIONSHIP_CACHE_FIELDS = (
+    'authority_id', 'domain_entity_id', 'range_entity_id',
+    'relationship_type_id', 'forward_relationship_name',
+    'reverse_relationship_name')
+
+MISSING = 'missing'
+ORPHANED = 'orphaned'
+STALE = 'stale'
+
+
+class CacheVerifier (object):
+
+    """Compares the caches with the topic map, optionally repairing
+    any differences, and reports on the drift found."""
+
+    def __init__ (self, repair=True, batch_size=1000, processes=1,
+                  max_details=100):
+        """Initialise the verifier.
+
+        :param repair: whether to repair the differences found
+        :type repair: `bool`
+        :param batch_size: number of names or relationships per batch
+        :type batch_size: int
+        :param processes: number of worker processes to use in
+          building the expected cache entries
+        :type processes: int
+        :param max_details: maximum number of primary keys to list in
+          the report for each kind of drift in each cache
+        :type max_details: int
+
+        """
+        self.repair = repair
+        self.batch_size = batch_size
+        self.processes = processes
+        self.max_details = max_details
+        self.report = {}
+        for cache in ('name_cache', 'name_index', 'relationship_cache'):
+            self.report[cache] = {'checked': 0, MISSING: 0, ORPHANED: 0,
+                                  STALE: 0, 'details': {
+                    MISSING: [], ORPHANED: [], STALE: []}}
+        self.report['repaired'] = repair
+
+    def _add_drift (self, cache, kind, pk):
+        data = self.report[cache]
+        data[kind] += 1
+        if len(data['details'][kind]) < self.max_details:
+            data['details'][kind].append(pk)
+
+    def _compare (self, cache, expected, actual, pks):
+        """Records the differences between `expected` and `actual`,
+        returning the keys of the entries that must be replaced or
+        deleted.
+
+        :param cache: name of the cache being compared
+        :type cache: string
+        :param expected: the expected values, keyed by object
+        :type expected: `dict`
+        :param actual: the existing values, keyed by object
+        :type actual: `dict`
+        :param pks: primary keys of the objects in the topic map
+        :type pks: `list` of integers
+        :rtype: `tuple` of `set`s of the keys to replace and to delete
+
+        """
+        self.report[cache]['checked'] += len(pks)
+        replace = set()
+        delete = set()
+        for pk in pks:
+            if expected.get(pk) == actual.get(pk):
+                continue
+            if pk not in actual:
+                self._add_drift(cache, MISSING, pk)
+            elif pk not in expected:
+                # The object has no expected entries (for example, a
+                # name with no form), so existing entries are stale.
+                self._add_drift(cache, STALE, pk)
+                delete.add(pk)
+                continue
+            else:
+                self._add_drift(cache, STALE, pk)
+            replace.add(pk)
+        for pk in set(actual) - set(pks):
+            self._add_drift(cache, ORPHANED, pk)
+            delete.add(pk)
+        return replace, delete
+
+    def _get_range_filter (self, field, first_pk, last_pk):
+        """Returns the filter arguments selecting the entries whose
+        `field` lies after `first_pk` and up to `last_pk` (or without
+        limit if `last_pk` is None).
+
+        :rtype: `dict`
+
+        """
+        range_filter = {'%s__gt' % field: first_pk}
+        if last_pk is not None:
+            range_filter['%s__lte' % field] = last_pk
+        return range_filter
+
+    def verify (self):
+        """Verifies, and optionally repairs, the caches.
+
+        :rtype: `dict`
+
+        """
+        self._verify_phase(Name, build_name_rows, self._verify_names)
+        self._verify_phase(EntityRelationshipPropertyAssertion,
+                           build_relationship_rows,
+                           self._verify_relationships)
+        return self.report
+
+    def _verify_names (self, pks, rows, first_pk, last_pk):
+        expected_cache = {}
+        for values in rows[NameCache]:
+            expected_cache[values['name_id']] = tuple(
+                [values[field] for field in NAME_CACHE_FIELDS])
+        expected_index = {}
+        for values in rows[NameIndex]:
+            expected_index.setdefault(values['name_id'], []).append(tuple(
+                    [values[field] for field in NAME_INDEX_FIELDS]))
+        actual_cache = {}
+        cached_names = NameCache.objects.filter(**self._get_range_filter(
+                'name', first_pk, last_pk)).values_list(
+            'name_id', *NAME_CACHE_FIELDS)
+        for values in cached_names.iterator():
+            actual_cache[values[0]] = values[1:]
+        actual_index = {}
+        indexed_forms = NameIndex.objects.filter(**self._get_range_filter(
+                'name', first_pk, last_pk)).values_list(
+            'name_id', *NAME_INDEX_FIELDS)
+        for values in indexed_forms.iterator():
+            actual_index.setdefault(values[0], []).append(values[1:])
+        for forms in expected_index.values() + actual_index.values():
+            forms.sort()
+        cache_replace, cache_delete = self._compare(
+            'name_cache', expected_cache, actual_cache, pks)
+        index_replace, index_delete = self._compare(
+            'name_index', expected_index, actual_index, pks)
+        if not self.repair:
+            return
+        changed = cache_replace | cache_delete | index_replace | \
+            index_delete
+        if not changed:
+            return
+        with transaction.atomic():
+            entities = set(
+                [actual[0] for pk, actual in actual_cache.items()
+                 if pk in changed] +
+                [values['entity_id'] for values in rows[NameCache]
+                 if values['name_id'] in changed])
+            NameCache.objects.filter(
+                name__in=cache_replace | cache_delete).delete()
+            NameCache.objects.bulk_create(
+                [NameCache(**values) for values in rows[NameCache]
+                 if values['name_id'] in cache_replace])
+            NameIndex.objects.filter(
+                name__in=index_replace | index_delete).delete()
+            NameIndex.objects.bulk_create(
+                [NameIndex(**values) for values in rows[NameIndex]
+                 if values['name_id'] in index_replace])
+            backend = get_search_backend()
+            for name in Name.objects.filter(pk__in=changed):
+                backend.update_name(name)
+            for pk in (cache_delete | index_delete) - set(pks):
+                backend.delete_name(Name(pk=pk))
+            for entity in entities:
+                EntitySummary.objects.invalidate(entity)
+            StatisticsSnapshot.objects.invalidate([NAME_LANGUAGES_SCRIPTS])
+
+    def _verify_phase (self, model, function, verify):
+        """Builds the expected cache entries for batches of `model`
+        objects using `function`, and passes them to `verify` along
+        with the range of primary keys covered.
+
+        Each batch covers the primary keys after the last one of the
+        previous batch, so that entries for objects that no longer
+        exist are also found.
+
+        """
+        first_pk = 0
+        for pks, rows in map_batches(
+                function, get_batches(model, 0, self.batch_size),
+                self.processes):
+            verify(pks, rows, first_pk, pks[-1])
+            first_pk = pks[-1]
+        verify([], function([]), first_pk, None)
+
+    def _verify_relationships (self, pks, rows, first_pk, last_pk):
+        expected = {}
+        for values in rows[EntityRelationshipCache]:
+            expected[values['entity_relationship_id']] = tuple(
+                [values[field] for field in RELATIONSHIP_CACHE_FIELDS])
+        actual = {}
+        cached_relationships = EntityRelationshipCache.objects.filter(
+            **self._get_range_filter('entity_relationship', first_pk,
+                                     last_pk)).values_list(
+            'entity_relationship_id', *RELATIONSHIP_CACHE_FIELDS)
+        for values in cached_relationships.iterator():
+            actual[values[0]] = values[1:]
+        replace, delete = self._compare('relationship_cache', expected,
+                                        actual, pks)
+        if not self.repair or not (replace or delete):
+            return
+        with transaction.atomic():
+            entities = set()
+            for pk in replace | delete:
+                for values in (expected.get(pk), actual.get(pk)):
+                    if values is not None:
+                        entities.update(values[1:3])
+            EntityRelationshipCache.objects.filter(
+                entity_relationship__in=replace | delete).delete()
+            EntityRelationshipCache.objects.bulk_create(
+                [EntityRelationshipCache(**values) for values in
+                 rows[EntityRelationshipCache] if
+                 values['entity_relationship_id'] in replace])
+            for entity in entities:
+                EntitySummary.objects.invalidate(entity)
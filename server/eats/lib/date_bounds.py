@@ -0,0 +1,102 @@
+"""Conversion of the normalised forms of dates into the numeric bounds
+held in the date index.
+
+A normalised form is an ISO 8601 style year, year and month, or year,
+month and day (such as "1650", "1650-03" or "1650-03-25"), with years
+numbered astronomically, so that 1 BCE is year 0 and earlier years
+are negative. Its bounds are the Julian Day Numbers of the first and
+last days that it covers, and so may be compared across calendars.
+
+Normalised forms of date parts in the calendars whose admin names are
+listed in the optional EATS_JULIAN_CALENDARS setting (by default, only
+"Julian") are read as Julian calendar dates; all others, including the
+bounds of date range queries, are read as proleptic Gregorian dates.
+
+"""
+
+import re
+
+from django.conf import settings
+
+
+DEFAULT_JULIAN_CALENDARS = ('Julian',)
+
+NORMALISED_DATE_RE = re.compile(
+    r'^(?P<year>[+-]?\d{1,6})(?:-(?P<month>\d{2})(?:-(?P<day>\d{2}))?)?$')
+
+
+def gregorian_to_jdn (year, month, day):
+    """Returns the Julian Day Number of a proleptic Gregorian date.
+
+    :rtype: int
+
+    """
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + \
+        y // 400 - 32045
+
+
+def julian_to_jdn (year, month, day):
+    """Returns the Julian Day Number of a Julian calendar date.
+
+    :rtype: int
+
+    """
+    a = (14 - month) // 12
+    y = year + 4800 - a
+    m = month + 12 * a - 3
+    return day + (153 * m + 2) // 5 + 365 * y + y // 4 - 32083
+
+
+def get_date_bounds (normalised, julian=False):
+    """Returns the Julian Day Numbers of the first and last days
+    covered by the normalised date `normalised`.
+
+    Raises ValueError if `normalised` is not a valid normalised date.
+
+    :param normalised: normalised form of a date
+    :type normalised: unicode string
+    :param julian: whether `normalised` is a Julian calendar date
+    :type julian: bool
+    :rtype: `tuple` of int
+
+    """
+    match = NORMALISED_DATE_RE.match(normalised.strip())
+    if match is None:
+        raise ValueError('"%s" is not a normalised date' % normalised)
+    to_jdn = julian_to_jdn if julian else gregorian_to_jdn
+    year = int(match.group('year'))
+    if match.group('month') is None:
+        return to_jdn(year, 1, 1), to_jdn(year + 1, 1, 1) - 1
+    month = int(match.group('month'))
+    if not 1 <= month <= 12:
+        raise ValueError('"%s" has an invalid month' % normalised)
+    if month == 12:
+        month_end = to_jdn(year + 1, 1, 1) - 1
+    else:
+        month_end = to_jdn(year, month + 1, 1) - 1
+    if match.group('day') is None:
+        return to_jdn(year, month, 1), month_end
+    day = int(match.group('day'))
+    jdn = to_jdn(year, month, day)
+    if day < 1 or jdn > month_end:
+        raise ValueError('"%s" has an invalid day' % normalised)
+    return jdn, jdn
+
+
+def is_julian_calendar (calendar):
+    """Returns True if the normalised forms of dates in `calendar` are
+    Julian calendar dates.
+
+    :param calendar: calendar of a date part
+    :type calendar: `Calendar`
+    :rtype: bool
+
+    """
+    if calendar is None:
+        return False
+    names = getattr(settings, 'EATS_JULIAN_CALENDARS',
+                    DEFAULT_JULIAN_CALENDARS)
+    return calendar.get_admin_name() in names
@@ -0,0 +1,295 @@
+"""Detection of entities that are likely to be duplicates.
+
+Comparing every entity with every other is out of the question for a
+large database, so candidate pairs are first found by blocking: only
+entities that share a normalised name form in `NameIndex` (compared
+by its indexed, case folded key), or a subject identifier, are
+compared. Name forms shared by more than `MAX_BLOCK_SIZE` entities
+are too common to distinguish entities and are not used for
+blocking. Pairs whose existence dates do not overlap
+are discarded unless they share a subject identifier, and the rest
+are scored.
+
+The entities are processed in batches of primary keys, with each
+pair found from the batch holding its lower entity, so that no more
+than a batch and the entities that share its name forms are held in
+memory at once. Batches may be processed in parallel by a pool of
+worker processes.
+
+"""
+
+import re
+import time
+
+from django.db import transaction
+from django.db.models import Count
+
+from tmapi.models import Occurrence, Variant
+
+from eats.lib.reindex import get_batches, map_batches
+from eats.lib.topic_map_context import get_eats_topic_map
+from eats.models import DuplicateCandidate, Entity, NameIndex
+
+
+MAX_BLOCK_SIZE = 100
+QUERY_BATCH_SIZE = 500
+# The score of a pair is the sum of the weighted features, to a
+# maximum of 1.
+NAME_WEIGHT = 0.8
+DATE_WEIGHT = 0.2
+SUBJECT_IDENTIFIER_WEIGHT = 1.0
+MINIMUM_SCORE = 0.4
+YEAR_PATTERN = re.compile(r'^(-?\d+)')
+
+
+def _chunks (values):
+    """Yields `values` in lists of at most `QUERY_BATCH_SIZE`, for
+    use in `__in` lookups."""
+    values = sorted(values)
+    for i in range(0, len(values), QUERY_BATCH_SIZE):
+        yield values[i:i+QUERY_BATCH_SIZE]
+
+
+def find_candidates (pks):
+    """Returns the field values of the duplicate candidates whose
+    lower entity is one of the entities with primary keys `pks`.
+
+    :param pks: primary keys of the entities to process
+    :type pks: `list` of integers
+    :rtype: `list` of `dict`s
+
+    """
+    entity_forms = get_name_forms(pks)
+    pairs = {}
+    for form, entities in get_name_blocks(
+            set().union(*entity_forms.values())).items():
+        for entity in entities:
+            if entity not in entity_forms:
+                continue
+            for other in entities:
+                if other > entity:
+                    pairs.setdefault((entity, other), [0, 0])[0] += 1
+    for entity, other, count in get_shared_subject_identifiers(pks):
+        pairs.setdefault((entity, other), [0, 0])[1] = count
+    others = set([other for entity, other in pairs])
+    entity_forms.update(get_name_forms(others - set(entity_forms)))
+    years = get_existence_years(set(pks) | others)
+    candidates = []
+    for (entity, other), (shared_names, shared_identifiers) in \
+            sorted(pairs.items()):
+        dates_overlap = None
+        if entity in years and other in years:
+            start, end = years[entity]
+            other_start, other_end = years[other]
+            dates_overlap = start <= other_end and other_start <= end
+        if dates_overlap is False and not shared_identifiers:
+            continue
+        score = score_pair(entity_forms.get(entity, ()),
+                           entity_forms.get(other, ()), shared_names,
+                           shared_identifiers, dates_overlap)
+        if score >= MINIMUM_SCORE:
+            candidates.append({
+                    'entity_id': entity, 'duplicate_id': other,
+                    'score': score, 'shared_names': shared_names,
+                    'shared_subject_identifiers': shared_identifiers,
+                    'dates_overlap': dates_overlap})
+    return candidates
+
+
+def get_existence_years (pks):
+    """Returns the earliest and latest years of the normalised
+    existence dates of the entities with primary keys `pks`, keyed by
+    entity.
+
+    Entities without normalised existence dates are omitted.
+
+    :param pks: primary keys of the entities
+    :type pks: iterable of integers
+    :rtype: `dict` of `tuple`s
+
+    """
+    topic_map = get_eats_topic_map()
+    player = 'name__topic__roles__association__roles__player'
+    years = {}
+    for chunk in _chunks(pks):
+        values = Variant.objects.filter(
+            name__topic__roles__type=topic_map.date_role_type,
+            name__topic__roles__association__type=
+            topic_map.existence_assertion_type,
+            name__topic__roles__association__roles__type=
+            topic_map.entity_role_type,
+            name__topic__roles__association__roles__player__in=chunk
+            ).exclude(value='').values_list(player, 'value')
+        for entity, value in values:
+            match = YEAR_PATTERN.match(value)
+            if match is None:
+                continue
+            year = int(match.group(1))
+            start, end = years.get(entity, (year, year))
+            years[entity] = (min(start, year), max(end, year))
+    return years
+
+
+def get_name_blocks (forms):
+    """Returns the primary keys of the entities having each of
+    `forms`, omitting forms had by more than `MAX_BLOCK_SIZE`
+    entities.
+
+    :param forms: keys of normalised name forms
+    :type forms: iterable of unicode strings
+    :rtype: `dict` of `set`s keyed by form
+
+    """
+    blocks = {}
+    for chunk in _chunks(forms):
+        usable_forms = NameIndex.objects.filter(key__in=chunk).values(
+            'key').annotate(entities=Count('entity', distinct=True)).filter(
+            entities__gt=1, entities__lte=MAX_BLOCK_SIZE).values_list(
+            'key', flat=True)
+        for form, entity in NameIndex.objects.filter(
+                key__in=list(usable_forms)).values_list('key', 'entity'):
+            blocks.setdefault(form, set()).add(entity)
+    return blocks
+
+
+def get_name_forms (pks):
+    """Returns the keys of the normalised name forms of the entities
+    with primary keys `pks`, keyed by entity.
+
+    :param pks: primary keys of the entities
+    :type pks: iterable of integers
+    :rtype: `dict` of `set`s
+
+    """
+    entity_forms = {}
+    for chunk in _chunks(pks):
+        for entity, form in NameIndex.objects.filter(
+                entity__in=chunk).values_list('entity', 'key'):
+            entity_forms.setdefault(entity, set()).add(form)
+    return entity_forms
+
+
+def get_shared_subject_identifiers (pks):
+    """Returns the pairs of entities, one of which has a primary key
+    in `pks` lower than that of the other, that have subject
+    identifier property assertions with the same URL, together with
+    the number of such URLs.
+
+    :param pks: primary keys of the entities
+    :type pks: iterable of integers
+    :rtype: `list` of `tuple`s
+
+    """
+    assertion_type = get_eats_topic_map().subject_identifier_assertion_type
+    urls = {}
+    for chunk in _chunks(pks):
+        for entity, url in Occurrence.objects.filter(
+                type=assertion_type, topic__in=chunk).values_list(
+                'topic', 'value'):
+            urls.setdefault(url, set()).add(entity)
+    counts = {}
+    for chunk in _chunks(urls):
+        for url, other in Occurrence.objects.filter(
+                type=assertion_type, value__in=chunk).values_list(
+                'value', 'topic').distinct():
+            for entity in urls[url]:
+                if other > entity:
+                    counts[(entity, other)] = counts.get(
+                        (entity, other), 0) + 1
+    return [(entity, other, count) for (entity, other), count in
+            sorted(counts.items())]
+
+
+def score_pair (forms, other_forms, shared_names, shared_identifiers,
+                dates_overlap):
+    """Returns the score, between 0 and 1, of a pair of entities.
+
+    The name score is the proportion of the two entities' name forms
+    that they share.
+
+    :param forms: normalised name forms of the first entity
+    :type forms: `set` of unicode strings
+    :param other_forms: normalised name forms of the second entity
+    :type other_forms: `set` of unicode strings
+    :param shared_names: number of name forms shared
+    :type shared_names: int
+    :param shared_identifiers: number of subject identifiers shared
+    :type shared_identifiers: int
+    :param dates_overlap: whether the existence dates overlap
+    :type dates_overlap: `bool` or None
+    :rtype: float
+
+    """
+    score = 0.0
+    all_forms = len(forms) + len(other_forms) - shared_names
+    if all_forms > 0:
+        score += NAME_WEIGHT * shared_names / float(all_forms)
+    if dates_overlap:
+        score += DATE_WEIGHT
+    if shared_identifiers:
+        score += SUBJECT_IDENTIFIER_WEIGHT
+    return round(min(score, 1.0), 4)
+
+
+class DuplicateFinder (object):
+
+    """Finds likely duplicate entities, replacing the contents of the
+    `DuplicateCandidate` table with them.
+
+    The new candidates are saved alongside the current ones, which
+    remain in use until they are swapped for the new ones in a single
+    transaction at the end of the run.
+
+    """
+
+    def __init__ (self, batch_size=1000, processes=1, stdout=None):
+        """Initialise the finder.
+
+        :param batch_size: number of entities per batch
+        :type batch_size: int
+        :param processes: number of worker processes to use
+        :type processes: int
+        :param stdout: stream to write progress reports to
+        :type stdout: file-like object
+
+        """
+        self.batch_size = batch_size
+        self.processes = processes
+        self.stdout = stdout
+
+    def find (self):
+        """Finds and saves the duplicate candidates.
+
+        The candidates are built in the worker processes, if any, but
+        are saved by this process only, so that databases that allow
+        only a single writer may be used.
+
+        :rtype: int
+
+        """
+        # Remove the candidates of any earlier run that was
+        # interrupted before they were made current.
+        DuplicateCandidate.objects.filter(is_current=False).delete()
+        batches = get_batches(Entity, 0, self.batch_size)
+        start = time.time()
+        processed = 0
+        total = 0
+        for batch, candidates in map_batches(find_candidates, batches,
+                                             self.processes):
+            with transaction.atomic():
+                DuplicateCandidate.objects.bulk_create(
+                    [DuplicateCandidate(is_current=False, **values) for
+                     values in candidates])
+            processed += len(batch)
+            total += len(candidates)
+            elapsed = time.time() - start
+            self._report('  entities up to %d: %d candidates, %.1f entities/sec'
+                         % (batch[-1], total, processed / max(elapsed, 0.001)))
+        with transaction.atomic():
+            DuplicateCandidate.objects.filter(is_current=True).delete()
+            DuplicateCandidate.objects.update(is_current=True)
+        return total
+
+    def _report (self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
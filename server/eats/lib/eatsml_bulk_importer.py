@@ -0,0 +1,650 @@
+"""Bulk creation of the entities and property assertions of an EATSML
+import.
+
+Creating an entity or property assertion through the model API saves
+each of its constructs, roles and themes with a separate query, and
+updates the name cache, name index, date index and entity
+relationship cache one name, date or relationship at a time. `BulkEntityImporter` instead plans
+every row that the model API would create for a chunk of entities,
+allocating primary keys in the same order, writes the rows with
+`bulk_create`, and then fills the caches for the whole chunk at once.
+
+Where primary keys cannot be allocated safely (see
+`can_allocate_keys`), each chunk is instead imported through the model
+API.
+
+"""
+
+from collections import deque
+
+from django.contrib.sites.models import Site
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection
+from django.db.models import Max
+
+from tmapi.constants import XSD_FLOAT, XSD_INT, XSD_STRING
+from tmapi.models import Association, Identifier, ItemIdentifier, Occurrence, Role, SubjectIdentifier, Topic, Variant
+from tmapi.models import Name as TopicName
+
+from eats.constants import EATS_NAMESPACE, XML
+from eats.lib.reindex import build_date_rows, build_name_rows, build_relationship_rows
+from eats.lib.search_backends import get_search_backend
+from eats.models import DateIndex, Entity, EntityRelationshipCache, EntitySummary, Name, NameCache, NameIndex, StatisticsSnapshot
+
+
+NSMAP = {'e': EATS_NAMESPACE}
+
+ENTITY_CHUNK_SIZE = 500
+
+# The order in which PropertyAssertion.create_date sets the parts of
+# a date.
+DATE_PART_PREFIXES = ('start', 'start_taq', 'start_tpq', 'end', 'end_taq',
+                      'end_tpq', 'point', 'point_taq', 'point_tpq')
+
+
+def can_allocate_keys ():
+    """Returns True if a `PrimaryKeyAllocator` can allocate keys
+    without colliding with rows created by other processes.
+
+    On PostgreSQL the keys come from each table's sequence. On SQLite
+    they follow on from the highest key used, which is safe only
+    while the database is locked against other writers, as it is for
+    the rest of a transaction. On other databases no means of
+    reserving keys is implemented.
+
+    :rtype: bool
+
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.in_atomic_block
+
+
+class PrimaryKeyAllocator (object):
+
+    """Allocates primary keys for rows that are to be created with
+    `bulk_create`, which does not set the primary keys of the objects
+    it saves.
+
+    On PostgreSQL the keys are taken from each table's sequence, a
+    block at a time. On SQLite they follow on from the highest key
+    ever used, once the database has been locked against other
+    writers until the end of the current transaction; keys allocated
+    must therefore be used, or discarded, before it is committed.
+
+    """
+
+    def __init__ (self, block_size=1000):
+        self._block_size = block_size
+        self._keys = {}
+        self._next_keys = {}
+        self._locked = False
+
+    def allocate (self, model):
+        """Returns an unused primary key for `model`.
+
+        :param model: model whose primary key is allocated
+        :type model: `Model` class
+        :rtype: int
+
+        """
+        model = model._meta.concrete_model
+        keys = self._keys.get(model)
+        if not keys:
+            keys = self._keys[model] = deque(self._get_keys(model))
+        return keys.popleft()
+
+    def _get_keys (self, model):
+        table = model._meta.db_table
+        cursor = connection.cursor()
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [table, model._meta.pk.column, self._block_size])
+            return [row[0] for row in cursor.fetchall()]
+        if not self._locked:
+            self._lock(cursor, model)
+        first = self._next_keys.get(model)
+        if first is None:
+            first = (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+            cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s',
+                           [table])
+            row = cursor.fetchone()
+            if row is not None:
+                first = max(first, row[0] + 1)
+        self._next_keys[model] = first + self._block_size
+        return range(first, first + self._block_size)
+
+    def _lock (self, cursor, model):
+        """Locks the SQLite database against other writers until the
+        end of the current transaction."""
+        if not can_allocate_keys():
+            raise DatabaseError('Primary keys cannot be allocated safely '
+                                'outside of a transaction on %s' %
+                                connection.vendor)
+        # A write, even one that changes no rows, takes the lock.
+        qn = connection.ops.quote_name
+        pk = qn(model._meta.pk.column)
+        cursor.execute('UPDATE %s SET %s = %s WHERE 0 = 1' % (
+                qn(model._meta.db_table), pk, pk))
+        self._locked = True
+
+    def reset_sequences (self):
+        """Advances the sequences of the tables that keys have been
+        allocated for past those keys, on databases where inserting a
+        row with an explicit key does not."""
+        if connection.vendor == 'postgresql' or not self._keys:
+            return
+        cursor = connection.cursor()
+        for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                     list(self._keys)):
+            cursor.execute(sql)
+
+
+class BulkEntityImporter (object):
+
+    """Imports the entities of an EATSML document, and their property
+    assertions, in chunks.
+
+    The rows created for each property assertion are exactly those
+    created by the corresponding `Entity.create_*_property_assertion`
+    method (and `PropertyAssertion.create_date`), planned in the same
+    order, and the same validation of the components used against
+    the asserting authority is performed.
+
+    """
+
+    def __init__ (self, importer, topic_map, chunk_size=ENTITY_CHUNK_SIZE):
+        """Initialise the importer.
+
+        :param importer: the importer whose mapping of XML IDs to
+          objects is used
+        :type importer: `EATSMLImporter`
+        :param topic_map: the topic map to import into
+        :type topic_map: `EATSTopicMap`
+        :param chunk_size: number of entities to import at a time
+        :type chunk_size: int
+
+        """
+        self._importer = importer
+        self._topic_map = topic_map
+        self._chunk_size = chunk_size
+        self._allocator = PrimaryKeyAllocator()
+        self._domain = Site.objects.get_current().domain
+        self._write_order = [
+            Identifier, ItemIdentifier, Topic, Topic.item_identifiers.through,
+            Topic.types.through, SubjectIdentifier, Association,
+            Association.scope.through, Role, TopicName,
+            TopicName.scope.through, Occurrence, Occurrence.scope.through,
+            Variant, Variant.scope.through]
+        # Planning refers to many of the well known topics, which must
+        # not be created on demand once keys have been allocated.
+        topic_map.create_well_known_topics()
+        self._reset()
+
+    def _add_scope (self, construct, themes):
+        field = construct.__class__.scope.field
+        through = field.rel.through
+        for theme in themes:
+            self._rows[through].append(through(**{
+                        field.m2m_field_name(): construct,
+                        field.m2m_reverse_field_name(): theme}))
+
+    def _create_association (self, association_type, scope=()):
+        association = self._create_construct(Association, type=association_type)
+        self._add_scope(association, scope)
+        return association
+
+    def _create_construct (self, model, **kwargs):
+        identifier = Identifier(pk=self._allocator.allocate(Identifier),
+                                containing_topic_map_id=self._topic_map.pk)
+        self._rows[Identifier].append(identifier)
+        construct = model(pk=self._allocator.allocate(model),
+                          identifier=identifier, topic_map=self._topic_map,
+                          **kwargs)
+        self._rows[construct._meta.concrete_model].append(construct)
+        return construct
+
+    def _create_name (self, topic, value, name_type):
+        return self._create_construct(TopicName, topic=topic, value=value,
+                                      type=name_type)
+
+    def _create_occurrence (self, topic, occurrence_type, value, scope=()):
+        if isinstance(value, float):
+            datatype = XSD_FLOAT
+        elif isinstance(value, int):
+            datatype = XSD_INT
+        else:
+            datatype = XSD_STRING
+        occurrence = self._create_construct(
+            Occurrence, topic=topic, type=occurrence_type, value=value,
+            datatype=datatype)
+        self._add_scope(occurrence, scope)
+        return occurrence
+
+    def _create_role (self, association, role_type, player):
+        # Roles are not referred to by any other row, so their keys
+        # are left to the database.
+        identifier = Identifier(pk=self._allocator.allocate(Identifier),
+                                containing_topic_map_id=self._topic_map.pk)
+        self._rows[Identifier].append(identifier)
+        self._rows[Role].append(Role(
+                identifier=identifier, topic_map=self._topic_map,
+                association=association, type=role_type, player=player))
+
+    def _create_topic (self, topic_type, proxy=Topic):
+        topic = self._create_construct(proxy)
+        item_identifier = ItemIdentifier(
+            pk=self._allocator.allocate(ItemIdentifier),
+            address='http://%s/tmapi/iid/auto/%d' % (self._domain, topic.pk),
+            containing_topic_map_id=self._topic_map.pk)
+        self._rows[ItemIdentifier].append(item_identifier)
+        self._rows[Topic.item_identifiers.through].append(
+            Topic.item_identifiers.through(
+                topic=topic, itemidentifier=item_identifier))
+        self._rows[Topic.types.through].append(Topic.types.through(
+                from_topic=topic, to_topic=topic_type))
+        return topic
+
+    def _create_variant (self, name, value, scope):
+        variant = self._create_construct(Variant, name=name, value=value,
+                                         datatype=XSD_STRING)
+        self._add_scope(variant, scope)
+        return variant
+
+    def _get_mapped_object (self, element, attribute_name, object_type):
+        return self._importer._get_mapped_object(element, attribute_name,
+                                                 object_type)
+
+    def finish (self):
+        """Completes the import of the chunks imported so far.
+
+        Keys allocated but not yet used are discarded, so that the
+        chunks may be committed before any more are imported.
+
+        """
+        self._allocator.reset_sequences()
+        self._allocator = PrimaryKeyAllocator()
+
+    def import_entities (self, tree):
+        """Imports the entities in XML `tree`, followed by their
+        entity relationship assertions.
+
+        :param tree: XML tree of EATSML to import
+        :type tree: `ElementTree`
+
+        """
+        entity_elements = tree.xpath('/e:collection/e:entities/e:entity',
+                                     namespaces=NSMAP)
+        chunks = [entity_elements[start:start + self._chunk_size] for start
+                  in range(0, len(entity_elements), self._chunk_size)]
+        for chunk in chunks:
+            self.import_entity_chunk(chunk)
+        for chunk in chunks:
+            self.import_relationship_chunk(chunk)
+        self.finish()
+
+    def import_entity_chunk (self, entity_elements):
+        """Imports the entities represented by `entity_elements`, and
+        their property assertions other than entity relationships.
+
+        :param entity_elements: XML elements representing entities
+        :type entity_elements: `list` of `Element`s
+
+        """
+        if not can_allocate_keys():
+            for entity_element in entity_elements:
+                self._importer._import_entity(entity_element)
+            return
+        for entity_element in entity_elements:
+            self._plan_entity(entity_element)
+        self._write()
+
+    def import_relationship_chunk (self, entity_elements):
+        """Imports the new entity relationship assertions of the
+        entities represented by `entity_elements`.
+
+        Every entity referenced by the assertions must already have
+        been imported.
+
+        :param entity_elements: XML elements representing entities
+        :type entity_elements: `list` of `Element`s
+
+        """
+        bulk = can_allocate_keys()
+        for entity_element in entity_elements:
+            for element in self._get_new_elements(
+                    entity_element,
+                    'e:entity_relationships/e:entity_relationship'):
+                if bulk:
+                    self._plan_entity_relationship_assertion(element)
+                else:
+                    self._importer._import_entity_relationship_assertion(
+                        element)
+        if bulk:
+            self._write()
+
+    def validate_entity_chunk (self, entity_elements):
+        """Checks, without creating anything, that the entities
+        represented by `entity_elements` and their new property
+        assertions (including entity relationships) can be imported.
+
+        The checks are those made by `import_entity_chunk` and
+        `import_relationship_chunk`: that each entity with an EATS ID
+        exists, and that the components used by each property
+        assertion are available to its authority. The infrastructure
+        referred to must already have been imported.
+
+        :param entity_elements: XML elements representing entities
+        :type entity_elements: `list` of `Element`s
+
+        """
+        importer = self._importer
+        eats_ids = []
+        for entity_element in entity_elements:
+            eats_id = importer._get_element_eats_id(entity_element)
+            if eats_id is not None:
+                eats_ids.append(eats_id)
+            for element in self._get_new_elements(
+                    entity_element, 'e:entity_types/e:entity_type'):
+                authority = self._get_mapped_object(element, 'authority',
+                                                    'authority')
+                authority.validate_components(
+                    entity_type=self._get_mapped_object(
+                        element, 'entity_type', 'entity_type'))
+                self._validate_dates(element, authority)
+            for element in self._get_new_elements(entity_element,
+                                                  'e:existences/e:existence'):
+                self._validate_dates(element, self._get_mapped_object(
+                        element, 'authority', 'authority'))
+            for element in self._get_new_elements(entity_element,
+                                                  'e:names/e:name'):
+                authority = self._get_mapped_object(element, 'authority',
+                                                    'authority')
+                authority.validate_components(
+                    name_type=self._get_mapped_object(element, 'name_type',
+                                                      'name_type'),
+                    language=self._get_mapped_object(element, 'language',
+                                                     'language'),
+                    script=self._get_mapped_object(element, 'script',
+                                                   'script'))
+                self._validate_dates(element, authority)
+            for element in self._get_new_elements(
+                    entity_element,
+                    'e:entity_relationships/e:entity_relationship'):
+                if element.get('domain_entity') != \
+                        entity_element.get(XML + 'id'):
+                    continue
+                authority = self._get_mapped_object(element, 'authority',
+                                                    'authority')
+                authority.validate_components(
+                    entity_relationship_type=self._get_mapped_object(
+                        element, 'entity_relationship_type',
+                        'entity_relationship_type'))
+                self._validate_dates(element, authority)
+        existing = set(Entity.objects.filter(
+                identifier__in=eats_ids).values_list('identifier', flat=True))
+        for eats_id in eats_ids:
+            if eats_id not in existing:
+                # Raises the exception for a missing entity.
+                importer._get_by_identifier(Entity, eats_id)
+
+    def _validate_dates (self, assertion_element, authority):
+        """Checks that the components used by the dates of
+        `assertion_element` are available to `authority`."""
+        for data in self._importer._get_dates_data(assertion_element):
+            authority.validate_components(date_period=data['date_period'])
+            for prefix in DATE_PART_PREFIXES:
+                if data.get(prefix):
+                    authority.validate_components(
+                        calendar=data[prefix + '_calendar'],
+                        date_type=data[prefix + '_type'])
+
+    def _plan_date (self, assertion, authority, data):
+        """Plans the rows of a date of `assertion`, as created by
+        `PropertyAssertion.create_date`, including those of the date
+        parts given in `data`."""
+        topic_map = self._topic_map
+        date = self._create_topic(topic_map.date_type)
+        date_parts = {}
+        for prefix, date_part_type in (
+            ('start_tpq', topic_map.start_tpq_date_type),
+            ('start', topic_map.start_date_type),
+            ('start_taq', topic_map.start_taq_date_type),
+            ('point_tpq', topic_map.point_tpq_date_type),
+            ('point', topic_map.point_date_type),
+            ('point_taq', topic_map.point_taq_date_type),
+            ('end_tpq', topic_map.end_tpq_date_type),
+            ('end', topic_map.end_date_type),
+            ('end_taq', topic_map.end_taq_date_type)):
+            date_parts[prefix] = self._create_name(date, '', date_part_type)
+        period_association = self._create_association(
+            topic_map.date_period_association_type)
+        self._create_role(period_association, topic_map.date_role_type, date)
+        self._create_role(assertion, topic_map.date_role_type, date)
+        authority.validate_components(date_period=data['date_period'])
+        self._create_role(period_association, topic_map.date_period_role_type,
+                          data['date_period'])
+        for prefix in DATE_PART_PREFIXES:
+            if data.get(prefix):
+                date_part = date_parts[prefix]
+                date_part.value = data[prefix]
+                calendar = data[prefix + '_calendar']
+                date_type = data[prefix + '_type']
+                authority.validate_components(calendar=calendar)
+                self._add_scope(date_part, [calendar,
+                                            data[prefix + '_certainty']])
+                self._create_variant(date_part, data[prefix + '_normalised'],
+                                     [topic_map.normalised_date_form_type])
+                authority.validate_components(date_type=date_type)
+                self._add_scope(date_part, [date_type])
+        self._dates.append(date.pk)
+
+    def _plan_dates (self, assertion_element, assertion, authority):
+        for data in self._importer._get_dates_data(assertion_element):
+            self._plan_date(assertion, authority, data)
+
+    def _plan_entity (self, entity_element):
+        """Plans the rows of the entity represented by
+        `entity_element`, if it is new, and of its new property
+        assertions other than entity relationships."""
+        importer = self._importer
+        topic_map = self._topic_map
+        eats_id = importer._get_element_eats_id(entity_element)
+        if eats_id is None:
+            entity = self._create_topic(topic_map.entity_type, proxy=Entity)
+            url = topic_map.get_entity_subject_identifier(
+                entity.identifier.pk).to_external_form()
+            self._rows[SubjectIdentifier].append(SubjectIdentifier(
+                    topic=entity, address=url,
+                    containing_topic_map_id=topic_map.pk))
+            entity_element.set('eats_id', str(entity.identifier.pk))
+            entity_element.set('url', url)
+        else:
+            entity = importer._get_by_identifier(Entity, eats_id)
+            self._entities.add(entity.pk)
+        importer._add_mapping('entity', entity_element.get(XML + 'id'), entity)
+        for element in self._get_new_elements(
+                entity_element, 'e:entity_types/e:entity_type'):
+            authority = self._get_mapped_object(element, 'authority',
+                                                'authority')
+            entity_type = self._get_mapped_object(element, 'entity_type',
+                                                  'entity_type')
+            authority.validate_components(entity_type=entity_type)
+            assertion = self._create_association(
+                topic_map.entity_type_assertion_type, [authority])
+            self._create_role(assertion, topic_map.property_role_type,
+                              entity_type)
+            self._create_role(assertion, topic_map.entity_role_type, entity)
+            element.set('eats_id', str(assertion.identifier.pk))
+            self._plan_dates(element, assertion, authority)
+        for element in self._get_new_elements(entity_element,
+                                              'e:existences/e:existence'):
+            authority = self._get_mapped_object(element, 'authority',
+                                                'authority')
+            assertion = self._create_association(
+                topic_map.existence_assertion_type, [authority])
+            self._create_role(assertion, topic_map.property_role_type,
+                              topic_map.existence)
+            self._create_role(assertion, topic_map.entity_role_type, entity)
+            element.set('eats_id', str(assertion.identifier.pk))
+            self._plan_dates(element, assertion, authority)
+        for element in self._get_new_elements(entity_element,
+                                              'e:names/e:name'):
+            self._plan_name_assertion(entity, element)
+        for element in self._get_new_elements(entity_element,
+                                              'e:notes/e:note'):
+            authority = self._get_mapped_object(element, 'authority',
+                                                'authority')
+            assertion = self._create_occurrence(
+                entity, topic_map.note_assertion_type,
+                importer._get_text(element, '.'), [authority])
+            element.set('eats_id', str(assertion.identifier.pk))
+        for element in self._get_new_elements(
+                entity_element, 'e:subject_identifiers/e:subject_identifier'):
+            authority = self._get_mapped_object(element, 'authority',
+                                                'authority')
+            assertion = self._create_occurrence(
+                entity, topic_map.subject_identifier_assertion_type,
+                importer._get_text(element, '.'), [authority])
+            element.set('eats_id', str(assertion.identifier.pk))
+
+    def _plan_entity_relationship_assertion (self, element):
+        """Plans the rows of the entity relationship assertion
+        represented by `element`, if its domain entity is the entity
+        it belongs to."""
+        topic_map = self._topic_map
+        entity_element = element.xpath('ancestor::e:entity',
+                                       namespaces=NSMAP)[0]
+        entity = self._get_mapped_object(entity_element, XML + 'id', 'entity')
+        domain_entity = self._get_mapped_object(element, 'domain_entity',
+                                                'entity')
+        if domain_entity != entity:
+            return
+        authority = self._get_mapped_object(element, 'authority', 'authority')
+        relationship_type = self._get_mapped_object(
+            element, 'entity_relationship_type', 'entity_relationship_type')
+        range_entity = self._get_mapped_object(element, 'range_entity',
+                                               'entity')
+        certainty = self._importer._get_relationship_certainty(element)
+        authority.validate_components(
+            entity_relationship_type=relationship_type)
+        assertion = self._create_association(
+            topic_map.entity_relationship_assertion_type,
+            [authority, certainty])
+        self._create_role(assertion, topic_map.domain_entity_role_type,
+                          domain_entity)
+        self._create_role(assertion, topic_map.range_entity_role_type,
+                          range_entity)
+        self._create_role(assertion,
+                          topic_map.entity_relationship_type_role_type,
+                          relationship_type)
+        self._relationships.append(assertion.pk)
+        self._entities.update([domain_entity.pk, range_entity.pk])
+        element.set('eats_id', str(assertion.identifier.pk))
+        self._plan_dates(element, assertion, authority)
+
+    def _plan_name_assertion (self, entity, element):
+        """Plans the rows of the name assertion represented by
+        `element`, as created by
+        `Entity.create_name_property_assertion` and
+        `Name.create_name_part`."""
+        importer = self._importer
+        topic_map = self._topic_map
+        authority = self._get_mapped_object(element, 'authority', 'authority')
+        name_type = self._get_mapped_object(element, 'name_type', 'name_type')
+        language = self._get_mapped_object(element, 'language', 'language')
+        script = self._get_mapped_object(element, 'script', 'script')
+        authority.validate_components(name_type=name_type, language=language,
+                                      script=script)
+        name = self._create_topic(topic_map.name_type)
+        scope = [authority]
+        if importer._get_boolean(element.get('is_preferred')):
+            scope.append(topic_map.is_preferred)
+        assertion = self._create_association(topic_map.name_assertion_type,
+                                             scope)
+        self._create_role(assertion, topic_map.property_role_type, name)
+        self._create_role(assertion, topic_map.entity_role_type, entity)
+        self._create_name(name, importer._get_text(element, 'e:display_form'),
+                          name_type)
+        self._plan_name_associations(topic_map.name_role_type, name, language,
+                                     script)
+        element.set('eats_id', str(assertion.identifier.pk))
+        for name_part_type, language, script, display_form, order in \
+                importer._get_name_parts_data(element):
+            association = self._create_association(
+                topic_map.name_has_name_part_association_type)
+            self._create_role(association, topic_map.name_role_type, name)
+            name_part = self._create_topic(topic_map.name_part_type)
+            self._create_role(association, topic_map.name_part_role_type,
+                              name_part)
+            self._create_name(name_part, display_form, name_part_type)
+            self._plan_name_associations(topic_map.name_part_role_type,
+                                         name_part, language, script, order)
+        self._names.append(name.pk)
+        self._entities.add(entity.pk)
+        self._plan_dates(element, assertion, authority)
+
+    def _plan_name_associations (self, role_type, name, language, script,
+                                 order=None):
+        """Plans the rows associating `name` (a name or name part)
+        with its language and script, and, for a name part, its
+        `order`."""
+        topic_map = self._topic_map
+        language_association = self._create_association(
+            topic_map.is_in_language_type)
+        self._create_role(language_association, role_type, name)
+        self._create_role(language_association, topic_map.language_role_type,
+                          language)
+        if order is not None:
+            self._create_occurrence(name, topic_map.name_part_order_type,
+                                    order)
+        script_association = self._create_association(
+            topic_map.is_in_script_type)
+        self._create_role(script_association, role_type, name)
+        self._create_role(script_association, topic_map.script_role_type,
+                          script)
+
+    @staticmethod
+    def _get_new_elements (entity_element, xpath):
+        """Returns the elements matching `xpath` under `entity_element`
+        that have no EATS ID.
+
+        :rtype: `list` of `Element`s
+
+        """
+        return [element for element in
+                entity_element.xpath(xpath, namespaces=NSMAP)
+                if not element.get('eats_id')]
+
+    def _reset (self):
+        self._rows = dict([(model, []) for model in self._write_order])
+        self._dates = []
+        self._entities = set()
+        self._names = []
+        self._relationships = []
+
+    def _write (self):
+        """Writes the planned rows, and the cache and index entries for
+        the names, dates and entity relationships they make up."""
+        for model in self._write_order:
+            model.objects.bulk_create(self._rows[model])
+        name_rows = build_name_rows(self._names)
+        NameCache.objects.bulk_create([NameCache(**values) for values in
+                                       name_rows[NameCache]])
+        NameIndex.objects.bulk_create([NameIndex(**values) for values in
+                                       name_rows[NameIndex]])
+        date_rows = build_date_rows(self._dates)
+        DateIndex.objects.bulk_create([DateIndex(**values) for values in
+                                       date_rows[DateIndex]])
+        relationship_rows = build_relationship_rows(self._relationships)
+        EntityRelationshipCache.objects.bulk_create(
+            [EntityRelationshipCache(**values) for values in
+             relationship_rows[EntityRelationshipCache]])
+        backend = get_search_backend()
+        for name in Name.objects.filter(pk__in=self._names):
+            backend.update_name(name)
+        EntitySummary.objects.filter(entity__in=self._entities).delete()
+        StatisticsSnapshot.objects.invalidate()
+        self._reset()
@@ -0,0 +1,498 @@
+"""Bulk loading of the data to be exported into EATSML for a batch of
+entities.
+
+Walking the topic map through the model properties costs several
+queries for every assertion, name, name part, date and date part of
+each entity exported. `EATSMLExportLoader` instead fetches those
+constructs, their roles and their scopes for a whole batch of
+entities in a fixed number of queries, and assembles them into the
+lightweight records defined here, from which `EATSMLExporter` renders
+the EATSML.
+
+"""
+
+from operator import attrgetter
+
+from django.db.models import Q
+
+from tmapi.models import Association, Name as TopicMapName, Occurrence, Role, SubjectIdentifier, Variant
+
+from eats.exceptions import EATSMLException
+from eats.models import Authority, Calendar, Date, DateForm, DatePartForm, DatePeriod, DateType, Entity, EntityRelationshipCache, EntityRelationshipType, EntityType, Language, NameCache, NamePartType, NameType, Script
+
+
+class EATSMLExportLoader (object):
+
+    def __init__ (self, topic_map):
+        self._topic_map = topic_map
+        self._infrastructure = None
+
+    def _get_date_part_types (self):
+        """Returns the date part name of each date part type, keyed
+        by the primary key of the type.
+
+        :rtype: `dict`
+
+        """
+        topic_map = self._topic_map
+        date_part_types = {}
+        for date_part_name in Date.date_part_names:
+            date_part_type = getattr(topic_map, '%s_date_type' % date_part_name)
+            date_part_types[date_part_type.pk] = (date_part_name,
+                                                  date_part_type)
+        return date_part_types
+
+    def _get_roles (self, role_type, association_type, player_role_types,
+                    players):
+        """Returns pairs of a player in `players` and the player of
+        the `role_type` role in each association of
+        `association_type` in which it plays a role of one of
+        `player_role_types`.
+
+        :rtype: `list` of `tuple`s of primary keys
+
+        """
+        return Role.objects.filter(
+            type=role_type, association__type=association_type,
+            association__roles__type__in=player_role_types,
+            association__roles__player__in=players).order_by('pk').values_list(
+            'association__roles__player', 'player')
+
+    def _get_scopes (self, through, field, pks):
+        """Returns the primary keys of the scoping topics of the
+        constructs with primary keys `pks`, keyed by construct.
+
+        :rtype: `dict` of `set`s
+
+        """
+        scopes = {}
+        for construct, topic in through.objects.filter(**{
+                '%s__in' % field: pks}).values_list(field, 'topic'):
+            scopes.setdefault(construct, set()).add(topic)
+        return scopes
+
+    def load (self, entities, authority=None, language=None, script=None,
+              mark_preferred=False):
+        """Returns the records of `entities` and their property
+        assertions, keyed by entity primary key.
+
+        If `mark_preferred` is True, or any of `authority`, `language`
+        and `script` is specified, the preferred name of each entity
+        is marked.
+
+        :param entities: entities to load
+        :type entities: `list` of `Entity`s
+        :param authority: preferred authority of names
+        :type authority: `Authority`
+        :param language: preferred language of names
+        :type language: `Language`
+        :param script: preferred script of names
+        :type script: `Script`
+        :param mark_preferred: whether to mark the preferred name even
+          with no preferences specified
+        :type mark_preferred: `bool`
+        :rtype: `dict` of `EntityRecord`s
+
+        """
+        infrastructure = self._load_infrastructure()
+        pks = [entity.pk for entity in entities]
+        records = {}
+        for entity in Entity.objects.filter(pk__in=pks).select_related(
+                'identifier'):
+            records[entity.pk] = EntityRecord(entity)
+        if not records:
+            return records
+        self._load_urls(records)
+        assertions = {}
+        self._load_relationships(records, assertions, infrastructure)
+        self._load_assertions(records, assertions, infrastructure)
+        self._load_occurrence_assertions(records, infrastructure)
+        if mark_preferred or authority or language or script:
+            preferred_names = NameCache.objects.get_preferred(
+                records.keys(), authority, language, script)
+            for entity, cached_name in preferred_names.items():
+                records[entity].preferred_name = cached_name.assertion_id
+        return records
+
+    def _load_assertions (self, records, assertions, infrastructure):
+        """Loads the existence, entity type and name property
+        assertions of the entities in `records`, and the roles and
+        scopes of those and of the entity relationships in
+        `assertions`."""
+        topic_map = self._topic_map
+        kinds = {
+            topic_map.entity_type_assertion_type.pk: 'entity_types',
+            topic_map.existence_assertion_type.pk: 'existences',
+            topic_map.name_assertion_type.pk: 'names',
+            }
+        entity_roles = Role.objects.filter(
+            type=topic_map.entity_role_type, player__in=records.keys(),
+            association__type__in=kinds.keys()).order_by(
+            'association').values_list(
+            'association', 'player', 'association__type',
+            'association__identifier')
+        name_assertions = set()
+        for assertion_pk, entity, assertion_type, identifier in entity_roles:
+            assertion = AssertionRecord(assertion_pk, identifier)
+            if kinds[assertion_type] == 'names':
+                name_assertions.add(assertion_pk)
+            assertions[assertion_pk] = assertion
+            getattr(records[entity], kinds[assertion_type]).append(assertion)
+        if not assertions:
+            return
+        scopes = self._get_scopes(Association.scope.through, 'association',
+                                  assertions.keys())
+        is_preferred = topic_map.is_preferred.pk
+        full_certainty = topic_map.property_assertion_full_certainty.pk
+        for assertion_pk, assertion in assertions.items():
+            scope = scopes.get(assertion_pk, set())
+            assertion.is_preferred = is_preferred in scope
+            assertion.is_certain = full_certainty in scope
+            if assertion.authority is None:
+                for topic in scope:
+                    if topic in infrastructure[Authority]:
+                        assertion.authority = infrastructure[Authority][topic]
+                        break
+        dates = {}
+        names = {}
+        roles = Role.objects.filter(
+            association__in=assertions.keys(),
+            type__in=[topic_map.date_role_type,
+                      topic_map.property_role_type]).order_by('pk').values_list(
+            'association', 'type', 'player')
+        date_role_type = topic_map.date_role_type.pk
+        for assertion_pk, role_type, player in roles:
+            assertion = assertions[assertion_pk]
+            if role_type == date_role_type:
+                date = dates[player] = DateRecord(topic_map)
+                assertion.dates.append(date)
+            elif player in infrastructure[EntityType]:
+                assertion.entity_type = infrastructure[EntityType][player]
+            elif assertion_pk in name_assertions:
+                names[player] = assertion.name = NameRecord()
+        self._load_dates(dates, infrastructure)
+        self._load_names(names, infrastructure)
+
+    def _load_dates (self, dates, infrastructure):
+        """Loads the periods and date parts of `dates`, keyed by the
+        primary key of their topics."""
+        if not dates:
+            return
+        topic_map = self._topic_map
+        periods = self._get_roles(
+            topic_map.date_period_role_type,
+            topic_map.date_period_association_type,
+            [topic_map.date_role_type], dates.keys())
+        for date, period in periods:
+            dates[date].period = infrastructure[DatePeriod][period]
+        date_part_types = self._get_date_part_types()
+        date_parts = {}
+        for pk, date, part_type, value in TopicMapName.objects.filter(
+                topic__in=dates.keys()).values_list(
+            'pk', 'topic', 'type', 'value'):
+            date_part_name, date_part_type = date_part_types[part_type]
+            date_part = DatePartRecord(topic_map, date_part_type, value)
+            date_parts[pk] = date_part
+            setattr(dates[date], date_part_name, date_part)
+        scopes = self._get_scopes(TopicMapName.scope.through, 'name',
+                                  date_parts.keys())
+        certainties = {
+            topic_map.date_full_certainty.pk: topic_map.date_full_certainty,
+            topic_map.date_no_certainty.pk: topic_map.date_no_certainty,
+            }
+        for pk, date_part in date_parts.items():
+            for topic in scopes.get(pk, ()):
+                if topic in infrastructure[Calendar]:
+                    date_part.calendar = infrastructure[Calendar][topic]
+                elif topic in infrastructure[DateType]:
+                    date_part.date_type = infrastructure[DateType][topic]
+                elif topic in certainties:
+                    date_part.certainty = certainties[topic]
+        # Only the first variant of a date part holds its normalised
+        # form.
+        for pk, value in Variant.objects.filter(
+                name__in=date_parts.keys()).order_by('-pk').values_list(
+            'name', 'value'):
+            date_parts[pk].normalised = value
+
+    def _load_infrastructure (self):
+        """Returns all infrastructure objects, keyed by model and
+        primary key, loading them on first use.
+
+        The ordered name part types of each language and the
+        separator of each script are also loaded.
+
+        :rtype: `dict` of `dict`s
+
+        """
+        if self._infrastructure is not None:
+            return self._infrastructure
+        topic_map = self._topic_map
+        infrastructure = {}
+        for model in (Authority, Calendar, DatePeriod, DateType,
+                      EntityRelationshipType, EntityType, Language,
+                      NamePartType, NameType, Script):
+            infrastructure[model] = dict(
+                [(item.pk, item) for item in
+                 model.objects.select_related('identifier')])
+        self._name_part_types = {}
+        for language, name_part_type in Occurrence.objects.filter(
+                type=topic_map.name_part_type_order_in_language_type).order_by(
+            'value').values_list('scope', 'topic'):
+            self._name_part_types.setdefault(language, []).append(
+                infrastructure[NamePartType][name_part_type])
+        self._separators = dict(Occurrence.objects.filter(
+                type=topic_map.script_separator_type).values_list(
+                'topic', 'value'))
+        self._infrastructure = infrastructure
+        return infrastructure
+
+    def _load_names (self, names, infrastructure):
+        """Loads the forms, types, languages, scripts and name parts
+        of `names`, keyed by the primary key of their topics."""
+        if not names:
+            return
+        topic_map = self._topic_map
+        name_parts = {}
+        for name, name_part in self._get_roles(
+                topic_map.name_part_role_type,
+                topic_map.name_has_name_part_association_type,
+                [topic_map.name_role_type], names.keys()):
+            name_parts[name_part] = NamePartRecord()
+            names[name].name_parts.append(name_parts[name_part])
+        elements = dict(names.items() + name_parts.items())
+        for element, value, element_type in TopicMapName.objects.filter(
+                topic__in=elements.keys()).values_list(
+            'topic', 'value', 'type'):
+            elements[element].display_form = value
+            if element in names:
+                elements[element].name_type = infrastructure[NameType][
+                    element_type]
+            else:
+                elements[element].name_part_type = infrastructure[
+                    NamePartType][element_type]
+        element_role_types = [topic_map.name_role_type,
+                              topic_map.name_part_role_type]
+        for element, language in self._get_roles(
+                topic_map.language_role_type, topic_map.is_in_language_type,
+                element_role_types, elements.keys()):
+            elements[element].language = infrastructure[Language][language]
+            if element in names:
+                names[element].name_part_types = self._name_part_types.get(
+                    language, [])
+        for element, script in self._get_roles(
+                topic_map.script_role_type, topic_map.is_in_script_type,
+                element_role_types, elements.keys()):
+            elements[element].script = infrastructure[Script][script]
+            if element in names:
+                names[element].separator = self._separators.get(script, u'')
+        if name_parts:
+            for name_part, order in Occurrence.objects.filter(
+                    topic__in=name_parts.keys(),
+                    type=topic_map.name_part_order_type).values_list(
+                'topic', 'value'):
+                name_parts[name_part].order = order
+
+    def _load_occurrence_assertions (self, records, infrastructure):
+        """Loads the note and subject identifier property assertions
+        of the entities in `records`."""
+        topic_map = self._topic_map
+        kinds = {
+            topic_map.note_assertion_type.pk: 'notes',
+            topic_map.subject_identifier_assertion_type.pk:
+                'subject_identifiers',
+            }
+        assertions = {}
+        for pk, entity, assertion_type, identifier, value in \
+                Occurrence.objects.filter(
+                topic__in=records.keys(), type__in=kinds.keys()).order_by(
+                'pk').values_list('pk', 'topic', 'type', 'identifier',
+                                  'value'):
+            assertion = AssertionRecord(pk, identifier)
+            assertion.note = assertion.subject_identifier = value
+            assertions[pk] = assertion
+            getattr(records[entity], kinds[assertion_type]).append(assertion)
+        scopes = self._get_scopes(Occurrence.scope.through, 'occurrence',
+                                  assertions.keys())
+        for pk, assertion in assertions.items():
+            for topic in scopes.get(pk, ()):
+                if topic in infrastructure[Authority]:
+                    assertion.authority = infrastructure[Authority][topic]
+                    break
+
+    def _load_relationships (self, records, assertions, infrastructure):
+        """Loads the entity relationship property assertions of the
+        entities in `records` from the entity relationship cache,
+        adding them to `assertions`."""
+        cached_relationships = EntityRelationshipCache.objects.filter(
+            Q(domain_entity__in=records.keys()) |
+            Q(range_entity__in=records.keys())).order_by(
+            'entity_relationship').values_list(
+            'entity_relationship', 'entity_relationship__identifier',
+            'authority', 'relationship_type', 'domain_entity', 'range_entity')
+        cached_relationships = list(cached_relationships)
+        others = set()
+        for values in cached_relationships:
+            others.update([entity for entity in values[4:] if entity not in
+                           records])
+        entities = dict([(pk, record.entity) for pk, record in records.items()])
+        for entity in Entity.objects.filter(pk__in=others).select_related(
+                'identifier'):
+            entities[entity.pk] = entity
+        for pk, identifier, authority, relationship_type, domain_entity, \
+                range_entity in cached_relationships:
+            assertion = AssertionRecord(pk, identifier)
+            assertion.authority = infrastructure[Authority][authority]
+            assertion.entity_relationship_type = infrastructure[
+                EntityRelationshipType][relationship_type]
+            assertion.domain_entity = entities[domain_entity]
+            assertion.range_entity = entities[range_entity]
+            assertions[pk] = assertion
+            for entity in set([domain_entity, range_entity]):
+                if entity in records:
+                    records[entity].entity_relationships.append(assertion)
+
+    def _load_urls (self, records):
+        """Sets the URL of each entity in `records`, from the entity's
+        EATS subject identifier."""
+        topic_map = self._topic_map
+        subject_identifiers = {}
+        for subject_identifier in SubjectIdentifier.objects.filter(
+                topic__in=records.keys()):
+            subject_identifiers.setdefault(subject_identifier.topic_id,
+                                           []).append(subject_identifier)
+        for pk, record in records.items():
+            locator_url = unicode(topic_map.get_entity_subject_identifier(
+                    record.entity.identifier_id))
+            for subject_identifier in subject_identifiers.get(pk, []):
+                if subject_identifier.get_reference() == locator_url:
+                    record.url = subject_identifier.to_external_form()
+                    break
+            else:
+                raise EATSMLException(
+                    'Entity %d has no EATS subject identifier' %
+                    record.entity.identifier_id)
+
+
+class AssertionRecord (object):
+
+    """Data of a property assertion to be exported."""
+
+    def __init__ (self, pk, identifier):
+        self.pk = pk
+        self._identifier = identifier
+        self.authority = None
+        self.dates = []
+        self.is_certain = False
+        self.is_preferred = False
+
+    def get_id (self):
+        return self._identifier
+
+
+class DatePartRecord (DatePartForm):
+
+    """Data of a date part to be exported."""
+
+    def __init__ (self, topic_map, date_part_type=None, value=''):
+        self.eats_topic_map = topic_map
+        self._date_part_type = date_part_type
+        self._value = value
+        self.calendar = None
+        self.certainty = None
+        self.date_type = None
+        self.normalised = ''
+
+    def get_normalised_value (self):
+        return self.normalised
+
+    def get_type (self):
+        return self._date_part_type
+
+    def get_value (self):
+        return self._value
+
+
+class DateRecord (DateForm):
+
+    """Data of a date to be exported."""
+
+    date_part_names = Date.date_part_names
+
+    def __init__ (self, topic_map):
+        self.period = None
+        for date_part_name in self.date_part_names:
+            setattr(self, date_part_name, DatePartRecord(topic_map))
+
+
+class EntityRecord (object):
+
+    """Data of an entity and its property assertions to be
+    exported."""
+
+    def __init__ (self, entity):
+        self.entity = entity
+        self.url = None
+        self.entity_relationships = []
+        self.entity_types = []
+        self.existences = []
+        self.names = []
+        self.notes = []
+        self.preferred_name = None
+        self.subject_identifiers = []
+
+
+class NamePartRecord (object):
+
+    """Data of a name part to be exported."""
+
+    def __init__ (self):
+        self.display_form = ''
+        self.language = None
+        self.name_part_type = None
+        self.order = None
+        self.script = None
+
+
+class NameRecord (object):
+
+    """Data of a name to be exported.
+
+    `name_part_types` holds the name part types of the name's
+    language, in order.
+
+    """
+
+    def __init__ (self):
+        self.display_form = ''
+        self.language = None
+        self.name_part_types = []
+        self.name_parts = []
+        self.name_type = None
+        self.script = None
+        self.separator = u''
+
+    @property
+    def assembled_form (self):
+        if self.display_form:
+            return self.display_form
+        data = self.get_name_parts()
+        form = []
+        for name_part_type in self.name_part_types:
+            form.extend([name_part.display_form for name_part in
+                         data.get(name_part_type, [])])
+        return self.separator.join(form)
+
+    def get_name_parts (self):
+        """Returns the name parts of this name, keyed by name part
+        type, in their specified order within type.
+
+        :rtype: `dict`
+
+        """
+        data = {}
+        for name_part in self.name_parts:
+            data.setdefault(name_part.name_part_type, []).append(name_part)
+        for name_parts in data.values():
+            name_parts.sort(key=attrgetter('order'))
+        return data
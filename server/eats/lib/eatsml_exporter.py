@@ -1,12 +1,21 @@
+import copy
+import itertools
+
+from django.db.models.query import QuerySet
+
 from lxml import etree
 
 from eats.constants import EATS, EATS_NAMESPACE, XML
+from eats.lib.eatsml_export_loader import EATSMLExportLoader
 from eats.lib.eatsml_handler import EATSMLHandler
 from eats.models import Authority, Calendar, DatePeriod, DateType, Entity, EntityRelationshipType, EntityType, Language, NamePartType, NameType, Script
 
 
 NSMAP = {None: EATS_NAMESPACE}
 
+# Number of entities exported at a time by the streaming exports.
+ENTITY_CHUNK_SIZE = 500
+
 
 class EATSMLExporter (EATSMLHandler):
 
@@ -26,6 +35,8 @@ class EATSMLExporter (EATSMLHandler):
             'script': set(),
             }
         self._entities_required = set()
+        self._entity_records = {}
+        self._loader = EATSMLExportLoader(topic_map)
         self._user_authority = None
         self._user_language = None
         self._user_script = None
@@ -37,28 +48,39 @@ class EATSMLExporter (EATSMLHandler):
         entities = Entity.objects.all()
         if entities:
             self._export_entities(entities, root)
-        # All infrastructure must be exported, not just that which is
-        # required by the existing entities.
-        self._infrastructure_required['authority'] = set(
-            Authority.objects.all())
-        self._infrastructure_required['calendar'] = set(Calendar.objects.all())
-        self._infrastructure_required['date_period'] = set(
-            DatePeriod.objects.all())
-        self._infrastructure_required['date_type'] = set(DateType.objects.all())
-        self._infrastructure_required['entity_relationship_type'] = \
-            set(EntityRelationshipType.objects.all())
-        self._infrastructure_required['entity_type'] = set(
-            EntityType.objects.all())
-        self._infrastructure_required['language'] = set(Language.objects.all())
-        self._infrastructure_required['name_part_type'] = set(
-            NamePartType.objects.all())
-        self._infrastructure_required['name_type'] = set(NameType.objects.all())
-        self._infrastructure_required['script'] = set(Script.objects.all())
+        self._require_all_infrastructure()
         self._export_infrastructure(root)
         tree = root.getroottree()
         self._validate(tree)
         return tree
 
+    def export_full_stream (self, chunk_size=ENTITY_CHUNK_SIZE,
+                            validate=False):
+        """Returns a generator of the serialised pieces of an EATSML
+        document of all EATS data (infrastructure and entities).
+
+        Unlike `export_full`, the document is never held in memory as
+        a whole: since all infrastructure is exported, it is written
+        first, followed by the entities, `chunk_size` at a time.
+
+        :param chunk_size: number of entities to export at a time
+        :type chunk_size: int
+        :param validate: if True, validate each chunk of entities,
+          along with the infrastructure and entities it references
+        :type validate: `bool`
+        :rtype: generator of `str`
+
+        """
+        self._require_all_infrastructure()
+        infrastructure = etree.Element(EATS + 'collection', nsmap=NSMAP)
+        self._export_required_infrastructure(infrastructure)
+        chunks = self._export_entity_chunks(Entity.objects.all(), chunk_size,
+                                            validate)
+        # Every related entity is also a primary entity, so the
+        # entities required by each chunk may be discarded.
+        return self._stream(infrastructure, (
+                entities_element for entities_element, required in chunks))
+
     def export_entities (self, entities, user=None):
         """Returns an XML tree of `entities` exported into EATSML.
 
@@ -85,6 +107,41 @@ class EATSMLExporter (EATSMLHandler):
         self._validate(tree)
         return tree
 
+    def export_entities_stream (self, entities, user=None,
+                                chunk_size=ENTITY_CHUNK_SIZE, validate=False):
+        """Returns a generator of the serialised pieces of an EATSML
+        document of `entities`.
+
+        Unlike `export_entities`, the document is never held in
+        memory as a whole: the entities are exported `chunk_size` at a
+        time, each chunk being yielded as soon as it is built. Since
+        the infrastructure must precede the entities in the document,
+        and the infrastructure they require is not known until they
+        have all been exported, all infrastructure is exported, as by
+        `export_full_stream`.
+
+        :param entities: entities to export
+        :type entities: `list` or `QuerySet` of `Entity`s
+        :param user: optional user
+        :type user: `EATSUser`
+        :param chunk_size: number of entities to export at a time
+        :type chunk_size: int
+        :param validate: if True, validate each chunk of entities,
+          along with the infrastructure and entities it references
+        :type validate: `bool`
+        :rtype: generator of `str`
+
+        """
+        if user is not None:
+            self._user_authority = user.get_current_authority()
+            self._user_language = user.get_language()
+            self._user_script = user.get_script()
+        self._require_all_infrastructure()
+        infrastructure = etree.Element(EATS + 'collection', nsmap=NSMAP)
+        self._export_required_infrastructure(infrastructure)
+        return self._stream(infrastructure, self._export_entities_stream_chunks(
+                entities, chunk_size, validate))
+
     def _export_entities (self, entities, parent):
         """Exports `entities`.
 
@@ -95,14 +152,84 @@ class EATSMLExporter (EATSMLHandler):
 
         """
         entities_element = etree.SubElement(parent, EATS + 'entities')
-        for entity in entities:
-            self._export_entity(entity, entities_element)
+        exported = set()
+        for chunk in self._get_entity_chunks(entities, ENTITY_CHUNK_SIZE):
+            self._load_entity_records(chunk)
+            for entity in chunk:
+                self._export_entity(entity, entities_element)
+                exported.add(entity.pk)
         # Export any additional entities that might need to be
         # exported (due to being referenced from another entity).
-        for entity in self._entities_required:
-            if entity not in entities:
+        extras = [entity for entity in self._entities_required
+                  if entity.pk not in exported]
+        for chunk in self._get_entity_chunks(extras, ENTITY_CHUNK_SIZE):
+            self._load_entity_records(chunk)
+            for entity in chunk:
                 self._export_entity(entity, entities_element, True)
 
+    def _export_entity_chunks (self, entities, chunk_size, validate,
+                               extra=False):
+        """Yields `entities` exported `chunk_size` at a time, each
+        chunk as an entities element together with the set of
+        entities referenced from that chunk.
+
+        :param entities: entities to export
+        :type entities: `list` or `QuerySet` of `Entity`s
+        :param chunk_size: number of entities to export at a time
+        :type chunk_size: int
+        :param validate: if True, validate each chunk
+        :type validate: `bool`
+        :param extra: if True, `entities` are only referenced by other
+          entities
+        :type extra: `bool`
+        :rtype: generator of `tuple`s
+
+        """
+        for chunk in self._get_entity_chunks(entities, chunk_size):
+            entities_element = etree.Element(EATS + 'entities', nsmap=NSMAP)
+            previously_required = self._entities_required
+            self._entities_required = set()
+            self._load_entity_records(chunk)
+            for entity in chunk:
+                self._export_entity(entity, entities_element, extra)
+            required = self._entities_required
+            self._entities_required = previously_required
+            if validate:
+                self._validate_chunk(entities_element, set(required) -
+                                     set(chunk))
+            yield entities_element, required
+
+    def _export_entities_stream_chunks (self, entities, chunk_size,
+                                        validate):
+        """Yields the entities elements of `entities` exported
+        `chunk_size` at a time, followed by those of any other
+        entities that they reference.
+
+        :param entities: entities to export
+        :type entities: `list` or `QuerySet` of `Entity`s
+        :param chunk_size: number of entities to export at a time
+        :type chunk_size: int
+        :param validate: if True, validate each chunk
+        :type validate: `bool`
+        :rtype: generator of `Element`s
+
+        """
+        exported = set()
+        related = set()
+        for entities_element, required in self._export_entity_chunks(
+                entities, chunk_size, validate):
+            exported.update([int(entity.get('eats_id')) for entity in
+                             entities_element])
+            related.update(required)
+            yield entities_element
+        # Export any additional entities that might need to be
+        # exported (due to being referenced from another entity).
+        extras = [entity for entity in related
+                  if entity.get_id() not in exported]
+        for entities_element, required in self._export_entity_chunks(
+                extras, chunk_size, validate, True):
+            yield entities_element
+
     def _export_entity (self, entity, parent, extra=False):
         """Exports `entity`.
 
@@ -114,12 +241,15 @@ class EATSMLExporter (EATSMLHandler):
         :type extra: `bool`
 
         """
+        record = self._entity_records.get(entity.pk)
+        if record is None:
+            self._load_entity_records([entity])
+            record = self._entity_records[entity.pk]
         entity_element = etree.SubElement(parent, EATS + 'entity')
-        entity_id = str(entity.get_id())
+        entity_id = str(record.entity.get_id())
         entity_element.set(XML + 'id', 'entity-%s' % entity_id)
         entity_element.set('eats_id', entity_id)
-        url = entity.get_eats_subject_identifier().to_external_form()
-        entity_element.set('url', url)
+        entity_element.set('url', record.url)
         if extra:
             entity_element.set('related_entity', 'true')
         else:
@@ -127,37 +257,38 @@ class EATSMLExporter (EATSMLHandler):
             # specifically requested to be exported); otherwise there
             # is the possibility of recursion.
             self._export_entity_relationship_property_assertions(
-                entity, entity_element)
-        self._export_entity_type_property_assertions(entity, entity_element)
-        self._export_existence_property_assertions(entity, entity_element)
-        self._export_name_property_assertions(entity, entity_element)
-        self._export_note_property_assertions(entity, entity_element)
+                record, entity_element)
+        self._export_entity_type_property_assertions(record, entity_element)
+        self._export_existence_property_assertions(record, entity_element)
+        self._export_name_property_assertions(record, entity_element)
+        self._export_note_property_assertions(record, entity_element)
         self._export_subject_identifier_property_assertions(
-            entity, entity_element)
+            record, entity_element)
 
-    def _export_entity_relationship_property_assertions (self, entity, parent):
-        """Exports the entity relationships of `entity`.
+    def _export_entity_relationship_property_assertions (self, record, parent):
+        """Exports the entity relationships of the entity in `record`.
 
-        :param entity: entity whose entity relationships will be exported
-        :type entity: `Entity`
+        :param record: entity whose entity relationships will be exported
+        :type record: `EntityRecord`
         :param parent: XML element that will contain the exported entity types
         :type parent: `Element`
 
         """
-        entity_relationships = entity.get_entity_relationships()
+        entity_relationships = record.entity_relationships
         if entity_relationships:
             entity_relationships_element = etree.SubElement(
                 parent, EATS + 'entity_relationships')
         for entity_relationship in entity_relationships:
             self._export_entity_relationship_property_assertion(
-                entity_relationship, entity, entity_relationships_element)
+                entity_relationship, record.entity,
+                entity_relationships_element)
 
     def _export_entity_relationship_property_assertion (self, assertion,
                                                         entity, parent):
         """Exports the entity relationship `assertion`.
 
         :param assertion: entity relationship to export
-        :type assertion: `EntityRelationshipPropertyAssertion`
+        :type assertion: `AssertionRecord`
         :param entity: entity whose assertion this is
         :type entity: `Entity`
         :param parent: XML element that will contain the exported
@@ -169,8 +300,7 @@ class EATSMLExporter (EATSMLHandler):
                                              'entity_relationship')
         authority = assertion.authority
         assertion_element.set('authority', 'authority-%d' % authority.get_id())
-        certainty = assertion.certainty
-        if certainty == self._topic_map.property_assertion_full_certainty:
+        if assertion.is_certain:
             certainty_value = 'full'
         else:
             certainty_value = 'none'
@@ -195,16 +325,16 @@ class EATSMLExporter (EATSMLHandler):
             self._entities_required.add(domain_entity)
         self._export_dates(assertion, assertion_element)
 
-    def _export_entity_type_property_assertions (self, entity, parent):
-        """Exports the entity types of `entity`.
+    def _export_entity_type_property_assertions (self, record, parent):
+        """Exports the entity types of the entity in `record`.
 
-        :param entity: entity whose entity types will be exported
-        :type entity: `Entity`
+        :param record: entity whose entity types will be exported
+        :type record: `EntityRecord`
         :param parent: XML element that will contain the exported entity types
         :type parent: `Element`
 
         """
-        entity_types = entity.get_entity_types()
+        entity_types = record.entity_types
         if entity_types:
             entity_types_element = etree.SubElement(parent,
                                                     EATS + 'entity_types')
@@ -215,8 +345,8 @@ class EATSMLExporter (EATSMLHandler):
     def _export_entity_type_property_assertion (self, assertion, parent):
         """Exports the entity type `assertion`.
 
-        :param assertopm: entity type property assertion to export
-        :type assertion: `EntityTypePropertyAssertion`
+        :param assertion: entity type property assertion to export
+        :type assertion: `AssertionRecord`
         :param parent: XML element that will contain the exported entity type
         :type parent: `Element`
 
@@ -232,16 +362,16 @@ class EATSMLExporter (EATSMLHandler):
         self._infrastructure_required['entity_type'].add(entity_type)
         self._export_dates(assertion, assertion_element)
 
-    def _export_existence_property_assertions (self, entity, parent):
-        """Exports the existences of `entity`.
+    def _export_existence_property_assertions (self, record, parent):
+        """Exports the existences of the entity in `record`.
 
-        :param entity: entity whose exstences will be exported
-        :type entity: `Entity`
+        :param record: entity whose exstences will be exported
+        :type record: `EntityRecord`
         :param parent: XML element that will contain the exported existences
         :type parent: `Element`
 
         """
-        existences = entity.get_existences()
+        existences = record.existences
         if existences:
             existences_element = etree.SubElement(parent, EATS + 'existences')
         for existence in existences:
@@ -252,7 +382,7 @@ class EATSMLExporter (EATSMLHandler):
         """Exports `existence`.
 
         :param existence: existence to export
-        :type existence: `ExistencePropertyAssertion`
+        :type existence: `AssertionRecord`
         :param parent: XML element that will contain the exported existence
         :type parent: `Element`
 
@@ -264,27 +394,20 @@ class EATSMLExporter (EATSMLHandler):
         self._infrastructure_required['authority'].add(authority)
         self._export_dates(existence, assertion_element)
 
-    def _export_name_property_assertions (self, entity, parent):
-        """Exports the names of `entity`.
+    def _export_name_property_assertions (self, record, parent):
+        """Exports the names of the entity in `record`.
 
-        :param entity: entity whose names will be exported
-        :type entity: `Entity`
+        :param record: entity whose names will be exported
+        :type record: `EntityRecord`
         :param parent: XML element that will contain the exported names
         :type parent: `Element`
 
         """
-        names = entity.get_eats_names()
+        names = record.names
         if names:
             names_element = etree.SubElement(parent, EATS + 'names')
-            preferred_name = None
-            if self._user_authority or self._user_language or self._user_script:
-                preferred_name = entity.get_preferred_name(
-                    self._user_authority, self._user_language,
-                    self._user_script)
         for name in names:
-            is_preferred = False
-            if name == preferred_name:
-                is_preferred = True
+            is_preferred = name.pk == record.preferred_name
             self._export_name_property_assertion(name, names_element,
                                                  is_preferred)
 
@@ -292,7 +415,7 @@ class EATSMLExporter (EATSMLHandler):
         """Exports the name in `assertion`.
 
         :param assertion: name to export
-        :type assertion: `NamePropertyAssertion`
+        :type assertion: `AssertionRecord`
         :param parent: XML element that will contain the exported name
         :type parent: `Element`
         :param is_preferred: indicates if this `assertion` is
@@ -329,7 +452,7 @@ class EATSMLExporter (EATSMLHandler):
         if name_parts_data:
             name_parts_element = etree.SubElement(name_element,
                                                   EATS + 'name_parts')
-            name_part_types = language.name_part_types
+            name_part_types = name.name_part_types
         # To maintain correct order of name parts, export them in type
         # order based on language, and then output any remaining in
         # essentially random order.
@@ -357,7 +480,7 @@ class EATSMLExporter (EATSMLHandler):
         :param name_part_type_id: the id of the name part type
         :type name_part_type: `int`
         :param name_parts: the name part to export
-        :type name_parts: `NamePart`
+        :type name_parts: `NamePartRecord`
         :param parent: XML element that will contain the exported name part
         :type parent: `Element`
 
@@ -373,16 +496,16 @@ class EATSMLExporter (EATSMLHandler):
         name_part_element.set('script', 'script-%d' % script.get_id())
         name_part_element.text = name_part.display_form
 
-    def _export_note_property_assertions (self, entity, parent):
-        """Exports the notes of `entity`.
+    def _export_note_property_assertions (self, record, parent):
+        """Exports the notes of the entity in `record`.
 
-        :param entity: entity whose notes will be exported
-        :type entity: `Entity`
+        :param record: entity whose notes will be exported
+        :type record: `EntityRecord`
         :param parent: XML element that will contain the exported notes
         :type parent: `Element`
 
         """
-        notes = entity.get_notes()
+        notes = record.notes
         if notes:
             notes_element = etree.SubElement(parent, EATS + 'notes')
         for note in notes:
@@ -392,7 +515,7 @@ class EATSMLExporter (EATSMLHandler):
         """Exports the note `assertion`.
 
         :param assertion: note to export
-        :type assertion: `NotePropertyAssertion`
+        :type assertion: `AssertionRecord`
         :param parent: XML element that will contain the exported note
         :type parent: `Element`
 
@@ -404,17 +527,17 @@ class EATSMLExporter (EATSMLHandler):
         note_element.text = assertion.note
         self._infrastructure_required['authority'].add(authority)
 
-    def _export_subject_identifier_property_assertions (self, entity, parent):
-        """Exports the subject identifiers of `entity`.
+    def _export_subject_identifier_property_assertions (self, record, parent):
+        """Exports the subject identifiers of the entity in `record`.
 
-        :param entity: entity whose subject identifiers will be exported
-        :type entity: `Entity`
+        :param record: entity whose subject identifiers will be exported
+        :type record: `EntityRecord`
         :param parent: XML element that will contain the exported
           subject identifiers
         :type parent: `Element`
 
         """
-        subject_identifiers = entity.get_eats_subject_identifiers()
+        subject_identifiers = record.subject_identifiers
         if subject_identifiers:
             subject_identifiers_element = etree.SubElement(
                 parent, EATS + 'subject_identifiers')
@@ -426,7 +549,7 @@ class EATSMLExporter (EATSMLHandler):
         """Exports the subject identifier `assertion`.
 
         :param assertion: subject identifier to export
-        :type assertion: `SubjectIdentifierPropertyAssertion`
+        :type assertion: `AssertionRecord`
         :param parent: XML element that will contain the exported
           subject identifier
         :type parent: `Element`
@@ -445,12 +568,12 @@ class EATSMLExporter (EATSMLHandler):
         """Exports the dates associated with `assertion`.
 
         :param assertion: property assertion whose dates will be exported
-        :type assertion: `PropertyAssertion`
+        :type assertion: `AssertionRecord`
         :param parent: XML element that will contain the exported dates
         :type parent; `Element`
 
         """
-        dates = assertion.get_dates()
+        dates = assertion.dates
         if dates:
             dates_element = etree.SubElement(parent, EATS + 'dates')
         for date in dates:
@@ -460,7 +583,7 @@ class EATSMLExporter (EATSMLHandler):
         """Exports `date`, appending it to `parent`.
 
         :param date: date to export
-        :type date: `Date`
+        :type date: `DateRecord`
         :param parent: XML element that will contain the exported date
         :type parent: `Element`
 
@@ -483,7 +606,7 @@ class EATSMLExporter (EATSMLHandler):
         `parent`.
 
         :param date_part: date part to export
-        :type date_part: `DatePart`
+        :type date_part: `DatePartRecord`
         :param date_part_name: name of date part
         :type date_part_name: `str`
         :param parent: XML element that will contain the exported date part
@@ -580,6 +703,23 @@ class EATSMLExporter (EATSMLHandler):
         self._validate(tree)
         return tree
 
+    def _export_required_infrastructure (self, parent):
+        """Exports the infrastructure elements required so far,
+        appending them to `parent`, while leaving the record of the
+        required infrastructure able to be added to.
+
+        :param parent: XML element that will contain the export infrastructure
+        :type parent: `Element`
+
+        """
+        required = self._infrastructure_required
+        self._infrastructure_required = dict(
+            [(key, set(items)) for key, items in required.items()])
+        try:
+            self._export_infrastructure(parent)
+        finally:
+            self._infrastructure_required = required
+
     def _export_infrastructure (self, parent):
         """Exports required infrastructure elements, appending them to
         `parent`.
@@ -1039,3 +1179,139 @@ class EATSMLExporter (EATSMLHandler):
         code_element.text = script.get_code()
         separator_element = etree.SubElement(script_element, EATS + 'separator')
         separator_element.text = script.separator
+
+    def _get_entity_chunks (self, entities, chunk_size):
+        """Yields lists of at most `chunk_size` of `entities`.
+
+        A `QuerySet` is paged through by primary key, so that only
+        one chunk of entities is fetched at a time.
+
+        :param entities: entities to divide into chunks
+        :type entities: `list` or `QuerySet` of `Entity`s
+        :param chunk_size: maximum number of entities in a chunk
+        :type chunk_size: int
+        :rtype: generator of `list`s of `Entity`s
+
+        """
+        if isinstance(entities, QuerySet):
+            last_pk = 0
+            while True:
+                chunk = list(entities.filter(pk__gt=last_pk).order_by(
+                        'pk')[:chunk_size])
+                if not chunk:
+                    return
+                yield chunk
+                last_pk = chunk[-1].pk
+        entities = iter(entities)
+        while True:
+            chunk = list(itertools.islice(entities, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _load_entity_records (self, entities):
+        """Loads the data to be exported for `entities`, replacing
+        that previously loaded.
+
+        :param entities: entities to load
+        :type entities: `list` of `Entity`s
+
+        """
+        self._entity_records = self._loader.load(
+            entities, self._user_authority, self._user_language,
+            self._user_script)
+
+    def _require_all_infrastructure (self):
+        """Marks all infrastructure as required for export, not just
+        that which is required by the exported entities."""
+        self._infrastructure_required['authority'] = set(
+            Authority.objects.all())
+        self._infrastructure_required['calendar'] = set(Calendar.objects.all())
+        self._infrastructure_required['date_period'] = set(
+            DatePeriod.objects.all())
+        self._infrastructure_required['date_type'] = set(DateType.objects.all())
+        self._infrastructure_required['entity_relationship_type'] = \
+            set(EntityRelationshipType.objects.all())
+        self._infrastructure_required['entity_type'] = set(
+            EntityType.objects.all())
+        self._infrastructure_required['language'] = set(Language.objects.all())
+        self._infrastructure_required['name_part_type'] = set(
+            NamePartType.objects.all())
+        self._infrastructure_required['name_type'] = set(NameType.objects.all())
+        self._infrastructure_required['script'] = set(Script.objects.all())
+
+    def _stream (self, infrastructure, entity_chunks):
+        """Yields the serialised pieces of an EATSML document made up
+        of the children of `infrastructure`, followed by the entities
+        in `entity_chunks`.
+
+        :param infrastructure: XML element containing the exported
+          infrastructure
+        :type infrastructure: `Element`
+        :param entity_chunks: exported entities
+        :type entity_chunks: iterator
+        :rtype: generator of `str`
+
+        """
+        output = StreamBuffer()
+        entity_chunks = iter(entity_chunks)
+        with etree.xmlfile(output, encoding='utf-8') as xml_file:
+            xml_file.write_declaration()
+            with xml_file.element(EATS + 'collection', nsmap=NSMAP):
+                for element in infrastructure:
+                    xml_file.write(element)
+                infrastructure.clear()
+                yield output.drain()
+                chunk = next(entity_chunks, None)
+                if chunk is not None:
+                    with xml_file.element(EATS + 'entities'):
+                        while chunk is not None:
+                            for element in chunk:
+                                xml_file.write(element)
+                            chunk.clear()
+                            yield output.drain()
+                            chunk = next(entity_chunks, None)
+        yield output.drain()
+
+    def _validate_chunk (self, entities_element, related_entities):
+        """Validates the exported entities in `entities_element`, in a
+        document along with the infrastructure and
+        `related_entities` they reference.
+
+        :param entities_element: XML element containing exported entities
+        :type entities_element: `Element`
+        :param related_entities: entities referenced from the
+          exported entities but not among them
+        :type related_entities: `set` of `Entity`s
+
+        """
+        root = etree.Element(EATS + 'collection', nsmap=NSMAP)
+        entities = copy.deepcopy(entities_element)
+        root.append(entities)
+        self._load_entity_records(related_entities)
+        for entity in related_entities:
+            self._export_entity(entity, entities, True)
+        self._export_required_infrastructure(root)
+        self._validate(root.getroottree())
+
+
+class StreamBuffer (object):
+
+    """File-like object collecting the output written to it by an
+    `etree.xmlfile` until it is drained."""
+
+    def __init__ (self):
+        self._pieces = []
+
+    def drain (self):
+        """Returns the output written since the last drain.
+
+        :rtype: `str`
+
+        """
+        output = ''.join(self._pieces)
+        self._pieces = []
+        return output
+
+    def write (self, data):
+        self._pieces.append(data)
@@ -0,0 +1,454 @@
+"""Resumable processing of queued EATSML imports.
+
+A queued `EATSMLImport` is carried out in stages, each committed
+separately: the infrastructure, then each chunk of entities, then the
+entity relationships of each chunk of entities. The imported and
+annotated entities are appended to files in a working directory as
+each chunk is committed, and the length of each file is recorded in
+the import's checkpoint along with its progress. An import that is
+interrupted may therefore be resumed from the last chunk committed,
+discarding anything written to the working files after it.
+
+An import that fails is not resumed. So that it does not leave some
+of its chunks committed, every entity is checked before the
+infrastructure is committed; an import that would fail those checks
+then leaves nothing behind.
+
+Each stage is carried out in its own `TopicMapContext`, so that the
+infrastructure and authority components it looks up reflect changes
+committed by other processes up to its start.
+
+A worker claims an import with a conditional update, so that no two
+workers claim the same import, and holds it on a lease: it records a
+heartbeat on the import at each stage it commits, and stops, undoing
+the stage, if it finds that another worker has claimed the import in
+the meantime. A running import whose heartbeat is older than the lease
+is taken to have been abandoned by its worker, and may be claimed and
+resumed.
+
+"""
+
+from datetime import timedelta
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.encoding import force_text
+
+from lxml import etree
+
+from eats.constants import EATS, XML
+from eats.exceptions import EATSImportLeaseException
+from eats.lib.eatsml_bulk_importer import BulkEntityImporter, ENTITY_CHUNK_SIZE
+from eats.lib.eatsml_stream_importer import EATSMLStreamImporter
+from eats.lib.topic_map_context import TopicMapContext
+from eats.models import EATSMLImport, Entity
+
+
+RAW_INFRASTRUCTURE = 'raw-infrastructure.xml'
+ANNOTATED_INFRASTRUCTURE = 'annotated-infrastructure.xml'
+RAW_ENTITIES = 'raw-entities.xml'
+SPOOLED_ENTITIES = 'spooled-entities.xml'
+ANNOTATED_ENTITIES = 'annotated-entities.xml'
+
+READ_SIZE = 65536
+READ_BATCH_SIZE = 1000
+
+# Number of seconds after its last heartbeat that a running import is
+# taken to have been abandoned by its worker. It must be longer than
+# any stage of an import takes.
+LEASE_DURATION = 900
+
+
+def claim_next_import (lease=LEASE_DURATION):
+    """Claims the import to process next, and returns it, or None if
+    there is none.
+
+    Running imports whose worker has not recorded a heartbeat within
+    `lease` seconds, and so must have stopped, are resumed before
+    queued imports are started.
+
+    :param lease: number of seconds after its last heartbeat that a
+      running import may be claimed
+    :type lease: int
+    :rtype: `EATSMLImport`
+
+    """
+    now = timezone.now()
+    claimable = Q(status=EATSMLImport.QUEUED) | Q(
+        status=EATSMLImport.RUNNING, heartbeat__isnull=True) | Q(
+        status=EATSMLImport.RUNNING,
+        heartbeat__lt=now - timedelta(seconds=lease))
+    for status in (EATSMLImport.RUNNING, EATSMLImport.QUEUED):
+        for pk in EATSMLImport.objects.filter(claimable, status=status) \
+                .order_by('pk').values_list('pk', flat=True):
+            # The conditions are checked again as the import is
+            # claimed, so that of several workers only one claims it.
+            if EATSMLImport.objects.filter(claimable, pk=pk).update(
+                    status=EATSMLImport.RUNNING, heartbeat=now):
+                return EATSMLImport.objects.get(pk=pk)
+    return None
+
+
+def _read_pieces (pieces_file, end):
+    """Yields the contents of `pieces_file` up to the offset `end`, in
+    blocks, wrapped in a root element."""
+    yield '<pieces>'
+    remaining = end
+    while remaining:
+        data = pieces_file.read(min(READ_SIZE, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+    yield '</pieces>'
+
+
+class EATSMLImportJob (EATSMLStreamImporter):
+
+    """Carries out a queued EATSML import, committing each stage
+    separately so that the import may be resumed if interrupted."""
+
+    def __init__ (self, eatsml_import, topic_map, work_dir,
+                  chunk_size=ENTITY_CHUNK_SIZE, stdout=None):
+        """Initialise the job.
+
+        :param eatsml_import: the import to carry out
+        :type eatsml_import: `EATSMLImport`
+        :param topic_map: the topic map to import into
+        :type topic_map: `EATSTopicMap`
+        :param work_dir: directory in which to keep the working files
+          of imports
+        :type work_dir: string
+        :param chunk_size: number of entities to import and commit at
+          a time
+        :type chunk_size: int
+        :param stdout: stream to write progress reports to
+        :type stdout: file-like object
+
+        """
+        super(EATSMLImportJob, self).__init__(topic_map, chunk_size)
+        self._import = eatsml_import
+        self._work_dir = os.path.join(work_dir, str(eatsml_import.pk))
+        self._stdout = stdout
+
+    def _commit_entity_chunk (self, bulk_importer, chunk, raw_file,
+                              spool_file, checkpoint):
+        with TopicMapContext(self._topic_map), transaction.atomic():
+            # The entities are written before the import annotates
+            # them.
+            self._write_pieces(raw_file, chunk)
+            self._import_entity_chunk(bulk_importer, chunk)
+            bulk_importer.finish()
+            self._write_pieces(spool_file, chunk)
+            checkpoint[RAW_ENTITIES] = raw_file.tell()
+            checkpoint[SPOOLED_ENTITIES] = spool_file.tell()
+            self._import.entities_imported += len(chunk)
+            self._save_checkpoint(checkpoint)
+        self._report_progress()
+
+    def _commit_relationship_chunk (self, bulk_importer, chunk,
+                                    annotated_file, checkpoint):
+        with TopicMapContext(self._topic_map), transaction.atomic():
+            bulk_importer.import_relationship_chunk(list(chunk))
+            bulk_importer.finish()
+            self._write_pieces(annotated_file, chunk)
+            checkpoint[ANNOTATED_ENTITIES] = annotated_file.tell()
+            self._import.relationships_imported += len(chunk)
+            self._save_checkpoint(checkpoint)
+        self._report_progress()
+
+    def _complete (self, checkpoint):
+        """Saves the imported and annotated documents assembled from
+        the working files, and marks the import as completed."""
+        for field, infrastructure_name, entities_name in (
+            (self._import.raw_file, RAW_INFRASTRUCTURE, RAW_ENTITIES),
+            (self._import.annotated_file, ANNOTATED_INFRASTRUCTURE,
+             ANNOTATED_ENTITIES)):
+            output = tempfile.TemporaryFile()
+            try:
+                self._write_document(infrastructure_name, entities_name,
+                                     checkpoint[entities_name], output)
+                field.save('eatsml.xml', File(output), save=False)
+            finally:
+                output.close()
+        self._import.status = EATSMLImport.COMPLETED
+        self._import.end_date = timezone.now()
+        self._import.checkpoint = ''
+        self._save_import()
+        self._import.source_file.delete()
+        shutil.rmtree(self._work_dir)
+
+    def _get_path (self, name):
+        return os.path.join(self._work_dir, name)
+
+    def _import_entities_stage (self, source, checkpoint):
+        """Imports the entities not yet imported, in chunks, without
+        their entity relationships."""
+        skip = self._import.entities_imported
+        if skip == self._import.entity_count:
+            return
+        bulk_importer = BulkEntityImporter(self, self._topic_map,
+                                           self._chunk_size)
+        with self._open_pieces(RAW_ENTITIES, checkpoint) as raw_file, \
+                self._open_pieces(SPOOLED_ENTITIES, checkpoint) as spool_file:
+            chunk = self._new_chunk()
+            for element in self._parse(source):
+                if element.tag != EATS + 'entity' or skip:
+                    if element.tag == EATS + 'entity':
+                        skip -= 1
+                    element.getparent().remove(element)
+                    continue
+                chunk.append(element)
+                if len(chunk) == self._chunk_size:
+                    self._commit_entity_chunk(bulk_importer, chunk, raw_file,
+                                              spool_file, checkpoint)
+                    chunk = self._new_chunk()
+            if len(chunk):
+                self._commit_entity_chunk(bulk_importer, chunk, raw_file,
+                                          spool_file, checkpoint)
+
+    def _import_relationships_stage (self, checkpoint):
+        """Imports the entity relationships not yet imported, in
+        chunks of the spooled entities."""
+        skip = self._import.relationships_imported
+        if skip == self._import.entity_count:
+            return
+        bulk_importer = BulkEntityImporter(self, self._topic_map,
+                                           self._chunk_size)
+        with self._open_pieces(ANNOTATED_ENTITIES, checkpoint) as \
+                annotated_file:
+            chunk = self._new_chunk()
+            for element in self._parse_pieces(SPOOLED_ENTITIES,
+                                               checkpoint[SPOOLED_ENTITIES]):
+                if skip:
+                    skip -= 1
+                    element.getparent().remove(element)
+                    continue
+                chunk.append(element)
+                if len(chunk) == self._chunk_size:
+                    self._commit_relationship_chunk(
+                        bulk_importer, chunk, annotated_file, checkpoint)
+                    chunk = self._new_chunk()
+            if len(chunk):
+                self._commit_relationship_chunk(bulk_importer, chunk,
+                                                annotated_file, checkpoint)
+
+    def _open_pieces (self, name, checkpoint):
+        """Returns the working file `name` opened for appending, with
+        anything written after the checkpoint (by a chunk that was not
+        committed) removed.
+
+        :rtype: file object
+
+        """
+        pieces_file = open(self._get_path(name), 'r+b')
+        pieces_file.truncate(checkpoint[name])
+        pieces_file.seek(checkpoint[name])
+        return pieces_file
+
+    def _parse_pieces (self, name, end):
+        """Yields the elements in the working file `name`, which holds
+        a sequence of serialised elements, up to the offset `end`.
+
+        As with `_parse`, the caller must remove the elements it is
+        given from the document.
+
+        :rtype: generator of `Element`s
+
+        """
+        parser = etree.XMLPullParser(events=('end',), remove_blank_text=True)
+        with open(self._get_path(name), 'rb') as pieces_file:
+            for data in _read_pieces(pieces_file, end):
+                parser.feed(data)
+                for event, element in parser.read_events():
+                    parent = element.getparent()
+                    if parent is not None and parent.getparent() is None:
+                        yield element
+        parser.close()
+
+    def _renew_lease (self):
+        """Records a new heartbeat on the import.
+
+        :raises `EATSImportLeaseException`: if another worker has
+          claimed the import
+
+        """
+        now = timezone.now()
+        if not EATSMLImport.objects.filter(
+                pk=self._import.pk, heartbeat=self._import.heartbeat).update(
+            heartbeat=now):
+            raise EATSImportLeaseException(
+                'Import %d has been claimed by another worker' %
+                self._import.pk)
+        self._import.heartbeat = now
+
+    def _report_progress (self):
+        if self._stdout is not None:
+            self._stdout.write(
+                '  %(entities_imported)d/%(entity_count)d entities, '
+                '%(relationships_imported)d/%(entity_count)d with '
+                'relationships, %(rate).1f/sec' %
+                self._import.get_progress())
+
+    def run (self):
+        """Carries out the import, resuming from its checkpoint if it
+        has one, and returns whether it completed.
+
+        If the import fails, the error is recorded on it, and it is
+        not resumed.
+
+        :raises `EATSImportLeaseException`: if another worker claims
+          the import while it is being carried out
+        :rtype: `bool`
+
+        """
+        self._import.status = EATSMLImport.RUNNING
+        if self._import.start_date is None:
+            self._import.start_date = timezone.now()
+        self._save_import()
+        try:
+            source = self._import.source_file
+            source.open('rb')
+            try:
+                with TopicMapContext(self._topic_map):
+                    checkpoint = self._start(source)
+                self._import_entities_stage(source, checkpoint)
+            finally:
+                source.close()
+            self._import_relationships_stage(checkpoint)
+            self._complete(checkpoint)
+        except EATSImportLeaseException:
+            # The import is now the other worker's to carry out.
+            raise
+        except Exception, e:
+            # Only the fields recording the failure are updated, since
+            # the progress held by this object may not have been
+            # committed.
+            EATSMLImport.objects.filter(pk=self._import.pk).update(
+                status=EATSMLImport.FAILED, error=force_text(e),
+                end_date=timezone.now())
+            return False
+        return True
+
+    def _save_checkpoint (self, checkpoint):
+        self._import.checkpoint = json.dumps(checkpoint)
+        self._save_import()
+
+    def _save_import (self):
+        """Saves the import, with a new heartbeat, provided that no
+        other worker has claimed it."""
+        self._renew_lease()
+        self._import.save()
+
+    def _start (self, source):
+        """Imports the infrastructure, and returns the checkpoint.
+
+        When resuming an import, the infrastructure has already been
+        imported, and the mapping of XML IDs to objects is instead
+        restored from the annotated infrastructure and the entities
+        imported so far.
+
+        :rtype: `dict`
+
+        """
+        if self._import.checkpoint:
+            checkpoint = json.loads(self._import.checkpoint)
+            parser = etree.XMLParser(remove_blank_text=True)
+            infrastructure = etree.parse(
+                self._get_path(ANNOTATED_INFRASTRUCTURE), parser)
+            self._nsmap = infrastructure.getroot().nsmap
+            self._import_infrastructure(infrastructure)
+            xml_ids = {}
+            for element in self._parse_pieces(SPOOLED_ENTITIES,
+                                              checkpoint[SPOOLED_ENTITIES]):
+                xml_ids[int(element.get('eats_id'))] = element.get(XML + 'id')
+                element.getparent().remove(element)
+            identifiers = xml_ids.keys()
+            for start in range(0, len(identifiers), READ_BATCH_SIZE):
+                entities = Entity.objects.filter(identifier__in=identifiers[
+                        start:start + READ_BATCH_SIZE]).values_list(
+                    'identifier', 'pk')
+                for identifier, pk in entities:
+                    self._add_mapping('entity', xml_ids[identifier],
+                                      Entity(pk=pk,
+                                             topic_map=self._topic_map))
+            return checkpoint
+        infrastructure, references, entity_count = self._scan(source)
+        raw_infrastructure = self._prune_infrastructure(infrastructure,
+                                                        references)
+        annotated_infrastructure = self._prune_infrastructure(
+            infrastructure, references)
+        if os.path.exists(self._work_dir):
+            shutil.rmtree(self._work_dir)
+        os.makedirs(self._work_dir)
+        checkpoint = {}
+        with transaction.atomic():
+            self._import_infrastructure(annotated_infrastructure.getroottree())
+            self._validate_entities(source)
+            for name, element in (
+                (RAW_INFRASTRUCTURE, raw_infrastructure),
+                (ANNOTATED_INFRASTRUCTURE, annotated_infrastructure)):
+                element.getroottree().write(self._get_path(name),
+                                            encoding='utf-8',
+                                            xml_declaration=True)
+            for name in (RAW_ENTITIES, SPOOLED_ENTITIES, ANNOTATED_ENTITIES):
+                open(self._get_path(name), 'wb').close()
+                checkpoint[name] = 0
+            self._import.entity_count = entity_count
+            self._save_checkpoint(checkpoint)
+        return checkpoint
+
+    def _validate_entities (self, source):
+        """Checks that every entity in `source` can be imported, in
+        chunks.
+
+        :param source: the EATSML document to import
+        :type source: seekable file-like object
+
+        """
+        bulk_importer = BulkEntityImporter(self, self._topic_map,
+                                           self._chunk_size)
+        chunk = self._new_chunk()
+        for element in self._parse(source):
+            if element.tag != EATS + 'entity':
+                element.getparent().remove(element)
+                continue
+            chunk.append(element)
+            if len(chunk) == self._chunk_size:
+                bulk_importer.validate_entity_chunk(list(chunk))
+                self._renew_lease()
+                chunk = self._new_chunk()
+        if len(chunk):
+            bulk_importer.validate_entity_chunk(list(chunk))
+
+    def _write_document (self, infrastructure_name, entities_name, end,
+                         output):
+        """Writes to `output` the document made up of the
+        infrastructure in the working file `infrastructure_name` and
+        the entities in the working file `entities_name`."""
+        parser = etree.XMLParser(remove_blank_text=True)
+        infrastructure = etree.parse(self._get_path(infrastructure_name),
+                                     parser).getroot()
+        with etree.xmlfile(output, encoding='utf-8') as xml_file:
+            xml_file.write_declaration()
+            with xml_file.element(infrastructure.tag,
+                                  nsmap=infrastructure.nsmap):
+                self._write_elements(xml_file, infrastructure)
+                if not self._import.entity_count:
+                    return
+                with xml_file.element(EATS + 'entities'):
+                    for element in self._parse_pieces(entities_name, end):
+                        xml_file.write(element)
+                        element.getparent().remove(element)
+
+    @staticmethod
+    def _write_pieces (pieces_file, elements):
+        for element in elements:
+            pieces_file.write(etree.tostring(element, encoding='utf-8'))
+        pieces_file.flush()
@@ -4,7 +4,9 @@ from lxml import etree
 
 from eats.constants import EATS_NAMESPACE, XML
 from eats.exceptions import EATSMLException
+from eats.lib.eatsml_bulk_importer import BulkEntityImporter, ENTITY_CHUNK_SIZE
 from eats.lib.eatsml_handler import EATSMLHandler
+from eats.lib.topic_map_context import TopicMapContext, get_current_context
 from eats.models import Authority, Calendar, DatePeriod, DateType, Entity, EntityRelationshipType, EntityType, Language, NamePartType, NameType, Script
 
 
@@ -43,10 +45,17 @@ class EATSMLImporter (EATSMLHandler):
     object with the same name as an existing object), an import must
     be run within a single transaction.
 
+    If `bulk` is True, entities and their property assertions are
+    created by a `BulkEntityImporter`, `chunk_size` entities at a
+    time, rather than one object at a time through the model API. The
+    resulting topic map and annotated EATSML are the same.
+
     """
 
-    def __init__ (self, topic_map):
+    def __init__ (self, topic_map, bulk=False, chunk_size=ENTITY_CHUNK_SIZE):
         super(EATSMLImporter, self).__init__(topic_map)
+        self._bulk = bulk
+        self._chunk_size = chunk_size
         # A mapping between an XML ID and an object, broken down by
         # type of object. Even though the XML IDs are guaranteed to be
         # unique, the RNG schema cannot enforce that, for example,
@@ -79,6 +88,11 @@ class EATSMLImporter (EATSMLHandler):
         :rtype: tuple of `ElementTree`
 
         """
+        if get_current_context() is None:
+            # Share the topic map, and the authority profiles loaded
+            # in the import's transaction, across the import.
+            with TopicMapContext(self._topic_map):
+                return self.import_xml(eatsml, user)
         # QAZ: check the authorities listed in the EATSML against the
         # user's editable authorities - abort the import if the former
         # isn't a subset of the latter. Except in the case of an
@@ -418,26 +432,40 @@ class EATSMLImporter (EATSMLHandler):
         :type tree: `ElementTree`
 
         """
+        if self._bulk:
+            BulkEntityImporter(self, self._topic_map,
+                               self._chunk_size).import_entities(tree)
+            return
         entity_elements = tree.xpath('/e:collection/e:entities/e:entity',
                                      namespaces=NSMAP)
         for entity_element in entity_elements:
-            xml_id = entity_element.get(XML + 'id')
-            eats_id = self._get_element_eats_id(entity_element)
-            if eats_id is None:
-                entity = self._topic_map.create_entity()
-                entity_element.set('eats_id', str(entity.get_id()))
-                url = entity.get_eats_subject_identifier().to_external_form()
-                entity_element.set('url', url)
-            else:
-                entity = self._get_by_identifier(Entity, eats_id)
-            self._add_mapping('entity', xml_id, entity)
-            self._import_entity_type_assertions(entity, entity_element)
-            self._import_existence_assertions(entity, entity_element)
-            self._import_name_assertions(entity, entity_element)
-            self._import_note_assertions(entity, entity_element)
-            self._import_subject_identifier_assertions(entity, entity_element)
+            self._import_entity(entity_element)
         self._import_entity_relationship_assertions(tree)
 
+    def _import_entity (self, entity_element):
+        """Imports the entity represented by `entity_element`, and its
+        property assertions other than entity relationships.
+
+        :param entity_element: XML element representing an entity
+        :type entity_element: `Element`
+
+        """
+        xml_id = entity_element.get(XML + 'id')
+        eats_id = self._get_element_eats_id(entity_element)
+        if eats_id is None:
+            entity = self._topic_map.create_entity()
+            entity_element.set('eats_id', str(entity.get_id()))
+            url = entity.get_eats_subject_identifier().to_external_form()
+            entity_element.set('url', url)
+        else:
+            entity = self._get_by_identifier(Entity, eats_id)
+        self._add_mapping('entity', xml_id, entity)
+        self._import_entity_type_assertions(entity, entity_element)
+        self._import_existence_assertions(entity, entity_element)
+        self._import_name_assertions(entity, entity_element)
+        self._import_note_assertions(entity, entity_element)
+        self._import_subject_identifier_assertions(entity, entity_element)
+
     def _import_entity_type_assertions (self, entity, entity_element):
         """Imports entity type assertions from `entity_element` into
         `entity`.
@@ -523,16 +551,37 @@ class EATSMLImporter (EATSMLHandler):
         :type name_element: `Element`
 
         """
+        for data in self._get_name_parts_data(name_element):
+            name.create_name_part(*data)
+
+    def _get_name_parts_data (self, name_element):
+        """Returns the name part type, language, script, display form
+        and order of each name part in `name_element`.
+
+        :param name_element: XML element representing a name
+        :type name_element: `Element`
+        :rtype: `list` of `tuple`s
+
+        """
+        data = []
+        # The order of a name part is its position among the name
+        # parts of the same type, counted in a single pass over the
+        # name parts. It is a float, as the XPath count it replaces
+        # was.
+        orders = {}
         for element in name_element.xpath('e:name_parts/e:name_part',
                                           namespaces=NSMAP):
+            name_part_type_id = element.get('name_part_type')
+            order = orders[name_part_type_id] = orders.get(
+                name_part_type_id, 0.0) + 1
             name_part_type = self._get_mapped_object(element, 'name_part_type',
                                                      'name_part_type')
             language = self._get_mapped_object(element, 'language', 'language')
             script = self._get_mapped_object(element, 'script', 'script')
             display_form = self._get_text(element, '.')
-            order = element.xpath('count(preceding-sibling::e:name_part[@name_part_type="%s"])+1' % name_part_type, namespaces=NSMAP)
-            name.create_name_part(name_part_type, language, script,
-                                  display_form, order)
+            data.append((name_part_type, language, script, display_form,
+                         order))
+        return data
 
     def _import_note_assertions (self, entity, entity_element):
         """Imports note assertions from `entity_element` into
@@ -613,9 +662,7 @@ class EATSMLImporter (EATSMLHandler):
                 element, 'entity_relationship_type', 'entity_relationship_type')
             range_entity = self._get_mapped_object(element, 'range_entity',
                                                    'entity')
-            certainty = self._topic_map.property_assertion_no_certainty
-            if element.get('certainty') == 'full':
-                certainty = self._topic_map.property_assertion_full_certainty
+            certainty = self._get_relationship_certainty(element)
             assertion = entity.create_entity_relationship_property_assertion(
                 authority, entity_relationship_type, domain_entity,
                 range_entity, certainty)
@@ -633,6 +680,21 @@ class EATSMLImporter (EATSMLHandler):
         :type assertion: `Association`
 
         """
+        for data in self._get_dates_data(assertion_element):
+            assertion.create_date(data)
+
+    def _get_dates_data (self, assertion_element):
+        """Returns the data for each date associated with
+        `assertion_element`, in the form expected by
+        `PropertyAssertion.create_date`.
+
+        :param assertion_element: XML element representing a property
+          assertion
+        :type assertion_element: `Element`
+        :rtype: `list` of `dict`s
+
+        """
+        dates = []
         for date_element in assertion_element.xpath('e:dates/e:date',
                                                     namespaces=NSMAP):
             date_period = self._get_mapped_object(date_element, 'date_period',
@@ -653,7 +715,8 @@ class EATSMLImporter (EATSMLHandler):
                     element, 'e:normalised')
                 data[date_part_type + '_type'] = self._get_mapped_object(
                     element, 'date_type', 'date_type')
-            assertion.create_date(data)
+            dates.append(data)
+        return dates
 
     def _add_mapping (self, object_type, xml_id, obj):
         """Adds a mapping between `xml_id` and `obj` within the
@@ -717,6 +780,21 @@ class EATSMLImporter (EATSMLHandler):
             eats_id = int(eats_id)
         return eats_id
 
+    def _get_relationship_certainty (self, element):
+        """Returns the certainty of the entity relationship assertion
+        represented by `element`.
+
+        :param element: XML element representing entity relationship
+          assertion
+        :type element: `Element`
+        :rtype: `Topic`
+
+        """
+        certainty = self._topic_map.property_assertion_no_certainty
+        if element.get('certainty') == 'full':
+            certainty = self._topic_map.property_assertion_full_certainty
+        return certainty
+
     @staticmethod
     def _get_text (element, xpath):
         """Returns the text of the element result of performing
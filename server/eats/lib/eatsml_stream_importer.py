@@ -0,0 +1,343 @@
+"""Streaming import of EATSML documents too large to hold in memory.
+
+`EATSMLImporter.import_xml` parses, validates, prunes and copies the
+whole document before importing it. `EATSMLStreamImporter` instead
+reads the document with `etree.iterparse` and holds only the
+infrastructure and a single chunk of entities at a time, writing the
+imported and annotated documents out as it goes.
+
+"""
+
+import copy
+import tempfile
+
+from lxml import etree
+
+from eats.constants import EATS, XML
+from eats.exceptions import EATSMLException
+from eats.lib.eatsml_bulk_importer import BulkEntityImporter, ENTITY_CHUNK_SIZE
+from eats.lib.eatsml_importer import EATSMLImporter, NSMAP
+from eats.lib.topic_map_context import TopicMapContext, get_current_context
+from eats.models import Entity
+
+
+# Attributes of the elements within an entity that refer to
+# infrastructural elements.
+INFRASTRUCTURE_REFERENCES = ('authority', 'calendar', 'date_period',
+                             'date_type', 'entity_relationship_type',
+                             'entity_type', 'language', 'name_part_type',
+                             'name_type', 'script')
+ENTITY_REFERENCES = ('domain_entity', 'range_entity')
+
+
+class EATSMLStreamImporter (EATSMLImporter):
+
+    """An importer of EATSML documents that does not hold the whole
+    document in memory.
+
+    The document is read twice, and a temporary file holding the
+    annotated entities once:
+
+       1. The infrastructure is kept and each chunk of entities is
+          validated, in a document along with the infrastructure
+          and placeholders for the entities it refers to. The
+          references to infrastructure are gathered, so that the
+          infrastructure can be pruned as `import_xml` would.
+       2. The infrastructure is imported, then each chunk of
+          entities, without their entity relationships. The
+          annotated entities are written to the temporary file.
+       3. The entity relationships of each chunk of annotated
+          entities are imported, once every entity they may refer
+          to exists.
+
+    The objects created, and the documents written, are the same as
+    those of an import of the whole document with `bulk` set,
+    except that the uniqueness of XML IDs is checked only within
+    each chunk.
+
+    """
+
+    def __init__ (self, topic_map, chunk_size=ENTITY_CHUNK_SIZE):
+        super(EATSMLStreamImporter, self).__init__(
+            topic_map, bulk=True, chunk_size=chunk_size)
+        self._nsmap = None
+
+    def _add_references (self, entity_element, references):
+        """Adds the references to infrastructure made within
+        `entity_element` to `references`, as tuples of the path from
+        the entity to the referring element, the attribute and the
+        XML ID referred to.
+
+        """
+        for element in entity_element.iterdescendants():
+            for attribute in INFRASTRUCTURE_REFERENCES:
+                xml_id = element.get(attribute)
+                if xml_id is not None:
+                    path = [element.tag]
+                    for ancestor in element.iterancestors():
+                        if ancestor is entity_element:
+                            break
+                        path.insert(0, ancestor.tag)
+                    references.add((tuple(path), attribute, xml_id))
+
+    def _import_entity_chunk (self, bulk_importer, chunk):
+        """Imports the entities in `chunk`, without their entity
+        relationships."""
+        bulk_importer.import_entity_chunk(list(chunk))
+        entities = self._xml_object_map['entity']
+        for element in chunk:
+            # Only the primary key (and topic map) of an entity is
+            # needed to import the entity relationships that refer to
+            # it.
+            xml_id = element.get(XML + 'id')
+            entities[xml_id] = Entity(pk=entities[xml_id].pk,
+                                      topic_map=self._topic_map)
+
+    def import_file (self, source, raw_output, annotated_output, user):
+        """Imports the EATSML document read from `source` into EATS.
+
+        The imported document (pruned as by `import_xml`) is written
+        to `raw_output`, and the imported document annotated with ids
+        to `annotated_output`.
+
+        :param source: the EATSML document to import
+        :type source: filename or seekable file-like object
+        :param raw_output: file to write the imported document to
+        :type raw_output: file-like object
+        :param annotated_output: file to write the annotated
+          document to
+        :type annotated_output: file-like object
+        :param user: user performing the import
+        :type user: `EATSUser`
+
+        """
+        if get_current_context() is None:
+            # Share the topic map, and the authority profiles loaded
+            # in the import's transaction, across the import.
+            with TopicMapContext(self._topic_map):
+                return self.import_file(source, raw_output,
+                                        annotated_output, user)
+        infrastructure, references, entity_count = self._scan(source)
+        raw_infrastructure = self._prune_infrastructure(infrastructure,
+                                                        references)
+        annotated_infrastructure = self._prune_infrastructure(
+            infrastructure, references)
+        self._import_infrastructure(annotated_infrastructure.getroottree())
+        bulk_importer = BulkEntityImporter(self, self._topic_map,
+                                           self._chunk_size)
+        spool = tempfile.TemporaryFile()
+        try:
+            self._import_entities_stream(source, bulk_importer,
+                                         raw_infrastructure, raw_output,
+                                         spool, entity_count)
+            spool.seek(0)
+            self._import_relationships_stream(
+                spool, bulk_importer, annotated_infrastructure,
+                annotated_output, entity_count)
+        finally:
+            spool.close()
+        bulk_importer.finish()
+
+    def _import_entities_stream (self, source, bulk_importer,
+                                 raw_infrastructure, raw_output, spool,
+                                 entity_count):
+        """Imports the entities in `source`, in chunks, without their
+        entity relationships.
+
+        The imported document is written to `raw_output`, and the
+        annotated entities to `spool`.
+
+        """
+        with etree.xmlfile(raw_output, encoding='utf-8') as raw_file, \
+                etree.xmlfile(spool, encoding='utf-8') as spool_file:
+            raw_file.write_declaration()
+            with raw_file.element(EATS + 'collection', nsmap=self._nsmap), \
+                    spool_file.element(EATS + 'entities', nsmap=self._nsmap):
+                for element in raw_infrastructure:
+                    raw_file.write(element)
+                if not entity_count:
+                    return
+                with raw_file.element(EATS + 'entities'):
+                    chunk = self._new_chunk()
+                    for element in self._parse(source):
+                        if element.tag != EATS + 'entity':
+                            element.getparent().remove(element)
+                            continue
+                        raw_file.write(element)
+                        chunk.append(element)
+                        if len(chunk) == self._chunk_size:
+                            self._import_entity_chunk(bulk_importer, chunk)
+                            self._write_elements(spool_file, chunk)
+                            chunk = self._new_chunk()
+                    if len(chunk):
+                        self._import_entity_chunk(bulk_importer, chunk)
+                        self._write_elements(spool_file, chunk)
+
+    def _import_relationships_stream (self, spool, bulk_importer,
+                                      annotated_infrastructure,
+                                      annotated_output, entity_count):
+        """Imports the entity relationships of the annotated entities
+        in `spool`, in chunks, and writes the annotated document to
+        `annotated_output`."""
+        with etree.xmlfile(annotated_output, encoding='utf-8') as xml_file:
+            xml_file.write_declaration()
+            with xml_file.element(EATS + 'collection', nsmap=self._nsmap):
+                for element in annotated_infrastructure:
+                    xml_file.write(element)
+                if not entity_count:
+                    return
+                with xml_file.element(EATS + 'entities'):
+                    chunk = self._new_chunk()
+                    for element in self._parse(spool):
+                        chunk.append(element)
+                        if len(chunk) == self._chunk_size:
+                            bulk_importer.import_relationship_chunk(
+                                list(chunk))
+                            self._write_elements(xml_file, chunk)
+                            chunk = self._new_chunk()
+                    if len(chunk):
+                        bulk_importer.import_relationship_chunk(list(chunk))
+                        self._write_elements(xml_file, chunk)
+
+    def _new_chunk (self):
+        """Returns a new element to hold a chunk of entities, which
+        also detaches them from the document being parsed."""
+        return etree.Element(EATS + 'entities', nsmap=self._nsmap)
+
+    def _parse (self, source):
+        """Yields the top level elements of the EATSML document
+        `source`, other than the entities element, and each entity
+        element.
+
+        Each element is yielded once it has been completely read.
+        The caller must remove the elements it is given from the
+        document, so that it does not grow.
+
+        :param source: the EATSML document
+        :type source: filename or seekable file-like object
+        :rtype: generator of `Element`s
+
+        """
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        try:
+            for event, element in etree.iterparse(
+                    source, events=('start', 'end'), remove_blank_text=True):
+                parent = element.getparent()
+                if parent is None:
+                    if event == 'start':
+                        self._nsmap = element.nsmap
+                    continue
+                if event != 'end':
+                    continue
+                if element.tag == EATS + 'entity' and \
+                        parent.tag == EATS + 'entities':
+                    yield element
+                elif parent.getparent() is None and \
+                        element.tag != EATS + 'entities':
+                    yield element
+        except etree.XMLSyntaxError, e:
+            message = 'EATSML is not well-formed: %s' % str(e)
+            raise EATSMLException(message)
+
+    def _prune_infrastructure (self, infrastructure, references):
+        """Returns a copy of `infrastructure`, a collection element
+        holding no entities, pruned of the material that is neither
+        new nor referred to by `references` or new infrastructure.
+
+        The prune XSLT is run over the infrastructure and a single
+        entity made up of the references.
+
+        :rtype: `Element`
+
+        """
+        entities = etree.SubElement(infrastructure, EATS + 'entities')
+        entity = etree.SubElement(entities, EATS + 'entity')
+        for path, attribute, xml_id in sorted(references):
+            parent = entity
+            for tag in path:
+                parent = etree.SubElement(parent, tag)
+            parent.set(attribute, xml_id)
+        try:
+            pruned = self._prune_eatsml(infrastructure.getroottree()).getroot()
+        finally:
+            infrastructure.remove(entities)
+        for element in pruned.xpath('e:entities', namespaces=NSMAP):
+            pruned.remove(element)
+        return pruned
+
+    def _scan (self, source):
+        """Reads `source`, returning its infrastructure, the references
+        made to infrastructure by its entities, and the number of
+        entities.
+
+        Each chunk of entities is validated, in a document along with
+        the infrastructure and placeholders for the other entities
+        they refer to.
+
+        :rtype: `tuple`
+
+        """
+        document = None
+        entities = None
+        entity_count = 0
+        entity_ids = set()
+        entity_references = set()
+        references = set()
+        for element in self._parse(source):
+            if document is None:
+                document = etree.Element(EATS + 'collection',
+                                         nsmap=self._nsmap)
+            if element.tag != EATS + 'entity':
+                document.append(element)
+                continue
+            if entities is None:
+                entities = etree.SubElement(document, EATS + 'entities')
+            entity_count += 1
+            entity_ids.add(element.get(XML + 'id'))
+            self._add_references(element, references)
+            for attribute in ENTITY_REFERENCES:
+                entity_references.update(element.xpath(
+                        'e:entity_relationships/e:entity_relationship/@' +
+                        attribute, namespaces=NSMAP))
+            entities.append(element)
+            if len(entities) == self._chunk_size:
+                self._validate_chunk(document, entities)
+                entities.clear()
+        if document is None:
+            # The document has only a root element.
+            document = etree.Element(EATS + 'collection', nsmap=self._nsmap)
+        if entities is None or len(entities):
+            self._validate_chunk(document, entities)
+        missing = entity_references - entity_ids
+        if missing:
+            message = 'EATSML refers to entities that it does not contain: %s' \
+                % ', '.join(sorted(missing))
+            raise EATSMLException(message)
+        if entities is not None:
+            document.remove(entities)
+        return document, references, entity_count
+
+    @staticmethod
+    def _write_elements (xml_file, elements):
+        for element in elements:
+            xml_file.write(element)
+
+    def _validate_chunk (self, document, entities):
+        """Validates `document`, whose entities element is
+        `entities`, after adding placeholders for the entities
+        referred to from but not in `entities`."""
+        if entities is not None:
+            entity_ids = set(entities.xpath('e:entity/@xml:id',
+                                            namespaces=NSMAP))
+            referenced_ids = set()
+            for attribute in ENTITY_REFERENCES:
+                referenced_ids.update(entities.xpath(
+                        'e:entity/e:entity_relationships/e:entity_relationship/@' + attribute, namespaces=NSMAP))
+            for xml_id in sorted(referenced_ids - entity_ids):
+                etree.SubElement(entities, EATS + 'entity',
+                                 {XML + 'id': xml_id})
+        # A copy is validated, since validation registers the XML IDs
+        # in the document, and those of the placeholders would
+        # otherwise clash with the entities of later chunks.
+        self._validate(copy.deepcopy(document).getroottree())
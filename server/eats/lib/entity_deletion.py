@@ -0,0 +1,128 @@
+"""Set based deletion of entities.
+
+`Entity.remove` removes each property assertion in turn, and removing
+a name assertion removes each of the name's parts and associations
+in turn, so that the number of queries grows with the number of
+names, name parts and relationships an entity has. An
+`EntityDeletionPlan` instead gathers the primary keys of everything
+that removing a set of entities removes, and deletes them in a few
+bulk deletes.
+
+"""
+
+from django.db import transaction
+from django.db.models import Q
+
+from tmapi.models import Association, ItemIdentifier, Occurrence, Topic
+
+from eats.lib.search_backends import get_search_backend
+from eats.models import EntityRelationshipCache, EntitySummary, StatisticsSnapshot
+
+
+DELETION_BATCH_SIZE = 500
+
+
+def _batches (pks):
+    """Yields `pks` in lists of at most `DELETION_BATCH_SIZE`."""
+    pks = sorted(pks)
+    for i in range(0, len(pks), DELETION_BATCH_SIZE):
+        yield pks[i:i+DELETION_BATCH_SIZE]
+
+
+class EntityDeletionPlan (object):
+
+    """The constructs and cache rows to be deleted along with a set
+    of entities.
+
+    Deleting the plan leaves the database in the same state as
+    calling `Entity.remove` on each of the entities would. That
+    includes leaving in place the dates of the property assertions
+    that are deleted.
+
+    The topics to delete are the entities, the names they assert and
+    the parts of those names. The associations to delete are those in
+    which any of those topics play a role: the property assertions of
+    the entities (including entity relationships with other
+    entities), and the associations of the names and name parts. The
+    occurrences to delete are the note and subject identifier
+    property assertions of the entities. The item identifiers of all
+    of these constructs are deleted with them, and the cache rows
+    that refer to them go by cascade.
+
+    """
+
+    def __init__ (self, topic_map, entities):
+        """Gathers the primary keys of what is to be deleted along with
+        `entities`.
+
+        :param topic_map: the EATS topic map
+        :type topic_map: `EATSTopicMap`
+        :param entities: the entities to delete
+        :type entities: `list` of `Entity`s
+
+        """
+        self.entities = set([entity.pk for entity in entities])
+        names = set()
+        for batch in _batches(self.entities):
+            names.update(Topic.objects.filter(
+                    roles__type=topic_map.property_role_type,
+                    roles__association__type=topic_map.name_assertion_type,
+                    roles__association__roles__type=topic_map.entity_role_type,
+                    roles__association__roles__player__in=batch
+                    ).values_list('pk', flat=True))
+        name_parts = set()
+        for batch in _batches(names):
+            name_parts.update(Topic.objects.filter(
+                    roles__type=topic_map.name_part_role_type,
+                    roles__association__type=
+                    topic_map.name_has_name_part_association_type,
+                    roles__association__roles__type=topic_map.name_role_type,
+                    roles__association__roles__player__in=batch
+                    ).values_list('pk', flat=True))
+        self.topics = self.entities | names | name_parts
+        self.associations = set()
+        for batch in _batches(self.topics):
+            self.associations.update(Association.objects.filter(
+                    roles__player__in=batch).values_list('pk', flat=True))
+        self.occurrences = set()
+        # Entities related to those being deleted have their
+        # summaries, which count their relationships, invalidated.
+        self.related_entities = set()
+        for batch in _batches(self.entities):
+            self.occurrences.update(Occurrence.objects.filter(
+                    topic__in=batch).values_list('pk', flat=True))
+            for domain_entity, range_entity in \
+                    EntityRelationshipCache.objects.filter(
+                    Q(domain_entity__in=batch) |
+                    Q(range_entity__in=batch)).values_list(
+                    'domain_entity', 'range_entity'):
+                self.related_entities.update((domain_entity, range_entity))
+        self.related_entities -= self.entities
+        self.item_identifiers = set()
+        for model, field, pks in (
+                (Association, 'association', self.associations),
+                (Occurrence, 'occurrence', self.occurrences),
+                (Topic, 'topic', self.topics)):
+            through = model.item_identifiers.through
+            for batch in _batches(pks):
+                self.item_identifiers.update(through.objects.filter(
+                        **{field + '__in': batch}).values_list(
+                        'itemidentifier', flat=True))
+
+    @transaction.atomic
+    def delete (self):
+        """Deletes the entities and everything gathered along with
+        them."""
+        backend = get_search_backend()
+        for batch in _batches(self.entities):
+            backend.delete_entities(batch)
+        for batch in _batches(self.related_entities):
+            EntitySummary.objects.filter(entity__in=batch).delete()
+        for batch in _batches(self.item_identifiers):
+            ItemIdentifier.objects.filter(pk__in=batch).delete()
+        for model, pks in ((Association, self.associations),
+                           (Occurrence, self.occurrences),
+                           (Topic, self.topics)):
+            for batch in _batches(pks):
+                model.objects.filter(pk__in=batch).delete()
+        StatisticsSnapshot.objects.invalidate()
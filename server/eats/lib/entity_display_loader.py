@@ -0,0 +1,145 @@
+"""Bulk loading of the data shown on the display page of an entity.
+
+Rendering the page from the model properties costs several queries
+for every property assertion displayed, in fetching its dates, the
+admin names of its authority and other infrastructure, the name of a
+related entity and the entities sharing a subject identifier.
+`EntityDisplayLoader` instead loads the entity's property assertions
+through `EATSMLExportLoader` and sets on their records everything the
+page shows, in a fixed number of queries.
+
+"""
+
+from tmapi.models import Name as TopicMapName, Occurrence
+
+from eats.constants import UNNAMED_ENTITY_NAME
+from eats.lib.eatsml_export_loader import EATSMLExportLoader
+from eats.models import NameCache
+
+
+class EntityDisplayLoader (EATSMLExportLoader):
+
+    def _get_admin_names (self):
+        """Returns the admin names of all infrastructure, keyed by
+        the primary key of the infrastructure topic and then by the
+        primary key of the name type.
+
+        The forward and reverse names of entity relationship types
+        are included.
+
+        :rtype: `dict` of `dict`s
+
+        """
+        topic_map = self._topic_map
+        admin_names = {}
+        for topic, name_type, value in TopicMapName.objects.filter(
+                type__in=[topic_map.admin_name_type,
+                          topic_map.relationship_name_type,
+                          topic_map.reverse_relationship_name_type]).values_list(
+            'topic', 'type', 'value'):
+            admin_names.setdefault(topic, {})[name_type] = value
+        return admin_names
+
+    def _get_duplicate_entities (self, entity, subject_identifiers):
+        """Returns the primary keys and identifiers of the entities,
+        other than `entity`, that have a subject identifier property
+        assertion matching each of `subject_identifiers`.
+
+        :rtype: `dict` of `list`s of `tuple`s
+
+        """
+        duplicates = {}
+        if not subject_identifiers:
+            return duplicates
+        for value, other_entity, identifier in Occurrence.objects.filter(
+                type=self._topic_map.subject_identifier_assertion_type,
+                value__in=subject_identifiers).exclude(
+            topic=entity).order_by('topic').values_list(
+            'value', 'topic', 'topic__identifier').distinct():
+            duplicates.setdefault(value, []).append((other_entity, identifier))
+        return duplicates
+
+    def load_entity (self, entity, authority, language, script):
+        """Returns the record of `entity` and its property assertions,
+        with the display data of each assertion set on its record.
+
+        The record has the form of the name that best matches
+        `authority`, `language` and `script` as `preferred_name_form`.
+        Each assertion record has the admin name of its authority as
+        `authority_name`. In addition, entity type assertions have
+        `entity_type_name`; the names of name assertions have
+        `language_name`, `name_type_name` and `script_name`; entity
+        relationship assertions have `relationship_type_name`,
+        `other_entity_id` and `other_entity_name_form`; and subject
+        identifier assertions have `duplicate_entities`, a list of
+        pairs of the identifier and preferred name form of each other
+        entity with the same subject identifier.
+
+        :param entity: entity to load
+        :type entity: `Entity`
+        :param authority: preferred authority of names
+        :type authority: `Authority`
+        :param language: preferred language of names
+        :type language: `Language`
+        :param script: preferred script of names
+        :type script: `Script`
+        :rtype: `EntityRecord`
+
+        """
+        topic_map = self._topic_map
+        record = self.load([entity], authority, language, script,
+                           mark_preferred=True)[entity.pk]
+        record.preferred_name_form = UNNAMED_ENTITY_NAME
+        for assertion in record.names:
+            if assertion.pk == record.preferred_name:
+                record.preferred_name_form = assertion.name.assembled_form
+        admin_names = self._get_admin_names()
+        admin_name_type = topic_map.admin_name_type.pk
+
+        def get_admin_name (topic, name_type=admin_name_type):
+            if topic is None:
+                return ''
+            return admin_names.get(topic.pk, {}).get(name_type, '')
+
+        for assertion in record.entity_relationships + record.entity_types + \
+                record.existences + record.names + record.notes + \
+                record.subject_identifiers:
+            assertion.authority_name = get_admin_name(assertion.authority)
+        for assertion in record.entity_types:
+            assertion.entity_type_name = get_admin_name(assertion.entity_type)
+        for assertion in record.names:
+            name = assertion.name
+            name.language_name = get_admin_name(name.language)
+            name.name_type_name = get_admin_name(name.name_type)
+            name.script_name = get_admin_name(name.script)
+        other_entities = set()
+        for assertion in record.entity_relationships:
+            if assertion.domain_entity.pk == entity.pk:
+                name_type = topic_map.relationship_name_type.pk
+                other_entity = assertion.range_entity
+            else:
+                name_type = topic_map.reverse_relationship_name_type.pk
+                other_entity = assertion.domain_entity
+            assertion.relationship_type_name = get_admin_name(
+                assertion.entity_relationship_type, name_type)
+            assertion.other_entity = other_entity
+            assertion.other_entity_id = other_entity.identifier_id
+            other_entities.add(other_entity.pk)
+        duplicates = self._get_duplicate_entities(
+            entity, [assertion.subject_identifier for assertion in
+                     record.subject_identifiers])
+        for entity_data in duplicates.values():
+            other_entities.update([pk for pk, identifier in entity_data])
+        name_forms = {}
+        if other_entities:
+            name_forms = NameCache.objects.get_preferred_forms(
+                other_entities, authority, language, script)
+        for assertion in record.entity_relationships:
+            assertion.other_entity_name_form = name_forms.get(
+                assertion.other_entity.pk, UNNAMED_ENTITY_NAME)
+        for assertion in record.subject_identifiers:
+            assertion.duplicate_entities = [
+                (identifier, name_forms.get(pk, UNNAMED_ENTITY_NAME)) for
+                pk, identifier in duplicates.get(
+                    assertion.subject_identifier, [])]
+        return record
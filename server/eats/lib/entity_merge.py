@@ -0,0 +1,280 @@
+"""Merging of entities using set based updates.
+
+TMAPI's `Topic.merge_in` moves each characteristic and role of the
+merged topic one at a time, and the entity relationship cache must be
+rebuilt for each relationship moved, so that the time taken to merge
+an entity grows with the number of its property assertions. The
+`EntityMerger` instead repoints the roles, occurrences, identifiers
+and cache entries of the merged entities with a handful of UPDATE
+queries, and finds the associations and occurrences that become
+duplicates by comparing signatures computed from bulk queries. Only
+those duplicates are merged construct by construct, using TMAPI's
+own merge utilities.
+
+"""
+
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Q
+
+from tmapi.models import Association, Name, Occurrence, Role, \
+    SubjectIdentifier, SubjectLocator, Topic
+from tmapi.models.merge_utils import handle_existing_construct, \
+    move_role_characteristics, move_variants
+from tmapi.models.signature import generate_name_signature
+
+from eats.lib.search_backends import get_search_backend
+from eats.models import DateIndex, Entity, EntityRelationshipCache, \
+    EntitySummary, NameCache, NameIndex, StatisticsSnapshot
+
+
+class EntityMerger (object):
+
+    """Merges entities, singly or in batches.
+
+    The result of a merge is the same as that of TMAPI's
+    `Topic.merge_in`, with the caches that EATS keeps of names and
+    entity relationships moved along with the names and
+    relationships.
+
+    """
+
+    def __init__ (self, topic_map):
+        self._topic_map = topic_map
+
+    def can_merge (self, entities, authorities):
+        """Returns True if every property assertion of `entities` is
+        made by one of `authorities`.
+
+        :param entities: the entities to be merged in
+        :type entities: `list` of `Entity`s
+        :param authorities: the authorities the merging user may edit
+        :type authorities: `QuerySet` of `Authority`s
+        :rtype: `bool`
+
+        """
+        return not Entity.objects.filter_asserting_authorities(
+            entities).exclude(pk__in=authorities).exists()
+
+    def _get_association_signatures (self, associations, replacements):
+        """Returns the signatures, keyed by primary key, of
+        `associations`, as generated by TMAPI's
+        `generate_association_signature`, with the players in
+        `replacements` replaced by the topic they map to.
+
+        :param associations: the associations
+        :type associations: `QuerySet` of `Association`s
+        :param replacements: primary keys of the topics to be
+          replaced, mapped to the primary key of their replacement
+        :type replacements: `dict`
+        :rtype: `OrderedDict`
+
+        """
+        pks = associations.values('pk')
+        scopes = {}
+        for association_id, topic_id in \
+                Association.scope.through.objects.filter(
+                association__in=pks).values_list('association', 'topic'):
+            scopes.setdefault(association_id, set()).add(topic_id)
+        roles = {}
+        for association_id, type_id, player_id in Role.objects.filter(
+                association__in=pks).values_list(
+                'association', 'type', 'player'):
+            player_id = replacements.get(player_id, player_id)
+            roles.setdefault(association_id, set()).add((type_id, player_id))
+        signatures = OrderedDict()
+        for pk, type_id in Association.objects.filter(pk__in=pks).order_by(
+                'pk').values_list('pk', 'type'):
+            signatures[pk] = (type_id, frozenset(scopes.get(pk, ())),
+                              frozenset(roles.get(pk, ())) or 0)
+        return signatures
+
+    def _get_occurrence_signatures (self, occurrences):
+        """Returns the signatures, keyed by primary key, of
+        `occurrences`, in the manner of TMAPI's
+        `generate_occurrence_signature`.
+
+        :param occurrences: the occurrences
+        :type occurrences: `QuerySet` of `Occurrence`s
+        :rtype: `OrderedDict`
+
+        """
+        pks = occurrences.values('pk')
+        scopes = {}
+        for occurrence_id, topic_id in \
+                Occurrence.scope.through.objects.filter(
+                occurrence__in=pks).values_list('occurrence', 'topic'):
+            scopes.setdefault(occurrence_id, set()).add(topic_id)
+        signatures = OrderedDict()
+        for pk, type_id, datatype, value in Occurrence.objects.filter(
+                pk__in=pks).order_by('pk').values_list(
+                'pk', 'type', 'datatype', 'value'):
+            signatures[pk] = (type_id, frozenset(scopes.get(pk, ())),
+                              datatype, value)
+        return signatures
+
+    @staticmethod
+    def _find_duplicates (existing, signatures):
+        """Returns pairs of the primary keys of the constructs in
+        `signatures` that duplicate a construct in `existing` or an
+        earlier construct in `signatures`, and of the construct they
+        duplicate.
+
+        :param existing: signatures of the constructs of the entity
+          merged into
+        :type existing: `dict`
+        :param signatures: signatures of the constructs of the
+          entities merged in
+        :type signatures: `OrderedDict`
+        :rtype: `list` of `tuple`s
+
+        """
+        constructs = dict([(signature, pk) for pk, signature in
+                           existing.items()])
+        duplicates = []
+        for pk, signature in signatures.items():
+            duplicate = constructs.get(signature)
+            if duplicate is not None and duplicate != pk:
+                duplicates.append((pk, duplicate))
+            else:
+                constructs.setdefault(signature, pk)
+        return duplicates
+
+    @transaction.atomic
+    def merge (self, pairs):
+        """Merges each pair of entities in `pairs`, the second entity
+        of each pair being merged into the first.
+
+        Pairs may be chained: where an entity has already been merged
+        into another, the entity it was merged into is used in its
+        place.
+
+        :param pairs: the pairs of entities to merge
+        :type pairs: iterable of `tuple`s of `Entity`s
+        :rtype: `dict` of `Entity`s keyed by the primary key of the
+          entity merged into them
+
+        """
+        merged = {}
+        for entity, other in pairs:
+            entity = merged.get(entity.pk, entity)
+            other = merged.get(other.pk, other)
+            if entity == other:
+                continue
+            for pk, target in merged.items():
+                if target == other:
+                    merged[pk] = entity
+            merged[other.pk] = entity
+        groups = OrderedDict()
+        for pk, entity in sorted(merged.items()):
+            groups.setdefault(entity, []).append(pk)
+        for entity, others in groups.items():
+            self._merge_entities(entity, others)
+        return merged
+
+    def _merge_associations (self, entity, others):
+        """Makes `entity` the player of the roles played by `others`,
+        and merges the associations that thereby become duplicates."""
+        existing = self._get_association_signatures(
+            Association.objects.filter(roles__player=entity).distinct(), {})
+        replacements = dict([(pk, entity.pk) for pk in others])
+        signatures = self._get_association_signatures(
+            Association.objects.filter(roles__player__in=others).distinct(),
+            replacements)
+        duplicates = self._find_duplicates(existing, signatures)
+        Role.objects.filter(player__in=others).update(player=entity)
+        for pk, duplicate_pk in duplicates:
+            association = Association.objects.get(pk=pk)
+            duplicate = Association.objects.get(pk=duplicate_pk)
+            handle_existing_construct(association, duplicate)
+            move_role_characteristics(association, duplicate)
+            association.remove()
+
+    def _merge_caches (self, entity, others):
+        """Moves the cache entries for `others` to `entity`."""
+        NameCache.objects.filter(entity__in=others).update(entity=entity)
+        NameIndex.objects.filter(entity__in=others).update(entity=entity)
+        DateIndex.objects.filter(entity__in=others).update(entity=entity)
+        EntityRelationshipCache.objects.filter(
+            domain_entity__in=others).update(domain_entity=entity)
+        EntityRelationshipCache.objects.filter(
+            range_entity__in=others).update(range_entity=entity)
+        get_search_backend().merge_entities(entity, others)
+
+    def _merge_entities (self, entity, others):
+        """Merges the entities with primary keys `others` into
+        `entity`.
+
+        :param entity: the entity to merge into
+        :type entity: `Entity`
+        :param others: primary keys of the entities to merge in
+        :type others: `list` of integers
+
+        """
+        types = Topic.types.through.objects.filter(
+            from_topic__in=others).exclude(
+            to_topic__in=entity.types.all()).values_list(
+            'to_topic', flat=True)
+        entity.types.add(*set(types))
+        SubjectIdentifier.objects.filter(topic__in=others).update(
+            topic=entity)
+        SubjectLocator.objects.filter(topic__in=others).update(topic=entity)
+        Topic.item_identifiers.through.objects.filter(
+            topic__in=others).update(topic=entity)
+        self._merge_names(entity, others)
+        self._merge_occurrences(entity, others)
+        self._merge_caches(entity, others)
+        # The summaries of related entities include a count of their
+        # relationships, which may change when duplicate relationships
+        # are merged.
+        EntitySummary.objects.filter(
+            Q(entity=entity) | Q(entity__in=others) |
+            Q(entity__in=EntityRelationshipCache.objects.filter(
+                    domain_entity=entity).values('range_entity')) |
+            Q(entity__in=EntityRelationshipCache.objects.filter(
+                    range_entity=entity).values('domain_entity'))).delete()
+        self._merge_associations(entity, others)
+        for other in Entity.objects.filter(pk__in=others):
+            other.remove()
+        StatisticsSnapshot.objects.invalidate()
+
+    def _merge_names (self, entity, others):
+        """Moves the topic names of `others` to `entity`.
+
+        EATS records names as property assertions rather than topic
+        names, so there are not normally any to move, and they are
+        merged one at a time, as by TMAPI.
+
+        """
+        names = list(Name.objects.filter(topic__in=others))
+        if not names:
+            return
+        signatures = dict([(generate_name_signature(name), name) for name
+                           in entity.get_names()])
+        for name in names:
+            signature = generate_name_signature(name)
+            existing = signatures.get(signature)
+            if existing is not None:
+                handle_existing_construct(name, existing)
+                move_variants(name, existing)
+                name.remove()
+            else:
+                name.topic = entity
+                name.save()
+                signatures[signature] = name
+
+    def _merge_occurrences (self, entity, others):
+        """Moves the occurrences of `others`, including their note and
+        subject identifier property assertions, to `entity`, merging
+        those that duplicate an occurrence already there."""
+        existing = self._get_occurrence_signatures(
+            Occurrence.objects.filter(topic=entity))
+        signatures = self._get_occurrence_signatures(
+            Occurrence.objects.filter(topic__in=others))
+        for pk, duplicate_pk in self._find_duplicates(existing, signatures):
+            occurrence = Occurrence.objects.get(pk=pk)
+            handle_existing_construct(
+                occurrence, Occurrence.objects.get(pk=duplicate_pk))
+            occurrence.remove()
+        Occurrence.objects.filter(topic__in=others).update(topic=entity)
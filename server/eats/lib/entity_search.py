@@ -0,0 +1,244 @@
+"""Ranked searching of entities by name.
+
+The words of a query are matched against the names of entities by
+the configured search backend (see `eats.lib.search_backends`), with
+each word required to match (as a prefix) one of the forms of the
+entity's names. Matching entities are ranked by the quality of the
+match, and only the requested slice of the results is fetched.
+
+Since the order depends on it, every matching entity is ranked, and
+the rank is therefore kept cheap to compute: the names matching the
+words of the query are found once for the whole query, through the
+indexed key of the name index, rather than by matching forms for each
+entity.
+
+A search may be restricted to entities whose existence dates overlap
+a period, which is matched against the date index.
+
+"""
+
+import unicodedata
+
+from django.db import connection
+
+from eats.lib.date_bounds import get_date_bounds
+from eats.lib.name_form import create_name_forms, create_name_forms_batch
+from eats.lib.search_backends import get_search_backend
+from eats.models import DateIndex, Entity, NameCache, NameIndex
+
+
+# Scores contributed to an entity's rank by each kind of match.
+EXACT_MATCH_SCORE = 8
+PREFIX_MATCH_SCORE = 4
+PREFERRED_MATCH_SCORE = 2
+AUTHORITY_MATCH_SCORE = 1
+
+LIKE_ESCAPE = '!'
+
+
+def escape_like (value):
+    """Returns `value` with the LIKE wildcards escaped.
+
+    :param value: value to escape
+    :type value: unicode string
+    :rtype: unicode string
+
+    """
+    for character in (LIKE_ESCAPE, '%', '_'):
+        value = value.replace(character, LIKE_ESCAPE + character)
+    return value
+
+
+class EntitySearch (object):
+
+    """Search for entities whose names match a query.
+
+    An `EntitySearch` may be passed directly to a `Paginator`; the
+    total is counted without ranking, and only the requested page is
+    fetched.
+
+    """
+
+    def __init__ (self, query, entity_type=None, authority=None,
+                  date_range=None):
+        """Initialise the search.
+
+        :param query: the search query
+        :type query: unicode string
+        :param entity_type: entity type to restrict results to
+        :type entity_type: `EntityType`
+        :param authority: authority whose names are ranked higher
+        :type authority: `Authority`
+        :param date_range: normalised forms of the (proleptic
+          Gregorian) dates starting and ending the period that the
+          existence dates of results must overlap; either may be None
+        :type date_range: `tuple` of unicode strings
+
+        """
+        self.query = unicode(query).strip()
+        self.words = [unicode(word) for word in self.query.split()]
+        self.entity_type = entity_type
+        self.authority = authority
+        self.date_range = date_range
+        self._count = None
+
+    def __getitem__ (self, key):
+        return list(self.get_ranked_queryset()[key])
+
+    def __len__ (self):
+        return self.count()
+
+    def count (self):
+        """Returns the total number of matching entities.
+
+        :rtype: int
+
+        """
+        if self._count is None:
+            self._count = self.get_queryset().count()
+        return self._count
+
+    def _get_dated_entities (self):
+        """Returns the primary keys of the entities with an existence
+        date overlapping the date range.
+
+        :rtype: `QuerySet`
+
+        """
+        start, end = self.date_range
+        start_day = end_day = None
+        if start:
+            start_day = get_date_bounds(start)[0]
+        if end:
+            end_day = get_date_bounds(end)[1]
+        existence_assertion_type = \
+            Entity.objects.eats_topic_map.existence_assertion_type
+        return DateIndex.objects.get_range_entities(
+            start_day, end_day, existence_assertion_type)
+
+    def _get_query_forms (self):
+        """Returns the forms of the whole query to match against full
+        names.
+
+        :rtype: `set` of unicode strings
+
+        """
+        forms = create_name_forms(self.query)
+        forms.discard(u'')
+        forms.add(self.query)
+        forms.add(unicodedata.normalize('NFC', self.query))
+        return forms
+
+    def get_queryset (self):
+        """Returns an unordered `QuerySet` of the matching entities.
+
+        :rtype: `QuerySet` of `Entity`s
+
+        """
+        if not self.words:
+            return Entity.objects.none()
+        entities = Entity.objects.all()
+        if self.entity_type is not None:
+            typed_entities = Entity.objects.filter_by_entity_type(
+                self.entity_type)
+            entities = entities.filter(pk__in=typed_entities.values('pk'))
+        if self.date_range is not None and any(self.date_range):
+            entities = entities.filter(pk__in=self._get_dated_entities())
+        return get_search_backend().filter_entities(entities, self.words)
+
+    def get_ranked_queryset (self):
+        """Returns a `QuerySet` of the matching entities, ordered by
+        rank.
+
+        The rank is computed for every match, before any slice of
+        the `QuerySet` is taken.
+
+        :rtype: `QuerySet` of `Entity`s
+
+        """
+        entities = self.get_queryset()
+        if not self.words:
+            return entities
+        rank_sql, rank_params = self._get_rank_sql()
+        return entities.extra(
+            select={'search_rank': rank_sql}, select_params=rank_params
+            ).order_by('-search_rank', 'pk')
+
+    def _get_rank_sql (self):
+        """Returns the SQL expression, and its parameters, giving the
+        rank of an entity.
+
+        :rtype: `tuple` of string and `list`
+
+        """
+        qn = connection.ops.quote_name
+        entity_id = '%s.%s' % (qn(Entity._meta.db_table), qn('id'))
+        name_cache_table = qn(NameCache._meta.db_table)
+        like = "UPPER(%%s) LIKE UPPER(%%s) ESCAPE '%s'" % LIKE_ESCAPE
+        query_forms = sorted(self._get_query_forms())
+        clauses = []
+        params = []
+        # Exact match of a full name.
+        clauses.append(
+            'CASE WHEN EXISTS (SELECT 1 FROM %s nc WHERE nc.entity_id = %s '
+            'AND (%s)) THEN %d ELSE 0 END' % (
+                name_cache_table, entity_id,
+                ' OR '.join(['UPPER(nc.form) = UPPER(%s)'] *
+                            len(query_forms)),
+                EXACT_MATCH_SCORE))
+        params.extend(query_forms)
+        # Match of the start of a full name.
+        clauses.append(
+            'CASE WHEN EXISTS (SELECT 1 FROM %s nc WHERE nc.entity_id = %s '
+            'AND (%s)) THEN %d ELSE 0 END' % (
+                name_cache_table, entity_id,
+                ' OR '.join([like % ('nc.form', '%s')] * len(query_forms)),
+                PREFIX_MATCH_SCORE))
+        params.extend([escape_like(form) + '%' for form in query_forms])
+        # Every word matches a single preferred name.
+        words_sql, words_params = self._get_words_sql('nc.name_id')
+        clauses.append(
+            'CASE WHEN EXISTS (SELECT 1 FROM %s nc WHERE nc.entity_id = %s '
+            'AND nc.is_preferred = %%s AND %s) THEN %d ELSE 0 END' % (
+                name_cache_table, entity_id, words_sql,
+                PREFERRED_MATCH_SCORE))
+        params.append(True)
+        params.extend(words_params)
+        # Every word matches a single name asserted by the authority.
+        if self.authority is not None:
+            clauses.append(
+                'CASE WHEN EXISTS (SELECT 1 FROM %s nc WHERE nc.entity_id = '
+                '%s AND nc.authority_id = %%s AND %s) THEN %d ELSE 0 END' % (
+                    name_cache_table, entity_id, words_sql,
+                    AUTHORITY_MATCH_SCORE))
+            params.append(self.authority.pk)
+            params.extend(words_params)
+        return ' + '.join(['(%s)' % clause for clause in clauses]), params
+
+    def _get_words_sql (self, name_id):
+        """Returns the SQL condition, and its parameters, that is true
+        when every word of the query matches the name identified by
+        `name_id`.
+
+        Each word's condition is a subquery independent of the name,
+        matching the word's forms as prefixes of the name index key,
+        as `NameIndexBackend` does.
+
+        :param name_id: SQL expression giving the name's primary key
+        :type name_id: string
+        :rtype: `tuple` of string and `list`
+
+        """
+        conditions = []
+        params = []
+        for word_forms in create_name_forms_batch(self.words):
+            if not any(word_forms):
+                # As with the backend, a word with no forms matches
+                # no name.
+                return '1 = 0', []
+            names = NameIndex.objects.filter_by_prefixes(word_forms).values(
+                'name')
+            sql, word_params = names.query.sql_with_params()
+            conditions.append('%s IN (%s)' % (name_id, sql))
+            params.extend(word_params)
+        return ' AND '.join(conditions), params
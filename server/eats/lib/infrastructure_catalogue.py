@@ -0,0 +1,170 @@
+"""Catalogue of the admin names and codes of the infrastructure
+elements (authorities, languages, scripts, entity types, etc) in an
+EATS topic map.
+
+Looking up an infrastructure element by its admin name or code
+otherwise means fetching the names of every element of its type, one
+query per element. The catalogue loads the admin names and codes of
+all of the elements, of every type, in a single query per topic map,
+and answers lookups from memory.
+
+The catalogue is invalidated whenever an admin name or code is set,
+an infrastructure element is created or a language removed, or a
+topic map is created or deleted. Within an active `TopicMapContext`
+(that is, during a request) a catalogue is kept for that context
+alone, so that changes made by other processes are seen by the next
+request; outside of one, a single catalogue is kept for the life of
+the process, and is not cleared by changes made in other processes. A
+long running process should therefore carry out each unit of work
+(such as a chunk of an import job) in a context of its own.
+
+"""
+
+import threading
+
+from django.db.models.signals import post_delete, post_save
+
+from tmapi.models import Name, TopicMap
+
+from eats.lib.topic_map_context import get_current_context
+
+
+class InfrastructureCatalogue (object):
+
+    def __init__ (self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self.loads = 0
+
+    def clear (self):
+        """Removes all of the catalogued names and codes."""
+        with self._lock:
+            self._values = {}
+
+    def get (self, topic_map, name_type, value):
+        """Returns the primary keys of the topics in `topic_map` that
+        have a name of `name_type` with `value`, in ascending order.
+
+        :param topic_map: the topic map containing the topics
+        :type topic_map: `EATSTopicMap`
+        :param name_type: type of the name
+        :type name_type: `Topic`
+        :param value: value of the name
+        :type value: unicode string
+        :rtype: `list` of integers
+
+        """
+        return self._get_values(topic_map).get(name_type.pk, {}).get(
+            value, [])
+
+    def get_names (self, topic_map, name_type):
+        """Returns the names of `name_type` of the topics in
+        `topic_map`, keyed by the primary key of the topic.
+
+        A topic with more than one name of `name_type` is given one of
+        them.
+
+        :param topic_map: the topic map containing the topics
+        :type topic_map: `EATSTopicMap`
+        :param name_type: type of the names
+        :type name_type: `Topic`
+        :rtype: `dict`
+
+        """
+        names = {}
+        for value, topics in self._get_values(topic_map).get(
+                name_type.pk, {}).items():
+            for topic in topics:
+                names[topic] = value
+        return names
+
+    def get_relationship_types (self, topic_map, name, reverse_name):
+        """Returns the primary keys of the topics in `topic_map` that
+        have the relationship name `name` and reverse relationship
+        name `reverse_name`, in ascending order.
+
+        :param topic_map: the topic map containing the topics
+        :type topic_map: `EATSTopicMap`
+        :param name: forward name of the relationship type
+        :type name: unicode string
+        :param reverse_name: reverse name of the relationship type
+        :type reverse_name: unicode string
+        :rtype: `list` of integers
+
+        """
+        forward = set(self.get(topic_map, topic_map.relationship_name_type,
+                               name))
+        return [pk for pk in self.get(
+                topic_map, topic_map.reverse_relationship_name_type,
+                reverse_name) if pk in forward]
+
+    def _get_values (self, topic_map):
+        with self._lock:
+            values = self._values.get(topic_map.pk)
+            if values is None:
+                values = self._values[topic_map.pk] = self._load(topic_map)
+        return values
+
+    def _load (self, topic_map):
+        """Loads and returns the catalogued names of the topics in
+        `topic_map`, keyed by name type and value.
+
+        The caller must hold the catalogue lock.
+
+        :param topic_map: the topic map to load from
+        :type topic_map: `EATSTopicMap`
+        :rtype: `dict`
+
+        """
+        name_types = [topic_map.admin_name_type, topic_map.language_code_type,
+                      topic_map.relationship_name_type,
+                      topic_map.reverse_relationship_name_type,
+                      topic_map.script_code_type]
+        values = {}
+        names = Name.objects.filter(
+            topic_map=topic_map, type__in=name_types).order_by(
+            'topic').values_list('type', 'value', 'topic')
+        for name_type, value, topic in names.iterator():
+            values.setdefault(name_type, {}).setdefault(value, []).append(
+                topic)
+        self.loads += 1
+        return values
+
+
+infrastructure_catalogue = InfrastructureCatalogue()
+
+
+def get_infrastructure_catalogue ():
+    """Returns the infrastructure catalogue for the current
+    `TopicMapContext`, or for the process if there is no active
+    context.
+
+    :rtype: `InfrastructureCatalogue`
+
+    """
+    context = get_current_context()
+    if context is None:
+        return infrastructure_catalogue
+    if context.infrastructure_catalogue is None:
+        context.infrastructure_catalogue = InfrastructureCatalogue()
+    return context.infrastructure_catalogue
+
+
+def invalidate_infrastructure_catalogue ():
+    """Clears the catalogues of the current `TopicMapContext` and of
+    the process, after an admin name or code has changed."""
+    context = get_current_context()
+    if context is not None and context.infrastructure_catalogue is not None:
+        context.infrastructure_catalogue.clear()
+    infrastructure_catalogue.clear()
+
+
+def _clear_infrastructure_catalogue (sender, instance, **kwargs):
+    if kwargs.get('created', True):
+        invalidate_infrastructure_catalogue()
+
+for sender in (TopicMap, 'eats.EATSTopicMap'):
+    post_save.connect(_clear_infrastructure_catalogue, sender=sender,
+                      dispatch_uid='eats_infrastructure_catalogue_save')
+    post_delete.connect(_clear_infrastructure_catalogue, sender=sender,
+                        dispatch_uid='eats_infrastructure_catalogue_delete')
@@ -1,5 +1,17 @@
 # -*- coding: utf-8 -*-
 
+"""Normalisation of names into the forms that are indexed and
+searched for.
+
+The variant forms of a name are made by the generators registered in
+`eats.lib.name_variants`, using the conversions below. These are
+carried out with translation tables built once, rather than with a
+chain of replacements or a Python level loop over each character, and
+the forms of each name are memoised, since the same words recur
+throughout names and search queries.
+
+"""
+
 import re
 import unicodedata
 
@@ -9,7 +21,40 @@ ASCII_SUBSTITUTIONS = ((u'Æ', u'AE'), (u'æ', u'ae'), (u'Œ', u'OE'),
                        (u'œ', u'oe'), (u'ß', u'ss'), (u'ſ', u's'),
                        (u'ʻ', "'"), (u'“', u'"'), (u'”', u'"'), (u'‘', u"'"),
                        (u'’', u"'"),)
+MACRON = u'\N{COMBINING MACRON}'
 MACRON_PATTERN = re.compile(u'([aeiou])\N{COMBINING MACRON}', re.UNICODE)
+# Maximum number of names whose forms are memoised.
+NAME_FORM_CACHE_SIZE = 100000
+
+
+class CategoryRemovalTable (dict):
+
+    """Translation table removing the characters whose Unicode
+    general category starts with `category`.
+
+    The category of each character is looked up only the first time
+    the character is translated.
+
+    """
+
+    def __init__ (self, category):
+        super(CategoryRemovalTable, self).__init__()
+        self.category = category
+
+    def __missing__ (self, code):
+        if unicodedata.category(unichr(code)).startswith(self.category):
+            value = None
+        else:
+            value = code
+        self[code] = value
+        return value
+
+
+ASCII_TABLE = dict([(ord(original), unicode(substitute)) for
+                    original, substitute in ASCII_SUBSTITUTIONS])
+# Diacritics in decomposed text are nonspacing marks.
+DIACRITIC_TABLE = CategoryRemovalTable('Mn')
+PUNCTUATION_TABLE = CategoryRemovalTable('P')
 
 
 def abbreviate_name (name, language_code):
@@ -39,27 +84,44 @@ def asciify_name (name):
     return ascii_form
 
 def create_name_forms (name, language_code=None, script_code=None):
-    name_forms = set()
-    normalised_name = unicodedata.normalize('NFD', name)
-    name_forms.add(normalised_name)
-    # script_code will be None for a search query.
-    if script_code == 'Latn' or script_code is None:
-        asciified_forms = set(map(asciify_name, name_forms))
-        name_forms = name_forms | asciified_forms
-    demacronised_forms = set(map(demacronise_name, name_forms))
-    name_forms = name_forms | demacronised_forms
-    # language_code will be None for a search query.
-    if language_code is not None:
-        abbreviated_forms = set()
-        for name in name_forms:
-            abbreviated_forms.add(abbreviate_name(name, language_code))
-        name_forms = name_forms | abbreviated_forms
-    unpunctuated_forms = set(map(unpunctuate_name, name_forms))
-    name_forms = name_forms | unpunctuated_forms
-    return name_forms
+    """Returns the normalised forms of `name`.
+
+    :param name: name to be converted
+    :type name: Unicode string
+    :param language_code: ISO language code for `name`, or None for
+      a search query
+    :type language_code: `str`
+    :param script_code: ISO script code for `name`, or None for a
+      search query
+    :type script_code: `str`
+    :rtype: `set` of Unicode strings
+
+    """
+    return name_normaliser.create_name_forms(name, language_code,
+                                             script_code)
+
+def create_name_forms_batch (names, language_code=None, script_code=None):
+    """Returns the normalised forms of each of `names`, all of which
+    are in the same language and script.
+
+    :param names: names to be converted
+    :type names: iterable of Unicode strings
+    :param language_code: ISO language code for `names`, or None for
+      search queries
+    :type language_code: `str`
+    :param script_code: ISO script code for `names`, or None for
+      search queries
+    :type script_code: `str`
+    :rtype: `list` of `frozenset`s of Unicode strings
+
+    """
+    return name_normaliser.create_name_forms_batch(names, language_code,
+                                                   script_code)
 
 def demacronise_name (name):
     """Returns `name` with macronised vowels schanged into double vowels."""
+    if MACRON not in name:
+        return name
     demacronised_form = MACRON_PATTERN.sub(r'\1\1', name)
     return demacronised_form
 
@@ -72,9 +134,17 @@ def substitute_ascii (name):
     :rtype: Unicode string
 
     """
-    for original, substitute in ASCII_SUBSTITUTIONS:
-        name = name.replace(original, substitute)
-    return name
+    return unicode(name).translate(ASCII_TABLE)
+
+def undiacritise_name (name):
+    """Returns `name` with combining diacritics removed.
+
+    :param name: name to be converted, in normalisation form NFD
+    :type name: Unicode string
+    :rtype: Unicode string
+
+    """
+    return name.translate(DIACRITIC_TABLE)
 
 def unpunctuate_name (name):
     """Returns `name` with punctuation removed.
@@ -86,10 +156,95 @@ def unpunctuate_name (name):
     """
     # QAZ: This does not work well in some cases, such as "On Self
     # Misery.—An Epigram", where "An" ends up joined to "Misery".
-    char_array = []
-    for character in name:
-        category = unicodedata.category(character)
-        # Punctuation categories start with 'P'.
-        if category[0] != 'P':
-            char_array.append(character)
-    return u''.join(char_array)
+    return name.translate(PUNCTUATION_TABLE)
+
+
+class NameNormaliser (object):
+
+    """Creates the normalised forms of names, memoising the forms of
+    up to `cache_size` names.
+
+    The forms are made by the generators in `registry`, or by the
+    configured generators if `registry` is None.
+
+    """
+
+    def __init__ (self, cache_size=NAME_FORM_CACHE_SIZE, registry=None):
+        self._cache = {}
+        self._cache_size = cache_size
+        self._registry = registry
+
+    def clear (self):
+        """Empties the memoised forms."""
+        self._cache.clear()
+
+    def create_name_forms (self, name, language_code=None, script_code=None):
+        """Returns the normalised forms of `name`.
+
+        :param name: name to be converted
+        :type name: Unicode string
+        :param language_code: ISO language code for `name`, or None
+          for a search query
+        :type language_code: `str`
+        :param script_code: ISO script code for `name`, or None for
+          a search query
+        :type script_code: `str`
+        :rtype: `set` of Unicode strings
+
+        """
+        key = (name, language_code, script_code)
+        name_forms = self._cache.get(key)
+        if name_forms is None:
+            name_forms = self._normalise(name, language_code, script_code)
+            if self._cache_size:
+                if len(self._cache) >= self._cache_size:
+                    self._cache.clear()
+                self._cache[key] = name_forms
+        return set(name_forms)
+
+    def create_name_forms_batch (self, names, language_code=None,
+                                 script_code=None):
+        """Returns the normalised forms of each of `names`, all of
+        which are in the same language and script.
+
+        Unlike `create_name_forms`, the memoised forms are returned
+        without being copied.
+
+        :rtype: `list` of `frozenset`s of Unicode strings
+
+        """
+        cache = self._cache
+        name_forms_list = []
+        for name in names:
+            key = (name, language_code, script_code)
+            name_forms = cache.get(key)
+            if name_forms is None:
+                name_forms = self._normalise(name, language_code, script_code)
+                if self._cache_size:
+                    if len(cache) >= self._cache_size:
+                        cache.clear()
+                    cache[key] = name_forms
+            name_forms_list.append(name_forms)
+        return name_forms_list
+
+    def _normalise (self, name, language_code, script_code):
+        """Returns the normalised forms of `name`, without reference to
+        the memoised forms.
+
+        :rtype: `frozenset` of Unicode strings
+
+        """
+        registry = self._registry
+        if registry is None:
+            from eats.lib.name_variants import get_name_variant_registry
+            registry = get_name_variant_registry()
+        normalised_name = unicodedata.normalize('NFD', name)
+        name_forms = set((normalised_name,))
+        for generator in registry.get_generators(language_code, script_code):
+            name_forms.update([variant for form in name_forms for variant in
+                               generator.generate(form, language_code,
+                                                  script_code)])
+        return frozenset(name_forms)
+
+
+name_normaliser = NameNormaliser()
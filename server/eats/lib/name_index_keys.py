@@ -0,0 +1,145 @@
+"""Upgrading of an existing name index to one with indexed keys.
+
+EATS has no migrations, so the key column is added to an existing
+`NameIndex` table here, if it is missing, and then filled in from the
+forms in batches. Entries whose forms differ only in case from
+another entry for the same name or name part are then deleted, as they
+would not have been created by the current code.
+
+A new database needs none of this, and a full reindex (with
+eats_reindex) has the same result, but is much slower for a large
+index.
+
+"""
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from eats.lib.search_backends import get_search_backend
+from eats.models import Name, NameIndex
+from eats.models.name_index import make_key
+
+
+class NameIndexKeyUpgrader (object):
+
+    """Adds and fills in the key column of the name index."""
+
+    def __init__ (self, batch_size=10000, stdout=None):
+        """Initialise the upgrader.
+
+        :param batch_size: number of entries to update per batch
+        :type batch_size: int
+        :param stdout: stream to write progress reports to
+        :type stdout: file-like object
+
+        """
+        self.batch_size = batch_size
+        self.stdout = stdout
+
+    def add_column (self):
+        """Adds the key column and its indexes to the name index
+        table, if it does not already have it, and returns whether it
+        was added.
+
+        :rtype: bool
+
+        """
+        table = NameIndex._meta.db_table
+        with connection.cursor() as cursor:
+            columns = [column.name for column in
+                       connection.introspection.get_table_description(
+                    cursor, table)]
+        if 'key' in columns:
+            return False
+        self._report('Adding key column to %s.' % table)
+        with connection.schema_editor() as editor:
+            editor.add_field(NameIndex, NameIndex._meta.get_field('key'))
+        return True
+
+    def deduplicate (self):
+        """Deletes all but the first of the entries for each name or
+        name part whose forms differ only in case, and returns the
+        number deleted.
+
+        Only entries that share a key can be duplicates, so the forms
+        are compared just within those groups.
+
+        :rtype: int
+
+        """
+        groups = NameIndex.objects.values('name', 'name_part', 'key').annotate(
+            count=Count('pk')).filter(count__gt=1)
+        duplicates = []
+        names = set()
+        for group in groups.iterator():
+            entries = NameIndex.objects.filter(
+                name=group['name'], name_part=group['name_part'],
+                key=group['key']).order_by('pk').values_list('pk', 'form')
+            folded_forms = set()
+            for pk, form in entries:
+                folded = form.lower()
+                if folded in folded_forms:
+                    duplicates.append(pk)
+                    names.add(group['name'])
+                else:
+                    folded_forms.add(folded)
+        for start in range(0, len(duplicates), self.batch_size):
+            NameIndex.objects.filter(
+                pk__in=duplicates[start:start+self.batch_size]).delete()
+        backend = get_search_backend()
+        for name in Name.objects.filter(pk__in=names):
+            backend.update_name(name)
+        self._report('Deleted %d entries differing only in case.' %
+                     len(duplicates))
+        return len(duplicates)
+
+    def fill_keys (self):
+        """Sets the key of each entry that does not have one, and
+        returns the number of entries updated.
+
+        Each batch is updated by a single statement.
+
+        :rtype: int
+
+        """
+        qn = connection.ops.quote_name
+        sql = 'UPDATE %s SET %s = CASE %s %%s END WHERE %s IN (%%s)' % (
+            qn(NameIndex._meta.db_table), qn('key'), qn('id'), qn('id'))
+        last_pk = 0
+        total = 0
+        while True:
+            rows = list(NameIndex.objects.filter(
+                    key='', pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'form')[:self.batch_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            rows = [(pk, make_key(form)) for pk, form in rows if form]
+            if rows:
+                params = []
+                for pk, key in rows:
+                    params.extend((pk, key))
+                params.extend([pk for pk, key in rows])
+                with transaction.atomic():
+                    connection.cursor().execute(sql % (
+                            ' '.join(['WHEN %s THEN %s'] * len(rows)),
+                            ', '.join(['%s'] * len(rows))), params)
+                total += len(rows)
+            self._report('  up to %d: %d keys set' % (last_pk, total))
+        return total
+
+    def _report (self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def upgrade (self):
+        """Adds the key column if needed, fills in the keys and removes
+        duplicate entries.
+
+        :rtype: `dict` of the numbers of entries updated and deleted
+
+        """
+        self.add_column()
+        updated = self.fill_keys()
+        deleted = self.deduplicate()
+        return {'updated': updated, 'deleted': deleted}
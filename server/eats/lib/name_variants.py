@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+
+"""Generators of the variant forms of names that are indexed and
+searched for.
+
+The normalised forms of a name are made by starting from the name
+itself (in Unicode normalisation form NFD) and applying each
+applicable generator in turn, adding the variants it generates from
+every form so far.
+
+The generators used are those named by the optional
+EATS_NAME_VARIANT_GENERATORS setting, a sequence of dotted paths to
+`VariantGenerator` subclasses or instances, in the order they are to
+be applied. A generator applies to the names in the languages and
+scripts it lists (all of them, if it lists none), and to search
+queries if `applies_to_queries` is true; the language and script of a
+search query are not known.
+
+Each generator has a signature that changes whenever its
+configuration or version does. The signatures of the generators that
+applied to the names in each language and script when they were
+indexed are recorded, so that after changing the generators only the
+names whose signatures have changed need be reindexed, by running the
+eats_reindex management command with the --variants option.
+
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from eats.lib.name_form import ABBREVIATIONS, asciify_name, demacronise_name, name_normaliser, undiacritise_name, unpunctuate_name
+
+
+DEFAULT_NAME_VARIANT_GENERATORS = (
+    'eats.lib.name_variants.AsciiGenerator',
+    'eats.lib.name_variants.GreekTransliterationGenerator',
+    'eats.lib.name_variants.CyrillicTransliterationGenerator',
+    'eats.lib.name_variants.ArabicTransliterationGenerator',
+    'eats.lib.name_variants.DiacriticGenerator',
+    'eats.lib.name_variants.DemacroniseGenerator',
+    'eats.lib.name_variants.AbbreviationGenerator',
+    'eats.lib.name_variants.UnpunctuateGenerator',
+    )
+
+_registry = None
+
+
+def get_name_variant_registry ():
+    """Returns the registry of the configured name variant
+    generators.
+
+    :rtype: `NameVariantRegistry`
+
+    """
+    global _registry
+    if _registry is None:
+        paths = getattr(settings, 'EATS_NAME_VARIANT_GENERATORS',
+                        DEFAULT_NAME_VARIANT_GENERATORS)
+        generators = []
+        for path in paths:
+            try:
+                generator = import_string(path)
+            except ImportError, e:
+                raise ImproperlyConfigured(
+                    'Error importing EATS name variant generator %s: %s' %
+                    (path, e))
+            if isinstance(generator, type):
+                generator = generator()
+            generators.append(generator)
+        _registry = NameVariantRegistry(generators)
+    return _registry
+
+
+@receiver(setting_changed)
+def reset_name_variant_registry (sender, setting, **kwargs):
+    """Discards the registry, and the name forms made with it, when
+    the generators are changed in tests."""
+    global _registry
+    if setting == 'EATS_NAME_VARIANT_GENERATORS':
+        _registry = None
+        name_normaliser.clear()
+
+
+class NameVariantRegistry (object):
+
+    """An ordered collection of name variant generators."""
+
+    def __init__ (self, generators):
+        self.generators = list(generators)
+        self._applicable = {}
+
+    def get_generators (self, language_code, script_code):
+        """Returns the generators that apply to names in
+        `language_code` and `script_code`, in order.
+
+        :param language_code: ISO language code, or None for a
+          search query
+        :type language_code: `str`
+        :param script_code: ISO script code, or None for a search
+          query
+        :type script_code: `str`
+        :rtype: `tuple` of `VariantGenerator`s
+
+        """
+        key = (language_code, script_code)
+        generators = self._applicable.get(key)
+        if generators is None:
+            generators = self._applicable[key] = tuple(
+                [generator for generator in self.generators if
+                 generator.applies_to(language_code, script_code)])
+        return generators
+
+    def get_signature (self, language_code, script_code):
+        """Returns the signature of the generators that apply to names
+        in `language_code` and `script_code`.
+
+        :rtype: `str`
+
+        """
+        signatures = [generator.get_signature() for generator in
+                      self.get_generators(language_code, script_code)]
+        return hashlib.sha1('\n'.join(signatures).encode('utf-8')).hexdigest()
+
+
+class VariantGenerator (object):
+
+    """Base class for name variant generators.
+
+    Subclasses implement `generate`, and set `languages` and
+    `scripts` to restrict the names they apply to. Any change in the
+    behaviour of a generator that is not reflected in its
+    configuration must be marked by incrementing `version`, so that
+    the names it applies to are reindexed.
+
+    """
+
+    # ISO codes of the languages and scripts of the names this
+    # generator applies to; if empty, it applies to all.
+    languages = ()
+    scripts = ()
+    applies_to_queries = True
+    version = 1
+
+    def applies_to (self, language_code, script_code):
+        """Returns True if this generator applies to names in
+        `language_code` and `script_code`.
+
+        :param language_code: ISO language code, or None for a
+          search query
+        :type language_code: `str`
+        :param script_code: ISO script code, or None for a search
+          query
+        :type script_code: `str`
+        :rtype: bool
+
+        """
+        if language_code is None and script_code is None:
+            return self.applies_to_queries
+        if self.languages and language_code not in self.languages:
+            return False
+        if self.scripts and script_code not in self.scripts:
+            return False
+        return True
+
+    def generate (self, form, language_code, script_code):
+        """Returns the variants of `form`.
+
+        :param form: form of a name
+        :type form: Unicode string
+        :param language_code: ISO language code of the name, or None
+          for a search query
+        :type language_code: `str`
+        :param script_code: ISO script code of the name, or None for
+          a search query
+        :type script_code: `str`
+        :rtype: `list` of Unicode strings
+
+        """
+        raise NotImplementedError
+
+    def _get_configuration (self):
+        """Returns the configuration of this generator that determines
+        the variants it generates, beyond its class and version.
+
+        :rtype: `list`
+
+        """
+        return [sorted(self.languages), sorted(self.scripts),
+                self.applies_to_queries]
+
+    def get_signature (self):
+        """Returns a string that changes whenever the variants this
+        generator generates might.
+
+        :rtype: `str`
+
+        """
+        return '%s.%s %s %r' % (self.__class__.__module__,
+                                self.__class__.__name__, self.version,
+                                self._get_configuration())
+
+
+class AbbreviationGenerator (VariantGenerator):
+
+    """Generator of the abbreviated form of names, with the
+    abbreviations for each language given by `abbreviations`."""
+
+    abbreviations = ABBREVIATIONS
+    applies_to_queries = False
+
+    @property
+    def languages (self):
+        return tuple(self.abbreviations.keys())
+
+    def generate (self, form, language_code, script_code):
+        for full, abbreviated in self.abbreviations.get(language_code, ()):
+            form = form.replace(full, abbreviated)
+        return [form]
+
+    def _get_configuration (self):
+        return super(AbbreviationGenerator, self)._get_configuration() + \
+            [sorted(self.abbreviations.items())]
+
+
+class AsciiGenerator (VariantGenerator):
+
+    """Generator of the ASCII form of Latin script names."""
+
+    scripts = ('Latn',)
+
+    def generate (self, form, language_code, script_code):
+        return [asciify_name(form)]
+
+
+class DemacroniseGenerator (VariantGenerator):
+
+    """Generator of the form of names with macronised vowels changed
+    into double vowels."""
+
+    def generate (self, form, language_code, script_code):
+        return [demacronise_name(form)]
+
+
+class DiacriticGenerator (VariantGenerator):
+
+    """Generator of the form of names without diacritics, for scripts
+    not handled by `AsciiGenerator`."""
+
+    scripts = ('Arab', 'Cyrl', 'Grek')
+
+    def generate (self, form, language_code, script_code):
+        return [undiacritise_name(form)]
+
+
+class PhoneticKeyGenerator (VariantGenerator):
+
+    """Generator of the Soundex keys of the words of Latin script
+    names.
+
+    This is not used by default; since a key stands in for a whole
+    word, it matches only whole words of a search query.
+
+    """
+
+    scripts = ('Latn',)
+    codes = {'B': '1', 'F': '1', 'P': '1', 'V': '1',
+             'C': '2', 'G': '2', 'J': '2', 'K': '2', 'Q': '2', 'S': '2',
+             'X': '2', 'Z': '2', 'D': '3', 'T': '3', 'L': '4', 'M': '5',
+             'N': '5', 'R': '6'}
+
+    def generate (self, form, language_code, script_code):
+        keys = [self.get_key(word) for word in asciify_name(form).split()]
+        return [u' '.join([key for key in keys if key])]
+
+    def get_key (self, word):
+        """Returns the Soundex key of `word`, or the empty string if
+        it has no letters.
+
+        :param word: word to key
+        :type word: Unicode string
+        :rtype: Unicode string
+
+        """
+        letters = [letter for letter in word.upper() if letter.isalpha()]
+        if not letters:
+            return u''
+        key = [letters[0]]
+        previous = self.codes.get(letters[0])
+        for letter in letters[1:]:
+            code = self.codes.get(letter)
+            if code is not None and code != previous:
+                key.append(code)
+            # H and W do not separate letters with the same code.
+            if letter not in 'HW':
+                previous = code
+        return u''.join(key)[:4].ljust(4, u'0')
+
+
+class TransliterationGenerator (VariantGenerator):
+
+    """Generator of the Latin script transliteration of names, using
+    the translation table `table`.
+
+    Any diacritics remaining after transliteration are removed.
+
+    """
+
+    table = {}
+
+    def generate (self, form, language_code, script_code):
+        return [undiacritise_name(form.translate(self.table))]
+
+    def _get_configuration (self):
+        return super(TransliterationGenerator, self)._get_configuration() + \
+            [sorted(self.table.items())]
+
+
+def _make_table (letters):
+    """Returns a translation table from `letters`, a sequence of
+    pairs of a lower case letter and its transliteration, adding
+    the upper case letters."""
+    table = {}
+    for letter, transliteration in letters:
+        table[ord(letter)] = transliteration
+        upper = letter.upper()
+        if upper != letter:
+            table[ord(upper)] = transliteration.capitalize()
+    return table
+
+
+class ArabicTransliterationGenerator (TransliterationGenerator):
+
+    scripts = ('Arab',)
+    table = _make_table((
+            (u'ا', u'a'), (u'ب', u'b'), (u'ت', u't'), (u'ث', u'th'),
+            (u'ج', u'j'), (u'ح', u'h'), (u'خ', u'kh'), (u'د', u'd'),
+            (u'ذ', u'dh'), (u'ر', u'r'), (u'ز', u'z'), (u'س', u's'),
+            (u'ش', u'sh'), (u'ص', u's'), (u'ض', u'd'), (u'ط', u't'),
+            (u'ظ', u'z'), (u'ع', u"'"), (u'غ', u'gh'), (u'ف', u'f'),
+            (u'ق', u'q'), (u'ك', u'k'), (u'ل', u'l'), (u'م', u'm'),
+            (u'ن', u'n'), (u'ه', u'h'), (u'و', u'w'), (u'ي', u'y'),
+            (u'ء', u"'"), (u'ة', u'h'), (u'ى', u'a'),
+            ))
+
+
+class CyrillicTransliterationGenerator (TransliterationGenerator):
+
+    scripts = ('Cyrl',)
+    table = _make_table((
+            (u'а', u'a'), (u'б', u'b'), (u'в', u'v'), (u'г', u'g'),
+            (u'ґ', u'g'), (u'д', u'd'), (u'е', u'e'), (u'є', u'ye'),
+            (u'ж', u'zh'), (u'з', u'z'), (u'и', u'i'), (u'і', u'i'),
+            (u'к', u'k'), (u'л', u'l'), (u'м', u'm'), (u'н', u'n'),
+            (u'о', u'o'), (u'п', u'p'), (u'р', u'r'), (u'с', u's'),
+            (u'т', u't'), (u'у', u'u'), (u'ф', u'f'), (u'х', u'kh'),
+            (u'ц', u'ts'), (u'ч', u'ch'), (u'ш', u'sh'), (u'щ', u'shch'),
+            (u'ъ', u''), (u'ы', u'y'), (u'ь', u''), (u'э', u'e'),
+            (u'ю', u'yu'), (u'я', u'ya'),
+            ))
+
+
+class GreekTransliterationGenerator (TransliterationGenerator):
+
+    scripts = ('Grek',)
+    table = _make_table((
+            (u'α', u'a'), (u'β', u'v'), (u'γ', u'g'), (u'δ', u'd'),
+            (u'ε', u'e'), (u'ζ', u'z'), (u'η', u'i'), (u'θ', u'th'),
+            (u'ι', u'i'), (u'κ', u'k'), (u'λ', u'l'), (u'μ', u'm'),
+            (u'ν', u'n'), (u'ξ', u'x'), (u'ο', u'o'), (u'π', u'p'),
+            (u'ρ', u'r'), (u'σ', u's'), (u'ς', u's'), (u'τ', u't'),
+            (u'υ', u'y'), (u'φ', u'f'), (u'χ', u'ch'), (u'ψ', u'ps'),
+            (u'ω', u'o'),
+            ))
+
+
+class UnpunctuateGenerator (VariantGenerator):
+
+    """Generator of the form of names without punctuation."""
+
+    def generate (self, form, language_code, script_code):
+        return [unpunctuate_name(form)]
@@ -0,0 +1,402 @@
+"""Bulk regeneration of the name cache, name index, entity
+relationship cache and date index.
+
+Rather than updating the caches one name at a time, as
+`Name.update_name_cache` and `Name.update_name_index` do, the caches
+are emptied and then repopulated in batches using `bulk_create`.
+Batches may be processed in parallel by a pool of worker processes,
+and progress is recorded in a checkpoint file so that an interrupted
+rebuild may be resumed.
+
+After a change to the name variant generators, `NameVariantReindexer`
+rebuilds the name cache and index of only those names in the
+languages and scripts affected by the change.
+
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+from django.db import connections, transaction
+
+from tmapi.models import Topic
+
+from eats.lib.name_variants import get_name_variant_registry
+from eats.lib.search_backends import get_search_backend
+from eats.lib.topic_map_context import get_eats_topic_map
+from eats.models import Date, DateIndex, EntityRelationshipCache, EntityRelationshipPropertyAssertion, EntitySummary, Name, NameCache, NameIndex, NamePart, NameVariantSignature
+
+
+NAMES_PHASE = 'names'
+RELATIONSHIPS_PHASE = 'relationships'
+DATES_PHASE = 'dates'
+PHASES = (NAMES_PHASE, RELATIONSHIPS_PHASE, DATES_PHASE)
+
+
+def build_date_rows (pks):
+    """Returns the field values of the date index entries for the
+    dates with primary keys `pks`.
+
+    :param pks: primary keys of the dates to process
+    :type pks: `list` of integers
+    :rtype: `dict` of `list`s of `dict`s, keyed by model
+
+    """
+    indexed_dates = []
+    for date in Date.objects.filter(pk__in=pks):
+        indexed_dates.extend([_get_field_values(indexed_date) for
+                              indexed_date in date.build_date_index()])
+    return {DateIndex: indexed_dates}
+
+
+def build_name_rows (pks):
+    """Returns the field values of the name cache and name index
+    entries for the names with primary keys `pks`.
+
+    :param pks: primary keys of the names to process
+    :type pks: `list` of integers
+    :rtype: `dict` of `list`s of `dict`s, keyed by model
+
+    """
+    cached_names = []
+    indexed_forms = []
+    for name in Name.objects.filter(pk__in=pks):
+        cached_name = name.build_name_cache()
+        if cached_name is not None:
+            cached_names.append(_get_field_values(cached_name))
+        indexed_forms.extend([_get_field_values(indexed_form) for indexed_form
+                              in name.build_name_index()])
+        for name_part in NamePart.objects.filter_by_name(name):
+            indexed_forms.extend([_get_field_values(indexed_form) for
+                                  indexed_form in name_part.build_name_index()])
+    return {NameCache: cached_names, NameIndex: indexed_forms}
+
+
+def build_relationship_rows (pks):
+    """Returns the field values of the entity relationship cache
+    entries for the entity relationship property assertions with
+    primary keys `pks`.
+
+    :param pks: primary keys of the assertions to process
+    :type pks: `list` of integers
+    :rtype: `dict` of `list`s of `dict`s, keyed by model
+
+    """
+    cached_relationships = []
+    for assertion in EntityRelationshipPropertyAssertion.objects.filter(
+            pk__in=pks):
+        cached_relationships.append(_get_field_values(
+                assertion.build_relationship_cache()))
+    return {EntityRelationshipCache: cached_relationships}
+
+
+def _close_connections ():
+    """Closes the database connections, so that each worker process
+    opens its own rather than sharing those of its parent."""
+    connections.close_all()
+
+
+def get_batches (model, last_pk, batch_size):
+    """Yields lists of the primary keys of `model` objects greater
+    than `last_pk`, in order.
+
+    Each batch is fetched by a separate query, so that no more than
+    one batch is held in memory.
+
+    :param model: model whose objects are batched
+    :type model: `Model` class
+    :param last_pk: primary key after which to start
+    :type last_pk: int
+    :param batch_size: maximum number of primary keys in a batch
+    :type batch_size: int
+    :rtype: generator of `list`s of integers
+
+    """
+    while True:
+        batch = list(model.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+def get_name_pks (language, script):
+    """Returns the primary keys of the names that are, or have name
+    parts that are, in `language` and `script`.
+
+    :param language: language of the names
+    :type language: `Language`
+    :param script: script of the names
+    :type script: `Script`
+    :rtype: `set` of integers
+
+    """
+    topic_map = get_eats_topic_map()
+    element_role_types = [topic_map.name_role_type,
+                          topic_map.name_part_role_type]
+    elements = Topic.objects.filter(
+        roles__type__in=element_role_types,
+        roles__association__type=topic_map.is_in_language_type,
+        roles__association__roles__type=topic_map.language_role_type,
+        roles__association__roles__player=language).filter(
+        roles__type__in=element_role_types,
+        roles__association__type=topic_map.is_in_script_type,
+        roles__association__roles__type=topic_map.script_role_type,
+        roles__association__roles__player=script).values('pk')
+    pks = set(Name.objects.filter(pk__in=elements).values_list(
+            'pk', flat=True))
+    pks.update(Name.objects.filter(
+            roles__type=topic_map.name_role_type,
+            roles__association__type=
+            topic_map.name_has_name_part_association_type,
+            roles__association__roles__type=topic_map.name_part_role_type,
+            roles__association__roles__player__in=elements).values_list(
+            'pk', flat=True))
+    return pks
+
+
+def _get_field_values (instance):
+    """Returns the values of the concrete fields of the unsaved model
+    `instance`, in a form that can be passed between processes.
+
+    :rtype: `dict`
+
+    """
+    return dict([(field.attname, getattr(instance, field.attname)) for
+                 field in instance._meta.concrete_fields])
+
+
+def map_batches (function, batches, processes):
+    """Yields each batch in `batches` together with the result of
+    calling `function` on it, in order.
+
+    If `processes` is greater than one, `function` is run in a pool
+    of that many worker processes, and only a few batches beyond
+    those being worked on are read ahead.
+
+    :param function: module level function to call on each batch
+    :type function: callable
+    :param batches: batches to process
+    :type batches: iterator
+    :param processes: number of worker processes to use
+    :type processes: int
+    :rtype: generator of `tuple`s
+
+    """
+    if processes <= 1:
+        for batch in batches:
+            yield batch, function(batch)
+        return
+    get_eats_topic_map().create_well_known_topics()
+    _close_connections()
+    pool = multiprocessing.Pool(processes, initializer=_close_connections)
+    try:
+        while True:
+            chunk = list(itertools.islice(batches, processes * 2))
+            if not chunk:
+                break
+            for batch, result in itertools.izip(
+                    chunk, pool.imap(function, chunk)):
+                yield batch, result
+    finally:
+        pool.close()
+        pool.join()
+
+
+class CacheRebuilder (object):
+
+    """Rebuilds the name and entity relationship caches and the date
+    index in bulk."""
+
+    def __init__ (self, batch_size=1000, processes=1, checkpoint_path=None,
+                  stdout=None):
+        """Initialise the rebuilder.
+
+        :param batch_size: number of names, relationships or dates
+          per batch
+        :type batch_size: int
+        :param processes: number of worker processes to use
+        :type processes: int
+        :param checkpoint_path: path to the file recording progress
+        :type checkpoint_path: string
+        :param stdout: stream to write progress reports to
+        :type stdout: file-like object
+
+        """
+        self.batch_size = batch_size
+        self.processes = processes
+        self.checkpoint_path = checkpoint_path
+        self.stdout = stdout
+
+    def _load_checkpoint (self):
+        """Returns the progress recorded in the checkpoint file, or
+        None if there is no checkpoint.
+
+        :rtype: `dict` or None
+
+        """
+        if self.checkpoint_path is None or \
+                not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path) as checkpoint_file:
+            return json.load(checkpoint_file)
+
+    def _report (self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def rebuild (self):
+        """Rebuilds the caches, resuming from the checkpoint if there
+        is one.
+
+        :rtype: `dict` of the number of rows created, keyed by phase
+
+        """
+        checkpoint = self._load_checkpoint()
+        if checkpoint is None:
+            checkpoint = dict([(phase, 0) for phase in PHASES])
+            self._truncate()
+            self._save_checkpoint(checkpoint)
+        else:
+            self._report('Resuming from checkpoint %s.' % self.checkpoint_path)
+        rows = {}
+        for phase, model, function in (
+            (NAMES_PHASE, Name, build_name_rows),
+            (RELATIONSHIPS_PHASE, EntityRelationshipPropertyAssertion,
+             build_relationship_rows),
+            (DATES_PHASE, Date, build_date_rows)):
+            rows[phase] = self._run_phase(phase, model, function, checkpoint)
+        if self.checkpoint_path is not None:
+            os.remove(self.checkpoint_path)
+        record_name_variant_signatures()
+        return rows
+
+    def _run_phase (self, phase, model, function, checkpoint):
+        """Runs `function` over batches of `model` objects not yet
+        processed according to `checkpoint`, saving the rows it
+        returns.
+
+        The rows are built in the worker processes, if any, but are
+        saved by this process only, so that databases that allow only
+        a single writer may be used.
+
+        :rtype: int
+
+        """
+        self._report('Rebuilding %s.' % phase)
+        # A checkpoint recorded before a phase was added lacks it.
+        batches = get_batches(model, checkpoint.setdefault(phase, 0),
+                              self.batch_size)
+        start = time.time()
+        total = 0
+        # Results are returned in batch order, so every batch up to
+        # and including the current one is complete.
+        for batch, rows in map_batches(function, batches, self.processes):
+            total += self._save_rows(phase, batch, rows)
+            checkpoint[phase] = batch[-1]
+            self._save_checkpoint(checkpoint)
+            elapsed = time.time() - start
+            self._report('  %s: up to %d, %d rows, %.1f rows/sec' % (
+                    phase, batch[-1], total, total / max(elapsed, 0.001)))
+        return total
+
+    def _save_rows (self, phase, pks, rows):
+        """Saves `rows` built for the objects with primary keys `pks`,
+        replacing any existing entries for them, and returns the
+        number of rows saved.
+
+        :rtype: int
+
+        """
+        total = 0
+        with transaction.atomic():
+            if phase == NAMES_PHASE:
+                NameCache.objects.filter(name__in=pks).delete()
+                NameIndex.objects.filter(name__in=pks).delete()
+            elif phase == RELATIONSHIPS_PHASE:
+                EntityRelationshipCache.objects.filter(
+                    entity_relationship__in=pks).delete()
+            else:
+                DateIndex.objects.filter(date__in=pks).delete()
+            for model, values in rows.items():
+                model.objects.bulk_create([model(**value) for value in
+                                           values])
+                total += len(values)
+            if phase == NAMES_PHASE:
+                backend = get_search_backend()
+                for name in Name.objects.filter(pk__in=pks):
+                    backend.update_name(name)
+        return total
+
+    def _save_checkpoint (self, checkpoint):
+        if self.checkpoint_path is None:
+            return
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.rename(temporary_path, self.checkpoint_path)
+
+    def _truncate (self):
+        """Empties the caches being rebuilt.
+
+        Entity summaries are also removed, and are regenerated as
+        they are next requested.
+
+        """
+        self._report('Emptying caches.')
+        for model in (NameCache, NameIndex, EntityRelationshipCache,
+                      DateIndex, EntitySummary):
+            model.objects.all().delete()
+
+
+class NameVariantReindexer (CacheRebuilder):
+
+    """Rebuilds the name cache and index of the names in those
+    languages and scripts whose name variant generators have changed
+    since they were last indexed.
+
+    There is no checkpoint; the changed generators are recorded only
+    once every affected name has been reindexed, so an interrupted
+    run is simply repeated.
+
+    """
+
+    def rebuild (self):
+        """Rebuilds the caches of the names affected by a change in
+        the name variant generators.
+
+        :rtype: `dict` of the number of rows created, keyed by phase
+
+        """
+        changed = NameVariantSignature.objects.get_changed(
+            get_name_variant_registry())
+        pks = set()
+        for language, script, signature in changed:
+            language_pks = get_name_pks(language, script)
+            if language_pks:
+                self._report('%d names in %s and %s to reindex.' % (
+                        len(language_pks), language.get_code(),
+                        script.get_code()))
+            pks.update(language_pks)
+        pks = sorted(pks)
+        batches = iter([pks[i:i+self.batch_size] for i in
+                        range(0, len(pks), self.batch_size)])
+        total = 0
+        for batch, rows in map_batches(build_name_rows, batches,
+                                       self.processes):
+            total += self._save_rows(NAMES_PHASE, batch, rows)
+            self._report('  %s: up to %d, %d rows' % (
+                    NAMES_PHASE, batch[-1], total))
+        NameVariantSignature.objects.record(changed)
+        return {NAMES_PHASE: total}
+
+
+def record_name_variant_signatures ():
+    """Records that all names have been indexed with the configured
+    name variant generators."""
+    NameVariantSignature.objects.record(
+        NameVariantSignature.objects.get_changed(get_name_variant_registry()))
@@ -0,0 +1,227 @@
+"""Backends for matching the words of a name search against the
+names of entities.
+
+The backend is selected by the EATS_NAME_SEARCH_BACKEND setting,
+which gives the dotted path to a backend class. The default,
+`NameIndexBackend`, matches against the `NameIndex` table.
+
+All backends are kept in sync with the names in the topic map via
+`Name.update_name_index` and `NamePart.update_name_index`; the
+`NameIndex` table itself is always maintained, so that it is possible
+to switch back to the default backend at any time.
+
+Any database tables needed by the configured backend are created by
+the post_migrate signal handler below; after changing backend, run
+the migrate and eats_reindex management commands to create and
+populate them.
+
+"""
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models.signals import post_migrate
+from django.utils.module_loading import import_string
+
+from eats.lib.name_form import create_name_forms, create_name_forms_batch
+
+
+DEFAULT_SEARCH_BACKEND = 'eats.lib.search_backends.NameIndexBackend'
+
+_backends = {}
+
+
+def get_search_backend ():
+    """Returns the configured name search backend.
+
+    :rtype: `BaseSearchBackend`
+
+    """
+    path = getattr(settings, 'EATS_NAME_SEARCH_BACKEND',
+                   DEFAULT_SEARCH_BACKEND)
+    backend = _backends.get(path)
+    if backend is None:
+        try:
+            backend_class = import_string(path)
+        except ImportError, e:
+            raise ImproperlyConfigured(
+                'Error importing EATS name search backend %s: %s' % (path, e))
+        backend = _backends[path] = backend_class()
+    return backend
+
+
+class BaseSearchBackend (object):
+
+    def delete_name (self, name):
+        """Removes `name` from the search index.
+
+        :param name: the name to remove
+        :type name: `Name`
+
+        """
+        pass
+
+    def create_tables (self):
+        """Creates any database tables required by this backend, if
+        they do not already exist."""
+        pass
+
+    def delete_entities (self, entities):
+        """Removes the names of `entities` from the search index.
+
+        :param entities: primary keys of the entities being deleted
+        :type entities: `list` of integers
+
+        """
+        pass
+
+    def filter_entities (self, entities, words):
+        """Returns `entities` filtered to those that have, for each
+        word in `words`, a name that matches it.
+
+        :param entities: entities to filter
+        :type entities: `QuerySet` of `Entity`s
+        :param words: words of the search query
+        :type words: `list` of unicode strings
+        :rtype: `QuerySet` of `Entity`s
+
+        """
+        raise NotImplementedError
+
+    def merge_entities (self, entity, others):
+        """Updates the search index after the names of `others` have
+        been moved to `entity` by a merge.
+
+        This is called after the `NameIndex` entries for the names
+        have been moved.
+
+        :param entity: the entity merged into
+        :type entity: `Entity`
+        :param others: primary keys of the entities merged in
+        :type others: `list` of integers
+
+        """
+        pass
+
+    def update_name (self, name):
+        """Updates the search index for `name`.
+
+        This is called after the `NameIndex` entries for `name` (and
+        its name parts) have been regenerated.
+
+        :param name: the name to update
+        :type name: `Name`
+
+        """
+        pass
+
+
+class NameIndexBackend (BaseSearchBackend):
+
+    """Backend matching each word as a case-insensitive prefix of the
+    forms in `NameIndex`."""
+
+    def filter_entities (self, entities, words):
+        from eats.models import NameIndex
+        for word_forms in create_name_forms_batch(words):
+            # A word may have no form in some conversions, such as to
+            # ASCII; such forms are ignored, since the empty string
+            # would match every form.
+            entities = entities.filter(
+                pk__in=NameIndex.objects.filter_by_prefixes(
+                    word_forms).values('entity'))
+        return entities
+
+
+class SQLiteFTSBackend (BaseSearchBackend):
+
+    """Backend using an SQLite FTS5 table holding one row per name.
+
+    Each row holds all of the indexed forms of a name and its name
+    parts, and each word of a query is matched as a prefix of a token
+    (or, for words containing punctuation, a phrase of tokens) in any
+    of them. Tokens are case folded by the FTS5 tokeniser; diacritics
+    are left to `create_name_forms`, as with `NameIndexBackend`.
+
+    """
+
+    table = 'eats_name_fts'
+
+    def __init__ (self):
+        if connection.vendor != 'sqlite':
+            raise ImproperlyConfigured(
+                'SQLiteFTSBackend requires an SQLite database')
+
+    def create_tables (self):
+        # The table is not created lazily, since SQLite does not
+        # cleanly roll back the creation of a virtual table within a
+        # savepoint.
+        connection.cursor().execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5 '
+            '(form, entity UNINDEXED, '
+            'tokenize="unicode61 remove_diacritics 0")' % self.table)
+
+    def delete_name (self, name):
+        connection.cursor().execute(
+            'DELETE FROM %s WHERE rowid = %%s' % self.table, [name.pk])
+
+    def delete_entities (self, entities):
+        if entities:
+            connection.cursor().execute(
+                'DELETE FROM %s WHERE entity IN (%s)' % (
+                    self.table, ', '.join(['%s'] * len(entities))),
+                list(entities))
+
+    def filter_entities (self, entities, words):
+        qn = connection.ops.quote_name
+        entity_id = '%s.%s' % (qn(entities.model._meta.db_table), qn('id'))
+        for word in words:
+            entities = entities.extra(
+                where=['%s IN (SELECT entity FROM %s WHERE %s MATCH %%s)' % (
+                        entity_id, self.table, self.table)],
+                params=[self.get_match_expression(word)])
+        return entities
+
+    def get_match_expression (self, word):
+        """Returns the FTS5 query expression matching `word`.
+
+        :param word: word of the search query
+        :type word: unicode string
+        :rtype: unicode string
+
+        """
+        terms = []
+        for form in sorted(create_name_forms(word)):
+            if form.strip():
+                terms.append(u'"%s"*' % form.replace(u'"', u'""'))
+        return u' OR '.join(terms) or u'""'
+
+    def merge_entities (self, entity, others):
+        if others:
+            connection.cursor().execute(
+                'UPDATE %s SET entity = %%s WHERE entity IN (%s)' % (
+                    self.table, ', '.join(['%s'] * len(others))),
+                [entity.pk] + list(others))
+
+    def update_name (self, name):
+        from eats.models import NameIndex
+        rows = NameIndex.objects.filter(name=name).values_list(
+            'entity', 'form')
+        cursor = connection.cursor()
+        cursor.execute('DELETE FROM %s WHERE rowid = %%s' % self.table,
+                       [name.pk])
+        if rows:
+            entity_id = rows[0][0]
+            forms = u' '.join([form for entity, form in rows])
+            cursor.execute(
+                'INSERT INTO %s (rowid, form, entity) VALUES (%%s, %%s, %%s)'
+                % self.table, [name.pk, forms, entity_id])
+
+
+def create_search_tables (sender, **kwargs):
+    """Creates the database tables required by the configured search
+    backend."""
+    if sender.label == 'eats':
+        get_search_backend().create_tables()
+
+post_migrate.connect(create_search_tables)
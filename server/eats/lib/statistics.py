@@ -0,0 +1,208 @@
+"""Computation of the statistics about the entities in EATS.
+
+Each section of the statistics is computed with a single grouped
+query (or a few, for date coverage), rather than a count for each
+combination of authority and type, and stored as a
+`StatisticsSnapshot`. Property assertion writes mark the sections they
+affect as out of date; a section is recomputed when it is requested,
+if it has been out of date for longer than the
+EATS_STATISTICS_MAX_STALENESS setting (in seconds), or by the
+eats_refresh_statistics management command.
+
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from tmapi.models import Association, Occurrence, Role
+
+from eats.models import Entity, NameCache, StatisticsSnapshot
+from eats.models.statistics_snapshot import STATISTICS_SECTIONS
+
+
+DEFAULT_STATISTICS_MAX_STALENESS = 300
+
+# Columns of the date coverage section.
+ALL_ASSERTIONS = 'all'
+DATED_ASSERTIONS = 'dated'
+
+
+class StatisticsEngine (object):
+
+    def __init__ (self, topic_map):
+        self.topic_map = topic_map
+
+    def compute (self, section):
+        """Returns the counts making up `section` of the statistics.
+
+        :param section: name of the section
+        :type section: `str`
+        :rtype: `list` of (row, column, count) `tuple`s
+
+        """
+        return getattr(self, '_compute_' + section)()
+
+    def _compute_assertions_per_entity (self):
+        """Returns the number of entities having each number of
+        property assertions, keyed by that number."""
+        tm = self.topic_map
+        role_type = Role._meta.get_field('type').column
+        association_type = Association._meta.get_field('type').column
+        occurrence_type = Occurrence._meta.get_field('type').column
+        role_types = [tm.entity_role_type.pk, tm.domain_entity_role_type.pk,
+                      tm.range_entity_role_type.pk]
+        association_types = [
+            tm.entity_relationship_assertion_type.pk,
+            tm.entity_type_assertion_type.pk,
+            tm.existence_assertion_type.pk, tm.name_assertion_type.pk]
+        occurrence_types = [tm.note_assertion_type.pk,
+                            tm.subject_identifier_assertion_type.pk]
+        qn = connection.ops.quote_name
+        sql = '''SELECT total, COUNT(*) FROM (
+                   SELECT entity, SUM(number) AS total FROM (
+                     SELECT r.%(player)s AS entity, COUNT(*) AS number
+                     FROM %(role)s r INNER JOIN %(association)s a
+                       ON r.%(parent)s = a.%(id)s
+                     WHERE r.%(role_type)s IN (%(role_types)s)
+                       AND a.%(association_type)s IN (%(association_types)s)
+                     GROUP BY r.%(player)s
+                     UNION ALL
+                     SELECT o.%(topic)s AS entity, COUNT(*) AS number
+                     FROM %(occurrence)s o
+                     WHERE o.%(occurrence_type)s IN (%(occurrence_types)s)
+                     GROUP BY o.%(topic)s
+                   ) numbers GROUP BY entity
+                 ) totals GROUP BY total''' % {
+            'association': qn(Association._meta.db_table),
+            'association_type': qn(association_type),
+            'association_types': ', '.join(['%s'] * len(association_types)),
+            'id': qn('id'),
+            'occurrence': qn(Occurrence._meta.db_table),
+            'occurrence_type': qn(occurrence_type),
+            'occurrence_types': ', '.join(['%s'] * len(occurrence_types)),
+            'parent': qn(Role._meta.get_field('association').column),
+            'player': qn(Role._meta.get_field('player').column),
+            'role': qn(Role._meta.db_table),
+            'role_type': qn(role_type),
+            'role_types': ', '.join(['%s'] * len(role_types)),
+            'topic': qn(Occurrence._meta.get_field('topic').column)}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, role_types + association_types +
+                           occurrence_types)
+            rows = cursor.fetchall()
+        counts = [(int(total), None, count) for total, count in rows]
+        without = Entity.objects.count() - sum([count for total, column, count
+                                                in counts])
+        if without:
+            counts.append((0, None, without))
+        return sorted(counts)
+
+    def _compute_date_coverage (self):
+        """Returns the number of property assertions of each kind, and
+        the number of those that have dates."""
+        tm = self.topic_map
+        kinds = {tm.entity_relationship_assertion_type.pk:
+                     'entity_relationship',
+                 tm.entity_type_assertion_type.pk: 'entity_type',
+                 tm.existence_assertion_type.pk: 'existence',
+                 tm.name_assertion_type.pk: 'name',
+                 tm.note_assertion_type.pk: 'note',
+                 tm.subject_identifier_assertion_type.pk:
+                     'subject_identifier'}
+        associations = Association.objects.filter(type__in=kinds.keys())
+        occurrences = Occurrence.objects.filter(type__in=kinds.keys())
+        counts = []
+        for column, queryset in (
+            (ALL_ASSERTIONS, associations),
+            (DATED_ASSERTIONS, associations.filter(
+                    roles__type=tm.date_role_type)),
+            (ALL_ASSERTIONS, occurrences)):
+            for kind, count in queryset.values_list('type').annotate(
+                count=Count('pk', distinct=True)).order_by():
+                counts.append((kinds[kind], column, count))
+        return counts
+
+    def _compute_entities (self):
+        """Returns the number of entities."""
+        return [(None, None, Entity.objects.count())]
+
+    def _compute_entity_relationship_types (self):
+        """Returns the number of entity relationship property
+        assertions, keyed by authority and relationship type."""
+        return self._count_by_authority(
+            self.topic_map.entity_relationship_assertion_type,
+            self.topic_map.entity_relationship_type_role_type)
+
+    def _compute_entity_types (self):
+        """Returns the number of entity type property assertions,
+        keyed by authority and entity type."""
+        return self._count_by_authority(
+            self.topic_map.entity_type_assertion_type,
+            self.topic_map.property_role_type)
+
+    def _compute_name_languages_scripts (self):
+        """Returns the number of names, keyed by language and
+        script."""
+        return list(NameCache.objects.values_list(
+                'language', 'script').annotate(count=Count('pk')).order_by())
+
+    def _count_by_authority (self, assertion_type, role_type):
+        """Returns the number of property assertions of
+        `assertion_type`, keyed by their authority and the player of
+        their role of `role_type`.
+
+        :rtype: `list` of (row, column, count) `tuple`s
+
+        """
+        return list(Association.objects.filter(
+                type=assertion_type, roles__type=role_type,
+                scope__types=self.topic_map.authority_type).values_list(
+                'scope', 'roles__player').annotate(
+                count=Count('pk', distinct=True)).order_by())
+
+    def get_snapshots (self, max_staleness=None):
+        """Returns the snapshots of each section of the statistics,
+        computing those that have never been computed, and recomputing
+        those that have been out of date for more than
+        `max_staleness` seconds.
+
+        :param max_staleness: number of seconds a snapshot may be out
+          of date before it is recomputed; defaults to the
+          EATS_STATISTICS_MAX_STALENESS setting
+        :type max_staleness: int
+        :rtype: `dict` of `StatisticsSnapshot`s keyed by section
+
+        """
+        if max_staleness is None:
+            max_staleness = getattr(settings, 'EATS_STATISTICS_MAX_STALENESS',
+                                    DEFAULT_STATISTICS_MAX_STALENESS)
+        limit = timezone.now() - datetime.timedelta(seconds=max_staleness)
+        snapshots = dict([(snapshot.section, snapshot) for snapshot in
+                          StatisticsSnapshot.objects.all()])
+        sections = [section for section in STATISTICS_SECTIONS if
+                    section not in snapshots or
+                    (snapshots[section].is_stale and
+                     snapshots[section].stale_since <= limit)]
+        snapshots.update(self.refresh(sections))
+        return snapshots
+
+    def refresh (self, sections=STATISTICS_SECTIONS):
+        """Computes and stores `sections` of the statistics, returning
+        their snapshots.
+
+        :param sections: names of the sections to refresh
+        :type sections: sequence of `str`
+        :rtype: `dict` of `StatisticsSnapshot`s keyed by section
+
+        """
+        snapshots = {}
+        for section in sections:
+            computed = timezone.now()
+            version = StatisticsSnapshot.objects.get_version(section)
+            snapshots[section] = StatisticsSnapshot.objects.record(
+                section, self.compute(section), computed, version)
+        return snapshots
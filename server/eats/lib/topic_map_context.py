@@ -0,0 +1,104 @@
+"""Request-scoped sharing of the EATS topic map.
+
+Within an active `TopicMapContext`, the EATS topic map is fetched
+from the database at most once, and that single instance is handed
+to the view, to the model managers and to every model instance that
+needs it. Outside of a context, the topic map is fetched as before.
+
+"""
+
+import threading
+
+from django.conf import settings
+
+
+_local = threading.local()
+
+
+class TopicMapContext (object):
+
+    """Holder for the EATS topic map shared during a request.
+
+    A context is activated either by using it as a context manager,
+    or by calling `activate` and `deactivate`.
+
+    """
+
+    def __init__ (self, topic_map=None):
+        self.topic_map = topic_map
+        # Catalogue of infrastructure admin names and codes, created
+        # on first use within this context.
+        self.infrastructure_catalogue = None
+        self.fetches = 0
+        self.fetches_avoided = 0
+        # Primary keys of the authorities whose cached component
+        # profiles have been checked as current in this context.
+        self.checked_authority_profiles = set()
+        # Authority profiles loaded inside a transaction, which are
+        # not shared with the process-wide cache.
+        self.authority_profiles = {}
+        self.authority_profile_loads = 0
+        self.component_validations = 0
+
+    def __enter__ (self):
+        self.activate()
+        return self
+
+    def __exit__ (self, exc_type, exc_value, traceback):
+        self.deactivate()
+
+    def activate (self):
+        _get_stack().append(self)
+
+    def deactivate (self):
+        stack = _get_stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+
+
+def _get_stack ():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def get_current_context ():
+    """Returns the currently active `TopicMapContext`, or None.
+
+    :rtype: `TopicMapContext`
+
+    """
+    stack = _get_stack()
+    if stack:
+        return stack[-1]
+    return None
+
+
+def get_eats_topic_map (topic_map_id=None):
+    """Returns the EATS topic map.
+
+    If `topic_map_id` is specified, the topic map with that primary
+    key is returned; otherwise the topic map identified by the
+    EATS_TOPIC_MAP setting is returned.
+
+    :param topic_map_id: primary key of the topic map
+    :type topic_map_id: int
+    :rtype: `EATSTopicMap`
+
+    """
+    context = get_current_context()
+    if context is not None and context.topic_map is not None and \
+            topic_map_id in (None, context.topic_map.pk):
+        context.fetches_avoided += 1
+        return context.topic_map
+    from eats.models import EATSTopicMap
+    if topic_map_id is None:
+        topic_map = EATSTopicMap.objects.get(iri=settings.EATS_TOPIC_MAP)
+    else:
+        topic_map = EATSTopicMap.objects.get(pk=topic_map_id)
+    if context is not None:
+        context.fetches += 1
+        if context.topic_map is None and \
+                topic_map.iri == settings.EATS_TOPIC_MAP:
+            context.topic_map = topic_map
+    return topic_map
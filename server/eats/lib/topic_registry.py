@@ -0,0 +1,153 @@
+"""Process-local registry of the well-known topics in an EATS topic
+map.
+
+The EATS ontology is expressed through a fixed set of topics
+(entity type, name role type, property role type, etc), each
+identified by one of the subject identifiers defined in
+`eats.constants`. These are looked up extremely frequently, so the
+registry resolves all of them in a single query per topic map and
+keeps the results in memory for the life of the process.
+
+The registry is cleared whenever a topic map is created or deleted.
+
+"""
+
+import threading
+
+from django.db.models.signals import post_delete, post_save
+
+from tmapi.models import SubjectIdentifier, TopicMap
+
+from eats import constants
+
+
+def get_well_known_iris ():
+    """Returns the set of well-known subject identifiers defined in
+    `eats.constants`.
+
+    :rtype: `frozenset` of strings
+
+    """
+    iris = set()
+    for name in dir(constants):
+        value = getattr(constants, name)
+        if isinstance(value, basestring) and \
+                value.startswith(constants.EATS_BASE_IRI) and \
+                value != constants.EATS_BASE_IRI:
+            iris.add(value)
+    return frozenset(iris)
+
+
+class TopicRegistry (object):
+
+    def __init__ (self, iris):
+        self._iris = frozenset(iris)
+        self._lock = threading.Lock()
+        self._topics = {}
+        self.reset_statistics()
+
+    def add (self, topic_map, address, topic):
+        """Adds `topic` to the registry as the topic in `topic_map`
+        with the subject identifier `address`.
+
+        Topics whose subject identifier is not one of the well-known
+        IRIs are not stored.
+
+        :param topic_map: the topic map containing `topic`
+        :type topic_map: `TopicMap`
+        :param address: subject identifier of `topic`
+        :type address: string
+        :param topic: the topic to register
+        :type topic: `Topic`
+
+        """
+        if address not in self._iris:
+            return
+        with self._lock:
+            topics = self._topics.get(topic_map.pk)
+            if topics is not None:
+                topics[address] = topic
+
+    def clear (self):
+        """Removes all topics from the registry."""
+        with self._lock:
+            self._topics = {}
+
+    def get (self, topic_map, address):
+        """Returns the topic in `topic_map` with the subject
+        identifier `address`, or None if it is not in the registry.
+
+        On the first request for `topic_map`, all of the well-known
+        topics in it are loaded in a single query.
+
+        :param topic_map: the topic map containing the topic
+        :type topic_map: `TopicMap`
+        :param address: subject identifier of the topic
+        :type address: string
+        :rtype: `Topic` or None
+
+        """
+        if address not in self._iris:
+            return None
+        with self._lock:
+            topics = self._topics.get(topic_map.pk)
+            if topics is None:
+                topics = self._load(topic_map)
+            topic = topics.get(address)
+            if topic is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return topic
+
+    def get_statistics (self):
+        """Returns the hit, miss and load counts of the registry.
+
+        :rtype: `dict`
+
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'loads': self.loads}
+
+    def _load (self, topic_map):
+        """Loads and returns the well-known topics in `topic_map`.
+
+        The caller must hold the registry lock.
+
+        :param topic_map: the topic map to load from
+        :type topic_map: `TopicMap`
+        :rtype: `dict`
+
+        """
+        topics = {}
+        identifiers = SubjectIdentifier.objects.filter(
+            containing_topic_map=topic_map,
+            address__in=self._iris).select_related('topic')
+        for identifier in identifiers:
+            topics[identifier.address] = identifier.topic
+        self._topics[topic_map.pk] = topics
+        self.loads += 1
+        return topics
+
+    def reset_statistics (self):
+        """Resets the hit, miss and load counts to zero."""
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+
+topic_registry = TopicRegistry(get_well_known_iris())
+
+
+def _clear_topic_registry (sender, instance, **kwargs):
+    if kwargs.get('created', True):
+        topic_registry.clear()
+
+# Receivers are connected only for topic maps (saved either as
+# themselves or through the EATS proxy), so that saves and deletes of
+# other models are not slowed by them.
+for sender in (TopicMap, 'eats.EATSTopicMap'):
+    post_save.connect(_clear_topic_registry, sender=sender,
+                      dispatch_uid='eats_topic_registry_save')
+    post_delete.connect(_clear_topic_registry, sender=sender,
+                        dispatch_uid='eats_topic_registry_delete')
@@ -3,14 +3,15 @@ from selectable.registry import registry
 
 from eats.constants import UNNAMED_ENTITY_NAME
 from eats.decorators import add_topic_map
-from eats.models import Entity
+from eats.lib.entity_search import EntitySearch
+from eats.models import Entity, NameCache
 
 
 class EntityLookup (LookupBase):
 
     @add_topic_map
     def get_query (self, topic_map, request, term):
-        return topic_map.lookup_entities(term)
+        return EntitySearch(term).get_ranked_queryset()
 
     def get_item (self, value):
         return Entity.objects.get_by_identifier(value)
@@ -19,19 +20,21 @@ class EntityLookup (LookupBase):
         return item.get_id()
 
     def get_item_label (self, item):
-        name_assertion = item.get_preferred_name(None, None, None)
-        if name_assertion:
-            label = name_assertion.name.assembled_form
-        else:
-            label = UNNAMED_ENTITY_NAME
-        return label
+        name_forms = getattr(self, '_name_forms', {})
+        if item.pk not in name_forms:
+            name_forms = NameCache.objects.get_preferred_forms(
+                [item], None, None, None)
+        return name_forms.get(item.pk, UNNAMED_ENTITY_NAME)
 
     def get_item_value (self, item):
-        name_assertion = item.get_preferred_name(None, None, None)
-        if name_assertion:
-            label = name_assertion.name.assembled_form
-        else:
-            label = UNNAMED_ENTITY_NAME
-        return label
+        return self.get_item_label(item)
+
+    def paginate_results (self, results, options):
+        page = super(EntityLookup, self).paginate_results(results, options)
+        # Fetch the names of all of the entities in the page at once,
+        # for use by get_item_label and get_item_value.
+        self._name_forms = NameCache.objects.get_preferred_forms(
+            page.object_list, None, None, None)
+        return page
 
 registry.register(EntityLookup)
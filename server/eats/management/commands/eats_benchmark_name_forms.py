@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""Django management command to measure the throughput of name
+normalisation on synthetic names in several scripts.
+
+Each run is timed over the same names: the unmemoised normaliser,
+which shows the cost of normalising a name never seen before; the
+memoised normaliser, as used when indexing and searching; and the
+batch API.
+
+"""
+
+import random
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from eats.lib.name_form import NameNormaliser
+
+
+# Syllables of names in each script, with the language and script
+# codes of the names.
+SCRIPTS = (
+    ('en', 'Latn', [u'al', u'an', u'bar', u'bel', u'cor', u'dan', u'el',
+                    u'fer', u'gar', u'hal', u'jon', u'mar', u'wil', u'yor']),
+    ('mi', 'Latn', [u'mā', u'o', u'ri', u'wha', u'ka', u'tū', u'ngā',
+                    u'rō', u'pē', u'hī']),
+    ('fr', 'Latn', [u'fran', u'çois', u'é', u'lo', u'ïse', u'œu', u'vre',
+                    u'mè', u're', u'dé']),
+    ('de', 'Latn', [u'schlo', u'ß', u'mül', u'ler', u'grü', u'ne', u'bä',
+                    u'cker']),
+    ('el', 'Grek', [u'αλ', u'εξ', u'αν', u'δρ', u'ος', u'σω', u'κρά', u'της',
+                    u'ώ']),
+    ('ru', 'Cyrl', [u'ив', u'ан', u'ов', u'пёт', u'р', u'ще', u'дрин',
+                    u'ский']),
+    ('ar', 'Arab', [u'مح', u'مد', u'عب', u'د', u'ال', u'له', u'ابن', u'رشد']),
+    )
+PUNCTUATION = [u'', u'', u'', u'.', u',', u'-', u"'", u'’', u'(', u')']
+
+
+class Command (BaseCommand):
+
+    args = '[<size> ...]'
+    help = 'Benchmarks name normalisation on the given numbers of mixed-script names (default: 1000000).'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--distinct', default=50000, type='int',
+                    help='Number of distinct names to draw the names from'),
+        )
+
+    def handle (self, *args, **options):
+        sizes = [int(size) for size in args] or [1000000]
+        random.seed(0)
+        for size in sizes:
+            self._benchmark(size, options['distinct'])
+
+    def _benchmark (self, size, distinct):
+        distinct_names = [self._make_name() for i in xrange(distinct)]
+        names = [random.choice(distinct_names) for i in xrange(size)]
+        self.stdout.write('%d names (%d distinct)' % (size, distinct))
+        self._time('unmemoised', size, lambda: self._normalise(
+                NameNormaliser(cache_size=0), names))
+        self._time('memoised', size, lambda: self._normalise(
+                NameNormaliser(), names))
+        # Names are normalised in batches sharing a language and
+        # script.
+        groups = {}
+        for language_code, script_code, name in names:
+            groups.setdefault((language_code, script_code), []).append(name)
+        self._time('batch', size, lambda: self._normalise_batch(
+                NameNormaliser(), groups))
+
+    def _make_name (self):
+        language_code, script_code, syllables = random.choice(SCRIPTS)
+        words = []
+        for i in range(random.randint(1, 3)):
+            word = u''.join([random.choice(syllables) for j in
+                             range(random.randint(1, 3))])
+            words.append(word.capitalize() + random.choice(PUNCTUATION))
+        return language_code, script_code, u' '.join(words)
+
+    def _normalise (self, normaliser, names):
+        for language_code, script_code, name in names:
+            normaliser.create_name_forms(name, language_code, script_code)
+
+    def _normalise_batch (self, normaliser, groups):
+        for (language_code, script_code), names in groups.items():
+            normaliser.create_name_forms_batch(names, language_code,
+                                               script_code)
+
+    def _time (self, label, size, function):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        self.stdout.write('  %-10s %8.2fs  %10.0f names/sec' % (
+                label, elapsed, size / max(elapsed, 0.001)))
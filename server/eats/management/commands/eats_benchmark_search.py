@@ -0,0 +1,272 @@
+"""Django management command to compare the performance of the name
+search backends on synthetic data.
+
+The benchmark runs against a test database, created (and destroyed)
+as the test runner does, so that the project's data is untouched, and
+each backend's `filter_entities` is timed on the queryset of all
+entities, as used by `EntitySearch`.
+
+Importing the synthetic entities through the streaming EATSML
+importer creates everything an entity has, but is too slow for the
+sizes at which the backends differ. By default, therefore, only the
+rows that the backends read are created, in bulk: the topics of the
+entities and their names, without the associations that make up
+their property assertions, and the names' index entries, built as
+`Name.build_name_index` builds them.
+
+The query that `NameIndexBackend` made before the name index had a
+key, matching the unindexed form, is timed alongside the backends.
+
+"""
+
+import os
+import random
+import tempfile
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from lxml import etree
+
+from tmapi.models import Identifier, Topic, TopicMapSystemFactory
+
+from eats.constants import EATS, XML
+from eats.lib.eatsml_bulk_importer import PrimaryKeyAllocator
+from eats.lib.eatsml_exporter import EATSMLExporter, NSMAP
+from eats.lib.eatsml_stream_importer import EATSMLStreamImporter
+from eats.lib.name_form import create_name_forms, create_name_forms_batch
+from eats.lib.search_backends import NameIndexBackend, SQLiteFTSBackend
+from eats.models import EATSTopicMap, EATSUser, Entity, Name, NameIndex
+
+
+SYLLABLES = ['al', 'an', 'bar', 'bel', 'cor', 'dan', 'el', 'fer', 'gar',
+             'hal', 'is', 'jon', 'kar', 'lin', 'mar', 'nor', 'ol', 'per',
+             'ric', 'sam', 'ter', 'ul', 'van', 'wil', 'yor', 'zan']
+
+QUERIES = ['mar', 'wil jon', 'bel', 'alan', 'zanzan', 'k']
+
+# Number of names created in each bulk insert.
+BATCH_SIZE = 10000
+
+
+class FormPrefixBackend (NameIndexBackend):
+
+    """Backend matching each word as a case-insensitive prefix of the
+    forms in `NameIndex`, as `NameIndexBackend` did before the name
+    index had a key."""
+
+    def filter_entities (self, entities, words):
+        for word_forms in create_name_forms_batch(words):
+            query = Q()
+            for form in word_forms:
+                if form:
+                    query = query | Q(form__istartswith=form)
+            entities = entities.filter(
+                pk__in=NameIndex.objects.filter(query).values('entity'))
+        return entities
+
+
+class Command (BaseCommand):
+
+    args = '[<size> ...]'
+    help = 'Benchmarks the name search backends against a test database holding the given numbers of names, two to an entity (default: 100000 400000 1000000 4000000; 400000 and 4000000 names give about 1 and 10 million name index rows).'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--import', action='store_true', dest='import',
+                    default=False,
+                    help='Create the entities through the EATSML importer, rather than only the rows searched (much slower)'),
+        make_option('--noinput', action='store_false', dest='interactive',
+                    default=True,
+                    help='Delete an existing test database without asking'),
+        make_option('--repeat', default=5, type='int',
+                    help='Number of times to run each query'),
+        )
+
+    def handle (self, *args, **options):
+        sizes = sorted([int(size) for size in args] or
+                       [100000, 400000, 1000000, 4000000])
+        random.seed(0)
+        old_name = connection.settings_dict['NAME']
+        # As with the test runner, an existing test database is
+        # deleted only once the user has agreed to it.
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=not options['interactive'],
+            serialize=False)
+        try:
+            self._benchmark(sizes, options['import'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _benchmark (self, sizes, use_importer, repeat):
+        topic_map = self._create_topic_map()
+        user = EATSUser.objects.create(user=User.objects.create_user(
+                'benchmark', 'benchmark@example.org', 'benchmark'))
+        backends = [('form', FormPrefixBackend()),
+                    ('key', NameIndexBackend())]
+        if connection.vendor == 'sqlite':
+            backends.append(('fts5', SQLiteFTSBackend()))
+        for label, backend in backends:
+            backend.create_tables()
+        infrastructure = EATSMLExporter(topic_map).export_infrastructure(
+            ).getroot()
+        count = 0
+        # The database is populated up to each size in turn.
+        for size in sizes:
+            start = time.time()
+            if use_importer:
+                self._import(topic_map, user, infrastructure, count, size,
+                             backends)
+            else:
+                self._insert(topic_map, count, size, backends)
+            count = size
+            self.stdout.write(
+                '%d entities, %d names, %d name index rows (populated in '
+                '%.1fs)' % (Entity.objects.count(), Name.objects.count(),
+                            NameIndex.objects.count(), time.time() - start))
+            for query in QUERIES:
+                words = [unicode(word) for word in query.split()]
+                timings = []
+                for label, backend in backends:
+                    timing, matches = self._time(backend, words, repeat)
+                    timings.append('%s: %8.2fms (%d)' % (label, timing,
+                                                         matches))
+                self.stdout.write('  %-10s %s' % (query, '  '.join(timings)))
+
+    def _create_topic_map (self):
+        """Returns a new topic map, with the infrastructure used by
+        the synthetic entities.
+
+        :rtype: `EATSTopicMap`
+
+        """
+        factory = TopicMapSystemFactory.new_instance()
+        factory.new_topic_map_system().create_topic_map(settings.EATS_TOPIC_MAP)
+        topic_map = EATSTopicMap.objects.get(iri=settings.EATS_TOPIC_MAP)
+        authority = topic_map.create_authority('Benchmark')
+        authority.set_languages([topic_map.create_language('English', 'en')])
+        authority.set_name_types([topic_map.create_name_type('regular')])
+        authority.set_scripts([topic_map.create_script('Latin', 'Latn', ' ')])
+        return topic_map
+
+    def _import (self, topic_map, user, infrastructure, start, end,
+                 backends):
+        """Imports the synthetic entities with the names numbered from
+        `start` up to `end`, and adds their names to the index of each
+        of `backends`."""
+        references = {}
+        for element in infrastructure.iter():
+            reference = element.tag[len(EATS):]
+            xml_id = element.get(XML + 'id')
+            if xml_id and reference in ('authority', 'language', 'name_type',
+                                        'script'):
+                references[reference] = xml_id
+        last_name = Name.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        source = tempfile.TemporaryFile()
+        output = open(os.devnull, 'w')
+        try:
+            with etree.xmlfile(source, encoding='utf-8') as xml_file:
+                with xml_file.element(EATS + 'collection', nsmap=NSMAP):
+                    for element in infrastructure:
+                        xml_file.write(element)
+                    with xml_file.element(EATS + 'entities'):
+                        for index in xrange(start // 2 + 1, end // 2 + 1):
+                            xml_file.write(self._make_entity(index,
+                                                             references))
+            source.seek(0)
+            with transaction.atomic():
+                EATSMLStreamImporter(topic_map).import_file(
+                    source, output, output, user)
+                # The import updates only the configured backend's
+                # index.
+                for name in Name.objects.filter(pk__gt=last_name).iterator():
+                    for label, backend in backends:
+                        backend.update_name(name)
+        finally:
+            source.close()
+            output.close()
+
+    def _insert (self, topic_map, start, end, backends):
+        """Creates, in bulk, the rows searched for the synthetic names
+        numbered from `start` up to `end`, and adds the names to the
+        index of each of `backends`."""
+        entity_type = topic_map.entity_type
+        name_type = topic_map.name_type
+        entity = None
+        with transaction.atomic():
+            allocator = PrimaryKeyAllocator(BATCH_SIZE)
+            for batch_start in xrange(start, end, BATCH_SIZE):
+                rows = {Identifier: [], Topic: [], Topic.types.through: [],
+                        NameIndex: []}
+
+                def create_topic (topic_type, proxy):
+                    identifier = Identifier(
+                        pk=allocator.allocate(Identifier),
+                        containing_topic_map_id=topic_map.pk)
+                    topic = proxy(pk=allocator.allocate(Topic),
+                                  identifier=identifier, topic_map=topic_map)
+                    rows[Identifier].append(identifier)
+                    rows[Topic].append(topic)
+                    rows[Topic.types.through].append(Topic.types.through(
+                            from_topic=topic, to_topic=topic_type))
+                    return topic
+
+                names = []
+                for index in xrange(batch_start,
+                                    min(batch_start + BATCH_SIZE, end)):
+                    # Each entity has two names.
+                    if entity is None or index % 2 == 0:
+                        entity = create_topic(entity_type, Entity)
+                    name = create_topic(name_type, Name)
+                    names.append(name)
+                    parts = []
+                    for form in create_name_forms(self._make_name(), 'en',
+                                                  'Latn'):
+                        parts.extend(form.split())
+                    rows[NameIndex].extend(NameIndex.objects.build_rows(
+                            parts, entity_id=entity.pk, name_id=name.pk))
+                for model in (Identifier, Topic, Topic.types.through,
+                              NameIndex):
+                    model.objects.bulk_create(rows[model])
+                for name in names:
+                    for label, backend in backends:
+                        backend.update_name(name)
+            allocator.reset_sequences()
+
+    def _make_entity (self, index, references):
+        """Returns an EATSML entity element with two names.
+
+        :rtype: `Element`
+
+        """
+        entity = etree.Element(EATS + 'entity')
+        entity.set(XML + 'id', 'entity-%d' % index)
+        names = etree.SubElement(entity, EATS + 'names')
+        for i in range(2):
+            name = etree.SubElement(names, EATS + 'name', references)
+            name.set('is_preferred', 'true' if i == 0 else 'false')
+            etree.SubElement(name, EATS + 'display_form').text = \
+                self._make_name()
+        return entity
+
+    def _make_name (self):
+        return u' '.join([self._make_word() for i in
+                          range(random.randint(2, 3))])
+
+    def _make_word (self):
+        return u''.join([random.choice(SYLLABLES) for i in
+                         range(random.randint(1, 3))]).capitalize()
+
+    def _time (self, backend, words, repeat):
+        timings = []
+        for i in range(repeat):
+            start = time.time()
+            count = backend.filter_entities(Entity.objects.all(),
+                                            words).count()
+            timings.append(time.time() - start)
+        return min(timings) * 1000, count
@@ -0,0 +1,27 @@
+"""Django management command to find entities that are likely to be
+duplicates."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from eats.lib.duplicate_detection import DuplicateFinder
+
+
+class Command (BaseCommand):
+
+    help = 'Finds entities that are likely to be duplicates of each other, replacing the ranked list of duplicate candidates.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', default=1000, type='int',
+                    help='Number of entities in each batch'),
+        make_option('--processes', default=1, type='int',
+                    help='Number of worker processes to use'),
+        )
+
+    def handle (self, *args, **options):
+        finder = DuplicateFinder(batch_size=options['batch_size'],
+                                 processes=options['processes'],
+                                 stdout=self.stdout)
+        total = finder.find()
+        self.stdout.write('Found %d duplicate candidates.' % total)
@@ -0,0 +1,58 @@
+"""Django management command to carry out queued EATSML imports."""
+
+from optparse import make_option
+import os.path
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from eats.exceptions import EATSImportLeaseException
+from eats.lib.eatsml_bulk_importer import ENTITY_CHUNK_SIZE
+from eats.lib.eatsml_import_job import EATSMLImportJob, LEASE_DURATION, \
+    claim_next_import
+from eats.lib.topic_map_context import get_eats_topic_map
+
+
+class Command (BaseCommand):
+
+    help = 'Carries out queued EATSML imports, resuming any that were interrupted.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--chunk-size', default=ENTITY_CHUNK_SIZE, type='int',
+                    help='Number of entities to import and commit at a time'),
+        make_option('--work-dir',
+                    default=os.path.join(tempfile.gettempdir(), 'eats-imports'),
+                    help='Directory in which to keep the working files of imports in progress; it must be kept for an interrupted import to be resumed'),
+        make_option('--lease', default=LEASE_DURATION, type='int',
+                    help='Seconds after the last progress recorded on a running import that it is taken to have been abandoned, and is resumed; it must be longer than it takes to import a chunk'),
+        make_option('--poll', default=0, type='int',
+                    help='Seconds to wait before checking again for queued imports; by default, exit once there are none'),
+        )
+
+    def handle (self, *args, **options):
+        topic_map = get_eats_topic_map()
+        while True:
+            eatsml_import = claim_next_import(options['lease'])
+            if eatsml_import is None:
+                if not options['poll']:
+                    return
+                time.sleep(options['poll'])
+                continue
+            self.stdout.write('Importing %d: %s' % (eatsml_import.pk,
+                                                   eatsml_import.description))
+            job = EATSMLImportJob(eatsml_import, topic_map,
+                                  options['work_dir'], options['chunk_size'],
+                                  self.stdout)
+            try:
+                completed = job.run()
+            except EATSImportLeaseException:
+                self.stdout.write('Import %d was claimed by another worker.'
+                                  % eatsml_import.pk)
+                continue
+            if completed:
+                self.stdout.write('Completed import %d.' % eatsml_import.pk)
+            else:
+                eatsml_import.refresh_from_db()
+                self.stdout.write('Import %d failed: %s' % (
+                        eatsml_import.pk, eatsml_import.error))
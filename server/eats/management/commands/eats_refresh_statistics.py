@@ -0,0 +1,33 @@
+"""Django management command to recompute the statistics shown on
+the statistics page."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from eats.lib.statistics import StatisticsEngine
+from eats.lib.topic_map_context import get_eats_topic_map
+from eats.models import StatisticsSnapshot
+from eats.models.statistics_snapshot import STATISTICS_SECTIONS
+
+
+class Command (BaseCommand):
+
+    help = 'Recomputes the sections of the statistics that are out of date, or all of them.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--all', action='store_true', default=False,
+                    help='Recompute all sections, not only those that are out of date'),
+        )
+
+    def handle (self, *args, **options):
+        sections = STATISTICS_SECTIONS
+        if not options['all']:
+            current = list(StatisticsSnapshot.objects.filter(
+                    stale_since__isnull=True).values_list(
+                    'section', flat=True))
+            sections = [section for section in sections if
+                        section not in current]
+        engine = StatisticsEngine(get_eats_topic_map())
+        for section in engine.refresh(sections):
+            self.stdout.write('Recomputed %s.' % section)
@@ -1,22 +1,62 @@
-"""Django management command to regenerate the name index and cache."""
+"""Django management command to regenerate the name and date indexes
+and caches."""
+
+from optparse import make_option
 
 from django.core.management.base import BaseCommand
 
-from eats.models import EntityRelationshipPropertyAssertion, Name
+from eats.lib.reindex import CacheRebuilder, NameVariantReindexer, record_name_variant_signatures
+from eats.models import Date, DateIndex, Entity, EntityRelationshipPropertyAssertion, EntitySummary, Name
 
 
 class Command (BaseCommand):
 
-    help = 'Regenerates the name index and cache, and the entity relationship cache.'
+    help = 'Regenerates the name index and cache, the date index, the entity relationship cache, and the entity summaries.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--bulk', action='store_true', default=False,
+                    help='Empty the caches and repopulate them in batches; entity summaries are regenerated as they are next requested'),
+        make_option('--batch-size', default=1000, type='int',
+                    help='Number of names, relationships or dates in each batch (with --bulk or --variants)'),
+        make_option('--processes', default=1, type='int',
+                    help='Number of worker processes to use (with --bulk or --variants)'),
+        make_option('--checkpoint',
+                    help='File in which to record progress, allowing an interrupted rebuild to be resumed (with --bulk)'),
+        make_option('--variants', action='store_true', default=False,
+                    help='Regenerate the name index and cache only for names in languages and scripts whose name variant generators have changed'),
+        )
 
     def handle (self, *args, **options):
+        if options['variants']:
+            reindexer = NameVariantReindexer(
+                batch_size=options['batch_size'],
+                processes=options['processes'], stdout=self.stdout)
+            reindexer.rebuild()
+            return
+        if options['bulk']:
+            rebuilder = CacheRebuilder(
+                batch_size=options['batch_size'],
+                processes=options['processes'],
+                checkpoint_path=options['checkpoint'], stdout=self.stdout)
+            rebuilder.rebuild()
+            return
         print('Generating name index and cache.')
         for name in Name.objects.all().iterator():
             name.update_name_cache()
             name.update_name_index()
+        record_name_variant_signatures()
+
+        print('Generating date index.')
+        DateIndex.objects.all().delete()
+        for date in Date.objects.all().iterator():
+            DateIndex.objects.bulk_create(date.build_date_index())
 
         print('Generating entity relationship cache.')
         for a in EntityRelationshipPropertyAssertion.objects.all().iterator():
             a.update_relationship_cache(
-                a.entity_relationship_type, a.domain_entity, a.range_entity,
-                a.certainty)
+                a.entity_relationship_type, a.domain_entity, a.range_entity)
+
+        print('Generating entity summaries.')
+        EntitySummary.objects.all().delete()
+        for entity in Entity.objects.all().iterator():
+            EntitySummary.objects.create_for_entity(entity)
@@ -0,0 +1,25 @@
+"""Django management command to add and fill in the indexed key
+column of an existing name index."""
+
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from eats.lib.name_index_keys import NameIndexKeyUpgrader
+
+
+class Command (BaseCommand):
+
+    help = 'Adds the indexed key column to an existing name index, if it is missing, fills in the keys, and removes entries made redundant by them.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', default=10000, type='int',
+                    help='Number of name index entries in each batch'),
+        )
+
+    def handle (self, *args, **options):
+        upgrader = NameIndexKeyUpgrader(batch_size=options['batch_size'],
+                                        stdout=self.stdout)
+        counts = upgrader.upgrade()
+        self.stdout.write('Set %(updated)d keys and deleted %(deleted)d entries.'
+                          % counts)
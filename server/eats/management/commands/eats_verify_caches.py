@@ -0,0 +1,39 @@
+"""Django management command to verify, and repair, the name index
+and caches."""
+
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from eats.lib.cache_verifier import CacheVerifier
+
+
+class Command (BaseCommand):
+
+    help = 'Compares the name index and cache and the entity relationship cache with the topic map, repairing only those entries that differ, and outputs a JSON report of the differences found.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--dry-run', action='store_true', default=False,
+                    help='Report the differences without repairing them'),
+        make_option('--batch-size', default=1000, type='int',
+                    help='Number of names or relationships in each batch'),
+        make_option('--processes', default=1, type='int',
+                    help='Number of worker processes to use'),
+        make_option('--max-details', default=100, type='int',
+                    help='Maximum number of primary keys to list for each kind of difference'),
+        make_option('--report',
+                    help='File to write the report to, instead of standard output'),
+        )
+
+    def handle (self, *args, **options):
+        verifier = CacheVerifier(
+            repair=not options['dry_run'], batch_size=options['batch_size'],
+            processes=options['processes'],
+            max_details=options['max_details'])
+        report = json.dumps(verifier.verify(), indent=2, sort_keys=True)
+        if options['report']:
+            with open(options['report'], 'w') as report_file:
+                report_file.write(report)
+        else:
+            self.stdout.write(report)
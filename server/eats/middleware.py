@@ -0,0 +1,25 @@
+from eats.lib.topic_map_context import TopicMapContext
+
+
+class TopicMapMiddleware (object):
+
+    """Middleware that shares a single EATS topic map instance across
+    everything that handles a request.
+
+    The active `TopicMapContext` is available as
+    `request.eats_topic_map_context`, and records how many topic map
+    fetches were made and avoided, and how many authority component
+    validations and authority profile loads were made.
+
+    """
+
+    def process_request (self, request):
+        context = TopicMapContext()
+        context.activate()
+        request.eats_topic_map_context = context
+
+    def process_response (self, request, response):
+        context = getattr(request, 'eats_topic_map_context', None)
+        if context is not None:
+            context.deactivate()
+        return response
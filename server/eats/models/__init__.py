@@ -6,11 +6,14 @@ TMAPI application.
 """
 
 from authority import Authority
+from authority_component_version import AuthorityComponentVersion
 from calendar import Calendar
-from date import Date
-from date_part import DatePart
+from date import Date, DateForm
+from date_index import DateIndex
+from date_part import DatePart, DatePartForm
 from date_period import DatePeriod
 from date_type import DateType
+from duplicate_candidate import DuplicateCandidate
 from eats_topic_map import EATSTopicMap
 from eats_user import EATSUser
 from eatsml_import import EATSMLImport
@@ -18,6 +21,7 @@ from entity import Entity
 from entity_relationship_cache import EntityRelationshipCache
 from entity_relationship_property_assertion import EntityRelationshipPropertyAssertion
 from entity_relationship_type import EntityRelationshipType
+from entity_summary import EntitySummary
 from entity_type import EntityType
 from entity_type_property_assertion import EntityTypePropertyAssertion
 from existence_property_assertion import ExistencePropertyAssertion
@@ -30,4 +34,6 @@ from name_part_type import NamePartType
 from name_property_assertion import NamePropertyAssertion
 from note_property_assertion import NotePropertyAssertion
 from name_type import NameType
+from name_variant_signature import NameVariantSignature
 from script import Script
+from statistics_snapshot import StatisticsSnapshot
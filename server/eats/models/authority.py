@@ -1,6 +1,7 @@
 from tmapi.models import Topic
 
 from eats.exceptions import EATSValidationException
+from eats.lib.authority_profile import authority_profile_cache, invalidate_authority_profile
 
 from infrastructure_manager import InfrastructureManager
 from calendar import Calendar
@@ -219,30 +220,36 @@ class Authority (Topic, Infrastructure):
             role.remove()
         for element in new_elements:
             association.create_role(infrastructure_role_type, element)
+        invalidate_authority_profile(self)
 
     def validate_components (self, calendar=None, date_period=None,
                              date_type=None, entity_relationship_type=None,
                              entity_type=None, language=None,
                              name_part_type=None, name_type=None, script=None):
-        if calendar and calendar not in self.get_calendars():
-            raise EATSValidationException
-        if date_period and date_period not in self.get_date_periods():
-            raise EATSValidationException
-        if date_type and date_type not in self.get_date_types():
-            raise EATSValidationException
-        if entity_relationship_type and entity_relationship_type \
-                not in self.get_entity_relationship_types():
-            raise EATSValidationException
-        if entity_type and entity_type not in self.get_entity_types():
-            raise EATSValidationException
-        if language and language not in self.get_languages():
-            raise EATSValidationException
-        if name_part_type and name_part_type not in self.get_name_part_types():
-            raise EATSValidationException
-        if name_type and name_type not in self.get_name_types():
-            raise EATSValidationException
-        if script and script not in self.get_scripts():
-            raise EATSValidationException
+        components = (
+            ('calendar', calendar), ('date_period', date_period),
+            ('date_type', date_type),
+            ('entity_relationship_type', entity_relationship_type),
+            ('entity_type', entity_type), ('language', language),
+            ('name_part_type', name_part_type), ('name_type', name_type),
+            ('script', script))
+        for component_type, component in components:
+            if component and not self._has_component(component_type,
+                                                     component):
+                raise EATSValidationException
+
+    def _has_component (self, component_type, component):
+        """Returns True if `component` is available to this authority.
+
+        :param component_type: type of the component
+        :type component_type: `str`
+        :param component: infrastructure element
+        :type component: `Topic`
+        :rtype: `bool`
+
+        """
+        return authority_profile_cache.has_component(self, component_type,
+                                                     component)
 
     def _validate_element_removal (self, element_name, old_elements,
                                    new_elements):
@@ -251,52 +258,9 @@ class Authority (Topic, Infrastructure):
         property assertion asserted by this authority.
 
         """
+        from eats.lib.authority_usage import AuthorityUsageIndex
         removed = set(old_elements) - set(new_elements)
         if removed:
-            method_name = '_validate_element_removal_' + element_name
-            validate = getattr(self, method_name)
-            for element in removed:
-                if validate(element):
-                    raise EATSValidationException
-
-    def _validate_element_removal_calendar (self, element):
-        from eats.models import Date
-        return Date.objects.filter_by_authority_calendar(self, element).count()
-
-    def _validate_element_removal_date_period (self, element):
-        from eats.models import Date
-        return Date.objects.filter_by_authority_date_period(
-            self, element).count()
-
-    def _validate_element_removal_date_type (self, element):
-        from eats.models import Date
-        return Date.objects.filter_by_authority_date_type(
-            self, element).count()
-
-    def _validate_element_removal_entity_relationship_type (self, element):
-        from eats.models import EntityRelationshipPropertyAssertion
-        return EntityRelationshipPropertyAssertion.objects.filter_by_authority_entity_relationship_type(self, element).count()
-
-    def _validate_element_removal_entity_type (self, element):
-        from eats.models import EntityTypePropertyAssertion
-        return EntityTypePropertyAssertion.objects.filter_by_authority_entity_type(self, element).count()
-
-    def _validate_element_removal_language (self, element):
-        from eats.models import NamePropertyAssertion
-        return NamePropertyAssertion.objects.filter_by_authority_language(
-            self, element).count()
-
-    def _validate_element_removal_name_part_type (self, element):
-        from eats.models import NamePropertyAssertion
-        return NamePropertyAssertion.objects.filter_by_authority_name_part_type(
-            self, element).count()
-
-    def _validate_element_removal_name_type (self, element):
-        from eats.models import NamePropertyAssertion
-        return NamePropertyAssertion.objects.filter_by_authority_name_type(
-            self, element).count()
-
-    def _validate_element_removal_script (self, element):
-        from eats.models import NamePropertyAssertion
-        return NamePropertyAssertion.objects.filter_by_authority_script(
-            self, element).count()
+            usage = AuthorityUsageIndex(self).get_usage(element_name, removed)
+            if usage:
+                raise EATSValidationException
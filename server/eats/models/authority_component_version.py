@@ -0,0 +1,57 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+
+class AuthorityComponentVersionManager (models.Manager):
+
+    def get_version (self, authority):
+        """Returns the version of the components available to
+        `authority`.
+
+        :param authority: the authority, or its primary key
+        :type authority: `Authority` or int
+        :rtype: int
+
+        """
+        versions = self.filter(authority=authority).values_list(
+            'version', flat=True)
+        for version in versions:
+            return version
+        return 0
+
+    def increment (self, authority):
+        """Records that the components available to `authority` have
+        changed.
+
+        :param authority: the authority
+        :type authority: `Authority`
+
+        """
+        if self.filter(authority=authority).update(
+                version=F('version') + 1):
+            return
+        try:
+            with transaction.atomic():
+                self.create(authority=authority, version=1)
+        except IntegrityError:
+            # Another process has created the version in the meantime.
+            self.filter(authority=authority).update(
+                version=F('version') + 1)
+
+
+class AuthorityComponentVersion (models.Model):
+
+    """Model recording a version number for the set of infrastructure
+    components available to an authority, incremented whenever that
+    set changes, so that cached copies of it can be checked cheaply.
+
+    """
+
+    authority = models.OneToOneField('Authority', primary_key=True,
+                                     related_name='+')
+    version = models.PositiveIntegerField(default=0)
+
+    objects = AuthorityComponentVersionManager()
+
+    class Meta:
+        app_label = 'eats'
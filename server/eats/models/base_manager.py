@@ -1,15 +1,16 @@
-from django.conf import settings
 from django.db import models
 
+from eats.lib.topic_map_context import get_current_context, get_eats_topic_map
+
 
 class BaseManager (models.Manager):
 
     @property
     def eats_topic_map (self):
+        if get_current_context() is not None:
+            return get_eats_topic_map()
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = EATSTopicMap.objects.get(
-                iri=settings.EATS_TOPIC_MAP)
+            self._eats_topic_map = get_eats_topic_map()
         return self._eats_topic_map
 
     def get_by_identifier (self, identifier):
@@ -1,6 +1,10 @@
 from tmapi.models import Topic
 
+from eats.lib.date_bounds import get_date_bounds
+from eats.lib.topic_map_context import get_eats_topic_map
+
 from base_manager import BaseManager
+from date_index import DateIndex
 from date_part import DatePart
 from date_period import DatePeriod
 
@@ -31,6 +35,30 @@ class DateManager (BaseManager):
             roles__association__scope=authority).filter(
             names__scope=date_type)
 
+    def filter_by_range (self, start=None, end=None, assertion_type=None):
+        """Returns the dates whose extent overlaps the period from
+        `start` to `end`, using the date index.
+
+        :param start: normalised form of the (proleptic Gregorian)
+          date starting the period, or None for no lower bound
+        :type start: unicode string
+        :param end: normalised form of the (proleptic Gregorian) date
+          ending the period, or None for no upper bound
+        :type end: unicode string
+        :param assertion_type: type of property assertion to restrict
+          the dates to
+        :type assertion_type: `Topic`
+        :rtype: `QuerySet` of `Date`s
+
+        """
+        start_day = end_day = None
+        if start:
+            start_day = get_date_bounds(start)[0]
+        if end:
+            end_day = get_date_bounds(end)[1]
+        return self.filter(pk__in=DateIndex.objects.get_range_dates(
+                start_day, end_day, assertion_type))
+
     def filter_by_entity_existences (self, entity):
         date_role_type = self.eats_topic_map.date_role_type
         entity_role_type = self.eats_topic_map.entity_role_type
@@ -46,16 +74,11 @@ class DateManager (BaseManager):
             types=self.eats_topic_map.date_type)
 
 
-class Date (Topic):
-
-    objects = DateManager()
-
-    date_part_names = ('start', 'start_taq', 'start_tpq', 'end', 'end_taq',
-                       'end_tpq', 'point', 'point_taq', 'point_tpq')
+class DateForm (object):
 
-    class Meta:
-        proxy = True
-        app_label = 'eats'
+    """Provides the assembly of the string form of a date from its
+    date parts, for `Date` and for any object with the same date part
+    attributes."""
 
     @property
     def assembled_form (self):
@@ -89,6 +112,18 @@ class Date (Topic):
                 date = '%s%s' % (date, taq)
         return date
 
+
+class Date (Topic, DateForm):
+
+    objects = DateManager()
+
+    date_part_names = ('start', 'start_taq', 'start_tpq', 'end', 'end_taq',
+                       'end_tpq', 'point', 'point_taq', 'point_tpq')
+
+    class Meta:
+        proxy = True
+        app_label = 'eats'
+
     def _cache_date_part (self, attr, part_type):
         """Returns the `DatePart` with the type `part_type`, caching the
         result in `attr`.
@@ -106,6 +141,30 @@ class Date (Topic):
             setattr(self, attr, value)
         return value
 
+    def build_date_index (self):
+        """Returns new, unsaved date index entries for the date parts
+        of this date that have a value.
+
+        The dates of entity relationships are indexed against the
+        domain entity.
+
+        :rtype: `list` of `DateIndex`
+
+        """
+        assertion = self.property_assertion
+        if assertion.type == self.eats_topic_map.entity_relationship_assertion_type:
+            entity = assertion.domain_entity
+        else:
+            entity = assertion.entity
+        rows = []
+        for name in self.date_part_names:
+            row = DateIndex.objects.build_row(
+                getattr(self, name), entity=entity, date=self,
+                assertion_type=assertion.type)
+            if row is not None:
+                rows.append(row)
+        return rows
+
     def create_date_parts (self):
         """Creates date parts for this date."""
         self._start_tpq = self.create_name(
@@ -134,8 +193,7 @@ class Date (Topic):
     @property
     def eats_topic_map (self):
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = self.get_topic_map(proxy=EATSTopicMap)
+            self._eats_topic_map = get_eats_topic_map(self.topic_map_id)
         return self._eats_topic_map
 
     @property
@@ -273,6 +331,7 @@ class Date (Topic):
         return self._assertion
 
     def remove (self):
+        self.property_assertion._invalidate_entity_summary()
         for role in self.get_roles_played(self.eats_topic_map.date_role_type):
             role.remove()
         super(Date, self).remove()
@@ -307,6 +366,11 @@ class Date (Topic):
         return self._cache_date_part(
             '_start_tpq', self.eats_topic_map.start_tpq_date_type)
 
+    def update_date_index (self):
+        """Updates the date index entries for this date."""
+        DateIndex.objects.filter(date=self).delete()
+        DateIndex.objects.bulk_create(self.build_date_index())
+
     def update (self, data):
         self.period = data['date_period']
         for name in self.date_part_names:
@@ -319,3 +383,5 @@ class Date (Topic):
                 date_part.certainty = data[name+'_certainty']
             else:
                 date_part.set_value('')
+        self.update_date_index()
+        self.property_assertion._invalidate_entity_summary()
@@ -0,0 +1,96 @@
+from django.db import models
+
+from eats.lib.date_bounds import get_date_bounds, is_julian_calendar
+
+
+class DateIndexManager (models.Manager):
+
+    def build_row (self, date_part, **kwargs):
+        """Returns a new, unsaved date index entry for `date_part`, or
+        None if it has no value or its normalised form cannot be
+        read.
+
+        :param date_part: date part to index
+        :type date_part: `DatePart`
+        :rtype: `DateIndex` or None
+
+        """
+        if not date_part.get_value():
+            return None
+        try:
+            start, end = get_date_bounds(date_part.get_normalised_value(),
+                                         is_julian_calendar(date_part.calendar))
+        except ValueError:
+            return None
+        return self.model(date_part=date_part, date_part_type=date_part.type,
+                          start=start, end=end, **kwargs)
+
+    def get_range_dates (self, start=None, end=None, assertion_type=None):
+        """Returns the primary keys of the dates whose extent overlaps
+        the days from `start` to `end` (inclusive).
+
+        The extent of a date runs from the first day of its earliest
+        date part to the last day of its latest. Each bound is matched
+        by a range scan over the index of one column.
+
+        :param start: Julian Day Number of the first day, or None for
+          no lower bound
+        :type start: int
+        :param end: Julian Day Number of the last day, or None for no
+          upper bound
+        :type end: int
+        :param assertion_type: type of property assertion to restrict
+          the dates to
+        :type assertion_type: `Topic`
+        :rtype: `QuerySet`
+
+        """
+        entries = self.all()
+        if assertion_type is not None:
+            entries = entries.filter(assertion_type=assertion_type)
+        dates = entries
+        if start is not None:
+            dates = dates.filter(date__in=entries.filter(
+                    end__gte=start).values('date'))
+        if end is not None:
+            dates = dates.filter(date__in=entries.filter(
+                    start__lte=end).values('date'))
+        return dates.values('date')
+
+    def get_range_entities (self, start=None, end=None, assertion_type=None):
+        """Returns the primary keys of the entities with a date whose
+        extent overlaps the days from `start` to `end` (inclusive).
+
+        :param start: Julian Day Number of the first day, or None for
+          no lower bound
+        :type start: int
+        :param end: Julian Day Number of the last day, or None for no
+          upper bound
+        :type end: int
+        :param assertion_type: type of property assertion to restrict
+          the dates to
+        :type assertion_type: `Topic`
+        :rtype: `QuerySet`
+
+        """
+        return self.filter(date__in=self.get_range_dates(
+                start, end, assertion_type)).values('entity')
+
+
+class DateIndex (models.Model):
+
+    """The numeric bounds of a date part, as Julian Day Numbers."""
+
+    entity = models.ForeignKey('Entity', related_name='indexed_dates')
+    date = models.ForeignKey('Date', related_name='indexed_date_parts')
+    date_part = models.ForeignKey('DatePart', related_name='+')
+    date_part_type = models.ForeignKey('tmapi.Topic', related_name='+')
+    # Type of the property assertion carrying the date.
+    assertion_type = models.ForeignKey('tmapi.Topic', related_name='+')
+    start = models.IntegerField(db_index=True)
+    end = models.IntegerField(db_index=True)
+
+    objects = DateIndexManager()
+
+    class Meta:
+        app_label = 'eats'
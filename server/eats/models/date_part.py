@@ -1,14 +1,15 @@
 from tmapi.models import Name
 
+from eats.lib.topic_map_context import get_eats_topic_map
 from calendar import Calendar
 from date_type import DateType
 
 
-class DatePart (Name):
+class DatePartForm (object):
 
-    class Meta:
-        proxy = True
-        app_label = 'eats'
+    """Provides the assembled form of a date part, for `DatePart` and
+    for any object with the same value, certainty and type
+    methods."""
 
     @property
     def assembled_form (self):
@@ -26,6 +27,13 @@ class DatePart (Name):
                 form = 'at or before ' + form
         return form
 
+
+class DatePart (Name, DatePartForm):
+
+    class Meta:
+        proxy = True
+        app_label = 'eats'
+
     @property
     def calendar (self):
         """Returns the calendar for this date part, or None if no
@@ -139,8 +147,7 @@ class DatePart (Name):
     @property
     def eats_topic_map (self):
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = self.get_topic_map(proxy=EATSTopicMap)
+            self._eats_topic_map = get_eats_topic_map(self.topic_map_id)
         return self._eats_topic_map
 
     def get_form_data (self, prefix):
@@ -0,0 +1,63 @@
+from django.db import models
+from django.db.models import Q
+
+
+class DuplicateCandidateManager (models.Manager):
+
+    def filter_by_entity (self, entity):
+        """Returns the candidates in which `entity` is one of the
+        pair, best first.
+
+        :param entity: the entity
+        :type entity: `Entity`
+        :rtype: `QuerySet` of `DuplicateCandidate`s
+
+        """
+        return self.filter(Q(entity=entity) | Q(duplicate=entity),
+                           is_current=True)
+
+
+class DuplicateCandidate (models.Model):
+
+    """Model recording a pair of entities that are likely to be
+    duplicates of each other, as found by the eats_find_duplicates
+    management command.
+
+    Each pair is recorded once, with `entity` having the lower
+    primary key. The pairs are ranked by `score`, between 0 and 1.
+
+    The candidates being found by a run of the command are not
+    current until the run has finished, when they replace those of
+    the previous run.
+
+    """
+
+    entity = models.ForeignKey('Entity', related_name='duplicate_candidates')
+    duplicate = models.ForeignKey('Entity', related_name='+')
+    score = models.FloatField()
+    # Number of normalised name forms the entities share.
+    shared_names = models.IntegerField(default=0)
+    shared_subject_identifiers = models.IntegerField(default=0)
+    # Whether the existence dates of the entities overlap; None if
+    # either has no existence dates.
+    dates_overlap = models.NullBooleanField()
+    is_current = models.BooleanField(default=True)
+
+    objects = DuplicateCandidateManager()
+
+    class Meta:
+        app_label = 'eats'
+        ordering = ['-score', 'entity', 'duplicate']
+        unique_together = ('entity', 'duplicate', 'is_current')
+
+    def get_other (self, entity):
+        """Returns the entity of this pair that is not `entity`.
+
+        :param entity: one of the entities of this pair
+        :type entity: `Entity`
+        :rtype: `Entity`
+
+        """
+        if entity.pk == self.entity_id:
+            return self.duplicate
+        return self.entity
@@ -1,12 +1,12 @@
 from django.contrib.sites.models import Site
 from django.core.urlresolvers import reverse
-from django.db.models import Q
 
 from tmapi.models import Locator, TopicMap
 
 from eats.constants import ADMIN_NAME_TYPE_IRI, AUTHORITY_HAS_CALENDAR_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_DATE_PERIOD_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_DATE_TYPE_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_ENTITY_RELATIONSHIP_TYPE_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_ENTITY_TYPE_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_LANGUAGE_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_NAME_PART_TYPE_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_NAME_TYPE_ASSOCIATION_TYPE_IRI, AUTHORITY_HAS_SCRIPT_ASSOCIATION_TYPE_IRI, AUTHORITY_ROLE_TYPE_IRI, AUTHORITY_TYPE_IRI, CALENDAR_TYPE_IRI, DATE_CERTAINTY_TYPE_IRI, DATE_FULL_CERTAINTY_IRI, DATE_NO_CERTAINTY_IRI, DATE_PERIOD_ASSOCIATION_TYPE, DATE_PERIOD_ROLE_TYPE, DATE_PERIOD_TYPE_IRI, DATE_ROLE_TYPE_IRI, DATE_TYPE_IRI, DATE_TYPE_TYPE_IRI, DOMAIN_ENTITY_ROLE_TYPE_IRI, END_DATE_TYPE_IRI, END_TAQ_DATE_TYPE_IRI, END_TPQ_DATE_TYPE_IRI, ENTITY_RELATIONSHIP_ASSERTION_TYPE_IRI, ENTITY_RELATIONSHIP_TYPE_ROLE_TYPE_IRI, ENTITY_RELATIONSHIP_TYPE_TYPE_IRI, ENTITY_ROLE_TYPE_IRI, ENTITY_TYPE_IRI, ENTITY_TYPE_ASSERTION_TYPE_IRI, ENTITY_TYPE_TYPE_IRI, EXISTENCE_IRI, EXISTENCE_ASSERTION_TYPE_IRI, INFRASTRUCTURE_ROLE_TYPE_IRI, IS_IN_LANGUAGE_TYPE_IRI, IS_IN_SCRIPT_TYPE_IRI, IS_PREFERRED_IRI, LANGUAGE_CODE_TYPE_IRI, LANGUAGE_ROLE_TYPE_IRI, LANGUAGE_TYPE_IRI, NAME_ASSERTION_TYPE_IRI, NAME_HAS_NAME_PART_ASSOCIATION_TYPE_IRI, NAME_PART_ORDER_TYPE_IRI, NAME_PART_ROLE_TYPE_IRI, NAME_PART_TYPE_IRI, NAME_PART_TYPE_ORDER_IN_LANGUAGE_TYPE_IRI, NAME_PART_TYPE_TYPE_IRI, NAME_ROLE_TYPE_IRI, NAME_TYPE_IRI, NAME_TYPE_TYPE_IRI, NORMALISED_DATE_FORM_TYPE_IRI, NOTE_ASSERTION_TYPE_IRI, POINT_DATE_TYPE_IRI, POINT_TAQ_DATE_TYPE_IRI, POINT_TPQ_DATE_TYPE_IRI, PROPERTY_ASSERTION_CERTAINTY_TYPE_IRI, PROPERTY_ASSERTION_FULL_CERTAINTY_IRI, PROPERTY_ASSERTION_NO_CERTAINTY_IRI, PROPERTY_ROLE_TYPE_IRI, RANGE_ENTITY_ROLE_TYPE_IRI, RELATIONSHIP_NAME_TYPE_IRI, REVERSE_RELATIONSHIP_NAME_TYPE_IRI, SCRIPT_CODE_TYPE_IRI, SCRIPT_ROLE_TYPE_IRI, SCRIPT_SEPARATOR_TYPE_IRI, SCRIPT_TYPE_IRI, START_DATE_TYPE_IRI, START_TAQ_DATE_TYPE_IRI, START_TPQ_DATE_TYPE_IRI, SUBJECT_IDENTIFIER_ASSERTION_TYPE_IRI
 from eats.exceptions import EATSException
-from eats.lib.name_form import create_name_forms
+from eats.lib.infrastructure_catalogue import invalidate_infrastructure_catalogue
+from eats.lib.topic_registry import get_well_known_iris, topic_registry
 from authority import Authority
 from calendar import Calendar
 from date_period import DatePeriod
@@ -22,6 +22,7 @@ from name_part_type import NamePartType
 from name_property_assertion import NamePropertyAssertion
 from name_type import NameType
 from script import Script
+from statistics_snapshot import ENTITIES, StatisticsSnapshot
 
 
 class EATSTopicMap (TopicMap):
@@ -120,6 +121,7 @@ class EATSTopicMap (TopicMap):
             authority = self.create_topic(proxy=Authority)
             authority.add_type(self.authority_type)
             authority.create_name(name, name_type=self.admin_name_type)
+            invalidate_infrastructure_catalogue()
             return authority
 
     def create_calendar (self, name):
@@ -139,6 +141,7 @@ class EATSTopicMap (TopicMap):
         calendar = self.create_topic(proxy=Calendar)
         calendar.add_type(self.calendar_type)
         calendar.create_name(name, name_type=self.admin_name_type)
+        invalidate_infrastructure_catalogue()
         return calendar
 
     def create_date_period (self, name):
@@ -159,6 +162,7 @@ class EATSTopicMap (TopicMap):
         date_period = self.create_topic(proxy=DatePeriod)
         date_period.add_type(self.date_period_type)
         date_period.create_name(name, name_type=self.admin_name_type)
+        invalidate_infrastructure_catalogue()
         return date_period
 
     def create_date_type (self, name):
@@ -178,6 +182,7 @@ class EATSTopicMap (TopicMap):
         date_type = self.create_topic(proxy=DateType)
         date_type.add_type(self.date_type_type)
         date_type.create_name(name, name_type=self.admin_name_type)
+        invalidate_infrastructure_catalogue()
         return date_type
 
     def create_entity (self, authority=None):
@@ -197,6 +202,7 @@ class EATSTopicMap (TopicMap):
         entity.add_type(self.entity_type)
         if authority is not None:
             entity.create_existence_property_assertion(authority)
+        StatisticsSnapshot.objects.invalidate([ENTITIES])
         return entity
 
     def create_entity_relationship_type (self, name, reverse_name):
@@ -223,6 +229,7 @@ class EATSTopicMap (TopicMap):
             name, name_type=self.relationship_name_type)
         entity_relationship_type.create_name(
             reverse_name, name_type=self.reverse_relationship_name_type)
+        invalidate_infrastructure_catalogue()
         return entity_relationship_type
 
     def create_entity_type (self, name):
@@ -243,6 +250,7 @@ class EATSTopicMap (TopicMap):
         entity_type = self.create_topic(proxy=EntityType)
         entity_type.add_type(self.entity_type_type)
         entity_type.create_name(name, name_type=self.admin_name_type)
+        invalidate_infrastructure_catalogue()
         return entity_type
 
     def create_language (self, name, code):
@@ -271,6 +279,7 @@ class EATSTopicMap (TopicMap):
         language.add_type(self.language_type)
         language.create_name(name, name_type=self.admin_name_type)
         language.create_name(code, name_type=self.language_code_type)
+        invalidate_infrastructure_catalogue()
         return language
 
     def create_name_part_type (self, name):
@@ -291,6 +300,7 @@ class EATSTopicMap (TopicMap):
         name_part_type = self.create_topic(proxy=NamePartType)
         name_part_type.add_type(self.name_part_type_type)
         name_part_type.create_name(name, name_type=self.admin_name_type)
+        invalidate_infrastructure_catalogue()
         return name_part_type
 
     def create_name_type (self, name):
@@ -310,6 +320,7 @@ class EATSTopicMap (TopicMap):
         name_type = self.create_topic(proxy=NameType)
         name_type.add_type(self.name_type_type)
         name_type.create_name(name, name_type=self.admin_name_type)
+        invalidate_infrastructure_catalogue()
         return name_type
 
     def create_script (self, name, code, separator):
@@ -341,15 +352,46 @@ class EATSTopicMap (TopicMap):
         script.create_name(name, name_type=self.admin_name_type)
         script.create_name(code, name_type=self.script_code_type)
         script.separator = separator
+        invalidate_infrastructure_catalogue()
         return script
 
+    def create_well_known_topics (self):
+        """Creates any of the well-known topics that do not already
+        exist.
+
+        This should be called before the topic map is used by
+        multiple processes at once, so that they do not each create
+        the same topic.
+
+        """
+        for iri in get_well_known_iris():
+            self.create_topic_by_subject_identifier(Locator(iri))
+
     def create_topic_by_subject_identifier (self, locator, attr=None):
-        if attr is None:
-            return super(EATSTopicMap, self).create_topic_by_subject_identifier(
-                locator)
-        value = getattr(self, attr, None)
+        """Returns the topic with the subject identifier `locator`,
+        creating it if necessary.
+
+        Well-known topics are retrieved from the process-wide
+        registry, and are also cached on this instance under `attr`
+        if it is supplied.
+
+        :param locator: subject identifier of the topic
+        :type locator: `Locator`
+        :param attr: name of the attribute to cache the topic under
+        :type attr: string
+        :rtype: `Topic`
+
+        """
+        if attr is not None:
+            value = getattr(self, attr, None)
+            if value is not None:
+                return value
+        address = locator.to_external_form()
+        value = topic_registry.get(self, address)
         if value is None:
             value = super(EATSTopicMap, self).create_topic_by_subject_identifier(locator)
+            topic_registry.add(self, address, value)
+        if attr is not None:
             setattr(self, attr, value)
         return value
 
@@ -544,37 +586,24 @@ class EATSTopicMap (TopicMap):
         return self.create_topic_by_subject_identifier(Locator(
                 LANGUAGE_TYPE_IRI), '_language_type')
 
-    def lookup_entities (self, query, entity_type=None):
-        names = query.split()
-        queries = []
-        for name in names:
-            query = self._create_lookup_query(unicode(name))
-            queries.append(query)
-        sets = []
-        for query in queries:
-            if entity_type:
-                results = Entity.objects.filter_by_entity_type(entity_type)
-            else:
-                results = Entity.objects.all()
-            sets.append(set(results.filter(query)))
-        if len(sets) == 0:
-            intersected_set = set()
-        else:
-            intersected_set = sets[0]
-        for i in range(1, len(sets)):
-            intersected_set = intersected_set.intersection(sets[i])
-        # QAZ: Is there any reason to return a list rather than a set?
-        return list(intersected_set)
-
-    def _create_lookup_query (self, name):
-        query = None
-        name_forms = create_name_forms(unicode(name))
-        for name_form in name_forms:
-            if query is None:
-                query = Q(indexed_names__form__istartswith=name_form)
-            else:
-                query = query | Q(indexed_names__form__istartswith=name_form)
-        return query
+    def lookup_entities (self, query, entity_type=None, date_range=None):
+        """Returns the entities with names matching `query`, ordered by
+        how well they match.
+
+        :param query: the search query
+        :type query: unicode string
+        :param entity_type: entity type to restrict results to
+        :type entity_type: `EntityType`
+        :param date_range: normalised forms of the (proleptic
+          Gregorian) dates starting and ending the period that the
+          existence dates of results must overlap; either may be None
+        :type date_range: `tuple` of unicode strings
+        :rtype: `list` of `Entity`s
+
+        """
+        from eats.lib.entity_search import EntitySearch
+        return list(EntitySearch(query, entity_type,
+                                 date_range=date_range).get_ranked_queryset())
 
     @property
     def name_assertion_type (self):
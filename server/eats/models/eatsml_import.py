@@ -9,15 +9,87 @@ from eats_user import EATSUser
 
 class EATSMLImport (models.Model):
 
+    """Record of an EATSML import.
+
+    An import is queued when the document is uploaded (into
+    `source_file`), and is carried out by the eats_import_worker
+    management command, which records its progress here.
+
+    The imported and annotated documents are stored in files; imports
+    made before this was so have them in `raw_xml` and
+    `annotated_xml` instead.
+
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATUS_CHOICES = ((QUEUED, 'Queued'), (RUNNING, 'Running'),
+                      (COMPLETED, 'Completed'), (FAILED, 'Failed'))
+
     importer = models.ForeignKey(EATSUser, related_name='eatsml_imports')
     description = models.CharField(max_length=200)
-    raw_xml = models.TextField()
-    annotated_xml = models.TextField()
+    raw_xml = models.TextField(blank=True)
+    annotated_xml = models.TextField(blank=True)
+    source_file = models.FileField(upload_to='eats/imports/source',
+                                   blank=True)
+    raw_file = models.FileField(upload_to='eats/imports/raw', blank=True)
+    annotated_file = models.FileField(upload_to='eats/imports/annotated',
+                                      blank=True)
     import_date = models.DateTimeField(editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    error = models.TextField(blank=True)
+    # Progress of the import: the number of entities in the document,
+    # and the number whose property assertions other than entity
+    # relationships, and whose entity relationships, have been
+    # imported.
+    entity_count = models.IntegerField(default=0)
+    entities_imported = models.IntegerField(default=0)
+    relationships_imported = models.IntegerField(default=0)
+    # JSON record of the state of the import to resume from.
+    checkpoint = models.TextField(blank=True)
+    start_date = models.DateTimeField(blank=True, null=True)
+    # When the worker carrying out the import last recorded that it
+    # was still doing so. A running import whose heartbeat is older
+    # than the worker's lease may be claimed by another worker.
+    heartbeat = models.DateTimeField(blank=True, null=True)
+    end_date = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         app_label = 'eats'
 
+    def get_progress (self):
+        """Returns the progress of the import.
+
+        The rate is the number of entities processed per second, with
+        each entity processed twice: once for its entity
+        relationships and once for everything else. The estimated
+        time remaining is in seconds, and is None until there is a
+        rate to estimate it from.
+
+        :rtype: `dict`
+
+        """
+        processed = self.entities_imported + self.relationships_imported
+        remaining = self.entity_count * 2 - processed
+        rate = 0.0
+        if self.start_date is not None:
+            end_date = self.end_date or datetime.now()
+            elapsed = (end_date - self.start_date).total_seconds()
+            rate = processed / max(elapsed, 0.001)
+        eta = None
+        if self.status == self.COMPLETED:
+            eta = 0
+        elif rate and self.status == self.RUNNING:
+            eta = int(remaining / rate)
+        return {'status': self.status, 'error': self.error,
+                'entity_count': self.entity_count,
+                'entities_imported': self.entities_imported,
+                'relationships_imported': self.relationships_imported,
+                'rate': round(rate, 1), 'eta': eta}
+
     def save (self, *args, **kwargs):
         if not self.id:
             self.import_date = datetime.now()
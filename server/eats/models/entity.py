@@ -1,16 +1,21 @@
 from django.core.urlresolvers import NoReverseMatch
+from django.db.models import Q
 
-from tmapi.models import Association, Topic
+from tmapi.models import Association, Occurrence, Role, Topic
 
 from eats.exceptions import EATSMergedIdentifierException, \
     EATSValidationException
+from eats.lib.topic_map_context import get_eats_topic_map
 
+from authority import Authority
 from base_manager import BaseManager
 from date import Date
+from entity_relationship_cache import EntityRelationshipCache
 from entity_relationship_property_assertion import EntityRelationshipPropertyAssertion
 from entity_type_property_assertion import EntityTypePropertyAssertion
 from existence_property_assertion import ExistencePropertyAssertion
 from name import Name
+from name_cache import NameCache
 from name_property_assertion import NamePropertyAssertion
 from note_property_assertion import NotePropertyAssertion
 from subject_identifier_property_assertion import SubjectIdentifierPropertyAssertion
@@ -45,6 +50,39 @@ class EntityManager (BaseManager):
                                    occurrences__scope=authority)
         return entities.exclude(id=entity.id)
 
+    def filter_asserting_authorities (self, entities):
+        """Returns the authorities that make property assertions
+        about any of `entities`.
+
+        This is a single query, however many assertions the entities
+        have, rather than one per assertion as when fetching each
+        assertion's authority.
+
+        :param entities: the entities, or their primary keys
+        :type entities: `list` or `QuerySet` of `Entity`s
+        :rtype: `QuerySet` of `Authority`s
+
+        """
+        topic_map = self.eats_topic_map
+        role_types = (topic_map.entity_role_type,
+                      topic_map.domain_entity_role_type,
+                      topic_map.range_entity_role_type)
+        occurrence_types = (topic_map.note_assertion_type,
+                            topic_map.subject_identifier_assertion_type)
+        # Each kind of assertion is matched by an independent
+        # subquery over its scope table, since joining both scope
+        # tables to the authorities multiplies their rows.
+        associations = Role.objects.filter(
+            type__in=role_types, player__in=entities).values('association')
+        occurrences = Occurrence.objects.filter(
+            type__in=occurrence_types, topic__in=entities).values('pk')
+        association_scopes = Association.scope.through.objects.filter(
+            association__in=associations).values('topic')
+        occurrence_scopes = Occurrence.scope.through.objects.filter(
+            occurrence__in=occurrences).values('topic')
+        return Authority.objects.filter(Q(pk__in=association_scopes) |
+                                        Q(pk__in=occurrence_scopes))
+
     def filter_by_entity_type (self, entity_type):
         assertion_type = self.eats_topic_map.entity_type_assertion_type
         role_type = self.eats_topic_map.property_role_type
@@ -214,6 +252,7 @@ class Entity (Topic):
                                        script)
         name.update_name_cache()
         name.update_name_index()
+        assertion._invalidate_statistics()
         return assertion
 
     def create_note_property_assertion (self, authority, note):
@@ -229,6 +268,7 @@ class Entity (Topic):
         assertion = self.create_occurrence(
             self.eats_topic_map.note_assertion_type, note,
             scope=[authority], proxy=NotePropertyAssertion)
+        assertion._invalidate_entity_summary()
         return assertion
 
     def create_subject_identifier_property_assertion (self, authority,
@@ -244,16 +284,17 @@ class Entity (Topic):
         :rtype: `SubjectIdentifierPropertyAssertion`
 
         """
-        return self.create_occurrence(
+        assertion = self.create_occurrence(
             self.eats_topic_map.subject_identifier_assertion_type,
             subject_identifier, scope=[authority],
             proxy=SubjectIdentifierPropertyAssertion)
+        assertion._invalidate_entity_summary()
+        return assertion
 
     @property
     def eats_topic_map (self):
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = self.get_topic_map(proxy=EATSTopicMap)
+            self._eats_topic_map = get_eats_topic_map(self.topic_map_id)
         return self._eats_topic_map
 
     def get_assertion (self, assertion_id):
@@ -411,27 +452,40 @@ class Entity (Topic):
         except NamePropertyAssertion.DoesNotExist:
             return None
 
+    def get_related_entity_name_forms (self, authority, language, script):
+        """Returns the forms of the preferred names of the entities
+        related to this entity, fetched together.
+
+        :param authority: preferred authority to assert the names
+        :type authority: `Authority`
+        :param language: preferred language of the names
+        :type language: `Language`
+        :param script: preferred script of the names
+        :type script: `Script`
+        :rtype: `dict` of unicode strings keyed by entity primary key
+
+        """
+        related_entities = set()
+        for domain_entity, range_entity in \
+                EntityRelationshipCache.objects.filter(
+                Q(domain_entity=self) | Q(range_entity=self)).values_list(
+                'domain_entity', 'range_entity'):
+            related_entities.update((domain_entity, range_entity))
+        return NameCache.objects.get_preferred_forms(
+            related_entities, authority, language, script)
+
     def merge_in (self, other):
-        # Due to the caching involved in entity relationships, it is
-        # unfortunately necessary to move them manually before using
-        # the TMAPI merge functionality.
-        for er in other.get_entity_relationships():
-            domain_entity = er.domain_entity
-            if domain_entity == other:
-                domain_entity = self
-            range_entity = er.range_entity
-            if range_entity == other:
-                range_entity = self
-            er.update(er.entity_relationship_type, domain_entity, range_entity,
-                      er.certainty)
-        super(Entity, self).merge_in(other)
+        """Merges `other` into this entity.
+
+        :param other: the entity to merge into this entity
+        :type other: `Entity`
+
+        """
+        from eats.lib.entity_merge import EntityMerger
+        EntityMerger(self.eats_topic_map).merge([(self, other)])
 
     def remove (self):
-        """Removes this entity from the EATS Topic Map."""
-        assertion_getters = [self.get_eats_names, self.get_entity_relationships,
-                             self.get_entity_types, self.get_existences,
-                             self.get_eats_subject_identifiers, self.get_notes]
-        for assertion_getter in assertion_getters:
-            for assertion in assertion_getter():
-                assertion.remove()
-        super(Entity, self).remove()
+        """Removes this entity, and its property assertions, from the
+        EATS Topic Map."""
+        from eats.lib.entity_deletion import EntityDeletionPlan
+        EntityDeletionPlan(self.eats_topic_map, [self]).delete()
@@ -8,7 +8,9 @@ from eats.exceptions import EATSValidationException
 from base_manager import BaseManager
 from entity_relationship_cache import EntityRelationshipCache
 from entity_relationship_type import EntityRelationshipType
+from entity_summary import EntitySummary
 from property_assertion import PropertyAssertion
+from statistics_snapshot import ASSERTION_STATISTICS, ENTITY_RELATIONSHIP_TYPES
 
 
 class EntityRelationshipPropertyAssertionManager (BaseManager):
@@ -32,6 +34,8 @@ class EntityRelationshipPropertyAssertionManager (BaseManager):
 
 class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
 
+    statistics_sections = ASSERTION_STATISTICS + (ENTITY_RELATIONSHIP_TYPES,)
+
     objects = EntityRelationshipPropertyAssertionManager()
 
     class Meta:
@@ -41,17 +45,11 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
     def _add_relationship_cache(self, relationship_type, domain_entity,
                                 range_entity):
         """Adds this relationship to the relationships cache."""
-        forward_name = relationship_type.get_admin_forward_name()
-        reverse_name = relationship_type.get_admin_reverse_name()
-        cached_relationship = EntityRelationshipCache(
-            entity_relationship=self, authority=self.authority,
-            domain_entity=domain_entity,
-            range_entity=range_entity,
-            relationship_type=relationship_type,
-            forward_relationship_name=forward_name,
-            reverse_relationship_name=reverse_name)
+        cached_relationship = self.build_relationship_cache(
+            relationship_type, domain_entity, range_entity)
         cached_relationship.save()
         self._cached_erpa = cached_relationship
+        self._invalidate_entity_summary()
 
     @property
     def authority (self):
@@ -66,6 +64,45 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
             authority = super(EntityRelationshipPropertyAssertion, self).authority
         return authority
 
+    def build_relationship_cache (self, relationship_type=None,
+                                  domain_entity=None, range_entity=None):
+        """Returns a new, unsaved relationship cache entry for this
+        relationship.
+
+        Any of `relationship_type`, `domain_entity` and `range_entity`
+        that are not supplied are read from the topic map, ignoring
+        any existing cache entry, as is the authority.
+
+        :param relationship_type: type of the relationship
+        :type relationship_type: `EntityRelationshipType`
+        :param domain_entity: the domain entity
+        :type domain_entity: `Entity`
+        :param range_entity: the range entity
+        :type range_entity: `Entity`
+        :rtype: `EntityRelationshipCache`
+
+        """
+        from entity import Entity
+        if relationship_type is None:
+            relationship_type = self._get_player(
+                self.eats_topic_map.entity_relationship_type_role_type,
+                EntityRelationshipType)
+        if domain_entity is None:
+            domain_entity = self._get_player(
+                self.eats_topic_map.domain_entity_role_type, Entity)
+        if range_entity is None:
+            range_entity = self._get_player(
+                self.eats_topic_map.range_entity_role_type, Entity)
+        authority = super(EntityRelationshipPropertyAssertion, self).authority
+        forward_name = relationship_type.get_admin_forward_name()
+        reverse_name = relationship_type.get_admin_reverse_name()
+        return EntityRelationshipCache(
+            entity_relationship=self, authority=authority,
+            domain_entity=domain_entity, range_entity=range_entity,
+            relationship_type=relationship_type,
+            forward_relationship_name=forward_name,
+            reverse_relationship_name=reverse_name)
+
     @property
     def _cached_relationship (self):
         if not hasattr(self, '_cached_erpa'):
@@ -79,6 +116,8 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
             self._cached_relationship.delete()
         except EntityRelationshipCache.DoesNotExist:
             pass
+        else:
+            self._invalidate_entity_summary()
 
     @property
     def domain_entity (self):
@@ -87,9 +126,8 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
             domain_entity = self._cached_relationship.domain_entity
         except EntityRelationshipCache.DoesNotExist:
             from entity import Entity
-            domain_role = self.get_roles(
-                self.eats_topic_map.domain_entity_role_type)[0]
-            domain_entity = domain_role.get_player(proxy=Entity)
+            domain_entity = self._get_player(
+                self.eats_topic_map.domain_entity_role_type, Entity)
         return domain_entity
 
     @property
@@ -99,10 +137,9 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
         try:
             entity_relationship_type = self._cached_relationship.relationship_type
         except EntityRelationshipCache.DoesNotExist:
-            role = self.get_roles(
-                self.eats_topic_map.entity_relationship_type_role_type)[0]
-            entity_relationship_type = role.get_player(
-                proxy=EntityRelationshipType)
+            entity_relationship_type = self._get_player(
+                self.eats_topic_map.entity_relationship_type_role_type,
+                EntityRelationshipType)
         return entity_relationship_type
 
     @property
@@ -112,11 +149,31 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
             range_entity = self._cached_relationship.range_entity
         except EntityRelationshipCache.DoesNotExist:
             from entity import Entity
-            range_role = self.get_roles(
-                self.eats_topic_map.range_entity_role_type)[0]
-            range_entity = range_role.get_player(proxy=Entity)
+            range_entity = self._get_player(
+                self.eats_topic_map.range_entity_role_type, Entity)
         return range_entity
 
+    def _invalidate_entity_summary (self):
+        """Marks the summaries of the entities in this relationship as
+        out of date."""
+        cached_relationship = self._cached_relationship
+        EntitySummary.objects.invalidate(cached_relationship.domain_entity_id)
+        EntitySummary.objects.invalidate(cached_relationship.range_entity_id)
+        self._invalidate_statistics()
+
+    def _get_player (self, role_type, proxy):
+        """Returns the player, from the topic map, of the role of
+        `role_type` in this relationship.
+
+        :param role_type: type of the role
+        :type role_type: `Topic`
+        :param proxy: proxy class to return the player as
+        :type proxy: class
+        :rtype: `Topic`
+
+        """
+        return self.get_roles(role_type)[0].get_player(proxy=proxy)
+
     def get_relationship_type_forward_name(self):
         """Returns the forward name for this asserted relationship."""
         return self._cached_relationship.forward_relationship_name
@@ -125,6 +182,14 @@ class EntityRelationshipPropertyAssertion (Association, PropertyAssertion):
         """Returns the reverse name for this asserted relationship."""
         return self._cached_relationship.reverse_relationship_name
 
+    def remove (self):
+        """Deletes this property assertion."""
+        try:
+            self._invalidate_entity_summary()
+        except EntityRelationshipCache.DoesNotExist:
+            pass
+        super(EntityRelationshipPropertyAssertion, self).remove()
+
     def set_players (self, domain_entity, range_entity, relationship_type):
         """Sets the domain and range entities involved in this relationship.
 
@@ -1,5 +1,7 @@
 from tmapi.models import Topic
 
+from eats.lib.infrastructure_catalogue import get_infrastructure_catalogue, invalidate_infrastructure_catalogue
+
 from infrastructure import Infrastructure
 from infrastructure_manager import InfrastructureManager
 
@@ -12,13 +14,9 @@ class EntityRelationshipTypeManager (InfrastructureManager):
             authority, association_type)
 
     def get_by_admin_name (self, name, reverse_name):
-        for ert in self.all():
-            existing_name = ert.get_admin_forward_name()
-            existing_reverse_name = ert.get_admin_reverse_name()
-            if name == existing_name and reverse_name == existing_reverse_name:
-                return ert
-        else:
-            raise self.model.DoesNotExist
+        return self._get_first(
+            get_infrastructure_catalogue().get_relationship_types(
+                self.eats_topic_map, name, reverse_name))
 
     def get_queryset (self):
         return super(EntityRelationshipTypeManager, self).get_queryset().filter(
@@ -60,3 +58,4 @@ class EntityRelationshipType (Topic, Infrastructure):
             pass
         self.get_names(self.eats_topic_map.relationship_name_type)[0].set_value(name)
         self.get_names(self.eats_topic_map.reverse_relationship_name_type)[0].set_value(reverse_name)
+        invalidate_infrastructure_catalogue()
@@ -0,0 +1,210 @@
+import json
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
+
+from tmapi.models import Name as TMName
+
+from eats.lib.topic_map_context import get_eats_topic_map
+
+from entity_relationship_cache import EntityRelationshipCache
+from name_cache import NameCache
+
+
+class EntitySummaryManager (models.Manager):
+
+    def create_for_entity (self, entity):
+        """Creates and returns the summary of `entity`.
+
+        :param entity: the entity to summarise
+        :type entity: `Entity`
+        :rtype: `EntitySummary`
+
+        """
+        entity_types = set([assertion.entity_type.pk for assertion in
+                            entity.get_entity_types()])
+        existence_dates = [date.assembled_form for date in
+                           entity.get_existence_dates()]
+        names = []
+        for cached_name in NameCache.objects.filter(entity=entity).order_by(
+                'pk'):
+            names.append({'authority': cached_name.authority_id,
+                          'form': cached_name.form,
+                          'is_preferred': cached_name.is_preferred,
+                          'language': cached_name.language_id,
+                          'script': cached_name.script_id})
+        notes = [assertion.note for assertion in entity.get_notes()]
+        relationship_count = EntityRelationshipCache.objects.filter(
+            Q(domain_entity=entity) | Q(range_entity=entity)).count()
+        subject_identifiers = [
+            assertion.subject_identifier for assertion in
+            entity.get_eats_subject_identifiers()]
+        summary = self.model(
+            entity=entity, entity_types=json.dumps(sorted(entity_types)),
+            existence_dates=json.dumps(existence_dates),
+            names=json.dumps(names), notes=json.dumps(notes),
+            relationship_count=relationship_count,
+            subject_identifiers=json.dumps(subject_identifiers))
+        try:
+            with transaction.atomic():
+                summary.save(force_insert=True)
+        except IntegrityError:
+            # Another process has created the summary in the
+            # meantime; the summary built here is equally valid.
+            pass
+        return summary
+
+    def get_for_entity (self, entity):
+        """Returns the summary of `entity`, creating it if it does not
+        exist.
+
+        :param entity: the entity whose summary is returned
+        :type entity: `Entity`
+        :rtype: `EntitySummary`
+
+        """
+        try:
+            return self.get(entity=entity)
+        except self.model.DoesNotExist:
+            return self.create_for_entity(entity)
+
+    def invalidate (self, entity):
+        """Deletes the summary of `entity`, so that it will be
+        regenerated when next requested.
+
+        :param entity: the entity, or its primary key
+        :type entity: `Entity` or int
+
+        """
+        self.filter(entity=entity).delete()
+
+
+class EntitySummary (models.Model):
+
+    """Model providing a denormalised summary of an entity, for use
+    in displaying the entity without walking the topic map.
+
+    A summary is deleted whenever the data it summarises changes, and
+    is regenerated when next requested.
+
+    """
+
+    entity = models.OneToOneField('Entity', primary_key=True,
+                                  related_name='summary')
+    entity_types = models.TextField()
+    existence_dates = models.TextField()
+    names = models.TextField()
+    notes = models.TextField()
+    relationship_count = models.PositiveIntegerField(default=0)
+    subject_identifiers = models.TextField()
+
+    objects = EntitySummaryManager()
+
+    class Meta:
+        app_label = 'eats'
+
+    def get_entity_type_ids (self):
+        """Returns the primary keys of the entity's types.
+
+        :rtype: `list` of integers
+
+        """
+        return json.loads(self.entity_types)
+
+    def get_entity_type_names (self):
+        """Returns the sorted admin names of the entity's types.
+
+        :rtype: `list` of unicode strings
+
+        """
+        entity_types = self.get_entity_type_ids()
+        if not entity_types:
+            return []
+        admin_name_type = get_eats_topic_map().admin_name_type
+        names = TMName.objects.filter(
+            topic__in=entity_types, type=admin_name_type).values_list(
+            'value', flat=True)
+        return sorted(set(names))
+
+    def get_existence_dates (self):
+        """Returns the assembled forms of the entity's existence dates.
+
+        :rtype: `list` of unicode strings
+
+        """
+        return json.loads(self.existence_dates)
+
+    def get_notes (self):
+        """Returns the text of the entity's notes.
+
+        :rtype: `list` of unicode strings
+
+        """
+        return json.loads(self.notes)
+
+    def get_other_name_forms (self, authority, language, script):
+        """Returns the sorted forms of the entity's names, excluding
+        the name that is preferred given `authority`, `language` and
+        `script`.
+
+        :rtype: `list` of unicode strings
+
+        """
+        names = json.loads(self.names)
+        preferred_name = self._get_preferred_name(names, authority, language,
+                                                  script)
+        forms = set([name['form'] for name in names if
+                     name is not preferred_name])
+        return sorted(forms)
+
+    def _get_preferred_name (self, names, authority, language, script):
+        """Returns the name data from `names` that best matches
+        `authority`, `language` and `script`, following the same rules
+        as `NamePropertyAssertionManager.get_preferred`.
+
+        :rtype: `dict` or None
+
+        """
+        if not names:
+            return None
+        for key, topic in (('script', script), ('authority', authority),
+                           ('language', language)):
+            if topic is not None:
+                matches = [name for name in names if name[key] == topic.pk]
+                if matches:
+                    names = matches
+        preferred_names = [name for name in names if name['is_preferred']]
+        if preferred_names:
+            names = preferred_names
+        return names[0]
+
+    def get_preferred_name_form (self, authority, language, script):
+        """Returns the form of the entity's name that best matches
+        `authority`, `language` and `script`, or None if the entity
+        has no names.
+
+        :rtype: unicode string or None
+
+        """
+        name = self._get_preferred_name(json.loads(self.names), authority,
+                                        language, script)
+        if name is None:
+            return None
+        return name['form']
+
+    def get_subject_identifiers (self):
+        """Returns the URLs of the entity's subject identifier property
+        assertions.
+
+        :rtype: `list` of unicode strings
+
+        """
+        return json.loads(self.subject_identifiers)
+
+    def has_names (self):
+        """Returns True if the entity has any names.
+
+        :rtype: `bool`
+
+        """
+        return bool(json.loads(self.names))
@@ -3,6 +3,7 @@ from tmapi.models import Association
 from base_manager import BaseManager
 from entity_type import EntityType
 from property_assertion import PropertyAssertion
+from statistics_snapshot import ASSERTION_STATISTICS, ENTITY_TYPES
 
 
 class EntityTypePropertyAssertionManager (BaseManager):
@@ -24,6 +25,8 @@ class EntityTypePropertyAssertionManager (BaseManager):
 
 class EntityTypePropertyAssertion (Association, PropertyAssertion):
 
+    statistics_sections = ASSERTION_STATISTICS + (ENTITY_TYPES,)
+
     objects = EntityTypePropertyAssertionManager()
 
     class Meta:
@@ -60,6 +63,12 @@ class EntityTypePropertyAssertion (Association, PropertyAssertion):
         self._entity_type = entity_type
         self.create_role(self.eats_topic_map.entity_role_type, entity)
         self._entity = entity
+        self._invalidate_entity_summary()
+
+    def remove (self):
+        """Deletes this property assertion."""
+        self._invalidate_entity_summary()
+        super(EntityTypePropertyAssertion, self).remove()
 
     def update (self, entity_type):
         """Updates this property assertion.
@@ -74,3 +83,4 @@ class EntityTypePropertyAssertion (Association, PropertyAssertion):
                 self.eats_topic_map.property_role_type)[0]
             property_role.set_player(entity_type)
             self._entity_type = entity_type
+            self._invalidate_entity_summary()
@@ -39,3 +39,9 @@ class ExistencePropertyAssertion (Association, PropertyAssertion):
                          self.eats_topic_map.existence)
         self.create_role(self.eats_topic_map.entity_role_type, entity)
         self._entity = entity
+        self._invalidate_entity_summary()
+
+    def remove (self):
+        """Deletes this property assertion."""
+        self._invalidate_entity_summary()
+        super(ExistencePropertyAssertion, self).remove()
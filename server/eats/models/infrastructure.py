@@ -1,10 +1,13 @@
+from eats.lib.infrastructure_catalogue import invalidate_infrastructure_catalogue
+from eats.lib.topic_map_context import get_eats_topic_map
+
+
 class Infrastructure (object):
 
     @property
     def eats_topic_map (self):
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = self.get_topic_map(proxy=EATSTopicMap)
+            self._eats_topic_map = get_eats_topic_map(self.topic_map_id)
         return self._eats_topic_map
 
     def get_admin_name (self):
@@ -20,6 +23,7 @@ class Infrastructure (object):
         except self.DoesNotExist:
             pass
         self.get_names(self.eats_topic_map.admin_name_type)[0].set_value(name)
+        invalidate_infrastructure_catalogue()
 
     def __unicode__ (self):
         return self.get_admin_name()
@@ -1,3 +1,5 @@
+from eats.lib.infrastructure_catalogue import get_infrastructure_catalogue
+
 from base_manager import BaseManager
 
 
@@ -13,8 +15,39 @@ class InfrastructureManager (BaseManager):
             roles__association__roles__player=authority)
 
     def get_by_admin_name (self, name):
-        for model_object in self.all():
-            if name == model_object.get_admin_name():
+        """Returns the element whose admin name is `name`.
+
+        :param name: admin name of the element
+        :type name: unicode string
+        :rtype: `Infrastructure`
+
+        """
+        return self._get_by_name(self.eats_topic_map.admin_name_type, name)
+
+    def _get_by_name (self, name_type, value):
+        """Returns the element that has a name of `name_type` with
+        `value`, looked up in the infrastructure catalogue.
+
+        :param name_type: type of the name
+        :type name_type: `Topic`
+        :param value: value of the name
+        :type value: unicode string
+        :rtype: `Infrastructure`
+
+        """
+        return self._get_first(get_infrastructure_catalogue().get(
+                self.eats_topic_map, name_type, value))
+
+    def _get_first (self, pks):
+        """Returns the element of this manager's type with the
+        lowest of the primary keys `pks`.
+
+        :param pks: primary keys of topics of any type
+        :type pks: `list` of integers
+        :rtype: `Infrastructure`
+
+        """
+        if pks:
+            for model_object in self.filter(pk__in=pks).order_by('pk')[:1]:
                 return model_object
-        else:
-            raise self.model.DoesNotExist
+        raise self.model.DoesNotExist
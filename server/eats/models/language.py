@@ -3,6 +3,8 @@ from django.db import transaction
 from tmapi.indices import ScopedIndex
 from tmapi.models import Topic
 
+from eats.lib.infrastructure_catalogue import invalidate_infrastructure_catalogue
+
 from infrastructure import Infrastructure
 from infrastructure_manager import InfrastructureManager
 from name_part_type import NamePartType
@@ -16,11 +18,7 @@ class LanguageManager (InfrastructureManager):
             authority, association_type)
 
     def get_by_code (self, code):
-        for language in self.all():
-            if code == language.get_code():
-                return language
-        else:
-            raise self.model.DoesNotExist
+        return self._get_by_name(self.eats_topic_map.language_code_type, code)
 
     def get_queryset (self):
         return super(LanguageManager, self).get_queryset().filter(
@@ -94,6 +92,7 @@ class Language (Topic, Infrastructure):
                 type=self.eats_topic_map.name_part_type_order_in_language_type):
             occurrence.remove()
         super(Language, self).remove()
+        invalidate_infrastructure_catalogue()
 
     def set_code (self, code):
         if code == self.get_code():
@@ -106,3 +105,4 @@ class Language (Topic, Infrastructure):
             pass
         name = self.get_names(self.eats_topic_map.language_code_type)[0]
         name.set_value(code)
+        invalidate_infrastructure_catalogue()
@@ -2,14 +2,17 @@ from operator import attrgetter
 
 from tmapi.models import Topic
 
+from entity_summary import EntitySummary
 from name_cache import NameCache
 from name_element import NameElement
 from name_index import NameIndex
 from name_part import NamePart
 from name_type import NameType
+from statistics_snapshot import NAME_LANGUAGES_SCRIPTS, StatisticsSnapshot
 
 from base_manager import BaseManager
 from eats.lib.name_form import create_name_forms
+from eats.lib.search_backends import get_search_backend
 
 
 class NameManager (BaseManager):
@@ -29,30 +32,13 @@ class Name (Topic, NameElement):
 
     def _add_name_cache (self):
         """Adds this name to the name cache."""
-        form = self.assembled_form
-        if form:
-            assertion = self.assertion
-            cached_name = NameCache(
-                entity=self.entity, assertion=assertion, name=self,
-                form=form, language=self.language, script=self.script,
-                authority=self.assertion.authority,
-                is_preferred=assertion.is_preferred)
+        cached_name = self.build_name_cache()
+        if cached_name is not None:
             cached_name.save()
 
     def _add_name_index (self):
         """Adds the forms of this name to the name index."""
-        parts = []
-        language_code = self.language.get_code()
-        script_code = self.script.get_code()
-        name_forms = create_name_forms(self.display_form, language_code,
-                                       script_code)
-        for name in name_forms:
-            parts.extend(name.split())
-        for part in set(parts):
-            if part:
-                indexed_form = NameIndex(entity=self.entity, name=self,
-                                         form=part)
-                indexed_form.save()
+        NameIndex.objects.bulk_create(self.build_name_index())
 
     def _assemble_name_parts (self):
         data = self.get_name_parts()
@@ -62,6 +48,40 @@ class Name (Topic, NameElement):
                          data.get(name_part_type, [])])
         return self.script.separator.join(form)
 
+    def build_name_cache (self):
+        """Returns a new, unsaved name cache entry for this name, or
+        None if the name has no form to cache.
+
+        :rtype: `NameCache` or None
+
+        """
+        form = self.assembled_form
+        if not form:
+            return None
+        assertion = self.assertion
+        return NameCache(
+            entity=self.entity, assertion=assertion, name=self, form=form,
+            language=self.language, script=self.script,
+            authority=assertion.authority,
+            is_preferred=assertion.is_preferred)
+
+    def build_name_index (self):
+        """Returns new, unsaved name index entries for the forms of
+        this name (excluding its name parts).
+
+        :rtype: `list` of `NameIndex`
+
+        """
+        parts = []
+        language_code = self.language.get_code()
+        script_code = self.script.get_code()
+        name_forms = create_name_forms(self.display_form, language_code,
+                                       script_code)
+        for name in name_forms:
+            parts.extend(name.split())
+        return NameIndex.objects.build_rows(parts, entity=self.entity,
+                                            name=self)
+
     @property
     def assembled_form (self):
         return self.display_form or self._assemble_name_parts()
@@ -137,6 +157,9 @@ class Name (Topic, NameElement):
         """Deletes the indexed forms of this name."""
         self.indexed_name_forms.filter(name_part__isnull=True).delete()
 
+    def _get_indexed_name (self):
+        return self
+
     @property
     def entity (self):
         """Returns the entity to which this name belongs.
@@ -209,6 +232,7 @@ class Name (Topic, NameElement):
         for role in self.get_roles_played():
             association = role.get_parent()
             association.remove()
+        get_search_backend().delete_name(self)
         super(Name, self).remove()
 
     @property
@@ -238,3 +262,5 @@ class Name (Topic, NameElement):
         """Updates the name cache for this name."""
         self._delete_name_cache()
         self._add_name_cache()
+        EntitySummary.objects.invalidate(self.entity)
+        StatisticsSnapshot.objects.invalidate([NAME_LANGUAGES_SCRIPTS])
@@ -1,6 +1,91 @@
 from django.db import models
 
 
+# Maximum number of entities to filter on in a single query, keeping
+# below the limit on query parameters imposed by some databases.
+ENTITY_BATCH_SIZE = 500
+
+
+class NameCacheManager (models.Manager):
+
+    def get_preferred (self, entities, authority, language, script):
+        """Returns the names that best match `authority`, `language`
+        and `script` for each of `entities`.
+
+        The same rules as `NamePropertyAssertionManager.get_preferred`
+        are applied, but the names of all of the entities are fetched
+        together. Entities without names are omitted from the
+        returned dictionary.
+
+        :param entities: the entities that bear the names
+        :type entities: iterable of `Entity`s or their primary keys
+        :param authority: preferred authority to assert the name
+        :type authority: `Authority`
+        :param language: preferred language of the name
+        :type language: `Language`
+        :param script: preferred script of the name
+        :type script: `Script`
+        :rtype: `dict` of `NameCache`s keyed by entity primary key
+
+        """
+        entity_ids = list(set([getattr(entity, 'pk', entity) for entity in
+                               entities]))
+        entity_names = {}
+        for i in range(0, len(entity_ids), ENTITY_BATCH_SIZE):
+            cached_names = self.filter(
+                entity__in=entity_ids[i:i+ENTITY_BATCH_SIZE]).order_by('pk')
+            for cached_name in cached_names:
+                entity_names.setdefault(cached_name.entity_id, []).append(
+                    cached_name)
+        preferred_names = {}
+        for entity_id, names in entity_names.items():
+            preferred_names[entity_id] = self._select_preferred(
+                names, authority, language, script)
+        return preferred_names
+
+    def get_preferred_forms (self, entities, authority, language, script):
+        """Returns the forms of the names that best match `authority`,
+        `language` and `script` for each of `entities`.
+
+        :param entities: the entities that bear the names
+        :type entities: iterable of `Entity`s or their primary keys
+        :param authority: preferred authority to assert the name
+        :type authority: `Authority`
+        :param language: preferred language of the name
+        :type language: `Language`
+        :param script: preferred script of the name
+        :type script: `Script`
+        :rtype: `dict` of unicode strings keyed by entity primary key
+
+        """
+        preferred_names = self.get_preferred(entities, authority, language,
+                                             script)
+        return dict([(entity_id, cached_name.form) for entity_id, cached_name
+                     in preferred_names.items()])
+
+    def _select_preferred (self, names, authority, language, script):
+        """Returns the name from `names` that best matches
+        `authority`, `language` and `script`.
+
+        :param names: names of a single entity, in primary key order
+        :type names: `list` of `NameCache`s
+        :rtype: `NameCache`
+
+        """
+        for attribute, topic in (('script_id', script),
+                                 ('authority_id', authority),
+                                 ('language_id', language)):
+            if topic is not None:
+                matches = [name for name in names if
+                           getattr(name, attribute) == topic.pk]
+                if matches:
+                    names = matches
+        preferred_names = [name for name in names if name.is_preferred]
+        if preferred_names:
+            names = preferred_names
+        return names[0]
+
+
 class NameCache (models.Model):
 
     """Model providing a "cache" of names, shortcutting the highly
@@ -23,5 +108,7 @@ class NameCache (models.Model):
     language = models.ForeignKey('Language')
     script = models.ForeignKey('Script')
 
+    objects = NameCacheManager()
+
     class Meta:
         app_label = 'eats'
@@ -1,3 +1,6 @@
+from eats.lib.search_backends import get_search_backend
+from eats.lib.topic_map_context import get_eats_topic_map
+
 from language import Language
 from script import Script
 
@@ -31,10 +34,18 @@ class NameElement (object):
     @property
     def eats_topic_map (self):
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = self.get_topic_map(proxy=EATSTopicMap)
+            self._eats_topic_map = get_eats_topic_map(self.topic_map_id)
         return self._eats_topic_map
 
+    def _get_indexed_name (self):
+        """Returns the `Name` whose index entries include this name's
+        forms.
+
+        :rtype: `Name`
+
+        """
+        raise NotImplementedError
+
     def _get_name (self):
         """Returns the TMAPI `Name` associated with this name
         entity."""
@@ -108,3 +119,4 @@ class NameElement (object):
         """Updates the name index forms for this name."""
         self._delete_name_index_forms()
         self._add_name_index()
+        get_search_backend().update_name(self._get_indexed_name())
@@ -1,4 +1,106 @@
-from django.db import models
+import sys
+
+from django.db import connection, models
+from django.db.models import Q
+
+
+# Maximum length of an index key. Longer forms are matched on their
+# truncated key and then on the form itself.
+NAME_INDEX_KEY_LENGTH = 50
+
+
+def make_key (form):
+    """Returns the index key for `form`: the form case folded and
+    truncated.
+
+    :param form: indexed form of a name
+    :type form: unicode string
+    :rtype: unicode string
+
+    """
+    return form.lower()[:NAME_INDEX_KEY_LENGTH]
+
+
+def get_key_successor (key):
+    """Returns the least string greater than every string that starts
+    with `key`, or None if there is no such string.
+
+    Strings are compared by code point, as SQLite compares them.
+
+    :param key: key prefix
+    :type key: unicode string
+    :rtype: unicode string or None
+
+    """
+    while key:
+        code_point = ord(key[-1])
+        if code_point < sys.maxunicode:
+            return key[:-1] + unichr(code_point + 1)
+        key = key[:-1]
+    return None
+
+
+class NameIndexManager (models.Manager):
+
+    def build_rows (self, forms, **kwargs):
+        """Returns new, unsaved name index entries for `forms`, with a
+        single entry for forms that differ only in case.
+
+        :param forms: forms to index
+        :type forms: iterable of unicode strings
+        :rtype: `list` of `NameIndex`
+
+        """
+        # Forms are compared in full, rather than by their key, since
+        # long forms that differ only after the key's length share it.
+        folded_forms = {}
+        for form in forms:
+            if form:
+                folded = form.lower()
+                if folded not in folded_forms or form < folded_forms[folded]:
+                    folded_forms[folded] = form
+        return [self.model(form=form, key=make_key(form), **kwargs) for
+                folded, form in sorted(folded_forms.items())]
+
+    def get_prefix_query (self, prefix):
+        """Returns a `Q` object matching the entries whose form starts
+        with `prefix`, ignoring case, using the index on their key.
+
+        :param prefix: prefix to match
+        :type prefix: unicode string
+        :rtype: `Q`
+
+        """
+        key = make_key(prefix)
+        if len(prefix) > NAME_INDEX_KEY_LENGTH:
+            return Q(key=key, form__istartswith=prefix)
+        if connection.vendor == 'sqlite':
+            # SQLite's LIKE is case insensitive, and so cannot use the
+            # index.
+            successor = get_key_successor(key)
+            if successor is None:
+                return Q(key__gte=key)
+            return Q(key__gte=key, key__lt=successor)
+        # On PostgreSQL, Django indexes the key with
+        # varchar_pattern_ops, which LIKE prefix matches use.
+        return Q(key__startswith=key)
+
+    def filter_by_prefixes (self, prefixes):
+        """Returns the entries whose form starts with any of
+        `prefixes`, ignoring case.
+
+        :param prefixes: prefixes to match
+        :type prefixes: iterable of unicode strings
+        :rtype: `QuerySet` of `NameIndex`es
+
+        """
+        query = Q()
+        prefixes = [prefix for prefix in prefixes if prefix]
+        if not prefixes:
+            return self.none()
+        for prefix in prefixes:
+            query = query | self.get_prefix_query(prefix)
+        return self.filter(query)
 
 
 class NameIndex (models.Model):
@@ -8,6 +110,12 @@ class NameIndex (models.Model):
     name_part = models.ForeignKey('NamePart', blank=True, null=True,
                                   related_name='indexed_name_part_forms')
     form = models.CharField(max_length=800)
+    # Case folded, truncated form, indexed for prefix searches. Each
+    # name (or name part) has a single entry for each case folded
+    # form, but may have several for a key.
+    key = models.CharField(max_length=NAME_INDEX_KEY_LENGTH, db_index=True)
+
+    objects = NameIndexManager()
 
     class Meta:
         app_label = 'eats'
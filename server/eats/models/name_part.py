@@ -6,6 +6,7 @@ from name_index import NameIndex
 from name_part_type import NamePartType
 
 from eats.lib.name_form import create_name_forms
+from eats.lib.search_backends import get_search_backend
 
 
 class NamePartManager (BaseManager):
@@ -35,6 +36,15 @@ class NamePart (Topic, NameElement):
 
     def _add_name_index (self):
         """Adds the forms of this name to the name index."""
+        NameIndex.objects.bulk_create(self.build_name_index())
+
+    def build_name_index (self):
+        """Returns new, unsaved name index entries for the forms of
+        this name part.
+
+        :rtype: `list` of `NameIndex`
+
+        """
         parts = []
         language_code = self.language.get_code()
         script_code = self.script.get_code()
@@ -42,15 +52,17 @@ class NamePart (Topic, NameElement):
                                        script_code)
         for name in name_forms:
             parts.extend(name.split())
-        for part in set(parts):
-            indexed_form = NameIndex(entity=self.name.entity, name=self.name,
-                                     name_part=self, form=part)
-            indexed_form.save()
+        name = self.name
+        return NameIndex.objects.build_rows(parts, entity=name.entity,
+                                            name=name, name_part=self)
 
     def _delete_name_index_forms (self):
         """Deletes the indexed forms of this name."""
         self.indexed_name_part_forms.all().delete()
 
+    def _get_indexed_name (self):
+        return self.name
+
     @property
     def _language_role (self):
         """Returns the language role for this name.
@@ -146,6 +158,9 @@ class NamePart (Topic, NameElement):
             association.remove()
         name.update_name_cache()
         super(NamePart, self).remove()
+        # The name index forms of this name part are deleted along
+        # with it.
+        get_search_backend().update_name(name)
 
     @property
     def _script_role (self):
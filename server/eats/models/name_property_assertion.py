@@ -6,6 +6,7 @@ from base_manager import BaseManager
 from name import Name
 from name_cache import NameCache
 from property_assertion import PropertyAssertion
+from statistics_snapshot import ASSERTION_STATISTICS, NAME_LANGUAGES_SCRIPTS
 
 
 class NamePropertyAssertionManager (BaseManager):
@@ -96,33 +97,11 @@ class NamePropertyAssertionManager (BaseManager):
         :rtype: `NamePropertyAssertion` or None
 
         """
-        entity_names = NameCache.objects.filter(entity=entity)
-        if not entity_names.count():
-            raise self.model.DoesNotExist
-        if script is not None:
-            script_names = entity_names.filter(script=script)
-            if not script_names.count():
-                script_names = entity_names
-        else:
-            script_names = entity_names
-        if authority is not None:
-            authority_names = script_names.filter(authority=authority)
-            if not authority_names.count():
-                authority_names = script_names
-        else:
-            authority_names = script_names
-        if language is not None:
-            language_names = authority_names.filter(language=language)
-            if not language_names.count():
-                language_names = authority_names
-        else:
-            language_names = authority_names
-        names = language_names.filter(is_preferred=True)
-        if not names.count():
-            names = language_names
+        preferred_names = NameCache.objects.get_preferred(
+            [entity], authority, language, script)
         try:
-            return names[0].assertion
-        except IndexError:
+            return preferred_names[entity.pk].assertion
+        except KeyError:
             raise self.model.DoesNotExist
 
     def get_queryset (self):
@@ -133,6 +112,8 @@ class NamePropertyAssertionManager (BaseManager):
 
 class NamePropertyAssertion (Association, PropertyAssertion):
 
+    statistics_sections = ASSERTION_STATISTICS + (NAME_LANGUAGES_SCRIPTS,)
+
     objects = NamePropertyAssertionManager()
 
     class Meta:
@@ -153,6 +134,7 @@ class NamePropertyAssertion (Association, PropertyAssertion):
         cached_name = self.cached_name
         cached_name.is_preferred = is_preferred
         cached_name.save()
+        self._invalidate_entity_summary()
 
     @property
     def name (self):
@@ -165,6 +147,7 @@ class NamePropertyAssertion (Association, PropertyAssertion):
 
     def remove (self):
         """Deletes this property assertion."""
+        self._invalidate_entity_summary()
         self.name.remove()
         super(NamePropertyAssertion, self).remove()
 
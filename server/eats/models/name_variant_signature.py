@@ -0,0 +1,63 @@
+from django.db import models
+
+from language import Language
+from script import Script
+
+
+class NameVariantSignatureManager (models.Manager):
+
+    def get_changed (self, registry):
+        """Returns the languages and scripts whose names were last
+        indexed with name variant generators other than those of
+        `registry`, together with the signature of the generators in
+        `registry`.
+
+        :param registry: registry of the name variant generators
+        :type registry: `NameVariantRegistry`
+        :rtype: `list` of `tuple`s of `Language`, `Script` and `str`
+
+        """
+        recorded = dict([((language, script), signature) for
+                         language, script, signature in self.values_list(
+                    'language', 'script', 'signature')])
+        scripts = [(script, script.get_code()) for script in
+                   Script.objects.all()]
+        changed = []
+        for language in Language.objects.all():
+            language_code = language.get_code()
+            for script, script_code in scripts:
+                signature = registry.get_signature(language_code, script_code)
+                if recorded.get((language.pk, script.pk)) != signature:
+                    changed.append((language, script, signature))
+        return changed
+
+    def record (self, changed):
+        """Records the signatures of the generators with which the
+        names in each language and script have been indexed.
+
+        :param changed: languages and scripts with their signatures,
+          as returned by `get_changed`
+        :type changed: `list` of `tuple`s
+
+        """
+        for language, script, signature in changed:
+            self.update_or_create(language=language, script=script,
+                                  defaults={'signature': signature})
+
+
+class NameVariantSignature (models.Model):
+
+    """Model recording the signature of the name variant generators
+    with which the names in a language and script were indexed.
+
+    """
+
+    language = models.ForeignKey('Language', related_name='+')
+    script = models.ForeignKey('Script', related_name='+')
+    signature = models.CharField(max_length=40)
+
+    objects = NameVariantSignatureManager()
+
+    class Meta:
+        app_label = 'eats'
+        unique_together = ('language', 'script')
@@ -1,6 +1,7 @@
 from tmapi.models import Occurrence
 
 from base_manager import BaseManager
+from entity_summary import EntitySummary
 from property_assertion import PropertyAssertion
 
 
@@ -34,6 +35,10 @@ class NotePropertyAssertion (Occurrence, PropertyAssertion):
             self._entity = self.get_parent(proxy=Entity)
         return self._entity
 
+    def _invalidate_entity_summary (self):
+        EntitySummary.objects.invalidate(self.topic_id)
+        self._invalidate_statistics()
+
     @property
     def note (self):
         """Returns the textual content of the asserted note.
@@ -43,6 +48,11 @@ class NotePropertyAssertion (Occurrence, PropertyAssertion):
         """
         return self.get_value()
 
+    def remove (self):
+        """Deletes this property assertion."""
+        self._invalidate_entity_summary()
+        super(NotePropertyAssertion, self).remove()
+
     def update (self, note):
         """Updates this property assertion.
 
@@ -52,3 +62,4 @@ class NotePropertyAssertion (Occurrence, PropertyAssertion):
         """
         if self.get_value() != note:
             self.set_value(note)
+            self._invalidate_entity_summary()
@@ -1,9 +1,17 @@
+from eats.lib.topic_map_context import get_eats_topic_map
+
 from authority import Authority
 from date import Date
+from entity_summary import EntitySummary
+from statistics_snapshot import ASSERTION_STATISTICS, StatisticsSnapshot
 
 
 class PropertyAssertion (object):
 
+    # Sections of the statistics affected by changes to property
+    # assertions of this kind.
+    statistics_sections = ASSERTION_STATISTICS
+
     @property
     def authority (self):
         """Returns the authority of this property assertion.
@@ -63,16 +71,17 @@ class PropertyAssertion (object):
                     part.certainty = data[prefix + '_certainty']
                     part.set_normalised_value(data[prefix + '_normalised'])
                     part.date_type = data[prefix + '_type']
+            date.update_date_index()
         except:
             date.remove()
             raise
+        self._invalidate_entity_summary()
         return date
 
     @property
     def eats_topic_map (self):
         if not hasattr(self, '_eats_topic_map'):
-            from eats_topic_map import EATSTopicMap
-            self._eats_topic_map = self.get_topic_map(proxy=EATSTopicMap)
+            self._eats_topic_map = get_eats_topic_map(self.topic_map_id)
         return self._eats_topic_map
 
     @property
@@ -84,6 +93,18 @@ class PropertyAssertion (object):
             self._entity = role.get_player(proxy=Entity)
         return self._entity
 
+    def _invalidate_entity_summary (self):
+        """Marks the summary of the entity making this property
+        assertion, and the statistics it counts towards, as out of
+        date."""
+        EntitySummary.objects.invalidate(self.entity)
+        self._invalidate_statistics()
+
+    def _invalidate_statistics (self):
+        """Marks the sections of the statistics that this property
+        assertion counts towards as out of date."""
+        StatisticsSnapshot.objects.invalidate(self.statistics_sections)
+
     def get_date (self, date_id):
         """Returns the date specified by `date_id`. If there is no
         such date, or the date is not associated with this property
@@ -1,5 +1,7 @@
 from tmapi.models import Topic
 
+from eats.lib.infrastructure_catalogue import invalidate_infrastructure_catalogue
+
 from infrastructure import Infrastructure
 from infrastructure_manager import InfrastructureManager
 
@@ -12,11 +14,7 @@ class ScriptManager (InfrastructureManager):
             authority, association_type)
 
     def get_by_code (self, code):
-        for script in self.all():
-            if code == script.get_code():
-                return script
-        else:
-            raise self.model.DoesNotExist
+        return self._get_by_name(self.eats_topic_map.script_code_type, code)
 
     def get_queryset (self):
         return super(ScriptManager, self).get_queryset().filter(
@@ -78,3 +76,4 @@ class Script (Topic, Infrastructure):
             pass
         name = self.get_names(self.eats_topic_map.script_code_type)[0]
         name.set_value(code)
+        invalidate_infrastructure_catalogue()
@@ -0,0 +1,122 @@
+import json
+
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+# Sections of the statistics, each computed and stored separately.
+ASSERTIONS_PER_ENTITY = 'assertions_per_entity'
+DATE_COVERAGE = 'date_coverage'
+ENTITIES = 'entities'
+ENTITY_RELATIONSHIP_TYPES = 'entity_relationship_types'
+ENTITY_TYPES = 'entity_types'
+NAME_LANGUAGES_SCRIPTS = 'name_languages_scripts'
+STATISTICS_SECTIONS = (ENTITIES, ENTITY_TYPES, ENTITY_RELATIONSHIP_TYPES,
+                       NAME_LANGUAGES_SCRIPTS, DATE_COVERAGE,
+                       ASSERTIONS_PER_ENTITY)
+# Sections affected by any change to a property assertion or its
+# dates.
+ASSERTION_STATISTICS = (DATE_COVERAGE, ASSERTIONS_PER_ENTITY)
+
+
+class StatisticsSnapshotManager (models.Manager):
+
+    def get_version (self, section):
+        """Returns the number of changes recorded to the data counted
+        by `section`, or None if it has never been computed.
+
+        :param section: name of the section
+        :type section: `str`
+        :rtype: int
+
+        """
+        versions = self.filter(section=section).values_list('version',
+                                                            flat=True)
+        return versions[0] if versions else None
+
+    def invalidate (self, sections=STATISTICS_SECTIONS):
+        """Marks `sections` of the statistics as out of date, and
+        records a change to the data they count.
+
+        :param sections: names of the sections to mark
+        :type sections: sequence of `str`
+
+        """
+        self.filter(section__in=sections).update(
+            version=F('version') + 1, stale_since=Coalesce(
+                'stale_since', Value(timezone.now(),
+                                     output_field=models.DateTimeField())))
+
+    def record (self, section, counts, computed, version):
+        """Stores `counts` as `section` of the statistics, computed at
+        `computed`.
+
+        The section is marked as up to date only if no change has
+        been recorded to the data it counts since the computation
+        began, when its version was `version`.
+
+        :param section: name of the section
+        :type section: `str`
+        :param counts: counts making up the section
+        :type counts: `list` of (row, column, count) `tuple`s
+        :param computed: time the computation of `counts` began
+        :type computed: `datetime.datetime`
+        :param version: version of the section when the computation
+          of `counts` began, as returned by `get_version`
+        :type version: int
+        :rtype: `StatisticsSnapshot`
+
+        """
+        snapshot, created = self.get_or_create(
+            section=section, defaults={'computed': computed,
+                                       'counts': json.dumps(counts)})
+        if not created:
+            self.filter(section=section).update(
+                computed=computed, counts=json.dumps(counts))
+            self.filter(section=section, version=version).update(
+                stale_since=None)
+            snapshot = self.get(section=section)
+        return snapshot
+
+
+class StatisticsSnapshot (models.Model):
+
+    """Model storing a section of the statistics about the entities
+    in EATS, so that they need not be computed on each request.
+
+    A snapshot is marked as out of date whenever the data it counts
+    changes, and is recomputed when next requested, if it has been out
+    of date for too long, or by the eats_refresh_statistics management
+    command.
+
+    """
+
+    section = models.CharField(max_length=30, primary_key=True)
+    # JSON list of (row, column, count) triples.
+    counts = models.TextField()
+    computed = models.DateTimeField()
+    stale_since = models.DateTimeField(blank=True, null=True)
+    # Number of changes made to the data counted, used to tell
+    # whether any were made during a computation.
+    version = models.PositiveIntegerField(default=0)
+
+    objects = StatisticsSnapshotManager()
+
+    class Meta:
+        app_label = 'eats'
+
+    def get_counts (self):
+        """Returns the counts in this snapshot, keyed by row and
+        column.
+
+        :rtype: `dict`
+
+        """
+        return dict([((row, column), count) for row, column, count in
+                     json.loads(self.counts)])
+
+    @property
+    def is_stale (self):
+        return self.stale_since is not None
@@ -1,6 +1,7 @@
 from tmapi.models import Locator, Occurrence
 
 from base_manager import BaseManager
+from entity_summary import EntitySummary
 from property_assertion import PropertyAssertion
 
 
@@ -34,6 +35,10 @@ class SubjectIdentifierPropertyAssertion (Occurrence, PropertyAssertion):
             self._entity = self.get_parent(proxy=Entity)
         return self._entity
 
+    def _invalidate_entity_summary (self):
+        EntitySummary.objects.invalidate(self.topic_id)
+        self._invalidate_statistics()
+
     @property
     def subject_identifier (self):
         """Returns the textual content of the asserted subject_identifier.
@@ -43,6 +48,11 @@ class SubjectIdentifierPropertyAssertion (Occurrence, PropertyAssertion):
         """
         return self.get_value()
 
+    def remove (self):
+        """Deletes this property assertion."""
+        self._invalidate_entity_summary()
+        super(SubjectIdentifierPropertyAssertion, self).remove()
+
     def update (self, subject_identifier):
         """Updates this property assertion.
 
@@ -53,3 +63,4 @@ class SubjectIdentifierPropertyAssertion (Occurrence, PropertyAssertion):
         if self.get_value() != subject_identifier:
             self.set_value(subject_identifier,
                            Locator('http://www.w3.org/2001/XMLSchema#anyURI'))
+            self._invalidate_entity_summary()
@@ -4,30 +4,37 @@ preferences."""
 from django import template
 
 from eats.constants import UNNAMED_ENTITY_NAME
+from eats.models import EntitySummary, NameCache
 
 
 register = template.Library()
 
 
+def _get_admin_name (infrastructure):
+    """Returns the admin name of `infrastructure`, or an empty
+    string if it is None."""
+    if infrastructure is None:
+        return ''
+    return infrastructure.get_admin_name()
+
 @register.inclusion_tag('eats/display/duplicate_subject_identifiers.html',
                         takes_context=True)
 def display_duplicate_subject_identifiers (context, entity, subject_identifier,
                                            authority=None):
     duplicate_entities = entity.get_duplicate_subject_identifiers(
         subject_identifier, authority)
-    duplicate_entity_data = {}
+    duplicate_entity_data = []
     preferred_authority = context['preferred_authority']
     preferred_language = context['preferred_language']
     preferred_script = context['preferred_script']
+    name_forms = NameCache.objects.get_preferred_forms(
+        duplicate_entities, preferred_authority, preferred_language,
+        preferred_script)
     for duplicate_entity in duplicate_entities:
-        preferred_name = duplicate_entity.get_preferred_name(
-            preferred_authority, preferred_language, preferred_script)
-        try:
-            preferred_name_form = preferred_name.name.assembled_form
-        except AttributeError:
-            preferred_name_form = UNNAMED_ENTITY_NAME
-        duplicate_entity_data[duplicate_entity.get_id()] = preferred_name_form
-    return {'duplicate_entity_data': duplicate_entity_data}
+        duplicate_entity_data.append((duplicate_entity.get_id(),
+                                      name_forms.get(duplicate_entity.pk,
+                                                     UNNAMED_ENTITY_NAME)))
+    return {'duplicate_entities': duplicate_entity_data}
 
 @register.inclusion_tag('eats/display/entity_relationship_property_assertion.html', takes_context=True)
 def display_entity_relationship_property_assertion (context, entity,
@@ -35,6 +42,10 @@ def display_entity_relationship_property_assertion (context, entity,
     """Returns a context dictionary for rendering the template
     displaying `entity_relationship`.
 
+    If `context` contains related_entity_name_forms (as returned by
+    `Entity.get_related_entity_name_forms`), the name of the related
+    entity is taken from it.
+
     :param context: the context of the calling template
     :type context: `dict`
     :param entity: the entity being displayed
@@ -53,13 +64,13 @@ def display_entity_relationship_property_assertion (context, entity,
         relationship_type_name = \
             entity_relationship.get_relationship_type_reverse_name()
         other_entity = domain_entity
-    try:
-        other_entity_name_form = other_entity.get_preferred_name(
-            authority=context['preferred_authority'],
-            language=context['preferred_language'],
-            script=context['preferred_script']).name.assembled_form
-    except AttributeError:
-        other_entity_name_form = UNNAMED_ENTITY_NAME
+    name_forms = context.get('related_entity_name_forms')
+    if name_forms is None:
+        name_forms = NameCache.objects.get_preferred_forms(
+            [other_entity], context['preferred_authority'],
+            context['preferred_language'], context['preferred_script'])
+    other_entity_name_form = name_forms.get(other_entity.pk,
+                                            UNNAMED_ENTITY_NAME)
     other_entity_id = other_entity.get_id()
     if entity_relationship.certainty == \
             context['property_assertion_full_certainty']:
@@ -79,28 +90,24 @@ def display_entity_search_result (context, entity):
     Requires that `context` contains the user preferences.
 
     """
-    dates = entity.get_existence_dates()
+    summary = EntitySummary.objects.get_for_entity(entity)
     preferred_authority = context['preferred_authority']
     preferred_language = context['preferred_language']
     preferred_script = context['preferred_script']
-    preferred_name = entity.get_preferred_name(
+    preferred_name_form = summary.get_preferred_name_form(
+        preferred_authority, preferred_language, preferred_script) or \
+        UNNAMED_ENTITY_NAME
+    other_name_values = summary.get_other_name_forms(
         preferred_authority, preferred_language, preferred_script)
-    other_names = entity.get_eats_names(exclude=preferred_name)
-    try:
-        preferred_name_form = preferred_name.name.assembled_form
-    except AttributeError:
-        preferred_name_form = UNNAMED_ENTITY_NAME
-    other_name_values = set()
-    for name in other_names:
-        other_name_values.add(name.name.assembled_form)
-    other_name_values = list(other_name_values)
-    other_name_values.sort()
-    entity_relationships = entity.get_entity_relationships()
-    entity_types = entity.get_entity_types()
-    entity_type_values = set()
-    for entity_type in entity_types:
-        entity_type_values.add(entity_type.entity_type.get_admin_name())
-    notes = entity.get_notes()
+    entity_relationships = []
+    related_entity_name_forms = {}
+    if summary.relationship_count:
+        entity_relationships = entity.get_entity_relationships()
+        related_entity_name_forms = entity.get_related_entity_name_forms(
+            preferred_authority, preferred_language, preferred_script)
+    entity_type_values = summary.get_entity_type_names()
+    notes = summary.get_notes()
+    dates = summary.get_existence_dates()
     return {'dates': dates, 'entity': entity,
             'entity_relationships': entity_relationships,
             'entity_types': entity_type_values, 'notes': notes,
@@ -110,20 +117,22 @@ def display_entity_search_result (context, entity):
             'preferred_name_form': preferred_name_form,
             'preferred_script': preferred_script,
             'property_assertion_full_certainty':
-                context['property_assertion_full_certainty']}
+                context['property_assertion_full_certainty'],
+            'related_entity_name_forms': related_entity_name_forms}
 
 @register.inclusion_tag('eats/display/name_metadata.html')
 def display_name_metadata (name):
     """Returns a context dictionary for rendering the template
     displaying the metadata of `name`."""
-    return {'language': name.language, 'name_type': name.name_type,
-            'script': name.script}
+    return {'language_name': _get_admin_name(name.language),
+            'name_type_name': _get_admin_name(name.name_type),
+            'script_name': _get_admin_name(name.script)}
 
 @register.inclusion_tag('eats/display/property_assertion_authority.html')
 def display_property_assertion_authority (property_assertion):
     """Returns a context dictionary for rendering the template
     displaying the authority of `property_assertion`."""
-    return {'authority': property_assertion.authority}
+    return {'authority_name': _get_admin_name(property_assertion.authority)}
 
 @register.inclusion_tag('eats/display/property_assertion_dates.html')
 def display_property_assertion_dates (property_assertion):
@@ -1,7 +1,19 @@
+from test_authority_usage import *
+from test_cache_verifier import *
+from test_date_bounds import *
+from test_duplicate_detection import *
 from test_eatsml_export import *
 from test_eatsml_import import *
+from test_entity_search import *
+from test_infrastructure_catalogue import *
 from test_lookups import *
+from test_name_index_keys import *
+from test_name_variants import *
 from test_property_assertions import *
+from test_reindex import *
+from test_statistics import *
+from test_topic_map_context import *
+from test_topic_registry import *
 from models import *
 from test_name_form import *
 from views import *
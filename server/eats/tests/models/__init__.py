@@ -6,6 +6,7 @@ from test_date_type import *
 from test_eats_topic_map import *
 from test_entity_relationship import *
 from test_entity_relationship_type import *
+from test_entity_summary import *
 from test_entity import *
 from test_entity_type import *
 from test_entity_type_type import *
@@ -1,5 +1,9 @@
+from django.db import DatabaseError, transaction
+
 from eats.exceptions import EATSValidationException
-from eats.tests.models.model_test_case import ModelTestCase
+from eats.lib.authority_profile import authority_profile_cache
+from eats.lib.topic_map_context import TopicMapContext
+from eats.tests.models.model_test_case import ModelTestCase, ModelTransactionTestCase
 
 
 class AuthorityTestCase (ModelTestCase):
@@ -21,6 +25,37 @@ class AuthorityTestCase (ModelTestCase):
         self.authority.set_calendars([])
         self.assertEqual(0, len(self.authority.get_calendars()))
 
+    def test_authority_profile (self):
+        language1 = self.create_language('English', 'en')
+        language2 = self.create_language('French', 'fr')
+        script = self.create_script('Latin', 'Latn', ' ')
+        self.authority.set_languages([language1])
+        self.authority.set_scripts([script])
+        authority_profile_cache.reset_statistics()
+        with TopicMapContext(self.tm) as context:
+            self.authority.validate_components(language=language1,
+                                               script=script)
+            # Once the profile has been checked in this context, no
+            # further queries are needed.
+            with self.assertNumQueries(0):
+                self.assertRaises(EATSValidationException,
+                                  self.authority.validate_components,
+                                  language=language2)
+            self.assertEqual(context.component_validations, 3)
+            self.assertEqual(context.authority_profile_loads, 1)
+            # Setting the components makes the profile out of date,
+            # even in other processes.
+            self.authority.set_languages([language1, language2])
+            self.authority.validate_components(language=language2)
+            self.assertEqual(context.authority_profile_loads, 2)
+        self.assertEqual(authority_profile_cache.get_statistics(),
+                         {'loads': 2, 'validations': 4, 'version_checks': 2})
+        # Profiles loaded inside a transaction (as every test is) are
+        # not shared outside of their context.
+        with self.assertNumQueries(2):
+            self.authority.validate_components(language=language1)
+        self.assertEqual(authority_profile_cache.loads, 3)
+
     def test_change_calendars (self):
         entity = self.tm.create_entity()
         calendar1 = self.create_calendar('Gregorian')
@@ -426,3 +461,53 @@ class AuthorityTestCase (ModelTestCase):
         self.assertEqual(self.authority.get_scripts().count(), 2)
         self.assertTrue(script2 in self.authority.get_scripts())
         self.assertTrue(script3 in self.authority.get_scripts())
+
+
+class AuthorityProfileTransactionTestCase (ModelTransactionTestCase):
+
+    def test_authority_profile_cached (self):
+        language = self.create_language('English', 'en')
+        self.authority.set_languages([language])
+        authority_profile_cache.clear()
+        authority_profile_cache.reset_statistics()
+        self.authority.validate_components(language=language)
+        # Outside of a context, the version is checked on each
+        # validation, but the profile is not reloaded.
+        with self.assertNumQueries(1):
+            self.authority.validate_components(language=language)
+        self.assertEqual(authority_profile_cache.loads, 1)
+
+    def test_authority_profile_in_transaction (self):
+        language = self.create_language('English', 'en')
+        self.authority.set_languages([language])
+        authority_profile_cache.clear()
+        authority_profile_cache.reset_statistics()
+        with transaction.atomic():
+            self.authority.validate_components(language=language)
+            # A profile loaded in a transaction that has not changed
+            # the authority's components is shared, so only the
+            # version is checked on each later validation.
+            with self.assertNumQueries(1):
+                self.authority.validate_components(language=language)
+        with self.assertNumQueries(1):
+            self.authority.validate_components(language=language)
+        self.assertEqual(authority_profile_cache.loads, 1)
+
+    def test_authority_profile_rollback (self):
+        language1 = self.create_language('English', 'en')
+        language2 = self.create_language('French', 'fr')
+        self.authority.set_languages([language1])
+        authority_profile_cache.clear()
+        try:
+            with transaction.atomic():
+                self.authority.set_languages([language1, language2])
+                self.authority.validate_components(language=language2)
+                raise DatabaseError
+        except DatabaseError:
+            pass
+        # A later change takes the version number used in the rolled
+        # back transaction, but the profile loaded there is not used.
+        self.authority.set_languages([language1])
+        self.assertRaises(EATSValidationException,
+                          self.authority.validate_components,
+                          language=language2)
@@ -1,4 +1,6 @@
 from eats.exceptions import EATSValidationException
+from eats.lib.date_bounds import get_date_bounds
+from eats.models import Date, DateIndex
 from eats.tests.models.model_test_case import ModelTransactionTestCase
 
 
@@ -191,6 +193,54 @@ class DateTestCase (ModelTransactionTestCase):
         self.assertEqual(date.point.assembled_form, '3 December 2010?')
         self.assertEqual(date.assembled_form, '3 December 2010?')
 
+    def test_date_index (self):
+        assertion = self.entity.create_existence_property_assertion(
+            self.authority)
+        julian = self.create_calendar('Julian')
+        self.authority.set_calendars([self.calendar, julian])
+        date1 = assertion.create_date(
+            {'date_period': self.date_period, 'start': '1650',
+             'start_calendar': self.calendar, 'start_type': self.date_type,
+             'start_normalised': '1650',
+             'start_certainty': self.tm.date_full_certainty,
+             'end_tpq': '25 March 1701', 'end_tpq_calendar': julian,
+             'end_tpq_type': self.date_type,
+             'end_tpq_normalised': '1701-03-25',
+             'end_tpq_certainty': self.tm.date_full_certainty})
+        entries = DateIndex.objects.filter(date=date1).order_by('start')
+        self.assertEqual(
+            [(entry.entity, entry.date_part_type, entry.start, entry.end)
+             for entry in entries],
+            [(self.entity, self.tm.start_date_type) +
+             get_date_bounds('1650'),
+             (self.entity, self.tm.end_tpq_date_type) +
+             get_date_bounds('1701-04-05')])
+        date2 = assertion.create_date(
+            {'date_period': self.date_period, 'point': 'about 1720',
+             'point_calendar': self.calendar, 'point_type': self.date_type,
+             'point_normalised': 'about 1720',
+             'point_certainty': self.tm.date_no_certainty})
+        # A date part whose normalised form cannot be read is not
+        # indexed.
+        self.assertEqual(DateIndex.objects.filter(date=date2).count(), 0)
+        for start, end, expected in (
+            ('1600', '1649', []), ('1600', '1650-01-01', [date1]),
+            ('1675', '1680', [date1]), ('1701-04-05', None, [date1]),
+            ('1701-04-06', None, []), (None, '1649-12', []),
+            (None, None, [date1])):
+            self.assertEqual(list(Date.objects.filter_by_range(start, end)),
+                             expected)
+        self.assertEqual(list(Date.objects.filter_by_range(
+                    '1675', '1680', self.tm.name_assertion_type)), [])
+        date2.update({'date_period': self.date_period, 'point': '1720',
+                      'point_calendar': self.calendar,
+                      'point_type': self.date_type, 'point_normalised': '1720',
+                      'point_certainty': self.tm.date_full_certainty})
+        self.assertEqual(list(Date.objects.filter_by_range('1720', '1720')),
+                         [date2])
+        date2.remove()
+        self.assertEqual(DateIndex.objects.filter(date=date2).count(), 0)
+
     def test_property_assertion (self):
         assertion = self.entity.create_existence_property_assertion(
             self.authority)
@@ -1,8 +1,13 @@
 from django.contrib.sites.models import Site
 from django.core.urlresolvers import reverse
+from django.db import transaction
+
+from tmapi.models import Association, Identifier, ItemIdentifier, Name as TopicMapName, Occurrence, Role, SubjectIdentifier, Topic
 
 from eats.exceptions import EATSMergedIdentifierException
-from eats.models import Entity, EntityRelationshipPropertyAssertion, ExistencePropertyAssertion, Name, NameCache, NameIndex, NamePropertyAssertion
+from eats.lib.entity_deletion import EntityDeletionPlan
+from eats.lib.entity_merge import EntityMerger
+from eats.models import Authority, Entity, EntityRelationshipCache, EntityRelationshipPropertyAssertion, EntitySummary, ExistencePropertyAssertion, Name, NameCache, NameIndex, NamePropertyAssertion
 from eats.tests.models.model_test_case import ModelTestCase
 
 
@@ -167,6 +172,60 @@ class EntityTestCase (ModelTestCase):
             self.authority, self.language1, self.script1)
         self.assertEqual(name5, preferred_name)
 
+    def test_get_preferred_names (self):
+        entity1 = self.tm.create_entity(self.authority)
+        entity2 = self.tm.create_entity(self.authority)
+        entity3 = self.tm.create_entity(self.authority)
+        entity1.create_name_property_assertion(
+            self.authority, self.name_type, self.language1, self.script1,
+            'Name1', False)
+        entity1.create_name_property_assertion(
+            self.authority2, self.name_type, self.language2, self.script1,
+            'Name2', True)
+        entity2.create_name_property_assertion(
+            self.authority, self.name_type, self.language2, self.script2,
+            'Name3', True)
+        entities = [entity1, entity2, entity3]
+        for preferences in ((self.authority, self.language1, self.script1),
+                            (self.authority2, None, self.script1),
+                            (None, self.language2, self.script2),
+                            (None, None, None)):
+            with self.assertNumQueries(1):
+                name_forms = NameCache.objects.get_preferred_forms(
+                    entities, *preferences)
+            expected = {}
+            for entity in entities:
+                name = entity.get_preferred_name(*preferences)
+                if name is not None:
+                    expected[entity.pk] = name.name.assembled_form
+            self.assertEqual(name_forms, expected)
+
+    def test_get_related_entity_name_forms (self):
+        relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.authority.set_entity_relationship_types([relationship_type])
+        entity1 = self.tm.create_entity(self.authority)
+        entity2 = self.tm.create_entity(self.authority)
+        entity3 = self.tm.create_entity(self.authority)
+        entity2.create_name_property_assertion(
+            self.authority, self.name_type, self.language1, self.script1,
+            'Name2')
+        entity3.create_name_property_assertion(
+            self.authority, self.name_type, self.language1, self.script1,
+            'Name3')
+        self.assertEqual(entity1.get_related_entity_name_forms(
+                None, None, None), {})
+        certainty = self.tm.property_assertion_full_certainty
+        entity1.create_entity_relationship_property_assertion(
+            self.authority, relationship_type, entity1, entity2, certainty)
+        entity3.create_entity_relationship_property_assertion(
+            self.authority, relationship_type, entity3, entity1, certainty)
+        with self.assertNumQueries(2):
+            name_forms = entity1.get_related_entity_name_forms(
+                self.authority, None, None)
+        self.assertEqual(name_forms, {entity2.pk: 'Name2',
+                                      entity3.pk: 'Name3'})
+
     def test_manager_filter_by_entity_type (self):
         self.assertEqual(Entity.objects.count(), 0)
         entity_type_1 = self.create_entity_type('person')
@@ -287,6 +346,97 @@ class EntityTestCase (ModelTestCase):
         self.assertEqual(set(entity1.get_entity_relationships()),
                          set([er1, er2]))
 
+    def test_batch_merge (self):
+        entity1 = self.tm.create_entity(self.authority)
+        entity2 = self.tm.create_entity(self.authority)
+        entity3 = self.tm.create_entity(self.authority)
+        entity4 = self.tm.create_entity(self.authority)
+        entity3_id = entity3.get_id()
+        entity_relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.authority.set_entity_relationship_types(
+            [entity_relationship_type])
+        name2 = entity2.create_name_property_assertion(
+            self.authority, self.name_type, self.language1, self.script1,
+            'Name2', False)
+        name3 = entity3.create_name_property_assertion(
+            self.authority, self.name_type, self.language1, self.script1,
+            'Name3', False)
+        er = entity3.create_entity_relationship_property_assertion(
+            self.authority, entity_relationship_type, entity3, entity4,
+            self.tm.property_assertion_full_certainty)
+        note = entity3.create_note_property_assertion(self.authority, 'Note')
+        # The second pair refers to an entity merged by the first.
+        merged = EntityMerger(self.tm).merge([(entity2, entity3),
+                                              (entity1, entity2)])
+        self.assertEqual(merged, {entity2.pk: entity1, entity3.pk: entity1})
+        self.assertEqual(set(Entity.objects.all()), set([entity1, entity4]))
+        self.assertEqual(set(entity1.get_eats_names()), set([name2, name3]))
+        self.assertEqual(set(NameCache.objects.values_list(
+                    'entity', flat=True)), set([entity1.pk]))
+        self.assertEqual(set(NameIndex.objects.values_list(
+                    'entity', flat=True)), set([entity1.pk]))
+        self.assertEqual(list(entity1.get_entity_relationships()), [er])
+        cached_relationship = EntityRelationshipCache.objects.get(
+            entity_relationship=er)
+        self.assertEqual(cached_relationship.domain_entity, entity1)
+        self.assertEqual(cached_relationship.range_entity, entity4)
+        self.assertEqual(list(entity1.get_notes()), [note])
+        # Each of the entities merged in had an existence property
+        # assertion identical to that of entity1.
+        self.assertEqual(entity1.get_existences().count(), 1)
+        self.assertRaises(EATSMergedIdentifierException,
+                          Entity.objects.get_by_identifier, entity3_id)
+
+    def test_filter_asserting_authorities (self):
+        entity1 = self.tm.create_entity(self.authority)
+        entity2 = self.tm.create_entity()
+        entity3 = self.tm.create_entity()
+        self.assertEqual(
+            list(Entity.objects.filter_asserting_authorities([entity1])),
+            [self.authority])
+        self.assertEqual(
+            list(Entity.objects.filter_asserting_authorities([entity2])), [])
+        entity2.create_note_property_assertion(self.authority2, 'Note')
+        self.assertEqual(
+            list(Entity.objects.filter_asserting_authorities([entity2])),
+            [self.authority2])
+        entity_relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        authority3 = self.create_authority('Test3')
+        authority3.set_entity_relationship_types([entity_relationship_type])
+        entity1.create_entity_relationship_property_assertion(
+            authority3, entity_relationship_type, entity1, entity3,
+            self.tm.property_assertion_full_certainty)
+        self.assertEqual(
+            list(Entity.objects.filter_asserting_authorities([entity3])),
+            [authority3])
+        self.assertEqual(
+            set(Entity.objects.filter_asserting_authorities(
+                    [entity1, entity2, entity3])),
+            set([self.authority, self.authority2, authority3]))
+        # An authority making many assertions of both kinds is
+        # returned once, without the scopes of the assertions being
+        # joined to each other.
+        for i in range(3):
+            entity2.create_note_property_assertion(authority3, 'Note')
+            entity2.create_subject_identifier_property_assertion(
+                authority3, 'http://www.example.org/%d/' % i)
+            entity2.create_existence_property_assertion(authority3)
+        authorities = Entity.objects.filter_asserting_authorities([entity2])
+        self.assertEqual(sorted(authorities, key=lambda item: item.pk),
+                         [self.authority2, authority3])
+        sql = str(authorities.query).upper()
+        self.assertFalse('DISTINCT' in sql)
+        self.assertFalse('OUTER JOIN' in sql)
+        merger = EntityMerger(self.tm)
+        self.assertTrue(merger.can_merge(
+                [entity1, entity3], Authority.objects.filter(
+                    pk__in=[self.authority.pk, authority3.pk])))
+        self.assertFalse(merger.can_merge(
+                [entity1, entity2], Authority.objects.filter(
+                    pk__in=[self.authority.pk, authority3.pk])))
+
     def test_remove (self):
         self.assertEqual(Entity.objects.count(), 0)
         self.assertEqual(ExistencePropertyAssertion.objects.count(), 0)
@@ -342,6 +492,76 @@ class EntityTestCase (ModelTestCase):
         self.assertEqual(NameIndex.objects.count(), 0)
         self.assertEqual(NamePropertyAssertion.objects.count(), 0)
 
+    def _get_rows (self):
+        models = (Association, Association.scope.through, Identifier,
+                  ItemIdentifier, Occurrence, Role, SubjectIdentifier,
+                  Topic, Topic.types.through, TopicMapName, EntitySummary,
+                  EntityRelationshipCache, NameCache, NameIndex)
+        return dict([(model, set(model.objects.values_list('pk', flat=True)))
+                     for model in models])
+
+    def test_remove_plan (self):
+        # Deleting entities with an EntityDeletionPlan must leave the
+        # database as removing each property assertion would.
+        name_part_type = self.create_name_part_type('given')
+        self.authority.set_name_part_types([name_part_type])
+        entity_relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.authority.set_entity_relationship_types(
+            [entity_relationship_type])
+        entity_type = self.create_entity_type('Person')
+        self.authority.set_entity_types([entity_type])
+        entities = []
+        for i in range(2):
+            entity = self.tm.create_entity(self.authority)
+            assertion = entity.create_name_property_assertion(
+                self.authority, self.name_type, self.language1, self.script1,
+                'Name %d' % i)
+            assertion.name.create_name_part(
+                name_part_type, self.language1, self.script1, 'Part', 1)
+            entity.create_entity_type_property_assertion(
+                self.authority, entity_type)
+            entity.create_note_property_assertion(self.authority, 'Note')
+            entity.create_subject_identifier_property_assertion(
+                self.authority, 'http://www.example.org/%d/' % i)
+            entity.get_eats_names()[0].item_identifiers.add(
+                ItemIdentifier.objects.create(
+                    address='http://www.example.org/ii/%d' % i,
+                    containing_topic_map=self.tm))
+            entities.append(entity)
+        other = self.tm.create_entity(self.authority)
+        entities[0].create_entity_relationship_property_assertion(
+            self.authority, entity_relationship_type, entities[0], other,
+            self.tm.property_assertion_full_certainty)
+        entities[1].create_entity_relationship_property_assertion(
+            self.authority, entity_relationship_type, other, entities[1],
+            self.tm.property_assertion_full_certainty)
+        EntitySummary.objects.get_for_entity(other)
+        entity_ids = [entity.pk for entity in entities]
+        try:
+            with transaction.atomic():
+                for entity in entities:
+                    for assertion_getter in [
+                            entity.get_eats_names,
+                            entity.get_entity_relationships,
+                            entity.get_entity_types, entity.get_existences,
+                            entity.get_eats_subject_identifiers,
+                            entity.get_notes]:
+                        for assertion in assertion_getter():
+                            assertion.remove()
+                    Topic.remove(entity)
+                expected = self._get_rows()
+                raise ValueError
+        except ValueError:
+            pass
+        # Deletion clears the primary keys of the deleted objects.
+        entities = Entity.objects.filter(pk__in=entity_ids)
+        EntityDeletionPlan(self.tm, entities).delete()
+        rows = self._get_rows()
+        for model in expected:
+            self.assertEqual(rows[model], expected[model])
+        self.assertEqual(list(Entity.objects.all()), [other])
+
     def test_traverse_to_entity (self):
         entity_relationship_type = self.create_entity_relationship_type(
             'is child of', 'is parent of')
@@ -0,0 +1,94 @@
+from eats.models import EntitySummary
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class EntitySummaryTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(EntitySummaryTestCase, self).setUp()
+        self.name_type = self.create_name_type('regular')
+        self.language1 = self.create_language('English', 'en')
+        self.language2 = self.create_language('French', 'fr')
+        self.script = self.create_script('Latin', 'Latn', ' ')
+        self.entity_type = self.create_entity_type('person')
+        self.relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.authority.set_languages([self.language1, self.language2])
+        self.authority.set_name_types([self.name_type])
+        self.authority.set_scripts([self.script])
+        self.authority.set_entity_types([self.entity_type])
+        self.authority.set_entity_relationship_types([self.relationship_type])
+        self.entity = self.tm.create_entity(self.authority)
+
+    def test_empty (self):
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertEqual(summary.get_entity_type_names(), [])
+        self.assertEqual(summary.get_notes(), [])
+        self.assertEqual(summary.get_preferred_name_form(None, None, None),
+                         None)
+        self.assertEqual(summary.get_subject_identifiers(), [])
+        self.assertEqual(summary.relationship_count, 0)
+        self.assertFalse(summary.has_names())
+
+    def test_entity_types (self):
+        assertion = self.entity.create_entity_type_property_assertion(
+            self.authority, self.entity_type)
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertEqual(summary.get_entity_type_names(), ['person'])
+        assertion.remove()
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertEqual(summary.get_entity_type_names(), [])
+
+    def test_names (self):
+        self.entity.create_name_property_assertion(
+            self.authority, self.name_type, self.language1, self.script,
+            'Name1')
+        name2 = self.entity.create_name_property_assertion(
+            self.authority, self.name_type, self.language2, self.script,
+            'Name2', False)
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertTrue(summary.has_names())
+        for language in (None, self.language1, self.language2):
+            expected = self.entity.get_preferred_name(
+                self.authority, language, self.script).name.assembled_form
+            self.assertEqual(summary.get_preferred_name_form(
+                    self.authority, language, self.script), expected)
+        self.assertEqual(summary.get_other_name_forms(
+                self.authority, self.language2, None), ['Name1'])
+        name2.update(self.name_type, self.language2, self.script, 'Name3',
+                     False)
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertEqual(summary.get_preferred_name_form(
+                self.authority, self.language2, None), 'Name3')
+
+    def test_notes_and_subject_identifiers (self):
+        note = self.entity.create_note_property_assertion(
+            self.authority, 'A note')
+        self.entity.create_subject_identifier_property_assertion(
+            self.authority, 'http://www.example.org/test/')
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertEqual(summary.get_notes(), ['A note'])
+        self.assertEqual(summary.get_subject_identifiers(),
+                         ['http://www.example.org/test/'])
+        note.update('A changed note')
+        summary = EntitySummary.objects.get_for_entity(self.entity)
+        self.assertEqual(summary.get_notes(), ['A changed note'])
+
+    def test_relationships (self):
+        entity2 = self.tm.create_entity(self.authority)
+        EntitySummary.objects.get_for_entity(entity2)
+        relationship = self.entity.create_entity_relationship_property_assertion(
+            self.authority, self.relationship_type, self.entity, entity2,
+            self.tm.property_assertion_full_certainty)
+        self.assertEqual(EntitySummary.objects.get_for_entity(
+                self.entity).relationship_count, 1)
+        self.assertEqual(EntitySummary.objects.get_for_entity(
+                entity2).relationship_count, 1)
+        relationship.remove()
+        self.assertEqual(EntitySummary.objects.get_for_entity(
+                entity2).relationship_count, 0)
+
+    def test_summary_reused (self):
+        EntitySummary.objects.get_for_entity(self.entity)
+        with self.assertNumQueries(1):
+            EntitySummary.objects.get_for_entity(self.entity)
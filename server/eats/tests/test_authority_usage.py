@@ -0,0 +1,100 @@
+from eats.lib.authority_usage import AuthorityUsageIndex
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class AuthorityUsageIndexTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(AuthorityUsageIndexTestCase, self).setUp()
+        self.other_authority = self.create_authority('Other')
+        self.gregorian = self.create_calendar('Gregorian')
+        self.julian = self.create_calendar('Julian')
+        self.date_period = self.create_date_period('lifespan')
+        self.date_type = self.create_date_type('exact')
+        self.relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.person = self.create_entity_type('person')
+        self.place = self.create_entity_type('place')
+        self.english = self.create_language('English', 'en')
+        self.french = self.create_language('French', 'fr')
+        self.latin = self.create_script('Latin', 'Latn', ' ')
+        self.given = self.create_name_part_type('given')
+        self.regular = self.create_name_type('regular')
+        for authority in (self.authority, self.other_authority):
+            authority.set_calendars([self.gregorian, self.julian])
+            authority.set_date_periods([self.date_period])
+            authority.set_date_types([self.date_type])
+            authority.set_entity_relationship_types([self.relationship_type])
+            authority.set_entity_types([self.person, self.place])
+            authority.set_languages([self.english, self.french])
+            authority.set_name_part_types([self.given])
+            authority.set_name_types([self.regular])
+            authority.set_scripts([self.latin])
+        self.index = AuthorityUsageIndex(self.authority)
+
+    def test_get_usage (self):
+        entity1 = self.tm.create_entity(self.authority)
+        entity2 = self.tm.create_entity(self.authority)
+        entity1.create_entity_type_property_assertion(
+            self.authority, self.person)
+        entity2.create_entity_type_property_assertion(
+            self.authority, self.person)
+        entity2.create_entity_type_property_assertion(
+            self.other_authority, self.place)
+        entity1.create_entity_relationship_property_assertion(
+            self.authority, self.relationship_type, entity1, entity2,
+            self.tm.property_assertion_full_certainty)
+        # An English name with a French name part, an English name
+        # with an English name part, and a name of the other
+        # authority.
+        assertion = entity1.create_name_property_assertion(
+            self.authority, self.regular, self.english, self.latin,
+            'Jean Smith')
+        assertion.name.create_name_part(self.given, self.french, self.latin,
+                                        'Jean', 1)
+        assertion = entity2.create_name_property_assertion(
+            self.authority, self.regular, self.english, self.latin,
+            'Joan Mills')
+        assertion.name.create_name_part(self.given, self.english, self.latin,
+                                        'Joan', 1)
+        entity2.create_name_property_assertion(
+            self.other_authority, self.regular, self.french, self.latin,
+            'Jeanne Moulin')
+        existence = entity1.get_existences()[0]
+        existence.create_date({
+                'date_period': self.date_period, 'point': '1 June 2001',
+                'point_calendar': self.gregorian,
+                'point_type': self.date_type,
+                'point_normalised': '2001-06-01',
+                'point_certainty': self.tm.date_full_certainty})
+        self.assertEqual(self.index.get_usage('calendar'),
+                         {self.gregorian.pk: 1})
+        self.assertEqual(self.index.get_usage('date_period'),
+                         {self.date_period.pk: 1})
+        self.assertEqual(self.index.get_usage('date_type'),
+                         {self.date_type.pk: 1})
+        self.assertEqual(self.index.get_usage('entity_relationship_type'),
+                         {self.relationship_type.pk: 1})
+        self.assertEqual(self.index.get_usage('entity_type'),
+                         {self.person.pk: 2})
+        self.assertEqual(self.index.get_usage('language'),
+                         {self.english.pk: 2, self.french.pk: 1})
+        self.assertEqual(self.index.get_usage('name_part_type'),
+                         {self.given.pk: 2})
+        self.assertEqual(self.index.get_usage('name_type'),
+                         {self.regular.pk: 2})
+        self.assertEqual(self.index.get_usage('script'), {self.latin.pk: 2})
+        # Usage may be restricted to particular components, each kind
+        # being counted in a single query.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.index.get_usage(
+                    'language', [self.french]), {self.french.pk: 1})
+        with self.assertNumQueries(1):
+            self.assertEqual(self.index.get_usage(
+                    'entity_type', [self.place]), {})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.index.get_usage('script', []), {})
+        usage = AuthorityUsageIndex(self.other_authority).get_all_usage()
+        self.assertEqual(usage['entity_type'], {self.place.pk: 1})
+        self.assertEqual(usage['language'], {self.french.pk: 1})
+        self.assertEqual(usage['calendar'], {})
@@ -0,0 +1,86 @@
+from eats.lib.cache_verifier import CacheVerifier
+from eats.models import EntityRelationshipCache, NameCache, NameIndex
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class CacheVerifierTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(CacheVerifierTestCase, self).setUp()
+        language = self.create_language('English', 'en')
+        name_type = self.create_name_type('regular')
+        script = self.create_script('Latin', 'Latn', ' ')
+        relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.authority.set_languages([language])
+        self.authority.set_name_types([name_type])
+        self.authority.set_scripts([script])
+        self.authority.set_entity_relationship_types([relationship_type])
+        self.entities = []
+        self.names = []
+        for form in ('Alan Smith', 'Bob Jones', 'Carol Brown'):
+            entity = self.tm.create_entity(self.authority)
+            assertion = entity.create_name_property_assertion(
+                self.authority, name_type, language, script, form)
+            self.entities.append(entity)
+            self.names.append(assertion.name)
+        self.relationship = \
+            self.entities[0].create_entity_relationship_property_assertion(
+            self.authority, relationship_type, self.entities[0],
+            self.entities[1], self.tm.property_assertion_full_certainty)
+
+    def _get_cache_data (self):
+        return (set(NameCache.objects.values_list('name', 'form')),
+                sorted(NameIndex.objects.values_list('name', 'form')),
+                set(EntityRelationshipCache.objects.values_list(
+                    'entity_relationship', 'domain_entity', 'range_entity')))
+
+    def test_no_drift (self):
+        expected = self._get_cache_data()
+        report = CacheVerifier(batch_size=2).verify()
+        self.assertEqual(report['name_cache']['checked'], 3)
+        self.assertEqual(report['relationship_cache']['checked'], 1)
+        for cache in ('name_cache', 'name_index', 'relationship_cache'):
+            for kind in ('missing', 'orphaned', 'stale'):
+                self.assertEqual(report[cache][kind], 0)
+        self.assertEqual(self._get_cache_data(), expected)
+
+    def test_repair (self):
+        expected = self._get_cache_data()
+        NameCache.objects.filter(name=self.names[0]).delete()
+        NameCache.objects.filter(name=self.names[1]).update(form='Wrong')
+        NameIndex.objects.filter(name=self.names[2], form='Brown').delete()
+        EntityRelationshipCache.objects.all().update(
+            range_entity=self.entities[2])
+        report = CacheVerifier(repair=False, batch_size=2).verify()
+        self.assertEqual(report['name_cache']['missing'], 1)
+        self.assertEqual(report['name_cache']['details']['missing'],
+                         [self.names[0].pk])
+        self.assertEqual(report['name_cache']['stale'], 1)
+        self.assertEqual(report['name_index']['stale'], 1)
+        self.assertEqual(report['relationship_cache']['stale'], 1)
+        self.assertNotEqual(self._get_cache_data(), expected)
+        CacheVerifier(batch_size=2).verify()
+        self.assertEqual(self._get_cache_data(), expected)
+        report = CacheVerifier(repair=False, batch_size=2).verify()
+        self.assertEqual(report['name_cache']['stale'], 0)
+
+    def test_orphans (self):
+        expected = self._get_cache_data()
+        # Create entries for a name and a relationship that do not
+        # exist.
+        missing_pk = 1000000
+        NameIndex.objects.create(entity=self.entities[0], name_id=missing_pk,
+                                 form='Orphan')
+        EntityRelationshipCache.objects.create(
+            entity_relationship_id=missing_pk, authority=self.authority,
+            domain_entity=self.entities[0], range_entity=self.entities[2],
+            relationship_type=self.relationship.entity_relationship_type,
+            forward_relationship_name='', reverse_relationship_name='')
+        report = CacheVerifier(repair=False).verify()
+        self.assertEqual(report['name_index']['orphaned'], 1)
+        self.assertEqual(report['name_index']['details']['orphaned'],
+                         [missing_pk])
+        self.assertEqual(report['relationship_cache']['orphaned'], 1)
+        CacheVerifier().verify()
+        self.assertEqual(self._get_cache_data(), expected)
@@ -0,0 +1,28 @@
+from django.test import TestCase
+
+from eats.lib.date_bounds import get_date_bounds
+
+
+class DateBoundsTestCase (TestCase):
+
+    def test_get_date_bounds (self):
+        data = (
+            ('2000', False, (2451545, 2451910)),
+            ('2000-02', False, (2451576, 2451604)),
+            ('2000-01-01', False, (2451545, 2451545)),
+            ('1582-10-15', False, (2299161, 2299161)),
+            # The day before the Gregorian reform, in the Julian
+            # calendar.
+            ('1582-10-04', True, (2299160, 2299160)),
+            ('1900-02', True, (2415064, 2415092)),
+            ('1900-02-29', True, (2415092, 2415092)),
+            ('-0001', False, (1720695, 1721059)),
+            )
+        for normalised, julian, expected in data:
+            self.assertEqual(get_date_bounds(normalised, julian), expected)
+
+    def test_get_date_bounds_invalid (self):
+        for normalised in ('', 'June 1650', '1650-13', '1650-1-1',
+                           '1650-00', '1650-06-00', '1900-02-29',
+                           '1650-04-31'):
+            self.assertRaises(ValueError, get_date_bounds, normalised)
@@ -0,0 +1,90 @@
+from eats.lib.duplicate_detection import DuplicateFinder, score_pair
+from eats.models import DuplicateCandidate
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class DuplicateFinderTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(DuplicateFinderTestCase, self).setUp()
+        self.language = self.create_language('English', 'en')
+        self.name_type = self.create_name_type('regular')
+        self.script = self.create_script('Latin', 'Latn', ' ')
+        self.calendar = self.create_calendar('Gregorian')
+        self.date_period = self.create_date_period('lifespan')
+        self.date_type = self.create_date_type('exact')
+        self.authority.set_languages([self.language])
+        self.authority.set_name_types([self.name_type])
+        self.authority.set_scripts([self.script])
+        self.authority.set_calendars([self.calendar])
+        self.authority.set_date_periods([self.date_period])
+        self.authority.set_date_types([self.date_type])
+
+    def _create_entity (self, form, start=None, end=None):
+        entity = self.tm.create_entity(self.authority)
+        entity.create_name_property_assertion(
+            self.authority, self.name_type, self.language, self.script, form)
+        if start is not None:
+            data = {'date_period': self.date_period}
+            for prefix, value in (('start', start), ('end', end)):
+                data[prefix] = value
+                data[prefix + '_calendar'] = self.calendar
+                data[prefix + '_type'] = self.date_type
+                data[prefix + '_normalised'] = value
+                data[prefix + '_certainty'] = self.tm.date_full_certainty
+            entity.get_existences()[0].create_date(data)
+        return entity
+
+    def test_find (self):
+        entity1 = self._create_entity('Alan Smith', '1880', '1940-06-01')
+        entity2 = self._create_entity('Alan Smith', '1890-01-01', '1950')
+        # Same name, but existence dates that do not overlap.
+        entity3 = self._create_entity('Alan Smith', '1700', '1760')
+        # Only a shared subject identifier.
+        entity4 = self._create_entity('Bob Jones')
+        # Too few name forms in common.
+        entity5 = self._create_entity('Alan Brown')
+        for entity in (entity1, entity4):
+            entity.create_subject_identifier_property_assertion(
+                self.authority, 'http://www.example.org/smith/')
+        finder = DuplicateFinder(batch_size=2)
+        self.assertEqual(finder.find(), 2)
+        candidates = list(DuplicateCandidate.objects.values_list(
+                'entity', 'duplicate', 'score', 'shared_names',
+                'shared_subject_identifiers', 'dates_overlap'))
+        self.assertEqual(candidates, [
+                (entity1.pk, entity2.pk, 1.0, 2, 0, True),
+                (entity1.pk, entity4.pk, 1.0, 0, 1, None)])
+        self.assertEqual(
+            list(DuplicateCandidate.objects.filter_by_entity(entity4)),
+            list(DuplicateCandidate.objects.filter(duplicate=entity4)))
+        # A subsequent run replaces the candidates, and candidates go
+        # when their entities do.
+        entity2.remove()
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+        entity5.create_subject_identifier_property_assertion(
+            self.authority, 'http://www.example.org/smith/')
+        # Until the run has finished, the candidates of the previous
+        # run remain current.
+        visible = []
+        class Progress (object):
+            def write (self, message):
+                visible.append(list(
+                        DuplicateCandidate.objects.filter_by_entity(
+                            entity4).values_list('entity', 'duplicate')))
+        finder = DuplicateFinder(batch_size=2, stdout=Progress())
+        self.assertEqual(finder.find(), 3)
+        self.assertTrue(visible)
+        self.assertEqual(visible,
+                         [[(entity1.pk, entity4.pk)]] * len(visible))
+        self.assertEqual(list(DuplicateCandidate.objects.values_list(
+                    'entity', 'duplicate')), [
+                (entity1.pk, entity4.pk), (entity1.pk, entity5.pk),
+                (entity4.pk, entity5.pk)])
+
+    def test_score_pair (self):
+        self.assertEqual(score_pair(set(['a', 'b']), set(['a', 'c']), 1, 0,
+                                    None), 0.2667)
+        self.assertEqual(score_pair(set(['a', 'b']), set(['a', 'b']), 2, 0,
+                                    True), 1.0)
+        self.assertEqual(score_pair(set(['a']), set(['b']), 0, 1, False), 1.0)
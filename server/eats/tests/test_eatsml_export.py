@@ -4,7 +4,9 @@ from StringIO import StringIO
 
 from lxml import etree
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from eats.lib.eatsml_exporter import EATSMLExporter
 from eats.tests.base_test_case import BaseTestCase
@@ -788,3 +790,137 @@ class EATSMLExportTestCase (TestCase, BaseTestCase):
 </collection>
 ''' % {'authority': authority.get_id(), 'language': language.get_id()}
         self._compare_XML(export, expected_xml)
+
+    def _create_described_entity (self, authority, infrastructure):
+        """Creates an entity with one of each kind of property
+        assertion, with dates and name parts.
+
+        :rtype: `Entity`
+
+        """
+        entity_type, language, script, name_type, name_part_type, \
+            relationship_type, calendar, date_type, date_period = \
+            infrastructure
+        date_data = {
+            'date_period': date_period, 'start': '1 January 2001',
+            'start_calendar': calendar,
+            'start_certainty': self.tm.date_full_certainty,
+            'start_normalised': '2001-01-01', 'start_type': date_type}
+        entity = self.tm.create_entity(authority)
+        entity.get_existences()[0].create_date(date_data)
+        entity.create_entity_type_property_assertion(authority, entity_type)
+        assertion = entity.create_name_property_assertion(
+            authority, name_type, language, script, 'Alice Smith')
+        assertion.name.create_name_part(name_part_type, language, script,
+                                        'Alice', 1)
+        assertion.create_date(date_data)
+        entity.create_note_property_assertion(authority, 'A note.')
+        entity.create_subject_identifier_property_assertion(
+            authority, 'http://www.example.org/%d/' % entity.get_id())
+        other = self.tm.create_entity(authority)
+        assertion = entity.create_entity_relationship_property_assertion(
+            authority, relationship_type, entity, other,
+            self.tm.property_assertion_full_certainty)
+        assertion.create_date(date_data)
+        return entity
+
+    def test_export_entities_query_count (self):
+        # The number of queries made in exporting entities must not
+        # depend on the number of entities.
+        authority = self.create_authority('Test')
+        infrastructure = (
+            self.create_entity_type('person'),
+            self.create_language('English', 'en'),
+            self.create_script('Latin', 'Latn', ' '),
+            self.create_name_type('regular'),
+            self.create_name_part_type('given'),
+            self.create_entity_relationship_type('is child of',
+                                                 'is parent of'),
+            self.create_calendar('Gregorian'),
+            self.create_date_type('exact'),
+            self.create_date_period('lifespan'))
+        entity_type, language, script, name_type, name_part_type, \
+            relationship_type, calendar, date_type, date_period = \
+            infrastructure
+        language.name_part_types = [name_part_type]
+        authority.set_calendars([calendar])
+        authority.set_date_periods([date_period])
+        authority.set_date_types([date_type])
+        authority.set_entity_relationship_types([relationship_type])
+        authority.set_entity_types([entity_type])
+        authority.set_languages([language])
+        authority.set_name_part_types([name_part_type])
+        authority.set_name_types([name_type])
+        authority.set_scripts([script])
+        entities = [self._create_described_entity(authority, infrastructure)
+                    for i in range(4)]
+        EATSMLExporter(self.tm).export_entities(entities[:1])
+        with CaptureQueriesContext(connection) as one_entity:
+            EATSMLExporter(self.tm).export_entities(entities[:1])
+        with CaptureQueriesContext(connection) as many_entities:
+            EATSMLExporter(self.tm).export_entities(entities)
+        self.assertEqual(len(one_entity), len(many_entities))
+
+    def _compare_stream (self, pieces, export):
+        parser = etree.XMLParser(remove_blank_text=True)
+        streamed = etree.XML(''.join(pieces), parser).getroottree()
+        self.exporter._validate(streamed)
+        actual = StringIO()
+        streamed.write_c14n(actual)
+        expected = StringIO()
+        export.write_c14n(expected)
+        self.assertEqual(actual.getvalue(), expected.getvalue())
+
+    def _create_related_entities (self):
+        authority = self.create_authority('Test')
+        language = self.create_language('English', 'en')
+        script = self.create_script('Latin', 'Latn', ' ')
+        name_type = self.create_name_type('regular')
+        relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        authority.set_entity_relationship_types([relationship_type])
+        authority.set_languages([language])
+        authority.set_name_types([name_type])
+        authority.set_scripts([script])
+        entities = []
+        for form in ('Alice', 'Bob', 'Carol'):
+            entity = self.tm.create_entity(authority)
+            entity.create_name_property_assertion(
+                authority, name_type, language, script, form)
+            entities.append(entity)
+        entities[0].create_entity_relationship_property_assertion(
+            authority, relationship_type, entities[0], entities[2],
+            self.tm.property_assertion_full_certainty)
+        return entities
+
+    def test_export_entities_stream (self):
+        entities = self._create_related_entities()
+        # All infrastructure is exported, whether or not it is used
+        # by the exported entities.
+        self.create_calendar('Gregorian')
+        pieces = self.exporter.export_entities_stream(
+            entities[:2], chunk_size=1, validate=True)
+        # Each chunk of entities is exported only once the pieces
+        # before it have been consumed.
+        first_pieces = [next(pieces), next(pieces)]
+        authority = entities[1].get_eats_names()[0].authority
+        entities[1].create_note_property_assertion(authority, 'A note')
+        exporter = EATSMLExporter(self.tm)
+        exporter._require_all_infrastructure()
+        export = exporter.export_entities(entities[:2])
+        self._compare_stream(first_pieces + list(pieces), export)
+
+    def test_export_entities_stream_no_entities (self):
+        self.create_calendar('Gregorian')
+        exporter = EATSMLExporter(self.tm)
+        exporter._require_all_infrastructure()
+        export = exporter.export_entities([])
+        pieces = self.exporter.export_entities_stream([])
+        self._compare_stream(pieces, export)
+
+    def test_export_full_stream (self):
+        self._create_related_entities()
+        self.create_calendar('Gregorian')
+        export = EATSMLExporter(self.tm).export_full()
+        pieces = self.exporter.export_full_stream(chunk_size=2, validate=True)
+        self._compare_stream(pieces, export)
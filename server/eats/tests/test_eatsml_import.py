@@ -1,15 +1,56 @@
+import re
+import shutil
 from StringIO import StringIO
+import tempfile
 
 from lxml import etree
 
+from django.core.files.base import ContentFile
+from django.db import transaction
 from django.test import TestCase
+from django.utils import timezone
 
-from eats.exceptions import EATSMLException
+from tmapi.models import Association, Identifier, ItemIdentifier, Occurrence, Role, SubjectIdentifier, Topic, Variant
+from tmapi.models import Name as TopicName
+
+from eats.exceptions import EATSImportLeaseException, EATSMLException
+from eats.lib import eatsml_bulk_importer
+from eats.lib.authority_profile import authority_profile_cache
+from eats.lib.eatsml_import_job import EATSMLImportJob, claim_next_import
 from eats.lib.eatsml_importer import EATSMLImporter
-from eats.models import Authority, Calendar, DatePeriod, DateType, Entity, EntityRelationshipType, EntityType, Language, NamePartType, NameType, Script
+from eats.lib.eatsml_stream_importer import EATSMLStreamImporter
+from eats.lib.infrastructure_catalogue import infrastructure_catalogue
+from eats.models import Authority, Calendar, DateIndex, DatePeriod, DateType, EATSMLImport, EATSTopicMap, Entity, EntityRelationshipCache, EntityRelationshipType, EntityType, Language, NameCache, NameIndex, NamePart, NamePartType, NameType, Script
 from eats.tests.base_test_case import BaseTestCase
 
 
+class InterruptedImportJob (EATSMLImportJob):
+
+    """Import job that stops part way through writing its second
+    chunk of entities."""
+
+    def _commit_entity_chunk (self, bulk_importer, chunk, raw_file,
+                              spool_file, checkpoint):
+        if self._import.entities_imported:
+            self._write_pieces(raw_file, chunk)
+            raise KeyboardInterrupt
+        super(InterruptedImportJob, self)._commit_entity_chunk(
+            bulk_importer, chunk, raw_file, spool_file, checkpoint)
+
+
+class ClaimedImportJob (EATSMLImportJob):
+
+    """Import job whose import is claimed by another worker while it
+    imports its first chunk of entities."""
+
+    def _commit_entity_chunk (self, bulk_importer, chunk, raw_file,
+                              spool_file, checkpoint):
+        EATSMLImport.objects.filter(pk=self._import.pk).update(
+            heartbeat=timezone.now())
+        super(ClaimedImportJob, self)._commit_entity_chunk(
+            bulk_importer, chunk, raw_file, spool_file, checkpoint)
+
+
 class EATSMLImportTestCase (TestCase, BaseTestCase):
 
     def setUp (self):
@@ -20,6 +61,12 @@ class EATSMLImportTestCase (TestCase, BaseTestCase):
         admin_user = self.create_django_user('admin', 'admin@example.org',
                                              'password')
         self.admin = self.create_user(admin_user)
+        # Import jobs keep their documents as files.
+        self.work_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        media_settings = self.settings(MEDIA_ROOT=self.work_dir)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
 
     def _compare_XML (self, import_tree, expected_xml):
         parser = etree.XMLParser(remove_blank_text=True)
@@ -30,6 +77,25 @@ class EATSMLImportTestCase (TestCase, BaseTestCase):
         root.getroottree().write_c14n(expected)
         self.assertEqual(actual.getvalue(), expected.getvalue())
 
+    def _dump_topic_map (self):
+        # Rows whose primary keys are left to the database are
+        # compared without them.
+        dump = {}
+        for model, has_key in (
+            (Identifier, True), (ItemIdentifier, True), (Topic, True),
+            (Topic.item_identifiers.through, False),
+            (Topic.types.through, False), (SubjectIdentifier, False),
+            (Association, True), (Association.scope.through, False),
+            (Role, False), (TopicName, True), (TopicName.scope.through, False),
+            (Occurrence, True), (Occurrence.scope.through, False),
+            (Variant, True), (Variant.scope.through, False),
+            (NameCache, False), (NameIndex, False), (DateIndex, False),
+            (EntityRelationshipCache, False)):
+            fields = [field.attname for field in model._meta.concrete_fields
+                      if has_key or not field.primary_key]
+            dump[model] = sorted(model.objects.values_list(*fields))
+        return dump
+
     def test_prune_1 (self):
         # Elements with an eats_id that are not referenced by a new
         # element are removed.
@@ -1514,3 +1580,486 @@ class EATSMLImportTestCase (TestCase, BaseTestCase):
             'existence': existence.get_id(),
             'entity_url': entity.get_eats_subject_identifier()}
         self._compare_XML(annotated_import, expected_xml)
+
+    def _create_bulk_import_xml (self):
+        """Returns an EATSML document exercising each kind of entity
+        property assertion, for comparing the import paths."""
+        authority = self.create_authority('Test')
+        calendar = self.create_calendar('Gregorian')
+        date_period = self.create_date_period('lifespan')
+        date_type = self.create_date_type('exact')
+        entity_relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        entity_type = self.create_entity_type('person')
+        unused_entity_type = self.create_entity_type('place')
+        language = self.create_language('English', 'en')
+        name_part_type = self.create_name_part_type('given')
+        name_type = self.create_name_type('regular')
+        script = self.create_script('Latin', 'Latn', ' ')
+        authority.set_calendars([calendar])
+        authority.set_date_periods([date_period])
+        authority.set_date_types([date_type])
+        authority.set_entity_relationship_types([entity_relationship_type])
+        authority.set_entity_types([entity_type])
+        authority.set_languages([language])
+        authority.set_name_part_types([name_part_type])
+        authority.set_name_types([name_type])
+        authority.set_scripts([script])
+        existing_entity = self.tm.create_entity(authority)
+        import_xml = '''
+<collection xmlns="http://eats.artefact.org.nz/ns/eatsml/">
+  <authorities>
+    <authority xml:id="authority-1" eats_id="%(authority)d">
+      <name>Test</name>
+    </authority>
+  </authorities>
+  <calendars>
+    <calendar xml:id="calendar-1" eats_id="%(calendar)d">
+      <name>Gregorian</name>
+    </calendar>
+  </calendars>
+  <date_periods>
+    <date_period xml:id="date_period-1" eats_id="%(date_period)d">
+      <name>lifespan</name>
+    </date_period>
+  </date_periods>
+  <date_types>
+    <date_type xml:id="date_type-1" eats_id="%(date_type)d">
+      <name>exact</name>
+    </date_type>
+  </date_types>
+  <entity_relationship_types>
+    <entity_relationship_type xml:id="entity_relationship_type-1" eats_id="%(entity_relationship_type)d">
+      <name>is child of</name>
+      <reverse_name>is parent of</reverse_name>
+    </entity_relationship_type>
+  </entity_relationship_types>
+  <entity_types>
+    <entity_type xml:id="entity_type-1" eats_id="%(entity_type)d">
+      <name>person</name>
+    </entity_type>
+    <entity_type xml:id="entity_type-2" eats_id="%(unused_entity_type)d">
+      <name>place</name>
+    </entity_type>
+  </entity_types>
+  <languages>
+    <language xml:id="language-1" eats_id="%(language)d">
+      <name>English</name>
+      <code>en</code>
+    </language>
+  </languages>
+  <name_part_types>
+    <name_part_type xml:id="name_part_type-1" eats_id="%(name_part_type)d">
+      <name>given</name>
+    </name_part_type>
+  </name_part_types>
+  <name_types>
+    <name_type xml:id="name_type-1" eats_id="%(name_type)d">
+      <name>regular</name>
+    </name_type>
+  </name_types>
+  <scripts>
+    <script xml:id="script-1" eats_id="%(script)d">
+      <name>Latin</name>
+      <code>Latn</code>
+      <separator> </separator>
+    </script>
+  </scripts>
+  <entities>
+    <entity xml:id="entity-1">
+      <entity_relationships>
+        <entity_relationship authority="authority-1" certainty="full" domain_entity="entity-1" entity_relationship_type="entity_relationship_type-1" range_entity="entity-2"/>
+      </entity_relationships>
+      <entity_types>
+        <entity_type authority="authority-1" entity_type="entity_type-1"/>
+      </entity_types>
+      <existences>
+        <existence authority="authority-1">
+          <dates>
+            <date date_period="date_period-1">
+              <assembled_form></assembled_form>
+              <date_parts>
+                <date_part calendar="calendar-1" certainty="full"
+                           date_type="date_type-1" type="start">
+                  <raw>1 January 2000</raw>
+                  <normalised>2000-01-01</normalised>
+                </date_part>
+                <date_part calendar="calendar-1" certainty="none"
+                           date_type="date_type-1" type="end_taq">
+                  <raw>2010</raw>
+                  <normalised>2010</normalised>
+                </date_part>
+              </date_parts>
+            </date>
+          </dates>
+        </existence>
+      </existences>
+      <names>
+        <name authority="authority-1" is_preferred="true" language="language-1" name_type="name_type-1" script="script-1">
+          <display_form></display_form>
+          <name_parts>
+            <name_part name_part_type="name_part_type-1" language="language-1" script="script-1">Miriam</name_part>
+            <name_part name_part_type="name_part_type-1" language="language-1" script="script-1">Clare</name_part>
+          </name_parts>
+        </name>
+      </names>
+      <notes>
+        <note authority="authority-1">A note.</note>
+      </notes>
+      <subject_identifiers>
+        <subject_identifier authority="authority-1">http://www.example.org/test/</subject_identifier>
+      </subject_identifiers>
+    </entity>
+    <entity xml:id="entity-2">
+      <entity_relationships>
+        <entity_relationship authority="authority-1" certainty="full" domain_entity="entity-1" entity_relationship_type="entity_relationship_type-1" range_entity="entity-2"/>
+        <entity_relationship authority="authority-1" certainty="none" domain_entity="entity-2" entity_relationship_type="entity_relationship_type-1" range_entity="entity-3"/>
+      </entity_relationships>
+      <names>
+        <name authority="authority-1" is_preferred="false" language="language-1" name_type="name_type-1" script="script-1">
+          <display_form>Pat Frost</display_form>
+        </name>
+      </names>
+    </entity>
+    <entity xml:id="entity-3" eats_id="%(existing_entity)d">
+      <notes>
+        <note authority="authority-1">Another note.</note>
+      </notes>
+    </entity>
+  </entities>
+</collection>''' % {
+            'authority': authority.get_id(), 'calendar': calendar.get_id(),
+            'date_period': date_period.get_id(),
+            'date_type': date_type.get_id(),
+            'entity_relationship_type': entity_relationship_type.get_id(),
+            'entity_type': entity_type.get_id(),
+            'existing_entity': existing_entity.get_id(),
+            'language': language.get_id(),
+            'name_part_type': name_part_type.get_id(),
+            'name_type': name_type.get_id(), 'script': script.get_id(),
+            'unused_entity_type': unused_entity_type.get_id()}
+        # The bulk importer creates any missing well known topics
+        # before it starts, rather than as they are first used.
+        self.tm.create_well_known_topics()
+        return import_xml
+
+    def _import_and_roll_back (self, import_function):
+        """Returns the result of calling `import_function` with a
+        fresh topic map object, along with a dump of the topic map
+        afterwards, rolling back the import.
+
+        Rolling back lets each import start from the same topic map,
+        and the fresh topic map object holds no topics created by an
+        earlier import.
+
+        """
+        topic_map = EATSTopicMap.objects.get(pk=self.tm.pk)
+        results = []
+        try:
+            with transaction.atomic():
+                results.append(import_function(topic_map))
+                results.append(self._dump_topic_map())
+                raise transaction.TransactionManagementError
+        except transaction.TransactionManagementError:
+            pass
+        return results
+
+    def _c14n (self, tree):
+        output = StringIO()
+        tree.write_c14n(output)
+        return output.getvalue()
+
+    def test_import_bulk (self):
+        import_xml = self._create_bulk_import_xml()
+        results = []
+        for bulk in (False, True):
+            def import_function (topic_map):
+                importer = EATSMLImporter(topic_map, bulk=bulk, chunk_size=2)
+                return self._c14n(importer.import_xml(import_xml,
+                                                      self.admin)[1])
+            results.append(self._import_and_roll_back(import_function))
+        standard, bulk = results
+        self.assertEqual(bulk[0], standard[0])
+        for model, rows in standard[1].items():
+            self.assertEqual(bulk[1][model], rows, model)
+        self.assertEqual(len(bulk[1][DateIndex]), 2)
+
+    def test_import_authority_profile (self):
+        # An import loads the profile of its authority once, although
+        # the import's transaction (here, the test's) has changed the
+        # authority's components.
+        import_xml = self._create_bulk_import_xml()
+        for bulk in (False, True):
+            def import_function (topic_map):
+                importer = EATSMLImporter(topic_map, bulk=bulk, chunk_size=2)
+                importer.import_xml(import_xml, self.admin)
+            authority_profile_cache.reset_statistics()
+            self._import_and_roll_back(import_function)
+            self.assertTrue(authority_profile_cache.validations > 1)
+            self.assertEqual(authority_profile_cache.loads, 1)
+
+    def test_import_name_part_order (self):
+        # Name parts are ordered by their position among the name
+        # parts of the same type.
+        import_xml = self._create_bulk_import_xml()
+        for bulk in (False, True):
+            topic_map = EATSTopicMap.objects.get(pk=self.tm.pk)
+            importer = EATSMLImporter(topic_map, bulk=bulk)
+            try:
+                with transaction.atomic():
+                    importer.import_xml(import_xml, self.admin)
+                    orders = sorted([
+                            (name_part.display_form, name_part.order)
+                            for name_part in NamePart.objects.all()])
+                    self.assertEqual(orders, [('Clare', 2.0),
+                                              ('Miriam', 1.0)])
+                    raise transaction.TransactionManagementError
+            except transaction.TransactionManagementError:
+                pass
+
+    def test_import_stream (self):
+        # Streaming import creates the same objects, and writes the
+        # same documents, as the import of a whole document.
+        import_xml = self._create_bulk_import_xml()
+        def standard_import (topic_map):
+            importer = EATSMLImporter(topic_map)
+            return [self._c14n(tree) for tree in
+                    importer.import_xml(import_xml, self.admin)]
+        standard = self._import_and_roll_back(standard_import)
+        # Chunks of one entity refer to entities in both the chunks
+        # before and after them.
+        for chunk_size in (1, 2):
+            def stream_import (topic_map):
+                importer = EATSMLStreamImporter(topic_map,
+                                                chunk_size=chunk_size)
+                raw_output = StringIO()
+                annotated_output = StringIO()
+                importer.import_file(StringIO(import_xml), raw_output,
+                                     annotated_output, self.admin)
+                parser = etree.XMLParser(remove_blank_text=True)
+                return [self._c14n(etree.XML(output.getvalue(),
+                                             parser).getroottree())
+                        for output in (raw_output, annotated_output)]
+            stream = self._import_and_roll_back(stream_import)
+            self.assertEqual(stream[0], standard[0])
+            self.assertTrue('entity_type-2' not in stream[0][0])
+            for model, rows in standard[1].items():
+                self.assertEqual(stream[1][model], rows, model)
+
+    def _create_import_job (self, import_xml):
+        eatsml_import = EATSMLImport(importer=self.admin, description='Test')
+        eatsml_import.source_file.save('eatsml.xml', ContentFile(import_xml),
+                                       save=False)
+        eatsml_import.save()
+        return eatsml_import
+
+    def _get_job_documents (self, eatsml_import):
+        parser = etree.XMLParser(remove_blank_text=True)
+        documents = []
+        for field in (eatsml_import.raw_file, eatsml_import.annotated_file):
+            field.open('rb')
+            try:
+                documents.append(self._c14n(etree.parse(field, parser)))
+            finally:
+                field.close()
+        return documents
+
+    def test_import_job (self):
+        # An import job creates the same objects, and writes the same
+        # documents, as the import of a whole document.
+        import_xml = self._create_bulk_import_xml()
+        def standard_import (topic_map):
+            importer = EATSMLImporter(topic_map)
+            return [self._c14n(tree) for tree in
+                    importer.import_xml(import_xml, self.admin)]
+        def job_import (topic_map):
+            self._create_import_job(import_xml)
+            eatsml_import = claim_next_import()
+            self.assertEqual(eatsml_import.status, EATSMLImport.RUNNING)
+            # An import is claimed by only one worker.
+            self.assertEqual(claim_next_import(), None)
+            job = EATSMLImportJob(eatsml_import, topic_map, self.work_dir,
+                                  chunk_size=2)
+            self.assertTrue(job.run())
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            self.assertEqual(eatsml_import.status, EATSMLImport.COMPLETED)
+            self.assertEqual(eatsml_import.get_progress()['eta'], 0)
+            self.assertEqual(claim_next_import(lease=0), None)
+            return self._get_job_documents(eatsml_import)
+        standard = self._import_and_roll_back(standard_import)
+        job = self._import_and_roll_back(job_import)
+        self.assertEqual(job[0], standard[0])
+        for model, rows in standard[1].items():
+            self.assertEqual(job[1][model], rows, model)
+
+    def test_import_job_model_api (self):
+        # Where primary keys cannot be allocated safely, each chunk is
+        # imported through the model API, with the same result.
+        import_xml = self._create_bulk_import_xml()
+        def standard_import (topic_map):
+            importer = EATSMLImporter(topic_map)
+            return [self._c14n(tree) for tree in
+                    importer.import_xml(import_xml, self.admin)]
+        def job_import (topic_map):
+            eatsml_import = self._create_import_job(import_xml)
+            job = EATSMLImportJob(eatsml_import, topic_map, self.work_dir,
+                                  chunk_size=2)
+            self.assertTrue(job.run())
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            return self._get_job_documents(eatsml_import)
+        def resumed_job_import (topic_map):
+            eatsml_import = self._create_import_job(import_xml)
+            job = InterruptedImportJob(eatsml_import, topic_map,
+                                       self.work_dir, chunk_size=2)
+            self.assertRaises(KeyboardInterrupt, job.run)
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            topic_map = EATSTopicMap.objects.get(pk=topic_map.pk)
+            job = EATSMLImportJob(eatsml_import, topic_map, self.work_dir,
+                                  chunk_size=2)
+            self.assertTrue(job.run())
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            return self._get_job_documents(eatsml_import)
+        standard = self._import_and_roll_back(standard_import)
+        can_allocate_keys = eatsml_bulk_importer.can_allocate_keys
+        eatsml_bulk_importer.can_allocate_keys = lambda: False
+        try:
+            jobs = [self._import_and_roll_back(job_import),
+                    self._import_and_roll_back(resumed_job_import)]
+        finally:
+            eatsml_bulk_importer.can_allocate_keys = can_allocate_keys
+        for job in jobs:
+            self.assertEqual(job[0], standard[0])
+            for model, rows in standard[1].items():
+                self.assertEqual(job[1][model], rows, model)
+
+    def test_import_job_resume (self):
+        # An interrupted import job is resumed from its last committed
+        # chunk, with the same result as an uninterrupted import.
+        import_xml = self._create_bulk_import_xml()
+        def standard_import (topic_map):
+            importer = EATSMLImporter(topic_map)
+            return [self._c14n(tree) for tree in
+                    importer.import_xml(import_xml, self.admin)]
+        def job_import (topic_map):
+            eatsml_import = self._create_import_job(import_xml)
+            job = InterruptedImportJob(eatsml_import, topic_map,
+                                       self.work_dir, chunk_size=2)
+            self.assertRaises(KeyboardInterrupt, job.run)
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            self.assertEqual(eatsml_import.status, EATSMLImport.RUNNING)
+            self.assertEqual(eatsml_import.entity_count, 3)
+            self.assertEqual(eatsml_import.entities_imported, 2)
+            # The interrupted import is resumed only once its lease
+            # has expired.
+            self.assertEqual(claim_next_import(), None)
+            eatsml_import = claim_next_import(lease=0)
+            self.assertEqual(eatsml_import.entities_imported, 2)
+            topic_map = EATSTopicMap.objects.get(pk=topic_map.pk)
+            job = EATSMLImportJob(eatsml_import, topic_map, self.work_dir,
+                                  chunk_size=2)
+            self.assertTrue(job.run())
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            self.assertEqual(eatsml_import.relationships_imported, 3)
+            return self._get_job_documents(eatsml_import)
+        standard = self._import_and_roll_back(standard_import)
+        job = self._import_and_roll_back(job_import)
+        self.assertEqual(job[0], standard[0])
+        for model, rows in standard[1].items():
+            self.assertEqual(job[1][model], rows, model)
+
+    def test_import_job_infrastructure_changed (self):
+        # Infrastructure created by another process, which does not
+        # clear this process's catalogue, is seen by an import job.
+        self.assertRaises(Language.DoesNotExist, Language.objects.get_by_code,
+                          'en')
+        values = dict(infrastructure_catalogue._values)
+        self.addCleanup(infrastructure_catalogue.clear)
+        self.tm.create_language(u'M\u0101ori', 'en')
+        infrastructure_catalogue._values = values
+        import_xml = '''
+<collection xmlns="http://eats.artefact.org.nz/ns/eatsml/">
+  <languages>
+    <language xml:id="language-1">
+      <name>M&#x101;ori</name>
+      <code>en</code>
+    </language>
+  </languages>
+</collection>'''
+        eatsml_import = self._create_import_job(import_xml)
+        job = EATSMLImportJob(eatsml_import, self.tm, self.work_dir)
+        self.assertFalse(job.run())
+        eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+        self.assertTrue(u'M\u0101ori" already exists' in eatsml_import.error)
+        self.assertEqual(Language.objects.count(), 1)
+
+    def test_import_job_failed_chunk (self):
+        # An import that would fail in its last chunk, whether of
+        # entities or of their relationships, fails before any chunk
+        # is committed.
+        import_xml = self._create_bulk_import_xml()
+        authority = Authority.objects.all()[0]
+        # The second document is imported once the relationship type
+        # its relationship uses is no longer available to the
+        # authority.
+        documents = (
+            (re.sub(r'(xml:id="entity-3" eats_id=")\d+', r'\g<1>9999',
+                    import_xml), 'does not exist'),
+            (import_xml, ''),
+            )
+        for document, error in documents:
+            if not error:
+                authority.set_entity_relationship_types([])
+            expected = self._dump_topic_map()
+            eatsml_import = self._create_import_job(document)
+            job = EATSMLImportJob(eatsml_import, self.tm, self.work_dir,
+                                  chunk_size=1)
+            self.assertFalse(job.run())
+            eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+            self.assertEqual(eatsml_import.status, EATSMLImport.FAILED)
+            self.assertTrue(error in eatsml_import.error, eatsml_import.error)
+            self.assertEqual(eatsml_import.entities_imported, 0)
+            self.assertEqual(self._dump_topic_map(), expected)
+
+    def test_import_job_invalid (self):
+        eatsml_import = self._create_import_job('<collection')
+        job = EATSMLImportJob(eatsml_import, self.tm, self.work_dir)
+        self.assertFalse(job.run())
+        eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+        self.assertEqual(eatsml_import.status, EATSMLImport.FAILED)
+        self.assertTrue('not well-formed' in eatsml_import.error)
+        self.assertEqual(claim_next_import(lease=0), None)
+
+    def test_import_job_claimed (self):
+        # A job whose import is claimed by another worker stops,
+        # without committing the chunk it was importing or marking
+        # the import as failed.
+        import_xml = self._create_bulk_import_xml()
+        eatsml_import = self._create_import_job(import_xml)
+        job = ClaimedImportJob(eatsml_import, self.tm, self.work_dir,
+                               chunk_size=2)
+        self.assertRaises(EATSImportLeaseException, job.run)
+        eatsml_import = EATSMLImport.objects.get(pk=eatsml_import.pk)
+        self.assertEqual(eatsml_import.status, EATSMLImport.RUNNING)
+        self.assertEqual(eatsml_import.entities_imported, 0)
+        self.assertEqual(eatsml_import.error, '')
+
+    def test_import_stream_invalid (self):
+        # Each chunk of entities is validated, with placeholders for
+        # the entities in other chunks that it refers to.
+        import_xml = '''
+<collection xmlns="http://eats.artefact.org.nz/ns/eatsml/">
+  <entities>
+    <entity xml:id="entity-1"/>
+    <entity xml:id="entity-2"/>
+    <entity xml:id="entity-3">
+      <unknown/>
+    </entity>
+  </entities>
+</collection>'''
+        importer = EATSMLStreamImporter(self.tm, chunk_size=2)
+        self.assertRaises(EATSMLException, importer.import_file,
+                          StringIO(import_xml), StringIO(), StringIO(),
+                          self.admin)
+        self.assertRaises(EATSMLException, importer.import_file,
+                          StringIO('<collection'), StringIO(), StringIO(),
+                          self.admin)
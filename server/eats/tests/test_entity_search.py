@@ -0,0 +1,147 @@
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from eats.lib.entity_search import EntitySearch
+from eats.lib.search_backends import get_search_backend, SQLiteFTSBackend
+from eats.tests.base_test_case import BaseTestCase
+
+
+class EntitySearchTestCase (TestCase, BaseTestCase):
+
+    def setUp (self):
+        super(EntitySearchTestCase, self).setUp()
+        self.reset_managers()
+        self.tm = self.create_topic_map()
+        self.authority = self.create_authority('Test')
+        self.authority2 = self.create_authority('Test2')
+        self.name_type = self.create_name_type('regular')
+        self.language = self.create_language('English', 'en')
+        self.script = self.create_script('Latin', 'Latn', ' ')
+        for authority in (self.authority, self.authority2):
+            authority.set_languages([self.language])
+            authority.set_name_types([self.name_type])
+            authority.set_scripts([self.script])
+
+    def _create_entity (self, *names, **kwargs):
+        authority = kwargs.get('authority', self.authority)
+        entity = self.tm.create_entity(authority)
+        for name, is_preferred in names:
+            entity.create_name_property_assertion(
+                authority, self.name_type, self.language, self.script, name,
+                is_preferred)
+        return entity
+
+    def test_count (self):
+        for i in range(12):
+            self._create_entity((u'Smith %d' % i, True))
+        self._create_entity((u'Jones', True))
+        search = EntitySearch(u'smi')
+        self.assertEqual(search.count(), 12)
+        paginator = Paginator(search, 10)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(len(paginator.page(2).object_list), 2)
+        self.assertEqual(EntitySearch(u'').count(), 0)
+
+    def test_date_range (self):
+        calendar = self.create_calendar('Gregorian')
+        date_period = self.create_date_period('lifespan')
+        date_type = self.create_date_type('exact')
+        self.authority.set_calendars([calendar])
+        self.authority.set_date_periods([date_period])
+        self.authority.set_date_types([date_type])
+        entity1 = self._create_entity((u'Smith', True))
+        entity2 = self._create_entity((u'Smithson', True))
+        self._create_entity((u'Smithers', True))
+        for entity, start, end in ((entity1, '1620', '1660'),
+                                   (entity2, '1690', '1750')):
+            entity.get_existences()[0].create_date(
+                {'date_period': date_period, 'start': start,
+                 'start_calendar': calendar, 'start_type': date_type,
+                 'start_normalised': start,
+                 'start_certainty': self.tm.date_full_certainty,
+                 'end': end, 'end_calendar': calendar, 'end_type': date_type,
+                 'end_normalised': end,
+                 'end_certainty': self.tm.date_full_certainty})
+        self.assertEqual(EntitySearch(u'smith').count(), 3)
+        search = EntitySearch(u'smith', date_range=('1650', '1700'))
+        self.assertEqual(search[:], [entity1, entity2])
+        search = EntitySearch(u'smith', date_range=('1661', '1689'))
+        self.assertEqual(search.count(), 0)
+        search = EntitySearch(u'smith', date_range=('1700', None))
+        self.assertEqual(search[:], [entity2])
+        self.assertEqual(self.tm.lookup_entities(
+                u'smith', date_range=(None, '1620-01-01')), [entity1])
+
+    def test_escape (self):
+        self._create_entity((u'Smith', True))
+        self.assertEqual(EntitySearch(u'Sm%th').count(), 0)
+        self.assertEqual(EntitySearch(u'S_ith').count(), 0)
+
+    def test_rank_authority (self):
+        entity1 = self._create_entity((u'Alan Smith', True))
+        entity2 = self._create_entity((u'Alan Smith', True),
+                                      authority=self.authority2)
+        search = EntitySearch(u'Alan Smith', authority=self.authority2)
+        self.assertEqual(search[:], [entity2, entity1])
+
+    def test_rank_exact (self):
+        entity1 = self._create_entity((u'Smithson Smith', True))
+        entity2 = self._create_entity((u'Smith', True))
+        entity3 = self._create_entity((u'Alan Smith', True))
+        search = EntitySearch(u'Smith')
+        self.assertEqual(search[:], [entity2, entity1, entity3])
+
+    def test_rank_preferred (self):
+        entity1 = self._create_entity((u'Bob', True), (u'Alan Smith', False))
+        entity2 = self._create_entity((u'Robert Alan Smith', True))
+        search = EntitySearch(u'Alan Smith')
+        # entity1 has a name starting with the query, while entity2
+        # only matches in its preferred name.
+        self.assertEqual(search[:], [entity1, entity2])
+        search = EntitySearch(u'Smith Alan')
+        self.assertEqual(search[:], [entity2, entity1])
+        search = EntitySearch(u'SMITH alan')
+        self.assertEqual(search[:], [entity2, entity1])
+
+    def test_rank_words_sql (self):
+        # The words are matched against the indexed key of the name
+        # index, independently of the name being ranked.
+        qn = connection.ops.quote_name
+        sql, params = EntitySearch(u'Alan Smith')._get_words_sql(
+            'nc.name_id')
+        self.assertTrue(qn('key') in sql)
+        self.assertFalse(qn('form') in sql)
+        self.assertEqual(sql.count('nc.name_id'), 2)
+
+
+@override_settings(
+    EATS_NAME_SEARCH_BACKEND='eats.lib.search_backends.SQLiteFTSBackend')
+class SQLiteFTSBackendTestCase (EntitySearchTestCase):
+
+    @classmethod
+    def setUpClass (cls):
+        # Create the FTS table outside of the test transactions, as
+        # post_migrate would.
+        SQLiteFTSBackend().create_tables()
+        super(SQLiteFTSBackendTestCase, cls).setUpClass()
+
+    def test_backend (self):
+        self.assertTrue(isinstance(get_search_backend(), SQLiteFTSBackend))
+
+    def test_name_changes (self):
+        entity = self._create_entity((u'Alan Smith', True))
+        assertion = entity.get_eats_names()[0]
+        self.assertEqual(EntitySearch(u'smi').count(), 1)
+        assertion.update(self.name_type, self.language, self.script,
+                         u'Alan Jones', True)
+        self.assertEqual(EntitySearch(u'smi').count(), 0)
+        self.assertEqual(EntitySearch(u'al jon').count(), 1)
+        assertion.remove()
+        self.assertEqual(EntitySearch(u'al').count(), 0)
+
+    def test_punctuation (self):
+        self._create_entity((u"Mary O'Brien", True))
+        self.assertEqual(EntitySearch(u"o'bri").count(), 1)
+        self.assertEqual(EntitySearch(u'"mary"').count(), 1)
@@ -0,0 +1,85 @@
+from eats.lib.infrastructure_catalogue import get_infrastructure_catalogue, infrastructure_catalogue
+from eats.lib.topic_map_context import TopicMapContext
+from eats.models import EntityRelationshipType, EntityType, Language, Script
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class InfrastructureCatalogueTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(InfrastructureCatalogueTestCase, self).setUp()
+        self.english = self.create_language('English', 'en')
+        self.french = self.create_language('French', 'fr')
+        self.latin = self.create_script('Latin', 'Latn', ' ')
+        self.person = self.create_entity_type('person')
+        self.relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+
+    def test_lookups (self):
+        loads = infrastructure_catalogue.loads
+        self.assertEqual(Language.objects.get_by_admin_name('French'),
+                         self.french)
+        # Later lookups of any type need only fetch the element found.
+        with self.assertNumQueries(1):
+            self.assertEqual(Language.objects.get_by_code('en'), self.english)
+        with self.assertNumQueries(1):
+            self.assertEqual(Script.objects.get_by_code('Latn'), self.latin)
+        with self.assertNumQueries(1):
+            self.assertEqual(EntityType.objects.get_by_admin_name('person'),
+                             self.person)
+        with self.assertNumQueries(1):
+            self.assertEqual(EntityRelationshipType.objects.get_by_admin_name(
+                    'is child of', 'is parent of'), self.relationship_type)
+        self.assertEqual(infrastructure_catalogue.loads, loads + 1)
+        with self.assertNumQueries(0):
+            self.assertRaises(Language.DoesNotExist,
+                              Language.objects.get_by_code, 'de')
+            self.assertRaises(
+                EntityRelationshipType.DoesNotExist,
+                EntityRelationshipType.objects.get_by_admin_name,
+                'is child of', 'is child of')
+        # A name of another type of element does not match.
+        self.assertRaises(Script.DoesNotExist,
+                          Script.objects.get_by_admin_name, 'English')
+
+    def test_get_names (self):
+        catalogue = get_infrastructure_catalogue()
+        admin_names = catalogue.get_names(self.tm, self.tm.admin_name_type)
+        self.assertEqual(admin_names[self.french.pk], 'French')
+        self.assertEqual(admin_names[self.person.pk], 'person')
+        self.assertFalse(self.relationship_type.pk in admin_names)
+        with self.assertNumQueries(0):
+            codes = catalogue.get_names(self.tm, self.tm.language_code_type)
+        self.assertEqual(codes, {self.english.pk: 'en', self.french.pk: 'fr'})
+        reverse_names = catalogue.get_names(
+            self.tm, self.tm.reverse_relationship_name_type)
+        self.assertEqual(reverse_names[self.relationship_type.pk],
+                         'is parent of')
+
+    def test_invalidation (self):
+        Language.objects.get_by_code('en')
+        self.english.set_admin_name('British English')
+        self.english.set_code('en-GB')
+        self.assertEqual(Language.objects.get_by_admin_name('British English'),
+                         self.english)
+        self.assertEqual(Language.objects.get_by_code('en-GB'), self.english)
+        self.assertRaises(Language.DoesNotExist, Language.objects.get_by_code,
+                          'en')
+        self.relationship_type.set_admin_name('is son of', 'is parent of')
+        self.assertEqual(EntityRelationshipType.objects.get_by_admin_name(
+                'is son of', 'is parent of'), self.relationship_type)
+        german = self.create_language('German', 'de')
+        self.assertEqual(Language.objects.get_by_code('de'), german)
+
+    def test_context (self):
+        Language.objects.get_by_code('en')
+        with TopicMapContext(self.tm):
+            catalogue = get_infrastructure_catalogue()
+            self.assertFalse(catalogue is infrastructure_catalogue)
+            self.assertEqual(Language.objects.get_by_code('en'), self.english)
+            self.assertEqual(catalogue.loads, 1)
+            self.assertTrue(get_infrastructure_catalogue() is catalogue)
+            self.create_language('German', 'de')
+            self.assertEqual(Language.objects.get_by_code('de').get_code(),
+                             'de')
+            self.assertEqual(catalogue.loads, 2)
@@ -2,7 +2,7 @@
 
 from django.test import TestCase
 
-from eats.lib.name_form import abbreviate_name, asciify_name, create_name_forms, demacronise_name, substitute_ascii, unpunctuate_name
+from eats.lib.name_form import abbreviate_name, asciify_name, create_name_forms, create_name_forms_batch, demacronise_name, NameNormaliser, substitute_ascii, unpunctuate_name
 
 
 class NameFormTestCase (TestCase):
@@ -43,6 +43,33 @@ class NameFormTestCase (TestCase):
             actual = create_name_forms(original, language_code, script_code)
             self.assertEqual(actual, expected)
 
+    def test_create_forms_batch (self):
+        names = [u'Māori', u'A. Smith', u'Māori', u'Smith and Jones']
+        actual = create_name_forms_batch(names, 'en', 'Latn')
+        expected = [create_name_forms(name, 'en', 'Latn') for name in names]
+        self.assertEqual(actual, expected)
+        self.assertEqual(create_name_forms_batch([]), [])
+
+    def test_create_forms_memoised (self):
+        normaliser = NameNormaliser(cache_size=2)
+        forms = normaliser.create_name_forms(u'A. Smith')
+        self.assertEqual(forms, set((u'A. Smith', u'A Smith')))
+        # Changing the returned set must not change the memoised
+        # forms.
+        forms.add(u'Jones')
+        self.assertEqual(normaliser.create_name_forms(u'A. Smith'),
+                         set((u'A. Smith', u'A Smith')))
+        # The same name in a different script has different forms.
+        self.assertEqual(normaliser.create_name_forms(u'Ma\u0304ori', 'mi', 'Latn'),
+                         set((u'Maori', u'Maaori', u'Ma\u0304ori')))
+        self.assertEqual(normaliser.create_name_forms(u'Ma\u0304ori', 'mi', 'Hani'),
+                         set((u'Maaori', u'Ma\u0304ori')))
+        # The cache does not grow beyond its size.
+        self.assertTrue(len(normaliser._cache) <= 2)
+        normaliser = NameNormaliser(cache_size=0)
+        normaliser.create_name_forms(u'A. Smith')
+        self.assertEqual(len(normaliser._cache), 0)
+
     def test_demacronis_name (self):
         data = (
             (u'Māori', u'Maaori'),
@@ -0,0 +1,88 @@
+import sys
+
+from eats.lib.name_index_keys import NameIndexKeyUpgrader
+from eats.models import NameIndex
+from eats.models.name_index import NAME_INDEX_KEY_LENGTH, \
+    get_key_successor, make_key
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class NameIndexKeysTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(NameIndexKeysTestCase, self).setUp()
+        language = self.create_language('English', 'en')
+        script = self.create_script('Latin', 'Latn', ' ')
+        name_type = self.create_name_type('regular')
+        self.authority.set_languages([language])
+        self.authority.set_name_types([name_type])
+        self.authority.set_scripts([script])
+        self.entity = self.tm.create_entity(self.authority)
+        self.assertion = self.entity.create_name_property_assertion(
+            self.authority, name_type, language, script, u'Alan Smith')
+        self.long_form = u'A' * (NAME_INDEX_KEY_LENGTH + 10)
+        self.entity.create_name_property_assertion(
+            self.authority, name_type, language, script, self.long_form)
+
+    def test_build_rows (self):
+        rows = NameIndex.objects.build_rows(
+            [u'Smith', u'smith', u'Alan', u''], entity=self.entity,
+            name=self.assertion.name)
+        self.assertEqual([(row.key, row.form) for row in rows],
+                         [(u'alan', u'Alan'), (u'smith', u'Smith')])
+        # Long forms that share a key are kept if they differ after
+        # it.
+        rows = NameIndex.objects.build_rows(
+            [self.long_form + u'B', self.long_form + u'C',
+             self.long_form.lower() + u'b'], entity=self.entity,
+            name=self.assertion.name)
+        self.assertEqual([row.form for row in rows],
+                         [self.long_form + u'B', self.long_form + u'C'])
+        self.assertEqual(set([row.key for row in rows]),
+                         set([make_key(self.long_form)]))
+
+    def test_filter_by_prefixes (self):
+        # Characters outside the Basic Multilingual Plane sort after
+        # U+FFFF.
+        NameIndex.objects.create(
+            entity=self.entity, name=self.assertion.name,
+            form=u'Al\U0001d49cx', key=make_key(u'Al\U0001d49cx'))
+        data = (
+            ([u'SMI'], set([u'Smith'])),
+            ([u'al', u'sm'], set([u'Alan', u'Al\U0001d49cx', u'Smith'])),
+            ([u'al\U0001d49c'], set([u'Al\U0001d49cx'])),
+            ([u'alan smith'], set()),
+            ([u''], set()),
+            ([self.long_form], set([self.long_form])),
+            ([self.long_form + u'A'], set()),
+            )
+        for prefixes, expected in data:
+            actual = set(NameIndex.objects.filter_by_prefixes(
+                    prefixes).values_list('form', flat=True))
+            self.assertEqual(actual, expected)
+
+    def test_get_key_successor (self):
+        self.assertEqual(get_key_successor(u'al'), u'am')
+        self.assertEqual(get_key_successor(u'a' + unichr(sys.maxunicode)),
+                         u'b')
+        self.assertEqual(get_key_successor(unichr(sys.maxunicode)), None)
+
+    def test_upgrade (self):
+        expected = set(NameIndex.objects.values_list('pk', 'form', 'key'))
+        NameIndex.objects.update(key='')
+        name = self.assertion.name
+        NameIndex.objects.create(entity=self.entity, name=name,
+                                 form=u'SMITH')
+        # An entry sharing only its key with another is not a
+        # duplicate.
+        for suffix in (u'B', u'C'):
+            entry = NameIndex.objects.create(
+                entity=self.entity, name=name, form=self.long_form + suffix)
+            expected.add((entry.pk, entry.form, make_key(self.long_form)))
+        upgrader = NameIndexKeyUpgrader(batch_size=2)
+        self.assertFalse(upgrader.add_column())
+        self.assertEqual(upgrader.upgrade(), {'updated': 6, 'deleted': 1})
+        self.assertEqual(set(NameIndex.objects.values_list(
+                    'pk', 'form', 'key')), expected)
+        for form, key in NameIndex.objects.values_list('form', 'key'):
+            self.assertEqual(key, make_key(form))
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from eats.lib.entity_search import EntitySearch
+from eats.lib.name_form import create_name_forms
+from eats.lib.name_variants import DEFAULT_NAME_VARIANT_GENERATORS, GreekTransliterationGenerator, NameVariantRegistry, PhoneticKeyGenerator, VariantGenerator, get_name_variant_registry
+from eats.lib.reindex import NameVariantReindexer, record_name_variant_signatures
+from eats.models import NameIndex, NameVariantSignature
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class ReversingGenerator (VariantGenerator):
+
+    scripts = ('Grek',)
+    applies_to_queries = False
+
+    def generate (self, form, language_code, script_code):
+        return [form[::-1]]
+
+
+class NameVariantsTestCase (TestCase):
+
+    def test_applies_to (self):
+        generator = GreekTransliterationGenerator()
+        self.assertTrue(generator.applies_to('el', 'Grek'))
+        self.assertTrue(generator.applies_to(None, None))
+        self.assertFalse(generator.applies_to('el', 'Latn'))
+        generator = ReversingGenerator()
+        self.assertFalse(generator.applies_to(None, None))
+
+    def test_create_forms (self):
+        data = (
+            (u'Σωκράτης', 'grc', 'Grek',
+             set((u'Σωκράτης', u'Σωκρατης', u'Sokratis'))),
+            (u'Пётр', 'ru', 'Cyrl',
+             set((u'Пётр', u'Петр', u'Petr'))),
+            (u'Sokratis', None, None, set((u'Sokratis',))),
+            )
+        for original, language_code, script_code, expected in data:
+            actual = create_name_forms(original, language_code, script_code)
+            self.assertEqual(actual, expected)
+
+    def test_phonetic_key (self):
+        generator = PhoneticKeyGenerator()
+        data = ((u'Robert', u'R163'), (u'Rupert', u'R163'),
+                (u'Ashcraft', u'A261'), (u'Tymczak', u'T522'),
+                (u'Lee', u'L000'), (u'.', u''))
+        for word, expected in data:
+            self.assertEqual(generator.get_key(word), expected)
+        self.assertEqual(generator.generate(u'Alan Smith', 'en', 'Latn'),
+                         [u'A450 S530'])
+
+    def test_registry (self):
+        generator = ReversingGenerator()
+        registry = NameVariantRegistry([GreekTransliterationGenerator(),
+                                        generator])
+        self.assertEqual(len(registry.get_generators('el', 'Grek')), 2)
+        self.assertEqual(len(registry.get_generators('en', 'Latn')), 0)
+        self.assertEqual(len(registry.get_generators(None, None)), 1)
+        signature = registry.get_signature('el', 'Grek')
+        self.assertEqual(registry.get_signature('en', 'Latn'),
+                         NameVariantRegistry([]).get_signature('en', 'Latn'))
+        generator.version = 2
+        self.assertNotEqual(registry.get_signature('el', 'Grek'), signature)
+
+    def test_setting (self):
+        paths = DEFAULT_NAME_VARIANT_GENERATORS + (
+            'eats.tests.test_name_variants.ReversingGenerator',)
+        with override_settings(EATS_NAME_VARIANT_GENERATORS=paths):
+            self.assertEqual(len(get_name_variant_registry().generators),
+                             len(paths))
+            self.assertTrue(u'ατ' in create_name_forms(u'τα', 'el', 'Grek'))
+        self.assertFalse(u'ατ' in create_name_forms(u'τα', 'el', 'Grek'))
+
+
+class NameVariantReindexerTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(NameVariantReindexerTestCase, self).setUp()
+        english = self.create_language('English', 'en')
+        greek = self.create_language('Greek', 'el')
+        self.latin = self.create_script('Latin', 'Latn', ' ')
+        self.greek = self.create_script('Greek', 'Grek', ' ')
+        name_type = self.create_name_type('regular')
+        self.authority.set_languages([english, greek])
+        self.authority.set_name_types([name_type])
+        self.authority.set_scripts([self.latin, self.greek])
+        self.greek_entity = self.tm.create_entity(self.authority)
+        self.greek_entity.create_name_property_assertion(
+            self.authority, name_type, greek, self.greek, u'Σωκράτης')
+        self.latin_entity = self.tm.create_entity(self.authority)
+        self.latin_entity.create_name_property_assertion(
+            self.authority, name_type, english, self.latin, u'Socrates')
+        record_name_variant_signatures()
+
+    def test_rebuild (self):
+        latin_rows = set(NameIndex.objects.filter(
+                entity=self.latin_entity).values_list('pk', 'form'))
+        paths = DEFAULT_NAME_VARIANT_GENERATORS + (
+            'eats.tests.test_name_variants.ReversingGenerator',)
+        with override_settings(EATS_NAME_VARIANT_GENERATORS=paths):
+            self.assertEqual(NameVariantReindexer().rebuild(), {'names': 7})
+            # Only the names in the Greek script are reindexed.
+            self.assertEqual(set(NameIndex.objects.filter(
+                        entity=self.latin_entity).values_list('pk', 'form')),
+                             latin_rows)
+            self.assertTrue(NameIndex.objects.filter(
+                    entity=self.greek_entity, form=u'\u03c2\u03b7\u03c4\u03b1\u03c1\u03ba\u03c9\u03a3').exists())
+            changed = NameVariantSignature.objects.get_changed(
+                get_name_variant_registry())
+            self.assertEqual(changed, [])
+            self.assertEqual(NameVariantReindexer().rebuild(), {'names': 0})
+
+    def test_search (self):
+        for query in (u'Σωκρατης', u'Sokratis', u'sokr'):
+            search = EntitySearch(query)
+            self.assertEqual(list(search.get_queryset()),
+                             [self.greek_entity])
@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import tempfile
+
+from eats.lib.reindex import CacheRebuilder, DATES_PHASE, NAMES_PHASE, RELATIONSHIPS_PHASE
+from eats.models import DateIndex, EntityRelationshipCache, NameCache, NameIndex
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class CacheRebuilderTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(CacheRebuilderTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        language = self.create_language('English', 'en')
+        name_part_type = self.create_name_part_type('given')
+        language.name_part_types = [name_part_type]
+        name_type = self.create_name_type('regular')
+        script = self.create_script('Latin', 'Latn', ' ')
+        relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.authority.set_languages([language])
+        self.authority.set_name_part_types([name_part_type])
+        self.authority.set_name_types([name_type])
+        self.authority.set_scripts([script])
+        self.authority.set_entity_relationship_types([relationship_type])
+        entities = []
+        for form in ('Alan Smith', u'J\u00f3n', ''):
+            entity = self.tm.create_entity(self.authority)
+            assertion = entity.create_name_property_assertion(
+                self.authority, name_type, language, script, form)
+            entities.append(entity)
+        assertion.name.create_name_part(name_part_type, language, script,
+                                        'Sam', 1)
+        entities[0].create_entity_relationship_property_assertion(
+            self.authority, relationship_type, entities[0], entities[1],
+            self.tm.property_assertion_full_certainty)
+        calendar = self.create_calendar('Gregorian')
+        date_period = self.create_date_period('lifespan')
+        date_type = self.create_date_type('exact')
+        self.authority.set_calendars([calendar])
+        self.authority.set_date_periods([date_period])
+        self.authority.set_date_types([date_type])
+        for entity, start, end in ((entities[0], '1620', '1660'),
+                                   (entities[1], '1690', '1750')):
+            entity.get_existences()[0].create_date(
+                {'date_period': date_period, 'start': start,
+                 'start_calendar': calendar, 'start_type': date_type,
+                 'start_normalised': start,
+                 'start_certainty': self.tm.date_full_certainty,
+                 'end': end, 'end_calendar': calendar, 'end_type': date_type,
+                 'end_normalised': end,
+                 'end_certainty': self.tm.date_full_certainty})
+
+    def tearDown (self):
+        shutil.rmtree(self.directory)
+        super(CacheRebuilderTestCase, self).tearDown()
+
+    def _get_cache_data (self):
+        names = set(NameCache.objects.values_list(
+                'entity', 'assertion', 'name', 'authority', 'form',
+                'is_preferred', 'language', 'script'))
+        forms = sorted(NameIndex.objects.values_list(
+                'entity', 'name', 'name_part', 'form'))
+        relationships = set(EntityRelationshipCache.objects.values_list(
+                'entity_relationship', 'authority', 'domain_entity',
+                'range_entity', 'relationship_type',
+                'forward_relationship_name', 'reverse_relationship_name'))
+        dates = set(DateIndex.objects.values_list(
+                'entity', 'date', 'date_part', 'date_part_type',
+                'assertion_type', 'start', 'end'))
+        return names, forms, relationships, dates
+
+    def test_rebuild (self):
+        expected = self._get_cache_data()
+        NameIndex.objects.all().delete()
+        NameCache.objects.all().delete()
+        DateIndex.objects.all().delete()
+        checkpoint_path = os.path.join(self.directory, 'checkpoint')
+        rows = CacheRebuilder(batch_size=2,
+                              checkpoint_path=checkpoint_path).rebuild()
+        self.assertEqual(self._get_cache_data(), expected)
+        self.assertEqual(rows[RELATIONSHIPS_PHASE], 1)
+        self.assertEqual(rows[DATES_PHASE], 4)
+        self.assertEqual(rows[NAMES_PHASE],
+                         len(expected[0]) + len(expected[1]))
+        self.assertFalse(os.path.exists(checkpoint_path))
+
+    def test_resume (self):
+        expected = self._get_cache_data()
+        names = sorted(NameCache.objects.values_list('name', flat=True))
+        # Simulate a rebuild interrupted after the first name.
+        NameIndex.objects.exclude(name=names[0]).delete()
+        NameCache.objects.exclude(name=names[0]).delete()
+        EntityRelationshipCache.objects.all().delete()
+        DateIndex.objects.all().delete()
+        checkpoint_path = os.path.join(self.directory, 'checkpoint')
+        # The checkpoint predates the dates phase.
+        with open(checkpoint_path, 'w') as checkpoint_file:
+            json.dump({NAMES_PHASE: names[0], RELATIONSHIPS_PHASE: 0},
+                      checkpoint_file)
+        CacheRebuilder(checkpoint_path=checkpoint_path).rebuild()
+        self.assertEqual(self._get_cache_data(), expected)
@@ -0,0 +1,117 @@
+import datetime
+
+from django.utils import timezone
+
+from eats.lib.statistics import ALL_ASSERTIONS, DATED_ASSERTIONS, StatisticsEngine
+from eats.models import StatisticsSnapshot
+from eats.models.statistics_snapshot import ASSERTIONS_PER_ENTITY, DATE_COVERAGE, ENTITIES, ENTITY_RELATIONSHIP_TYPES, ENTITY_TYPES, NAME_LANGUAGES_SCRIPTS, STATISTICS_SECTIONS
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class StatisticsEngineTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(StatisticsEngineTestCase, self).setUp()
+        self.other_authority = self.create_authority('Other')
+        self.person = self.create_entity_type('person')
+        self.place = self.create_entity_type('place')
+        self.relationship_type = self.create_entity_relationship_type(
+            'is child of', 'is parent of')
+        self.english = self.create_language('English', 'en')
+        self.latin = self.create_script('Latin', 'Latn', ' ')
+        self.name_type = self.create_name_type('regular')
+        self.date_period = self.create_date_period('lifespan')
+        for authority in (self.authority, self.other_authority):
+            authority.set_entity_types([self.person, self.place])
+            authority.set_entity_relationship_types([self.relationship_type])
+            authority.set_languages([self.english])
+            authority.set_scripts([self.latin])
+            authority.set_name_types([self.name_type])
+            authority.set_date_periods([self.date_period])
+        self.entity1 = self.tm.create_entity(self.authority)
+        self.entity1.create_entity_type_property_assertion(
+            self.authority, self.person)
+        self.entity1.create_entity_type_property_assertion(
+            self.other_authority, self.person)
+        self.entity1.create_name_property_assertion(
+            self.authority, self.name_type, self.english, self.latin,
+            'Alan Smith')
+        self.entity2 = self.tm.create_entity(self.authority)
+        self.entity2.create_entity_type_property_assertion(
+            self.authority, self.place)
+        self.entity1.create_entity_relationship_property_assertion(
+            self.authority, self.relationship_type, self.entity1,
+            self.entity2, self.tm.property_assertion_full_certainty)
+        self.engine = StatisticsEngine(self.tm)
+
+    def test_compute (self):
+        counts = dict([(section, dict([((row, column), count) for
+                                       row, column, count in
+                                       self.engine.compute(section)]))
+                       for section in STATISTICS_SECTIONS])
+        self.assertEqual(counts[ENTITIES], {(None, None): 2})
+        self.assertEqual(counts[ENTITY_TYPES], {
+                (self.authority.pk, self.person.pk): 1,
+                (self.other_authority.pk, self.person.pk): 1,
+                (self.authority.pk, self.place.pk): 1})
+        self.assertEqual(counts[ENTITY_RELATIONSHIP_TYPES], {
+                (self.authority.pk, self.relationship_type.pk): 1})
+        self.assertEqual(counts[NAME_LANGUAGES_SCRIPTS], {
+                (self.english.pk, self.latin.pk): 1})
+        self.assertEqual(counts[DATE_COVERAGE], {
+                ('entity_relationship', ALL_ASSERTIONS): 1,
+                ('entity_type', ALL_ASSERTIONS): 3,
+                ('existence', ALL_ASSERTIONS): 2,
+                ('name', ALL_ASSERTIONS): 1})
+        # entity1 has existence, two entity type, name and
+        # relationship assertions; entity2 has existence, entity type
+        # and relationship assertions.
+        self.assertEqual(counts[ASSERTIONS_PER_ENTITY],
+                         {(3, None): 1, (5, None): 1})
+        self.tm.create_entity()
+        assertion = self.entity2.get_existences()[0]
+        assertion.create_date({'date_period': self.date_period})
+        counts = dict([((row, column), count) for row, column, count in
+                       self.engine.compute(DATE_COVERAGE)])
+        self.assertEqual(counts[('existence', DATED_ASSERTIONS)], 1)
+        counts = dict([((row, column), count) for row, column, count in
+                       self.engine.compute(ASSERTIONS_PER_ENTITY)])
+        self.assertEqual(counts[(0, None)], 1)
+
+    def test_get_snapshots (self):
+        snapshots = self.engine.get_snapshots()
+        self.assertEqual(set(snapshots.keys()), set(STATISTICS_SECTIONS))
+        for snapshot in snapshots.values():
+            self.assertFalse(snapshot.is_stale)
+        self.entity2.create_entity_type_property_assertion(
+            self.other_authority, self.place)
+        stale = set(StatisticsSnapshot.objects.filter(
+                stale_since__isnull=False).values_list('section', flat=True))
+        self.assertEqual(stale, set((ENTITY_TYPES, DATE_COVERAGE,
+                                     ASSERTIONS_PER_ENTITY)))
+        # Recently changed statistics are served out of date.
+        snapshots = self.engine.get_snapshots(max_staleness=60)
+        self.assertTrue(snapshots[ENTITY_TYPES].is_stale)
+        self.assertEqual(snapshots[ENTITY_TYPES].get_counts().get(
+                (self.other_authority.pk, self.place.pk)), None)
+        snapshots = self.engine.get_snapshots(max_staleness=0)
+        self.assertFalse(snapshots[ENTITY_TYPES].is_stale)
+        self.assertEqual(snapshots[ENTITY_TYPES].get_counts()[
+                (self.other_authority.pk, self.place.pk)], 1)
+
+    def test_record_keeps_later_changes (self):
+        computed = timezone.now() - datetime.timedelta(seconds=10)
+        StatisticsSnapshot.objects.record(ENTITIES, [], computed, None)
+        StatisticsSnapshot.objects.invalidate([ENTITIES])
+        version = StatisticsSnapshot.objects.get_version(ENTITIES)
+        # A change made during the computation, while the section is
+        # already out of date.
+        StatisticsSnapshot.objects.invalidate([ENTITIES])
+        snapshot = StatisticsSnapshot.objects.record(
+            ENTITIES, [(None, None, 2)], computed, version)
+        self.assertTrue(snapshot.is_stale)
+        self.assertEqual(snapshot.get_counts(), {(None, None): 2})
+        version = StatisticsSnapshot.objects.get_version(ENTITIES)
+        snapshot = StatisticsSnapshot.objects.record(
+            ENTITIES, [(None, None, 3)], timezone.now(), version)
+        self.assertFalse(snapshot.is_stale)
@@ -0,0 +1,45 @@
+from django.http import HttpResponse
+from django.test.client import RequestFactory
+
+from eats.lib.topic_map_context import get_current_context, get_eats_topic_map, TopicMapContext
+from eats.middleware import TopicMapMiddleware
+from eats.models import Entity
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class TopicMapContextTestCase (ModelTestCase):
+
+    def test_no_context (self):
+        self.assertEqual(get_current_context(), None)
+        tm1 = get_eats_topic_map()
+        tm2 = get_eats_topic_map()
+        self.assertEqual(tm1, self.tm)
+        self.assertFalse(tm1 is tm2)
+
+    def test_context (self):
+        entity = self.tm.create_entity(self.authority)
+        with TopicMapContext() as context:
+            tm = get_eats_topic_map()
+            self.assertEqual(tm, self.tm)
+            self.assertEqual(context.fetches, 1)
+            self.assertTrue(Entity.objects.eats_topic_map is tm)
+            fetched_entity = Entity.objects.get_by_identifier(
+                entity.get_id())
+            with self.assertNumQueries(0):
+                self.assertTrue(fetched_entity.eats_topic_map is tm)
+            self.assertEqual(context.fetches, 1)
+            self.assertTrue(context.fetches_avoided > 1)
+        self.assertEqual(get_current_context(), None)
+
+    def test_middleware (self):
+        middleware = TopicMapMiddleware()
+        request = RequestFactory().get('/')
+        middleware.process_request(request)
+        context = request.eats_topic_map_context
+        self.assertTrue(get_current_context() is context)
+        self.assertTrue(get_eats_topic_map() is get_eats_topic_map())
+        self.assertEqual(context.fetches, 1)
+        self.assertEqual(context.fetches_avoided, 1)
+        response = middleware.process_response(request, HttpResponse())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_current_context(), None)
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save
+
+from tmapi.models import Name, Topic
+
+from eats.constants import ENTITY_TYPE_TYPE_IRI, NAME_ROLE_TYPE_IRI
+from eats.lib.topic_registry import get_well_known_iris, topic_registry
+from eats.models import EATSTopicMap
+from eats.tests.models.model_test_case import ModelTestCase
+
+
+class TopicRegistryTestCase (ModelTestCase):
+
+    def setUp (self):
+        super(TopicRegistryTestCase, self).setUp()
+        topic_registry.reset_statistics()
+
+    def test_well_known_iris (self):
+        iris = get_well_known_iris()
+        self.assertTrue(ENTITY_TYPE_TYPE_IRI in iris)
+        self.assertTrue(NAME_ROLE_TYPE_IRI in iris)
+
+    def test_get (self):
+        entity_type_type = self.tm.entity_type_type
+        # A fresh topic map instance must not need to query for the
+        # topic.
+        tm = EATSTopicMap.objects.get(pk=self.tm.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(tm.entity_type_type, entity_type_type)
+        self.assertEqual(topic_registry.hits, 1)
+        # Accessing the property again uses the instance cache.
+        with self.assertNumQueries(0):
+            tm.entity_type_type
+        self.assertEqual(topic_registry.hits, 1)
+
+    def test_load (self):
+        name_role_type = self.tm.name_role_type
+        self.tm.entity_type_type
+        self.tm.property_role_type
+        topic_registry.clear()
+        topic_registry.reset_statistics()
+        tm = EATSTopicMap.objects.get(pk=self.tm.pk)
+        # All well-known topics are loaded in a single query.
+        with self.assertNumQueries(1):
+            self.assertEqual(tm.name_role_type, name_role_type)
+            tm.entity_type_type
+            tm.property_role_type
+        self.assertEqual(topic_registry.get_statistics(),
+                         {'hits': 3, 'misses': 0, 'loads': 1})
+
+    def test_topic_map_creation_invalidates (self):
+        self.tm.name_role_type
+        self.assertTrue(topic_registry.get(
+                self.tm, NAME_ROLE_TYPE_IRI) is not None)
+        self.tm.delete()
+        self.reset_managers()
+        self.tm = self.create_topic_map()
+        loads = topic_registry.loads
+        self.assertEqual(topic_registry.get(self.tm, NAME_ROLE_TYPE_IRI),
+                         None)
+        self.assertEqual(topic_registry.loads, loads + 1)
+
+    def test_receivers_only_for_topic_maps (self):
+        # Other models are left to Django's fast delete, which is not
+        # possible for a model with delete receivers.
+        for model in (Name, Topic):
+            self.assertFalse(post_delete.has_listeners(model))
+            self.assertFalse(post_save.has_listeners(model))
@@ -17,3 +17,4 @@ from test_language import *
 from test_name_part_type import *
 from test_name_type import *
 from test_script import *
+from test_statistics import *
@@ -1,5 +1,6 @@
 from django.core.urlresolvers import reverse
 
+from eats.forms.admin import AuthorityForm
 from eats.models import Authority
 from eats.tests.views.view_test_case import ViewTestCase
 
@@ -112,6 +113,39 @@ class AuthorityViewsTestCase (ViewTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context['form'].instance, self.authority)
 
+    def test_authority_change_get_usage (self):
+        entity_type1 = self.create_entity_type('person')
+        entity_type2 = self.create_entity_type('place')
+        self.authority.set_entity_types([entity_type1, entity_type2])
+        entity = self.tm.create_entity(self.authority)
+        entity.create_entity_type_property_assertion(self.authority,
+                                                     entity_type1)
+        url = reverse('authority-change', kwargs={
+                'topic_id': self.authority.get_id()})
+        response = self.app.get(url)
+        choices = dict(
+            response.context['form'].fields['entity_types'].choices)
+        self.assertEqual(choices[unicode(entity_type1.get_id())],
+                         u'person (in use: 1)')
+        self.assertEqual(choices[unicode(entity_type2.get_id())], u'place')
+
+    def test_authority_change_form_usage (self):
+        # The uses of the components are counted only when the form
+        # is rendered, and not to validate submitted data.
+        entity_type = self.create_entity_type('person')
+        self.authority.set_entity_types([entity_type])
+        entity = self.tm.create_entity(self.authority)
+        entity.create_entity_type_property_assertion(self.authority,
+                                                     entity_type)
+        data = {'name': 'Test',
+                'entity_types': [unicode(entity_type.get_id())]}
+        form = AuthorityForm(self.tm, Authority, data=data,
+                             instance=self.authority)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form._usage, None)
+        self.assertTrue(u'person (in use: 1)' in unicode(
+                form['entity_types']))
+
     def test_authority_change_post (self):
         self.assertEqual(Authority.objects.count(), 1)
         url = reverse('authority-change', kwargs={
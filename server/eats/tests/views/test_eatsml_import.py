@@ -1,7 +1,12 @@
+import shutil
+from StringIO import StringIO
+import tempfile
+
 from django.conf import settings
+from django.core.management import call_command
 from django.core.urlresolvers import reverse
 
-from eats.models import EATSMLImport
+from eats.models import Authority, EATSMLImport
 from eats.tests.views.view_test_case import ViewTestCase
 
 
@@ -13,6 +18,17 @@ class EATSMLImportViewTestCase (ViewTestCase):
         self.editor = self.create_user(user)
         self.editor.editable_authorities = [self.authority]
         self.url = reverse('import-eatsml')
+        # The uploaded, imported and annotated documents are saved as
+        # files.
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = self.settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def _run_worker (self):
+        call_command('eats_import_worker', stdout=StringIO(),
+                     work_dir=self.media_root)
     
     def test_authentication (self):
         """Tests that only an editor can see the import page."""
@@ -58,6 +74,26 @@ class EATSMLImportViewTestCase (ViewTestCase):
                            kwargs={'import_id': eatsml_import.id})
         self.assertEqual(response.request.url[len(response.request.host_url):],
                          view_url)
+        # The import is queued, and carried out by a worker.
+        self.assertEqual(eatsml_import.status, EATSMLImport.QUEUED)
+        progress_url = reverse('display-eatsml-import-progress',
+                               kwargs={'import_id': eatsml_import.id})
+        response = self.app.get(progress_url, user='user')
+        self.assertEqual(response.json['status'], EATSMLImport.QUEUED)
+        self._run_worker()
+        response = self.app.get(progress_url, user='user')
+        self.assertEqual(response.json['status'], EATSMLImport.COMPLETED)
+        self.assertEqual(response.json['eta'], 0)
+        raw_url = reverse('display-eatsml-import-raw',
+                          kwargs={'import_id': eatsml_import.id})
+        response = self.app.get(raw_url, user='user')
+        self.assertTrue('New authority' in response)
+        self.assertFalse('eats_id' in response)
+        annotated_url = reverse('display-eatsml-import-annotated',
+                                kwargs={'import_id': eatsml_import.id})
+        response = self.app.get(annotated_url, user='user')
+        authority = Authority.objects.get_by_admin_name('New authority')
+        self.assertTrue('eats_id="%d"' % authority.get_id() in response)
 
     def test_post_invalid (self):
         self.assertEqual(EATSMLImport.objects.count(), 0)
@@ -75,6 +111,15 @@ class EATSMLImportViewTestCase (ViewTestCase):
         upload_file = ('import_file', 'eatsml.xml', import_xml)
         csrf_token = form['csrfmiddlewaretoken'].value
         data = {'csrfmiddlewaretoken': csrf_token, 'description': description}
-        self.app.post(self.url, data, status=500,
-                      upload_files=[upload_file], user='user')
-        self.assertEqual(EATSMLImport.objects.count(), 0)
+        self.app.post(self.url, data, upload_files=[upload_file],
+                      user='user')
+        self.assertEqual(EATSMLImport.objects.count(), 1)
+        self._run_worker()
+        eatsml_import = EATSMLImport.objects.all()[0]
+        self.assertEqual(eatsml_import.status, EATSMLImport.FAILED)
+        progress_url = reverse('display-eatsml-import-progress',
+                               kwargs={'import_id': eatsml_import.id})
+        response = self.app.get(progress_url, user='user')
+        self.assertEqual(response.json['status'], EATSMLImport.FAILED)
+        self.assertTrue(response.json['error'])
+        self.assertEqual(Authority.objects.count(), 1)
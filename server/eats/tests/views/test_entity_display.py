@@ -1,4 +1,6 @@
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from eats.constants import UNNAMED_ENTITY_NAME
 from eats.tests.views.view_test_case import ViewTestCase
@@ -16,6 +18,29 @@ class EntityDisplayViewTestCase (ViewTestCase):
         response = self.app.get(self.url)
         self.assertContains(response, UNNAMED_ENTITY_NAME, count=2)
 
+    def test_preferred_name (self):
+        english = self.create_language('English', 'en')
+        french = self.create_language('French', 'fr')
+        name_type = self.create_name_type('regular')
+        script = self.create_script('Latin', 'Latn', ' ')
+        self.authority.set_languages([english, french])
+        self.authority.set_name_types([name_type])
+        self.authority.set_scripts([script])
+        self.entity.create_name_property_assertion(
+            self.authority, name_type, english, script, 'Alan')
+        self.entity.create_name_property_assertion(
+            self.authority, name_type, french, script, 'Alain')
+        user = self.create_django_user('user', 'user@example.org',
+                                       'password')
+        eats_user = self.create_user(user)
+        eats_user.set_language(french)
+        response = self.app.get(self.url, user='user')
+        self.assertEqual(response.context['preferred_name_form'], 'Alain')
+        eats_user.set_language(english)
+        response = self.app.get(self.url, user='user')
+        self.assertEqual(response.context['preferred_name_form'], 'Alan')
+        self.assertContains(response, 'Alan', count=3)
+
     def test_no_related_entity_name (self):
         entity_relationship_type = self.create_entity_relationship_type(
             'is parent of', 'is child of')
@@ -38,6 +63,76 @@ class EntityDisplayViewTestCase (ViewTestCase):
             self.authority, entity_relationship_type, self.entity, entity2,
             self.tm.property_assertion_no_certainty)
         response = self.app.get(self.url)
-        self.assertTrue(assertion in response.context['relationship_pas'])
+        self.assertEqual([assertion.pk], [relationship_pa.pk for relationship_pa
+                                          in response.context['relationship_pas']])
         self.assertContains(response, 'is parent of', count=1)
         self.assertContains(response, '(uncertain)', count=1)
+
+    def test_number_of_queries (self):
+        # The number of queries made in displaying an entity does not
+        # depend on the number of its property assertions.
+        calendar = self.create_calendar('Gregorian')
+        date_period = self.create_date_period('lifespan')
+        date_type = self.create_date_type('exact')
+        entity_relationship_type = self.create_entity_relationship_type(
+            'is parent of', 'is child of')
+        entity_type = self.create_entity_type('person')
+        language = self.create_language('English', 'en')
+        name_type = self.create_name_type('regular')
+        script = self.create_script('Latin', 'Latn', ' ')
+        self.authority.set_calendars([calendar])
+        self.authority.set_date_periods([date_period])
+        self.authority.set_date_types([date_type])
+        self.authority.set_entity_relationship_types([entity_relationship_type])
+        self.authority.set_entity_types([entity_type])
+        self.authority.set_languages([language])
+        self.authority.set_name_types([name_type])
+        self.authority.set_scripts([script])
+        date_data = {'date_period': date_period, 'point': '1 January 1900',
+                     'point_normalised': '1900-01-01',
+                     'point_calendar': calendar, 'point_type': date_type,
+                     'point_certainty': self.tm.date_full_certainty}
+
+        def add_assertions (index):
+            other = self.tm.create_entity(self.authority)
+            other.create_name_property_assertion(
+                self.authority, name_type, language, script, 'Other %d' % index)
+            other.create_subject_identifier_property_assertion(
+                self.authority, 'http://www.example.org/%d/' % index)
+            self.entity.create_existence_property_assertion(
+                self.authority).create_date(date_data)
+            self.entity.create_entity_type_property_assertion(
+                self.authority, entity_type).create_date(date_data)
+            self.entity.create_name_property_assertion(
+                self.authority, name_type, language, script,
+                'Name %d' % index).create_date(date_data)
+            self.entity.create_entity_relationship_property_assertion(
+                self.authority, entity_relationship_type, other, self.entity,
+                self.tm.property_assertion_full_certainty).create_date(
+                date_data)
+            self.entity.create_note_property_assertion(
+                self.authority, 'Note %d' % index)
+            self.entity.create_subject_identifier_property_assertion(
+                self.authority, 'http://www.example.org/%d/' % index)
+
+        # The first display after adding assertions may fill caches
+        # that the later displays use.
+        add_assertions(1)
+        self.app.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.app.get(self.url)
+        query_count = len(queries)
+        self.assertContains(response, 'Other 1', count=2)
+        for index in range(2, 6):
+            add_assertions(index)
+        self.app.get(self.url)
+        with self.assertNumQueries(query_count):
+            response = self.app.get(self.url)
+        self.assertContains(response, 'Name 5', count=1)
+        self.assertContains(response, 'is child of', count=5)
+        self.assertContains(response, 'Other 5', count=2)
+        self.assertContains(response, 'Note 5', count=1)
+        self.assertContains(response, '1 January 1900', count=20)
+        self.assertContains(response, '[Test]', count=30)
+        self.assertContains(response, 'type: regular; language: English; '
+                            'script: Latin', count=5)
@@ -3,7 +3,7 @@
 from django.conf import settings
 from django.core.urlresolvers import reverse
 
-from eats.models import Entity
+from eats.models import DuplicateCandidate, Entity
 from eats.tests.views.view_test_case import ViewTestCase
 
 
@@ -99,6 +99,33 @@ class EntityMergeViewTestCase (ViewTestCase):
         self.assertEqual(set(entity1.get_entity_types()),
                          set([type1, type2]))
 
+    def test_duplicate_candidates (self):
+        entity1 = self.tm.create_entity(self.authority)
+        entity2 = self.tm.create_entity(self.authority)
+        entity3 = self.tm.create_entity(self.authority)
+        DuplicateCandidate.objects.create(entity=entity1, duplicate=entity2,
+                                          score=0.5)
+        DuplicateCandidate.objects.create(entity=entity2, duplicate=entity3,
+                                          score=0.9)
+        url = reverse('entity-merge', kwargs={'entity_id': entity2.get_id()})
+        response = self.app.get(url, user='user')
+        links = response.html.find(id='duplicate-candidates').find_all('a')
+        self.assertEqual([link['href'] for link in links], [
+                '?merge_entity=%s' % entity3.get_id(),
+                '?merge_entity=%s' % entity1.get_id()])
+        # Following a link selects the candidate in the merge form.
+        response = response.click(href='merge_entity=%s' % entity1.get_id())
+        form = response.forms['entity-merge-form']
+        self.assertEqual(form['merge_entity_1'].value, str(entity1.get_id()))
+        response = form.submit().follow()
+        self.assertEqual(set(Entity.objects.all()), set([entity2, entity3]))
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+        # An entity that is not a candidate is not selected.
+        response = self.app.get(url + '?merge_entity=%s' % entity2.get_id(),
+                                user='user')
+        form = response.forms['entity-merge-form']
+        self.assertEqual(form['merge_entity_1'].value, '')
+
     def test_merge_redirect (self):
         # A merged entity should have URLs based on its identifier
         # redirect to the appropriate page for the entity it was
@@ -0,0 +1,35 @@
+from django.core.urlresolvers import reverse
+
+from eats.tests.views.view_test_case import ViewTestCase
+
+
+class StatisticsViewTestCase (ViewTestCase):
+
+    def setUp (self):
+        super(StatisticsViewTestCase, self).setUp()
+        self.url = reverse('statistics')
+
+    def test_statistics (self):
+        entity_type = self.create_entity_type('person')
+        self.authority.set_entity_types([entity_type])
+        entity = self.tm.create_entity(self.authority)
+        entity.create_entity_type_property_assertion(self.authority,
+                                                     entity_type)
+        self.create_entity_relationship_type('is child of', 'is parent of')
+        response = self.app.get(self.url)
+        self.assertEqual(response.context['number_entities'], 1)
+        self.assertEqual(response.context['entity_type_stats'],
+                         {'person': {'Test': 1}})
+        self.assertEqual(response.context['entity_relationship_stats'],
+                         {'is child of / is parent of': {'Test': 0}})
+        self.assertEqual(response.context['stale_since'], None)
+        self.tm.create_entity(self.authority)
+        # The page shows the previous statistics until they have been
+        # out of date for long enough.
+        with self.settings(EATS_STATISTICS_MAX_STALENESS=60):
+            response = self.app.get(self.url)
+        self.assertEqual(response.context['number_entities'], 1)
+        self.assertNotEqual(response.context['stale_since'], None)
+        with self.settings(EATS_STATISTICS_MAX_STALENESS=0):
+            response = self.app.get(self.url)
+        self.assertEqual(response.context['number_entities'], 2)
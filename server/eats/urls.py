@@ -40,6 +40,9 @@ urlpatterns += patterns(
     url(r'^import/$', 'import_eatsml', name='import-eatsml'),
     url(r'^import/(?P<import_id>\d+)/$', 'display_eatsml_import',
         name='display-eatsml-import'),
+    url(r'^import/(?P<import_id>\d+)/progress/$',
+        'display_eatsml_import_progress',
+        name='display-eatsml-import-progress'),
     url(r'^import/(?P<import_id>\d+)/raw/$', 'display_eatsml_import_raw',
         name='display-eatsml-import-raw'),
     url(r'^import/(?P<import_id>\d+)/annotated/$',
@@ -5,14 +5,18 @@ from django.shortcuts import redirect, render
 
 from lxml import etree
 
-from eats.constants import UNNAMED_ENTITY_NAME
 from eats.decorators import add_topic_map
 from eats.exceptions import EATSMergedIdentifierException
 from eats.forms.display import EntitySearchForm
 from eats.lib.eatsml_exporter import EATSMLExporter
+from eats.lib.entity_display_loader import EntityDisplayLoader
+from eats.lib.entity_search import EntitySearch
+from eats.lib.infrastructure_catalogue import get_infrastructure_catalogue
+from eats.lib.statistics import ALL_ASSERTIONS, DATED_ASSERTIONS, StatisticsEngine
 from eats.lib.user import get_user_preferences, user_is_editor
 from eats.lib.views import get_topic_or_404
-from eats.models import Authority, Entity, EntityRelationshipPropertyAssertion, EntityRelationshipType, EntityType, EntityTypePropertyAssertion
+from eats.models import Authority, Entity, EntityRelationshipType, EntityType, Language, Script
+from eats.models.statistics_snapshot import ASSERTIONS_PER_ENTITY, DATE_COVERAGE, ENTITIES, ENTITY_RELATIONSHIP_TYPES, ENTITY_TYPES, NAME_LANGUAGES_SCRIPTS
 
 
 def home (request):
@@ -30,30 +34,22 @@ def entity_view (request, topic_map, entity_id):
     preferred_authority = user_preferences['preferred_authority']
     preferred_language = user_preferences['preferred_language']
     preferred_script = user_preferences['preferred_script']
-    try:
-        preferred_name_form = entity.get_preferred_name(
-            authority=preferred_authority, language=preferred_language,
-            script=preferred_script).name.assembled_form
-    except AttributeError:
-        preferred_name_form = UNNAMED_ENTITY_NAME
-    existence_dates = entity.get_existence_dates()
-    entity_type_pas = entity.get_entity_types()
-    name_pas = entity.get_eats_names()
-    relationship_pas = entity.get_entity_relationships()
-    note_pas = entity.get_notes()
-    subject_identifier_pas = entity.get_eats_subject_identifiers()
+    # The property assertions, and everything displayed about them,
+    # including the preferred name, are loaded in bulk, so that the
+    # number of queries does not depend on the number of assertions.
+    record = EntityDisplayLoader(topic_map).load_entity(
+        entity, preferred_authority, preferred_language, preferred_script)
     context_data = {'entity': entity,
                     'preferred_authority': preferred_authority,
                     'preferred_language': preferred_language,
-                    'preferred_name_form': preferred_name_form,
+                    'preferred_name_form': record.preferred_name_form,
                     'preferred_script': preferred_script,
-                    'existence_dates': existence_dates,
-                    'entity_type_pas': entity_type_pas, 'name_pas': name_pas,
-                    'note_pas': note_pas,
-                    'property_assertion_full_certainty':
-                        topic_map.property_assertion_full_certainty,
-                    'relationship_pas': relationship_pas,
-                    'subject_identifier_pas': subject_identifier_pas,
+                    'existence_pas': record.existences,
+                    'entity_type_pas': record.entity_types,
+                    'name_pas': record.names, 'note_pas': record.notes,
+                    'relationship_pas': record.entity_relationships,
+                    'subject_identifier_pas': record.subject_identifiers,
+                    'eats_subject_identifier': record.url,
                     'site': Site.objects.get_current(),
                     'user_is_editor': user_is_editor(request.user)}
     return render(request, 'eats/display/entity.html', context_data)
@@ -82,8 +78,13 @@ def search (request, topic_map):
         entity_type = None
         if entity_type_id:
             entity_type = EntityType.objects.get_by_identifier(entity_type_id)
-        results_list = topic_map.lookup_entities(name, entity_type)
-        paginator = Paginator(results_list, 10)
+        date_range = (form.cleaned_data['date_from'],
+                      form.cleaned_data['date_to'])
+        user_preferences = get_user_preferences(request)
+        entity_search = EntitySearch(
+            name, entity_type, user_preferences['preferred_authority'],
+            date_range)
+        paginator = Paginator(entity_search, 10)
         page = request.GET.get('page')
         try:
             results = paginator.page(page)
@@ -91,7 +92,6 @@ def search (request, topic_map):
             results = paginator.page(1)
         except EmptyPage:
             results = paginator.page(paginator.num_pages)
-        user_preferences = get_user_preferences(request)
     context_data = {
         'property_assertion_full_certainty': \
             topic_map.property_assertion_full_certainty,
@@ -114,22 +114,63 @@ def search_eatsml (request, topic_map):
 
 @add_topic_map
 def statistics (request, topic_map):
-    number_entities = Entity.objects.count()
+    snapshots = StatisticsEngine(topic_map).get_snapshots()
+    catalogue = get_infrastructure_catalogue()
+    admin_names = catalogue.get_names(topic_map, topic_map.admin_name_type)
+
+    def get_admin_names (model):
+        return dict([(pk, admin_names.get(pk)) for pk in
+                     model.objects.values_list('pk', flat=True)])
+
+    authorities = get_admin_names(Authority)
+    number_entities = snapshots[ENTITIES].get_counts().get((None, None), 0)
+    forward_names = catalogue.get_names(topic_map,
+                                        topic_map.relationship_name_type)
+    reverse_names = catalogue.get_names(
+        topic_map, topic_map.reverse_relationship_name_type)
+    relationship_type_names = dict(
+        [(pk, u'%s / %s' % (forward_names.get(pk), reverse_names.get(pk)))
+         for pk in EntityRelationshipType.objects.values_list(
+                'pk', flat=True)])
     entity_type_stats = {}
     entity_relationship_stats = {}
-    authorities = list(Authority.objects.all())
-    for entity_type in EntityType.objects.all():
-        et_data = entity_type_stats.setdefault(entity_type.get_admin_name(), {})
-        for authority in authorities:
-            et_data[authority.get_admin_name()] = EntityTypePropertyAssertion.objects.filter_by_authority_entity_type(authority, entity_type).count()
-    for entity_relationship_type in EntityRelationshipType.objects.all():
-        ert_data = entity_relationship_stats.setdefault(entity_relationship_type.get_admin_name(), {})
-        for authority in authorities:
-            ert_data[authority.get_admin_name()] = EntityRelationshipPropertyAssertion.objects.filter_by_authority_entity_relationship_type(authority, entity_relationship_type).count()
+    for names, section, stats in (
+        (get_admin_names(EntityType), ENTITY_TYPES, entity_type_stats),
+        (relationship_type_names, ENTITY_RELATIONSHIP_TYPES,
+         entity_relationship_stats)):
+        counts = snapshots[section].get_counts()
+        for pk, name in names.items():
+            data = stats.setdefault(name, {})
+            for authority_pk, authority_name in authorities.items():
+                data[authority_name] = counts.get((authority_pk, pk), 0)
+    languages = get_admin_names(Language)
+    scripts = get_admin_names(Script)
+    name_stats = sorted(
+        [(languages.get(language), scripts.get(script), count) for
+         (language, script), count in
+         snapshots[NAME_LANGUAGES_SCRIPTS].get_counts().items()])
+    date_counts = snapshots[DATE_COVERAGE].get_counts()
+    date_stats = []
+    for kind in sorted(set([kind for kind, column in date_counts])):
+        number = date_counts.get((kind, ALL_ASSERTIONS), 0)
+        dated = date_counts.get((kind, DATED_ASSERTIONS), 0)
+        date_stats.append((kind.replace('_', ' '), number, dated,
+                           number and 100 * dated / number))
+    assertion_stats = sorted(
+        [(number, count) for (number, column), count in
+         snapshots[ASSERTIONS_PER_ENTITY].get_counts().items()])
+    stale_since = [snapshot.stale_since for snapshot in snapshots.values()
+                   if snapshot.is_stale]
     context_data = {
         'number_entities': number_entities,
         'entity_type_stats': entity_type_stats,
         'entity_relationship_stats': entity_relationship_stats,
-        'authorities': [authority.get_admin_name() for authority in authorities],
+        'authorities': sorted(authorities.values()),
+        'name_stats': name_stats,
+        'date_stats': date_stats,
+        'assertion_stats': assertion_stats,
+        'computed': min([snapshot.computed for snapshot in
+                         snapshots.values()]),
+        'stale_since': stale_since and min(stale_since) or None,
     }
     return render(request, 'eats/display/statistics.html', context_data)
@@ -1,9 +1,6 @@
-import StringIO
-
 from django.contrib.auth.decorators import user_passes_test
 from django.core.urlresolvers import reverse
-from django.db import transaction
-from django.http import HttpResponse, Http404
+from django.http import FileResponse, HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator, InvalidPage, EmptyPage
 from django.shortcuts import get_object_or_404, redirect, render
 
@@ -12,13 +9,17 @@ from lxml import etree
 from eats.constants import UNNAMED_ENTITY_NAME
 from eats.exceptions import EATSMergedIdentifierException
 from eats.lib.eatsml_exporter import EATSMLExporter
-from eats.lib.eatsml_importer import EATSMLImporter
+from eats.lib.entity_merge import EntityMerger
 from eats.lib.property_assertions import EntityRelationshipPropertyAssertions, EntityTypePropertyAssertions, ExistencePropertyAssertions, NamePropertyAssertions, NotePropertyAssertions, SubjectIdentifierPropertyAssertions
 from eats.lib.user import get_user_preferences, user_is_editor
 from eats.lib.views import get_topic_or_404
 from eats.decorators import add_topic_map
 from eats.forms.edit import CreateEntityForm, create_choice_list, CurrentAuthorityForm, DateForm, EATSMLImportForm, EntityMergeForm
-from eats.models import Authority, Calendar, DatePeriod, DateType, EATSMLImport, Entity, EntityType
+from eats.models import Authority, Calendar, DatePeriod, DateType, DuplicateCandidate, EATSMLImport, Entity, EntityType, NameCache
+
+
+# Maximum number of likely duplicates offered on the entity merge page.
+MAX_DUPLICATE_CANDIDATES = 20
 
 
 @user_passes_test(user_is_editor)
@@ -140,14 +141,8 @@ def entity_delete (request, topic_map, entity_id):
     except EATSMergedIdentifierException, e:
         return redirect('entity-delete', entity_id=e.new_id, permanent=True)
     editable_authorities = request.user.eats_user.editable_authorities.all()
-    assertion_getters = [entity.get_eats_names, entity.get_entity_relationships,
-                         entity.get_entity_types, entity.get_existences,
-                         entity.get_eats_subject_identifiers, entity.get_notes]
-    can_delete = True
-    for assertion_getter in assertion_getters:
-        for assertion in assertion_getter():
-            if assertion.authority not in editable_authorities:
-                can_delete = False
+    can_delete = not Entity.objects.filter_asserting_authorities(
+        [entity]).exclude(pk__in=editable_authorities).exists()
     if request.method == 'POST' and can_delete:
         entity.remove()
         return redirect(reverse('search'))
@@ -167,23 +162,39 @@ def entity_merge (request, topic_map, entity_id):
         if form.is_valid():
             merge_entity = form.cleaned_data['merge_entity']
             editable_authorities = request.user.eats_user.editable_authorities.all()
-            assertion_getters = ['get_eats_names', 'get_entity_relationships',
-                                 'get_entity_types', 'get_existences',
-                                 'get_eats_subject_identifiers', 'get_notes']
-            can_merge = True
-            for assertion_getter in assertion_getters:
-                for assertion in getattr(merge_entity, assertion_getter)():
-                    if assertion.authority not in editable_authorities:
-                        can_merge = False
-            if can_merge:
-                entity.merge_in(merge_entity)
+            merger = EntityMerger(topic_map)
+            if merger.can_merge([merge_entity], editable_authorities):
+                merger.merge([(entity, merge_entity)])
                 return redirect(
                     reverse('entity-change', kwargs={'entity_id': entity_id}))
             else:
                 context_data['unauthorised'] = True
-    else:
-        form = EntityMergeForm()
+    # Offer the likely duplicates of the entity found by
+    # eats_find_duplicates for merging.
+    user_preferences = get_user_preferences(request)
+    candidates = DuplicateCandidate.objects.filter_by_entity(
+        entity).select_related('entity__identifier',
+                               'duplicate__identifier')[:MAX_DUPLICATE_CANDIDATES]
+    others = [candidate.get_other(entity) for candidate in candidates]
+    name_forms = NameCache.objects.get_preferred_forms(
+        others, user_preferences['preferred_authority'],
+        user_preferences['preferred_language'],
+        user_preferences['preferred_script'])
+    duplicate_candidates = []
+    for candidate, other in zip(candidates, others):
+        duplicate_candidates.append({
+                'entity_id': str(other.get_id()),
+                'name': name_forms.get(other.pk, UNNAMED_ENTITY_NAME),
+                'score': candidate.score})
+    if request.method != 'POST':
+        initial = {}
+        merge_entity_id = request.GET.get('merge_entity')
+        if merge_entity_id in [candidate['entity_id'] for candidate in
+                               duplicate_candidates]:
+            initial['merge_entity'] = merge_entity_id
+        form = EntityMergeForm(initial=initial)
     context_data['form'] = form
+    context_data['duplicate_candidates'] = duplicate_candidates
     return render(request, 'eats/edit/entity_merge.html', context_data)
 
 @user_passes_test(user_is_editor)
@@ -273,28 +284,38 @@ def export_eatsml_base (request, topic_map):
 def export_eatsml_entities (request, topic_map):
     """Exports all entities in EATSML."""
     entities = Entity.objects.all()
-    tree = EATSMLExporter(topic_map).export_entities(entities)
-    return serialise_tree(tree)
+    pieces = EATSMLExporter(topic_map).export_entities_stream(entities)
+    return stream_xml(pieces)
 
 @user_passes_test(user_is_editor)
 @add_topic_map
 def export_eatsml_entities_by_entity_type (request, topic_map, entity_type_id):
     entity_type = get_topic_or_404(EntityType, entity_type_id)
     entities = Entity.objects.filter_by_entity_type(entity_type)
-    tree = EATSMLExporter(topic_map).export_entities(entities)
-    return serialise_tree(tree)
+    pieces = EATSMLExporter(topic_map).export_entities_stream(entities)
+    return stream_xml(pieces)
 
 @user_passes_test(user_is_editor)
 @add_topic_map
 def export_eatsml_full (request, topic_map):
     """Exports all EATS data in EATSML."""
-    tree = EATSMLExporter(topic_map).export_full()
-    return serialise_tree(tree)
+    pieces = EATSMLExporter(topic_map).export_full_stream()
+    return stream_xml(pieces)
 
 def serialise_tree (tree):
     xml = etree.tostring(tree, encoding='utf-8', pretty_print=True)
     return HttpResponse(xml, content_type='text/xml')
 
+def stream_xml (pieces):
+    return StreamingHttpResponse(pieces, content_type='text/xml')
+
+def xml_file_response (xml_file, xml):
+    """Returns a response with the contents of `xml_file`, or `xml`
+    if there is no file."""
+    if xml_file:
+        return FileResponse(xml_file, content_type='text/xml')
+    return HttpResponse(xml, content_type='text/xml')
+
 @user_passes_test(user_is_editor)
 @add_topic_map
 def import_eatsml (request, topic_map):
@@ -303,31 +324,14 @@ def import_eatsml (request, topic_map):
         form = EATSMLImportForm(request.POST, request.FILES)
         user = request.user.eats_user
         if form.is_valid():
-            eatsml_file = StringIO.StringIO()
-            for chunk in request.FILES['import_file'].chunks():
-                eatsml_file.write(chunk)
-            eatsml_file.seek(0)
-            # QAZ: After dealing with the uploaded file in chunks
-            # above, to prevent overwhelming the system with a huge
-            # file, straightaway the whole value is retrieved and
-            # passed to the importer.
-            eatsml = eatsml_file.getvalue()
-            try:
-                with transaction.atomic():
-                    import_tree, annotated_tree = EATSMLImporter(
-                        topic_map).import_xml(eatsml, user)
-            except Exception, e:
-                response = render(request, '500.html', {'message': e})
-                response.status_code = 500
-                return response
+            # The import is carried out by the eats_import_worker
+            # management command, so that large documents do not hold
+            # up the request.
             description = form.cleaned_data['description']
-            imported_xml = etree.tostring(import_tree, encoding='utf-8',
-                                          pretty_print=True)
-            annotated_xml = etree.tostring(annotated_tree, encoding='utf-8',
-                                           pretty_print=True)
-            eatsml_import = EATSMLImport(
-                importer=user, description=description, raw_xml=imported_xml,
-                annotated_xml=annotated_xml)
+            eatsml_import = EATSMLImport(importer=user,
+                                         description=description)
+            eatsml_import.source_file.save(
+                'eatsml.xml', request.FILES['import_file'], save=False)
             eatsml_import.save()
             redirect_url = reverse('display-eatsml-import',
                                    kwargs={'import_id': eatsml_import.id})
@@ -335,7 +339,8 @@ def import_eatsml (request, topic_map):
     else:
         form = EATSMLImportForm()
     import_list = EATSMLImport.objects.values('id', 'importer__user__username',
-                                              'description', 'import_date')
+                                              'description', 'import_date',
+                                              'status')
     paginator = Paginator(import_list, 100)
     try:
         page = int(request.GET.get('page', '1'))
@@ -354,12 +359,19 @@ def display_eatsml_import (request, import_id):
     context_data = {'import': eatsml_import}
     return render(request, 'eats/edit/eatsml_import_display.html', context_data)
 
+@user_passes_test(user_is_editor)
+def display_eatsml_import_progress (request, import_id):
+    """Returns the progress of an import, as JSON."""
+    eatsml_import = get_object_or_404(EATSMLImport, pk=import_id)
+    return JsonResponse(eatsml_import.get_progress())
+
 @user_passes_test(user_is_editor)
 def display_eatsml_import_raw (request, import_id):
     eatsml_import = get_object_or_404(EATSMLImport, pk=import_id)
-    return HttpResponse(eatsml_import.raw_xml, content_type='text/xml')
+    return xml_file_response(eatsml_import.raw_file, eatsml_import.raw_xml)
 
 @user_passes_test(user_is_editor)
 def display_eatsml_import_annotated (request, import_id):
     eatsml_import = get_object_or_404(EATSMLImport, pk=import_id)
-    return HttpResponse(eatsml_import.annotated_xml, content_type='text/xml')
+    return xml_file_response(eatsml_import.annotated_file,
+                             eatsml_import.annotated_xml)